@@ -0,0 +1,135 @@
+"""
+ARDT FMS - Authorization Snapshot
+Version: 5.4
+
+Resolves a user's role and permission codes once and reuses them.
+
+Two cache levels are used:
+- Request scope: the snapshot is stored on the User instance, which
+  AuthenticationMiddleware loads fresh for every request.
+- Cross-request: the snapshot is stored in the Django cache under a
+  global version number. Any change to UserRole, RolePermission, Role
+  or Permission rows bumps the version (see apps.accounts.signals).
+  The cache must be shared by all worker processes (CACHES from
+  REDIS_URL), otherwise a bump only reaches the worker that made it.
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+VERSION_CACHE_KEY = "accounts:authz:version"
+SNAPSHOT_ATTR = "_authz_snapshot"
+
+
+@dataclass(frozen=True)
+class AuthorizationSnapshot:
+    """Immutable set of role and permission codes for one user."""
+
+    role_codes: tuple = ()
+    permission_codes: frozenset = frozenset()
+
+    @property
+    def role_set(self):
+        return frozenset(self.role_codes)
+
+    def has_role(self, role_code):
+        return role_code in self.role_codes
+
+    def has_permission(self, permission_code):
+        return permission_code in self.permission_codes
+
+
+EMPTY_SNAPSHOT = AuthorizationSnapshot()
+
+
+def _cache_timeout():
+    return getattr(settings, "ARDT_AUTHZ_CACHE_TIMEOUT", 300)
+
+
+def _get_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_CACHE_KEY, version, timeout=None)
+    return version
+
+
+def _snapshot_cache_key(user, version):
+    # date_joined guards against reused primary keys (e.g. after a DB reset)
+    joined = user.date_joined.timestamp() if user.date_joined else 0
+    return f"accounts:authz:{version}:{user.pk}:{joined}"
+
+
+def _load_snapshot(user):
+    """Load role and permission codes with a single joined query."""
+    from .models import UserRole
+
+    rows = (
+        UserRole.objects.filter(user_id=user.pk)
+        .order_by("-role__level", "role__name")
+        .values_list("role__code", "role__role_permissions__permission__code")
+    )
+
+    role_codes = {}
+    permission_codes = set()
+    for role_code, permission_code in rows:
+        role_codes[role_code] = None
+        if permission_code is not None:
+            permission_codes.add(permission_code)
+
+    return AuthorizationSnapshot(
+        role_codes=tuple(role_codes),
+        permission_codes=frozenset(permission_codes),
+    )
+
+
+def get_authorization(user):
+    """
+    Return the AuthorizationSnapshot for a user.
+
+    The first call on a User instance consults the shared cache and falls
+    back to the database; later calls are plain attribute lookups.
+    """
+    if user is None or user.pk is None or not user.is_authenticated:
+        return EMPTY_SNAPSHOT
+
+    snapshot = user.__dict__.get(SNAPSHOT_ATTR)
+    if snapshot is not None:
+        return snapshot
+
+    key = _snapshot_cache_key(user, _get_version())
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _load_snapshot(user)
+        cache.set(key, snapshot, timeout=_cache_timeout())
+
+    user.__dict__[SNAPSHOT_ATTR] = snapshot
+    return snapshot
+
+
+def clear_authorization(user):
+    """Drop the request-scoped snapshot held on a User instance."""
+    if user is not None:
+        user.__dict__.pop(SNAPSHOT_ATTR, None)
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.add(VERSION_CACHE_KEY, 2, timeout=None)
+
+
+def invalidate_authorization_cache():
+    """
+    Invalidate every cached snapshot by bumping the global version.
+
+    When called inside a transaction the version is bumped again on
+    commit, so a request that cached pre-commit data cannot keep it.
+    """
+    _bump_version()
+    if connection.in_atomic_block:
+        transaction.on_commit(_bump_version)
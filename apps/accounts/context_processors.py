@@ -5,11 +5,18 @@ Version: 5.4
 Context processors for template-level permission checking.
 """
 
+from django.utils.functional import SimpleLazyObject
+
+from .authorization import EMPTY_SNAPSHOT, get_authorization
+
 
 def permissions(request):
     """
     Add permission helper functions to template context.
 
+    Nothing here touches the database until a template actually reads
+    one of the values; all of them share the user's AuthorizationSnapshot.
+
     Usage in templates:
         {% if perms.has_role.ADMIN %}
             Admin content here
@@ -19,33 +26,43 @@ def permissions(request):
             <a href="{% url 'workorders:create' %}">Create Work Order</a>
         {% endif %}
     """
-    if not request.user.is_authenticated:
-        return {
-            'perms': PermissionChecker(None),
-            'user_roles': [],
-            'user_permissions': [],
-        }
+    user = getattr(request, 'user', None)
+    checker = PermissionChecker(user)
 
     return {
-        'perms': PermissionChecker(request.user),
-        'user_roles': request.user.role_codes if hasattr(request.user, 'role_codes') else [],
-        'user_permissions': request.user.get_permissions() if hasattr(request.user, 'get_permissions') else [],
+        'perms': checker,
+        'user_roles': SimpleLazyObject(lambda: list(checker.snapshot.role_codes)),
+        'user_permissions': SimpleLazyObject(lambda: list(checker.snapshot.permission_codes)),
     }
 
 
 class PermissionChecker:
     """
     Helper class for checking permissions in templates.
+
+    The user may be a lazy object (request.user); it is only evaluated
+    when a check is made.
     """
 
     def __init__(self, user):
         self.user = user
-        self.has_role = RoleChecker(user)
-        self.has_permission = PermChecker(user)
+        self.has_role = RoleChecker(self)
+        self.has_permission = PermChecker(self)
 
     def __bool__(self):
         return self.user is not None and self.user.is_authenticated
 
+    @property
+    def is_superuser(self):
+        return bool(self) and self.user.is_superuser
+
+    @property
+    def snapshot(self):
+        """The user's AuthorizationSnapshot (empty for anonymous users)."""
+        if not self:
+            return EMPTY_SNAPSHOT
+        return get_authorization(self.user)
+
 
 class RoleChecker:
     """
@@ -54,23 +71,16 @@ class RoleChecker:
     Usage: perms.has_role.ADMIN
     """
 
-    def __init__(self, user):
-        self.user = user
-        self._cache = {}
+    def __init__(self, checker):
+        self._checker = checker
 
     def __getattr__(self, role_code):
         if role_code.startswith('_'):
             raise AttributeError(role_code)
 
-        if role_code not in self._cache:
-            if self.user is None or not self.user.is_authenticated:
-                self._cache[role_code] = False
-            elif self.user.is_superuser:
-                self._cache[role_code] = True
-            else:
-                self._cache[role_code] = self.user.has_role(role_code)
-
-        return self._cache[role_code]
+        if self._checker.is_superuser:
+            return True
+        return self._checker.snapshot.has_role(role_code)
 
 
 class PermChecker:
@@ -81,9 +91,8 @@ class PermChecker:
     (Note: use underscore instead of dot in template)
     """
 
-    def __init__(self, user):
-        self.user = user
-        self._cache = {}
+    def __init__(self, checker):
+        self._checker = checker
 
     def __getattr__(self, perm_code):
         if perm_code.startswith('_'):
@@ -92,12 +101,6 @@ class PermChecker:
         # Convert underscore to dot for permission lookup
         actual_perm = perm_code.replace('_', '.', 1)
 
-        if actual_perm not in self._cache:
-            if self.user is None or not self.user.is_authenticated:
-                self._cache[actual_perm] = False
-            elif self.user.is_superuser:
-                self._cache[actual_perm] = True
-            else:
-                self._cache[actual_perm] = self.user.has_permission(actual_perm)
-
-        return self._cache[actual_perm]
+        if self._checker.is_superuser:
+            return True
+        return self._checker.snapshot.has_permission(actual_perm)
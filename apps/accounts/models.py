@@ -110,32 +110,47 @@ class User(AbstractUser):
         """Get display name (full name or username)."""
         return self.get_full_name() or self.username
 
+    @property
+    def authorization(self):
+        """Resolved role/permission snapshot, loaded once per request."""
+        from .authorization import get_authorization
+
+        return get_authorization(self)
+
+    def clear_authorization_cache(self):
+        """Force the next role/permission check to reload the snapshot."""
+        from .authorization import clear_authorization
+
+        clear_authorization(self)
+
     @property
     def role_codes(self):
         """Get list of role codes for this user."""
-        return list(self.roles.values_list("code", flat=True))
+        return list(self.authorization.role_codes)
 
     def has_role(self, role_code):
         """Check if user has a specific role."""
-        return role_code in self.role_codes
+        return self.authorization.has_role(role_code)
 
     def has_any_role(self, role_codes):
         """Check if user has any of the specified roles."""
-        return any(code in self.role_codes for code in role_codes)
+        roles = self.authorization.role_set
+        return any(code in roles for code in role_codes)
 
     def has_all_roles(self, role_codes):
         """Check if user has all of the specified roles."""
-        return all(code in self.role_codes for code in role_codes)
+        roles = self.authorization.role_set
+        return all(code in roles for code in role_codes)
 
     def get_permissions(self):
         """Get all permission codes for this user."""
-        return list(Permission.objects.filter(roles__in=self.roles.all()).values_list("code", flat=True).distinct())
+        return list(self.authorization.permission_codes)
 
     def has_permission(self, permission_code):
         """Check if user has a specific permission."""
         if self.is_superuser:
             return True
-        return permission_code in self.get_permissions()
+        return self.authorization.has_permission(permission_code)
 
 
 class Role(models.Model):
@@ -0,0 +1,49 @@
+"""
+ARDT FMS - Accounts Signal Handlers
+Version: 5.4
+
+Keeps the authorization snapshot cache in sync with role assignments.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authorization import clear_authorization, invalidate_authorization_cache
+from .models import Permission, Role, RolePermission, User, UserRole
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def user_role_changed(sender, instance, **kwargs):
+    """Invalidate cached authorization when a role is assigned or removed."""
+    invalidate_authorization_cache()
+    # Also refresh the in-memory snapshot of the instance that was used
+    if UserRole.user.is_cached(instance):
+        clear_authorization(instance.user)
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def role_definition_changed(sender, **kwargs):
+    """Invalidate cached authorization when roles or permissions change."""
+    invalidate_authorization_cache()
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def user_roles_m2m_changed(sender, instance, action, **kwargs):
+    """Handle user.roles.add()/remove()/clear()."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_authorization_cache()
+        if isinstance(instance, User):
+            clear_authorization(instance)
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_m2m_changed(sender, action, **kwargs):
+    """Handle role.permissions.add()/remove()/clear()."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_authorization_cache()
@@ -0,0 +1,86 @@
+"""
+Tests for Accounts context processors.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import engines
+from django.test import RequestFactory
+from django.utils.functional import SimpleLazyObject
+
+from apps.accounts.context_processors import permissions
+from apps.common.tests.base import assert_template_queries
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def qc_user(db):
+    from apps.accounts.models import Permission, Role, RolePermission, UserRole
+
+    user = User.objects.create_user(username='inspector', password='testpass123')
+    role = Role.objects.create(code='QC', name='Quality Control')
+    perm = Permission.objects.create(code='quality.approve', name='Approve', module='quality')
+    RolePermission.objects.create(role=role, permission=perm)
+    UserRole.objects.create(user=user, role=role)
+    return User.objects.get(pk=user.pk)
+
+
+def make_request(user):
+    request = RequestFactory().get('/')
+    request.user = user
+    return request
+
+
+class TestPermissionsContextProcessor:
+    """Tests for the lazy permissions context processor."""
+
+    def test_does_not_evaluate_user(self):
+        """Building the context must not load request.user."""
+        def fail():
+            raise AssertionError('request.user was evaluated')
+
+        context = permissions(make_request(SimpleLazyObject(fail)))
+        assert set(context) == {'perms', 'user_roles', 'user_permissions'}
+
+    def test_partial_without_perms_costs_no_queries(self, qc_user):
+        """A partial that never reads perms issues no queries."""
+        html = assert_template_queries(
+            0, 'components/status_badge.html',
+            {'status': 'OPEN', 'status_display': 'Open'}, make_request(qc_user),
+        )
+        assert 'Open' in html
+
+    def test_all_values_share_one_query(self, qc_user):
+        """perms, user_roles and user_permissions resolve from one snapshot."""
+        template = engines['django'].from_string(
+            '{% if perms.has_role.QC %}qc{% endif %}'
+            '{% if perms.has_permission.quality_approve %}approve{% endif %}'
+            '{% for r in user_roles %}[{{ r }}]{% endfor %}'
+            '{{ user_permissions|length }}'
+        )
+        html = assert_template_queries(1, template, request=make_request(qc_user))
+        assert html == 'qcapprove[QC]1'
+
+    def test_anonymous_user(self, db):
+        """Anonymous users get falsy checks and empty lists."""
+        context = permissions(make_request(AnonymousUser()))
+        assert not context['perms']
+        assert context['perms'].has_role.ADMIN is False
+        assert context['perms'].has_permission.workorders_create is False
+        assert list(context['user_roles']) == []
+
+    def test_superuser_bypass(self, admin_user, django_assert_num_queries):
+        """Superusers pass every check without loading roles."""
+        context = permissions(make_request(admin_user))
+        with django_assert_num_queries(0):
+            assert context['perms'].has_role.ANYTHING is True
+            assert context['perms'].has_permission.workorders_delete is True
@@ -145,3 +145,66 @@ class TestUserModel:
                 password='testpass123',
                 is_superuser=False
             )
+
+
+class TestUserAuthorizationCache:
+    """Tests for the request-scoped role/permission snapshot."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def planner(self, db):
+        from apps.accounts.models import Permission, Role, RolePermission, UserRole
+
+        user = User.objects.create_user(username='planner', password='testpass123')
+        role = Role.objects.create(code='PLANNER', name='Planner', level=3)
+        perm = Permission.objects.create(code='workorders.create', name='Create WO', module='workorders')
+        RolePermission.objects.create(role=role, permission=perm)
+        UserRole.objects.create(user=user, role=role)
+        return User.objects.get(pk=user.pk)
+
+    def test_checks_share_one_query(self, planner, django_assert_num_queries):
+        """All role and permission checks on one instance cost a single query."""
+        with django_assert_num_queries(1):
+            assert planner.has_role('PLANNER')
+            assert planner.has_any_role(['ADMIN', 'PLANNER'])
+            assert not planner.has_all_roles(['ADMIN', 'PLANNER'])
+            assert planner.has_permission('workorders.create')
+            assert planner.role_codes == ['PLANNER']
+            assert planner.get_permissions() == ['workorders.create']
+
+    def test_snapshot_shared_across_requests(self, planner, django_assert_num_queries):
+        """A fresh instance of the same user reuses the cached snapshot."""
+        planner.has_role('PLANNER')
+        fresh = User.objects.get(pk=planner.pk)
+        with django_assert_num_queries(0):
+            assert fresh.has_role('PLANNER')
+
+    def test_role_assignment_invalidates_cache(self, planner):
+        """Assigning a role is visible to the same and to fresh instances."""
+        from apps.accounts.models import Role, UserRole
+
+        assert not planner.has_role('QC')
+        UserRole.objects.create(user=planner, role=Role.objects.create(code='QC', name='QC'))
+        assert planner.has_role('QC')
+        assert User.objects.get(pk=planner.pk).has_role('QC')
+
+    def test_role_permission_change_invalidates_cache(self, planner):
+        """Removing a permission from a role drops it for cached users."""
+        from apps.accounts.models import RolePermission
+
+        assert planner.has_permission('workorders.create')
+        RolePermission.objects.all().delete()
+        assert not User.objects.get(pk=planner.pk).has_permission('workorders.create')
+
+    def test_user_without_roles(self, db):
+        """Users with no roles get empty role and permission lists."""
+        user = User.objects.create_user(username='norole', password='testpass123')
+        assert user.role_codes == []
+        assert user.get_permissions() == []
+        assert not user.has_permission('workorders.create')
@@ -0,0 +1,17 @@
+"""
+ARDT FMS - Common Admin
+Version: 5.4
+"""
+
+from django.contrib import admin
+
+from .models import DocumentSequence
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    """Admin for document number counters."""
+
+    list_display = ["key", "last_value", "updated_at"]
+    search_fields = ["key"]
+    readonly_fields = ["updated_at"]
@@ -0,0 +1,79 @@
+"""
+ARDT FMS - Compiled Object Cache
+Version: 5.4
+
+Keeps objects compiled from database rows (branch tables, form schemas)
+in a per-process LRU, invalidated through version counters stored in
+the Django cache.
+
+Writers bump the version keys an object depends on; every process sees
+the new version on its next lookup and recompiles. Inside a transaction
+the version is bumped again on commit, so an object compiled from
+pre-commit rows cannot be kept. Entries also expire after
+ARDT_COMPILED_CACHE_TIMEOUT seconds, which bounds staleness if a bump is
+lost (e.g. an evicted version key).
+
+Usage:
+    _tables = CompiledCache(max_entries=256)
+    table = _tables.get((procedure_id, revision), [version_key], lambda: compile_procedure(procedure_id))
+    invalidate(version_key)
+
+The Django cache must be shared by all worker processes (CACHES from
+REDIS_URL); over a per-process cache a bump only reaches its own worker.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+def _timeout():
+    return getattr(settings, "ARDT_COMPILED_CACHE_TIMEOUT", 300)
+
+
+def bump_version(key):
+    """Increment a version counter in the Django cache."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def invalidate(key):
+    """Bump a version key now and, inside a transaction, again on commit."""
+    bump_version(key)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_version(key))
+
+
+class CompiledCache:
+    """Per-process LRU of compiled objects keyed by their version keys."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        # key -> (versions, expires at, value)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version_keys, build):
+        """Return the cached object for key, calling build() when it is missing, outdated or expired."""
+        versions = cache.get_many(version_keys)
+        version = tuple(versions.get(version_key, 0) for version_key in version_keys)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] <= now:
+            entry = (version, now + _timeout(), build())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentSequence",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "key",
+                    models.CharField(help_text="<app.model>.<field>:<series prefix>", max_length=150, unique=True),
+                ),
+                ("last_value", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Document Sequence",
+                "verbose_name_plural": "Document Sequences",
+                "db_table": "document_sequences",
+                "ordering": ["key"],
+            },
+        ),
+    ]
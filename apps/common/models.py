@@ -0,0 +1,28 @@
+"""
+ARDT FMS - Common Models
+Version: 5.4
+"""
+
+from django.db import models
+
+
+class DocumentSequence(models.Model):
+    """
+    Counter behind a document number series (e.g. "PO-2026-").
+
+    Rows are locked with SELECT ... FOR UPDATE while a number is taken, so
+    concurrent creates never read the same value. See apps.common.sequences.
+    """
+
+    key = models.CharField(max_length=150, unique=True, help_text="<app.model>.<field>:<series prefix>")
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "document_sequences"
+        ordering = ["key"]
+        verbose_name = "Document Sequence"
+        verbose_name_plural = "Document Sequences"
+
+    def __str__(self):
+        return f"{self.key} = {self.last_value}"
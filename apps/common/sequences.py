@@ -0,0 +1,127 @@
+"""
+ARDT FMS - Document Number Sequences
+Version: 5.4
+
+Allocates document numbers (PO-2026-000123, FSR-2026-0042, ...) from
+a DocumentSequence counter row. Before this existed, each generator read the
+highest existing number back from its table.
+
+Taking a number locks the counter row (SELECT ... FOR UPDATE) and bumps it
+in the caller's transaction. When the number is taken in the same
+transaction as the insert, a rollback also returns the number, so series
+stay gap-free and concurrent creates never collide. A counter row is
+seeded once from the highest number already stored in the table.
+
+Usage:
+    number = next_document_number(PurchaseOrder, "po_number", f"PO-{year}-", padding=6)
+    numbers = next_document_numbers(Receipt, "receipt_number", f"RCP-{year}-", count=500, padding=6)
+
+Optional block pre-allocation (ARDT_SEQUENCE_BLOCK_SIZE > 1) lets each
+worker process reserve a block of values at once and hand them out from
+memory. It is only used outside atomic blocks, where the reservation is
+committed immediately. Numbers stay unique but may be issued out of order,
+and unused values are skipped when a worker exits.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+
+def reserve(key, count=1, seed=None):
+    """
+    Reserve `count` consecutive values of a sequence and return them as a range.
+
+    `seed` is called (once, when the counter row does not exist yet) to get
+    the last value already in use.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    with transaction.atomic():
+        current = DocumentSequence.objects.select_for_update().filter(key=key).values_list("last_value", flat=True).first()
+        if current is None:
+            DocumentSequence.objects.bulk_create(
+                [DocumentSequence(key=key, last_value=seed() if seed else 0)], ignore_conflicts=True
+            )
+            current = DocumentSequence.objects.select_for_update().values_list("last_value", flat=True).get(key=key)
+        DocumentSequence.objects.filter(key=key).update(last_value=F("last_value") + count, updated_at=timezone.now())
+    return range(current + 1, current + 1 + count)
+
+
+class _BlockCache:
+    """Per-process blocks of pre-allocated sequence values."""
+
+    def __init__(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, block_size, seed=None):
+        with self._lock:
+            block = self._blocks.get(key)
+            value = next(block, None) if block is not None else None
+            if value is None:
+                block = self._blocks[key] = iter(reserve(key, block_size, seed))
+                value = next(block)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+_blocks = _BlockCache()
+
+
+def _block_size(block_size):
+    if block_size is None:
+        block_size = getattr(settings, "ARDT_SEQUENCE_BLOCK_SIZE", 1)
+    return max(1, int(block_size))
+
+
+def next_value(key, seed=None, block_size=None):
+    """Return the next value of a sequence."""
+    block_size = _block_size(block_size)
+    if block_size > 1 and not connection.in_atomic_block:
+        return _blocks.take(key, block_size, seed)
+    return reserve(key, 1, seed).start
+
+
+def sequence_key(model, field, series):
+    return f"{model._meta.label_lower}.{field}:{series}"
+
+
+def max_existing_number(model, field, series):
+    """Highest numeric suffix already stored for a series (0 when none)."""
+    highest = 0
+    values = model._default_manager.filter(**{f"{field}__startswith": series}).values_list(field, flat=True)
+    for value in values.iterator():
+        suffix = value[len(series):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+def next_document_number(model, field, series, padding=4, block_size=None):
+    """Next formatted number of a series, e.g. ("PO-2026-", padding=6) -> "PO-2026-000124"."""
+    value = next_value(
+        sequence_key(model, field, series),
+        seed=lambda: max_existing_number(model, field, series),
+        block_size=block_size,
+    )
+    return f"{series}{value:0{padding}d}"
+
+
+def next_document_numbers(model, field, series, count, padding=4):
+    """Reserve `count` consecutive formatted numbers at once (for bulk_create)."""
+    values = reserve(
+        sequence_key(model, field, series),
+        count,
+        seed=lambda: max_existing_number(model, field, series),
+    )
+    return [f"{series}{value:0{padding}d}" for value in values]
@@ -20,8 +20,11 @@ Usage:
 """
 
 import pytest
-from django.urls import reverse
+from django.db import connection
+from django.template.loader import get_template
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -71,6 +74,42 @@ def admin_client(client, admin_user):
     return client
 
 
+# =============================================================================
+# QUERY COUNT HELPERS
+# =============================================================================
+
+def render_with_queries(template, context=None, request=None):
+    """
+    Render a template and capture the SQL it issues.
+
+    `template` is a template name or an already-loaded template. When a
+    request is given, context processors run as part of the render.
+
+    Returns (html, captured_queries).
+    """
+    if isinstance(template, str):
+        template = get_template(template)
+    with CaptureQueriesContext(connection) as ctx:
+        html = template.render(context or {}, request)
+    return html, ctx.captured_queries
+
+
+def assert_template_queries(expected, template, context=None, request=None):
+    """
+    Assert that rendering a template issues exactly `expected` queries.
+
+    Usage:
+        html = assert_template_queries(0, 'partials/workorder_row.html',
+                                       {'work_order': wo}, request)
+    """
+    html, queries = render_with_queries(template, context, request)
+    assert len(queries) == expected, (
+        f"Expected {expected} queries, got {len(queries)}:\n"
+        + "\n".join(q['sql'] for q in queries)
+    )
+    return html
+
+
 # =============================================================================
 # BASE CRUD TEST CLASS
 # =============================================================================
@@ -0,0 +1,50 @@
+"""
+Tests for the compiled object cache.
+"""
+import pytest
+from django.core.cache import cache
+
+from apps.common.compiled import CompiledCache, invalidate
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestCompiledCache:
+    """Tests for versioned, expiring compiled entries."""
+
+    def test_builds_once_per_version(self):
+        compiled = CompiledCache()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        assert compiled.get('a', ['test:v'], build) == 1
+        assert compiled.get('a', ['test:v'], build) == 1
+        invalidate('test:v')
+        assert compiled.get('a', ['test:v'], build) == 2
+        assert compiled.get('a', ['test:v'], build) == 2
+
+    def test_entries_expire(self, settings):
+        settings.ARDT_COMPILED_CACHE_TIMEOUT = 0
+        compiled = CompiledCache()
+        values = iter([1, 2])
+
+        assert compiled.get('a', ['test:v'], lambda: next(values)) == 1
+        assert compiled.get('a', ['test:v'], lambda: next(values)) == 2
+
+    def test_least_recently_used_is_dropped(self):
+        compiled = CompiledCache(max_entries=2)
+        compiled.get('a', [], lambda: 'a')
+        compiled.get('b', [], lambda: 'b')
+        compiled.get('a', [], lambda: 'a')
+        compiled.get('c', [], lambda: 'c')
+
+        assert compiled.get('a', [], lambda: 'rebuilt') == 'a'
+        assert compiled.get('b', [], lambda: 'rebuilt') == 'rebuilt'
@@ -0,0 +1,94 @@
+"""
+Tests for document number sequences.
+"""
+import pytest
+from datetime import date
+
+from apps.common.models import DocumentSequence
+from apps.common.sequences import (
+    _blocks, next_document_number, next_document_numbers, next_value, reserve
+)
+
+
+@pytest.fixture
+def make_requisition(db, user):
+    from apps.supplychain.models import PurchaseRequisition
+
+    def _make(**kwargs):
+        return PurchaseRequisition.objects.create(
+            requested_by=user, title='Sequence test', request_date=date.today(),
+            required_date=date.today(), **kwargs
+        )
+    return _make
+
+
+class TestReserve:
+    """Tests for the counter table."""
+
+    def test_values_are_consecutive(self, db):
+        assert reserve('test:A') == range(1, 2)
+        assert reserve('test:A', 3) == range(2, 5)
+        assert next_value('test:A') == 5
+        assert DocumentSequence.objects.get(key='test:A').last_value == 5
+
+    def test_seed_is_read_once(self, db):
+        calls = []
+
+        def seed():
+            calls.append(1)
+            return 41
+
+        assert next_value('test:B', seed=seed) == 42
+        assert next_value('test:B', seed=seed) == 43
+        assert len(calls) == 1
+
+    def test_rollback_returns_the_number(self, db):
+        from django.db import transaction
+
+        next_value('test:C')
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                next_value('test:C')
+                raise RuntimeError
+        assert next_value('test:C') == 2
+
+    def test_block_preallocation(self, db):
+        _blocks.clear()
+        # Blocks are only taken outside atomic blocks; run the allocator as if autocommit
+        from unittest import mock
+        with mock.patch('apps.common.sequences.connection') as conn:
+            conn.in_atomic_block = False
+            values = [next_value('test:D', block_size=10) for _ in range(12)]
+        _blocks.clear()
+        assert values == list(range(1, 13))
+        assert DocumentSequence.objects.get(key='test:D').last_value == 20
+
+
+class TestDocumentNumbers:
+    """Tests for formatted document numbers."""
+
+    def test_seeded_from_existing_rows(self, make_requisition):
+        from apps.supplychain.models import PurchaseRequisition
+
+        make_requisition(requisition_number='REQ-2030-0041')
+        make_requisition(requisition_number='REQ-2030-LEGACY')
+        number = next_document_number(PurchaseRequisition, 'requisition_number', 'REQ-2030-')
+        assert number == 'REQ-2030-0042'
+
+    def test_bulk_numbers_take_one_reservation(self, db, django_assert_max_num_queries):
+        from apps.supplychain.models import Receipt
+
+        next_document_number(Receipt, 'receipt_number', 'RCP-2030-', padding=6)
+        with django_assert_max_num_queries(4):
+            numbers = next_document_numbers(Receipt, 'receipt_number', 'RCP-2030-', 500, padding=6)
+        assert numbers[0] == 'RCP-2030-000002'
+        assert numbers[-1] == 'RCP-2030-000501'
+
+    def test_model_generators_use_the_sequence(self, make_requisition):
+        first = make_requisition()
+        second = make_requisition()
+        assert first.requisition_number.endswith('-0001')
+        assert second.requisition_number.endswith('-0002')
+        assert DocumentSequence.objects.filter(
+            key__startswith='supplychain.purchaserequisition.requisition_number:'
+        ).exists()
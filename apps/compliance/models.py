@@ -12,6 +12,8 @@ from django.conf import settings
 from django.utils import timezone
 from decimal import Decimal
 
+from apps.common.sequences import next_document_number
+
 
 class ComplianceRequirement(models.Model):
     """Regulatory and standard requirements tracking."""
@@ -157,16 +159,7 @@ class QualityControl(models.Model):
 
     def _generate_inspection_number(self):
         year = timezone.now().year
-        last = QualityControl.objects.filter(inspection_number__startswith=f'QC-{year}-').order_by('-inspection_number').first()
-        if last and last.inspection_number:
-            try:
-                last_num = int(last.inspection_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        return f"QC-{year}-{new_num:06d}"
+        return next_document_number(QualityControl, 'inspection_number', f'QC-{year}-', padding=6)
 
     @property
     def is_passed(self):
@@ -241,16 +234,7 @@ class NonConformance(models.Model):
 
     def _generate_ncr_number(self):
         year = timezone.now().year
-        last = NonConformance.objects.filter(ncr_number__startswith=f'NCR-{year}-').order_by('-ncr_number').first()
-        if last and last.ncr_number:
-            try:
-                last_num = int(last.ncr_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        return f"NCR-{year}-{new_num:04d}"
+        return next_document_number(NonConformance, 'ncr_number', f'NCR-{year}-', padding=4)
 
     @property
     def is_open(self):
@@ -515,16 +499,7 @@ class ComplianceReport(models.Model):
     def _generate_report_number(self):
         year = timezone.now().year
         prefix = self.report_type[:3] if self.report_type else 'RPT'
-        last = ComplianceReport.objects.filter(report_number__startswith=f'{prefix}-{year}-').order_by('-report_number').first()
-        if last and last.report_number:
-            try:
-                last_num = int(last.report_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        return f"{prefix}-{year}-{new_num:04d}"
+        return next_document_number(ComplianceReport, 'report_number', f'{prefix}-{year}-', padding=4)
 
 
 class QualityMetric(models.Model):
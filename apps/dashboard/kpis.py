@@ -0,0 +1,162 @@
+"""
+ARDT FMS - Dashboard KPI Engine
+Version: 5.4
+
+Computes dashboard counters with one conditional aggregate per model
+and shares the result between all users for a short TTL.
+
+KPIs are grouped by model. Every KPI of a group is computed in the same
+aggregate(Count(filter=Q(...))) query, so asking for one KPI of a group
+warms the cache for all the others.
+
+Usage:
+    from apps.dashboard.kpis import get_kpis, resolve_kpis
+
+    counts = get_kpis("work_orders")          # {"total": 12, "active": 5, ...}
+    data = resolve_kpis({"open": "ncrs.open", "total": "work_orders.total"})
+"""
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+CACHE_KEY_PREFIX = "dashboard:kpi"
+
+ACTIVE_WO_STATUSES = ["IN_PROGRESS", "PLANNED", "RELEASED"]
+OVERDUE_WO_STATUSES = ["PLANNED", "IN_PROGRESS", "ON_HOLD"]
+OPEN_NCR_STATUSES = ["OPEN", "INVESTIGATING"]
+UNRESOLVED_NCR_STATUSES = ["OPEN", "INVESTIGATING", "PENDING_DISPOSITION", "IN_REWORK"]
+
+
+def _work_order_kpis(today):
+    week_ago = today - timedelta(days=7)
+    week_end = today + timedelta(days=7)
+    return {
+        "total": Q(),
+        "active": Q(status__in=ACTIVE_WO_STATUSES),
+        "completed_week": Q(status="COMPLETED", actual_end__date__gte=week_ago),
+        "overdue": Q(due_date__lt=today, status__in=OVERDUE_WO_STATUSES),
+        "pending": Q(status__in=["DRAFT", "PLANNED"]),
+        "in_progress": Q(status="IN_PROGRESS"),
+        "qc_pending": Q(status="QC_PENDING"),
+        "due_this_week": Q(due_date__range=[today, week_end], status__in=["PLANNED", "IN_PROGRESS"]),
+    }
+
+
+def _drill_bit_kpis(today):
+    return {
+        "total": Q(),
+        "in_stock": Q(status="IN_STOCK"),
+        "in_production": Q(status="IN_PRODUCTION"),
+    }
+
+
+def _ncr_kpis(today):
+    return {
+        "open": Q(status__in=OPEN_NCR_STATUSES),
+        "critical": Q(status__in=OPEN_NCR_STATUSES, severity="CRITICAL"),
+        "unresolved": Q(status__in=UNRESOLVED_NCR_STATUSES),
+    }
+
+
+def _equipment_kpis(today):
+    scheduled = Q(status="OPERATIONAL", maintenance_interval_days__isnull=False)
+    return {
+        "overdue": scheduled & Q(next_maintenance__lt=today),
+        "due_soon": scheduled & Q(next_maintenance__range=[today, today + timedelta(days=7)]),
+    }
+
+
+def _purchase_requisition_kpis(today):
+    return {
+        "pending": Q(status="PENDING"),
+    }
+
+
+# group name -> (model label, function(today) -> {kpi name: Q filter})
+KPI_GROUPS = {
+    "work_orders": ("workorders.WorkOrder", _work_order_kpis),
+    "drill_bits": ("workorders.DrillBit", _drill_bit_kpis),
+    "ncrs": ("quality.NCR", _ncr_kpis),
+    "equipment": ("maintenance.Equipment", _equipment_kpis),
+    "purchase_requisitions": ("supplychain.PurchaseRequisition", _purchase_requisition_kpis),
+}
+
+
+def _cache_timeout():
+    return getattr(settings, "ARDT_DASHBOARD_KPI_CACHE_TIMEOUT", 60)
+
+
+def _cache_key(group, today):
+    return f"{CACHE_KEY_PREFIX}:{group}:{today.isoformat()}"
+
+
+def compute_kpis(group, today=None):
+    """Compute every KPI of a group with a single aggregate query (no cache)."""
+    if group not in KPI_GROUPS:
+        raise KeyError(f"Unknown KPI group: {group}")
+
+    today = today or timezone.now().date()
+    model_label, definitions = KPI_GROUPS[group]
+    model = apps.get_model(model_label)
+    filters = definitions(today)
+
+    return model.objects.aggregate(
+        **{name: Count("pk", filter=q) if q else Count("pk") for name, q in filters.items()}
+    )
+
+
+def get_kpis(group, today=None):
+    """Return every KPI of a group, served from the shared cache when fresh."""
+    today = today or timezone.now().date()
+    key = _cache_key(group, today)
+
+    values = cache.get(key)
+    if values is None:
+        values = compute_kpis(group, today)
+        cache.set(key, values, timeout=_cache_timeout())
+    return values
+
+
+def get_many_kpis(groups, today=None):
+    """Return {group: kpis} for several groups with one cache round trip."""
+    today = today or timezone.now().date()
+    groups = list(dict.fromkeys(groups))
+    keys = {_cache_key(group, today): group for group in groups}
+
+    cached = cache.get_many(list(keys))
+    result = {keys[key]: values for key, values in cached.items()}
+
+    missing = {}
+    for group in groups:
+        if group not in result:
+            result[group] = missing[_cache_key(group, today)] = compute_kpis(group, today)
+    if missing:
+        cache.set_many(missing, timeout=_cache_timeout())
+    return result
+
+
+def resolve_kpis(spec, today=None):
+    """
+    Resolve a widget KPI spec into values.
+
+    `spec` maps output keys to "group.kpi" references, e.g.
+    {"open": "ncrs.open", "critical": "ncrs.critical"}.
+    """
+    groups = get_many_kpis((ref.split(".", 1)[0] for ref in spec.values()), today)
+    values = {}
+    for key, ref in spec.items():
+        group, name = ref.split(".", 1)
+        values[key] = groups[group][name]
+    return values
+
+
+def invalidate_kpis(group=None, today=None):
+    """Drop cached KPIs for one group (or all groups) for the given day."""
+    today = today or timezone.now().date()
+    groups = [group] if group else list(KPI_GROUPS)
+    cache.delete_many([_cache_key(g, today) for g in groups])
@@ -0,0 +1,85 @@
+"""
+Tests for the dashboard KPI engine.
+"""
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from apps.dashboard.kpis import compute_kpis, get_kpis, get_many_kpis, invalidate_kpis, resolve_kpis
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def drill_bits(db, user):
+    from apps.workorders.models import DrillBit
+    for i, status in enumerate([DrillBit.Status.IN_STOCK, DrillBit.Status.IN_STOCK, DrillBit.Status.IN_PRODUCTION]):
+        DrillBit.objects.create(
+            serial_number=f'KPI-{i}',
+            bit_type=DrillBit.BitType.FC,
+            size=Decimal('8.500'),
+            status=status,
+            created_by=user,
+        )
+
+
+class TestKPIEngine:
+    """Tests for single-pass KPI aggregation and caching."""
+
+    def test_group_computed_in_one_query(self, drill_bits, django_assert_num_queries):
+        """All KPIs of a model come from one aggregate query."""
+        with django_assert_num_queries(1):
+            kpis = compute_kpis('drill_bits')
+        assert kpis == {'total': 3, 'in_stock': 2, 'in_production': 1}
+
+    def test_cached_across_calls(self, drill_bits, django_assert_num_queries):
+        """A second request for the same group is served from cache."""
+        get_kpis('drill_bits')
+        with django_assert_num_queries(0):
+            assert get_kpis('drill_bits')['in_stock'] == 2
+
+    def test_many_groups_one_query_each(self, db, django_assert_num_queries):
+        """Fetching several groups costs one query per model."""
+        with django_assert_num_queries(2):
+            kpis = get_many_kpis(['work_orders', 'ncrs', 'work_orders'])
+        assert set(kpis) == {'work_orders', 'ncrs'}
+        assert kpis['work_orders']['total'] == 0
+
+    def test_resolve_widget_spec(self, drill_bits):
+        """Widget KPI specs map output keys to group.kpi references."""
+        data = resolve_kpis({'stock': 'drill_bits.in_stock', 'all': 'drill_bits.total'})
+        assert data == {'stock': 2, 'all': 3}
+
+    def test_invalidate(self, drill_bits, django_assert_num_queries):
+        """Invalidating a group forces the next read to recompute."""
+        get_kpis('drill_bits')
+        invalidate_kpis('drill_bits')
+        with django_assert_num_queries(1):
+            get_kpis('drill_bits')
+
+    def test_unknown_group(self, db):
+        """Unknown groups raise KeyError."""
+        with pytest.raises(KeyError):
+            compute_kpis('unknown')
+
+
+class TestWidgetData:
+    """Tests for widget data backed by the KPI engine."""
+
+    def test_counter_widgets_read_the_kpi_engine(self, user, drill_bits, django_assert_num_queries):
+        """Counter widgets sharing a KPI group issue one query for the group."""
+        from apps.dashboard.views import get_widget_data
+
+        resolve_kpis({'total': 'drill_bits.total'})
+        with django_assert_num_queries(0):
+            data = get_widget_data('drill_bits_status', user)
+        assert data == {'total': 3, 'in_stock': 2, 'in_production': 1}
+
+        with django_assert_num_queries(1):
+            assert get_widget_data('open_ncrs', user) == {'open': 0, 'critical': 0}
@@ -0,0 +1,84 @@
+"""
+Tests for dashboard widget views.
+"""
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from apps.dashboard.views import DEFAULT_WIDGET_LAYOUT, build_widget_layout
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def logged_in_client(client, user):
+    client.force_login(user)
+    return client
+
+
+class TestBuildWidgetLayout:
+    """Tests for layout normalisation."""
+
+    def test_orders_and_filters(self):
+        """Hidden and unknown widgets are dropped; order is respected."""
+        layout = build_widget_layout([
+            {"id": "open_ncrs", "order": 2, "visible": True},
+            {"id": "drill_bits_status", "order": 1, "visible": True, "size": "large"},
+            {"id": "quick_links", "order": 3, "visible": False},
+            {"id": "missing_widget", "order": 4, "visible": True},
+        ])
+        assert [w["id"] for w in layout] == ["drill_bits_status", "open_ncrs"]
+        assert layout[0]["size"] == "large"
+        assert layout[1]["name"] == "Open NCRs"
+
+    def test_invalid_config(self):
+        """Non-list configs produce an empty layout."""
+        assert build_widget_layout({}) == []
+
+    def test_default_layout(self):
+        """The default layout is fully visible."""
+        assert len(build_widget_layout(DEFAULT_WIDGET_LAYOUT)) == len(DEFAULT_WIDGET_LAYOUT)
+
+
+class TestWidgetFragment:
+    """Tests for the HTMX widget endpoint."""
+
+    def test_requires_login(self, client):
+        response = client.get(reverse("dashboard:widget", args=["drill_bits_status"]))
+        assert response.status_code == 302
+
+    def test_unknown_widget(self, logged_in_client):
+        response = logged_in_client.get(reverse("dashboard:widget", args=["nope"]))
+        assert response.status_code == 404
+
+    def test_renders_and_caches(self, logged_in_client):
+        """The second load of a widget is served from its own cache entry."""
+        url = reverse("dashboard:widget", args=["drill_bits_status"])
+        response = logged_in_client.get(url)
+        assert response.status_code == 200
+        assert b"In Stock" in response.content
+        assert cache.get("dashboard:widget:drill_bits_status") is not None
+
+    def test_saved_dashboard_access(self, logged_in_client, admin_user):
+        """Widgets of a private saved dashboard are not served to other users."""
+        from apps.dashboard.models import SavedDashboard
+
+        dashboard = SavedDashboard.objects.create(
+            name="Ops", created_by=admin_user,
+            widget_config=[{"id": "open_ncrs", "order": 1, "visible": True}],
+        )
+        url = reverse("dashboard:widget", args=["open_ncrs"])
+        response = logged_in_client.get(url, {"dashboard": dashboard.pk})
+        assert response.status_code == 403
+
+        dashboard.visibility = SavedDashboard.Visibility.PUBLIC
+        dashboard.save()
+        assert logged_in_client.get(url, {"dashboard": dashboard.pk}).status_code == 200
+
+        other = reverse("dashboard:widget", args=["quick_links"])
+        assert logged_in_client.get(other, {"dashboard": dashboard.pk}).status_code == 404
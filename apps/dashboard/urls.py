@@ -18,6 +18,8 @@ urlpatterns = [
     path("planner/", views.planner_dashboard, name="planner"),
     path("technician/", views.technician_dashboard, name="technician"),
     path("qc/", views.qc_dashboard, name="qc"),
+    # Lazy-loaded widget bodies (HTMX)
+    path("widgets/<str:widget_id>/", views.widget_fragment, name="widget"),
     # Dashboard Customization
     path("customize/", views.customize_dashboard, name="customize"),
     path("customize/save/", views.save_widget_order, name="save_widget_order"),
@@ -6,18 +6,24 @@ Role-based dashboard views with KPIs and statistics.
 """
 
 import json
-from datetime import timedelta
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q, Sum
-from django.http import JsonResponse
-from django.shortcuts import redirect, render
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from apps.accounts.models import UserPreference
 
+from .kpis import get_kpis, get_many_kpis, resolve_kpis
+from .models import SavedDashboard
+
 
 @login_required
 def home_view(request):
@@ -46,11 +52,15 @@ def home_view(request):
 def main_dashboard(request):
     """
     Main dashboard view for all users.
-    Shows general overview and quick links.
+    Shows general overview, quick links and the user's widget layout.
+
+    Widgets are rendered as empty shells; their bodies load in parallel
+    through dashboard:widget once the page is shown.
     """
     context = {
         "page_title": "Dashboard",
         "user": request.user,
+        "widgets": build_widget_layout(get_user_widget_layout(request.user)),
     }
     return render(request, "dashboard/main.html", context)
 
@@ -60,23 +70,12 @@ def manager_dashboard(request):
     """
     Manager dashboard with KPIs and overview statistics.
     """
-    from apps.workorders.models import DrillBit, WorkOrder
-
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-
-    # Work order statistics
-    total_work_orders = WorkOrder.objects.count()
-    active_work_orders = WorkOrder.objects.filter(status__in=["IN_PROGRESS", "PLANNED", "RELEASED"]).count()
-    completed_this_week = WorkOrder.objects.filter(status="COMPLETED", actual_end__date__gte=week_ago).count()
-    overdue_work_orders = WorkOrder.objects.filter(
-        due_date__lt=today, status__in=["PLANNED", "IN_PROGRESS", "ON_HOLD"]
-    ).count()
+    from apps.workorders.models import WorkOrder
 
-    # Drill bit statistics
-    total_drill_bits = DrillBit.objects.count()
-    in_stock_bits = DrillBit.objects.filter(status="IN_STOCK").count()
-    in_production_bits = DrillBit.objects.filter(status="IN_PRODUCTION").count()
+    # Work order and drill bit statistics (one aggregate per model, shared cache)
+    kpis = get_many_kpis(["work_orders", "drill_bits"])
+    wo_kpis = kpis["work_orders"]
+    bit_kpis = kpis["drill_bits"]
 
     # Status breakdown for chart
     status_breakdown = WorkOrder.objects.values("status").annotate(count=Count("id")).order_by("status")
@@ -86,13 +85,13 @@ def manager_dashboard(request):
 
     context = {
         "page_title": "Manager Dashboard",
-        "total_work_orders": total_work_orders,
-        "active_work_orders": active_work_orders,
-        "completed_this_week": completed_this_week,
-        "overdue_work_orders": overdue_work_orders,
-        "total_drill_bits": total_drill_bits,
-        "in_stock_bits": in_stock_bits,
-        "in_production_bits": in_production_bits,
+        "total_work_orders": wo_kpis["total"],
+        "active_work_orders": wo_kpis["active"],
+        "completed_this_week": wo_kpis["completed_week"],
+        "overdue_work_orders": wo_kpis["overdue"],
+        "total_drill_bits": bit_kpis["total"],
+        "in_stock_bits": bit_kpis["in_stock"],
+        "in_production_bits": bit_kpis["in_production"],
         "status_breakdown": list(status_breakdown),
         "recent_work_orders": recent_work_orders,
     }
@@ -108,15 +107,9 @@ def planner_dashboard(request):
     from apps.workorders.models import WorkOrder
 
     today = timezone.now().date()
-    week_end = today + timedelta(days=7)
-
-    # Get all counts in a single query using aggregate
-    status_counts = WorkOrder.objects.aggregate(
-        pending=Count("id", filter=Q(status__in=["DRAFT", "PLANNED"])),
-        in_progress=Count("id", filter=Q(status="IN_PROGRESS")),
-        overdue=Count("id", filter=Q(due_date__lt=today, status__in=["PLANNED", "IN_PROGRESS", "ON_HOLD"])),
-        due_this_week=Count("id", filter=Q(due_date__range=[today, week_end], status__in=["PLANNED", "IN_PROGRESS"])),
-    )
+
+    # All counts come from the shared single-aggregate KPI cache
+    status_counts = get_kpis("work_orders", today)
 
     # Work order lists (separate queries for display)
     pending_work_orders = (
@@ -201,12 +194,13 @@ def qc_dashboard(request):
     recent_ncrs = NCR.objects.select_related("work_order", "detected_by").order_by("-created_at")[:10]
 
     # Statistics
-    open_ncrs = NCR.objects.filter(status__in=["OPEN", "INVESTIGATING", "PENDING_DISPOSITION", "IN_REWORK"]).count()
+    kpis = get_many_kpis(["work_orders", "ncrs"])
+    open_ncrs = kpis["ncrs"]["unresolved"]
 
     context = {
         "page_title": "QC Dashboard",
         "pending_qc": pending_qc,
-        "pending_qc_count": pending_qc.count(),
+        "pending_qc_count": kpis["work_orders"]["qc_pending"],
         "recent_ncrs": recent_ncrs,
         "open_ncrs": open_ncrs,
     }
@@ -231,30 +225,44 @@ AVAILABLE_WIDGETS = {
         "description": "Active, completed, and overdue work order counts",
         "icon": "clipboard-list",
         "default_size": "medium",
+        "kpis": {
+            "total": "work_orders.total",
+            "active": "work_orders.active",
+            "completed_week": "work_orders.completed_week",
+            "overdue": "work_orders.overdue",
+        },
     },
     "drill_bits_status": {
         "name": "Drill Bits Status",
         "description": "Overview of drill bit inventory status",
         "icon": "tool",
         "default_size": "small",
+        "kpis": {
+            "total": "drill_bits.total",
+            "in_stock": "drill_bits.in_stock",
+            "in_production": "drill_bits.in_production",
+        },
     },
     "recent_work_orders": {
         "name": "Recent Work Orders",
         "description": "List of recently created work orders",
         "icon": "clock",
         "default_size": "large",
+        "cache_timeout": 30,
     },
     "maintenance_due": {
         "name": "Maintenance Due",
         "description": "Equipment due for maintenance",
         "icon": "wrench",
         "default_size": "medium",
+        "kpis": {"overdue": "equipment.overdue", "due_soon": "equipment.due_soon"},
     },
     "open_ncrs": {
         "name": "Open NCRs",
         "description": "Non-conformance reports requiring attention",
         "icon": "alert-triangle",
         "default_size": "medium",
+        "kpis": {"open": "ncrs.open", "critical": "ncrs.critical"},
     },
     "low_stock_alerts": {
         "name": "Low Stock Alerts",
@@ -267,12 +275,14 @@ AVAILABLE_WIDGETS = {
         "description": "Items awaiting your approval",
         "icon": "check-circle",
         "default_size": "small",
+        "kpis": {"pr_count": "purchase_requisitions.pending"},
     },
     "quick_links": {
         "name": "Quick Links",
         "description": "Shortcuts to frequently used modules",
         "icon": "link",
         "default_size": "small",
+        "cache_timeout": 3600,
     },
 }
 
@@ -296,76 +306,60 @@ def get_user_widget_layout(user):
     return DEFAULT_WIDGET_LAYOUT
 
 
-def get_widget_data(widget_id, user):
-    """Get data for a specific widget."""
-    from apps.quality.models import NCR
-    from apps.workorders.models import DrillBit, WorkOrder
-
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-
-    if widget_id == "work_orders_summary":
-        return {
-            "total": WorkOrder.objects.count(),
-            "active": WorkOrder.objects.filter(status__in=["IN_PROGRESS", "PLANNED", "RELEASED"]).count(),
-            "completed_week": WorkOrder.objects.filter(status="COMPLETED", actual_end__date__gte=week_ago).count(),
-            "overdue": WorkOrder.objects.filter(
-                due_date__lt=today, status__in=["PLANNED", "IN_PROGRESS", "ON_HOLD"]
-            ).count(),
-        }
+def build_widget_layout(widget_config):
+    """
+    Turn a stored widget layout (UserPreference.dashboard_widgets or
+    SavedDashboard.widget_config) into the visible, ordered widget list
+    used by dashboard templates. No widget data is computed here.
+    """
+    if not isinstance(widget_config, list):
+        return []
+
+    widgets = []
+    for widget in sorted(widget_config, key=lambda w: w.get("order", 0)):
+        widget_info = AVAILABLE_WIDGETS.get(widget.get("id"))
+        if widget_info is None or not widget.get("visible", True):
+            continue
+        widgets.append({
+            "id": widget["id"],
+            "size": widget.get("size", widget_info.get("default_size", "medium")),
+            "name": widget_info["name"],
+            "description": widget_info.get("description", ""),
+            "icon": widget_info.get("icon", "square"),
+        })
+    return widgets
 
-    elif widget_id == "drill_bits_status":
-        return {
-            "total": DrillBit.objects.count(),
-            "in_stock": DrillBit.objects.filter(status="IN_STOCK").count(),
-            "in_production": DrillBit.objects.filter(status="IN_PRODUCTION").count(),
-        }
 
-    elif widget_id == "recent_work_orders":
-        return {
-            "work_orders": WorkOrder.objects.select_related("customer", "assigned_to").order_by("-created_at")[:5]
-        }
+def get_widget_data(widget_id, user):
+    """
+    Get data for a specific widget.
 
-    elif widget_id == "maintenance_due":
-        from apps.maintenance.models import Equipment
+    Counter widgets declare the KPIs they need in AVAILABLE_WIDGETS["kpis"];
+    those are served by the shared KPI engine (apps.dashboard.kpis).
+    """
+    from apps.workorders.models import WorkOrder
 
-        return {
-            "overdue": Equipment.objects.filter(
-                status=Equipment.Status.OPERATIONAL,
-                maintenance_interval_days__isnull=False,
-                next_maintenance__lt=today,
-            ).count(),
-            "due_soon": Equipment.objects.filter(
-                status=Equipment.Status.OPERATIONAL,
-                maintenance_interval_days__isnull=False,
-                next_maintenance__range=[today, today + timedelta(days=7)],
-            ).count(),
-        }
+    kpi_spec = AVAILABLE_WIDGETS.get(widget_id, {}).get("kpis")
+    if kpi_spec:
+        return resolve_kpis(kpi_spec)
 
-    elif widget_id == "open_ncrs":
+    if widget_id == "recent_work_orders":
         return {
-            "open": NCR.objects.filter(status__in=["OPEN", "INVESTIGATING"]).count(),
-            "critical": NCR.objects.filter(status__in=["OPEN", "INVESTIGATING"], severity="CRITICAL").count(),
+            "work_orders": WorkOrder.objects.select_related("customer", "assigned_to").order_by("-created_at")[:5]
         }
 
     elif widget_id == "low_stock_alerts":
         from django.db.models import F as ModelF
-        from apps.inventory.models import Stock
 
         try:
+            from apps.inventory.models import Stock
+
             return {
                 "count": Stock.objects.filter(quantity_on_hand__lte=ModelF("reorder_point")).count()
             }
         except Exception:
             return {"count": 0}
 
-    elif widget_id == "pending_approvals":
-        from apps.supplychain.models import PurchaseRequisition
-
-        return {
-            "pr_count": PurchaseRequisition.objects.filter(status="PENDING").count(),
-        }
-
     elif widget_id == "quick_links":
         return {
             "links": [
@@ -379,6 +373,54 @@ def get_widget_data(widget_id, user):
     return {}
 
 
+def get_widget_cache_key(widget_id, user):
+    """Cache key for a rendered widget body."""
+    if AVAILABLE_WIDGETS[widget_id].get("per_user"):
+        return f"dashboard:widget:{widget_id}:user:{user.pk}"
+    return f"dashboard:widget:{widget_id}"
+
+
+def render_widget_content(widget_id, user):
+    """
+    Render a widget body, served from cache for the widget's TTL.
+
+    Each widget has its own key and TTL (AVAILABLE_WIDGETS["cache_timeout"],
+    falling back to ARDT_DASHBOARD_WIDGET_CACHE_TIMEOUT).
+    """
+    key = get_widget_cache_key(widget_id, user)
+    html = cache.get(key)
+    if html is None:
+        widget = {"id": widget_id, "data": get_widget_data(widget_id, user)}
+        html = render_to_string("dashboard/partials/widget_content.html", {"widget": widget})
+        timeout = AVAILABLE_WIDGETS[widget_id].get(
+            "cache_timeout", getattr(settings, "ARDT_DASHBOARD_WIDGET_CACHE_TIMEOUT", 60)
+        )
+        cache.set(key, html, timeout=timeout)
+    return html
+
+
+@login_required
+def widget_fragment(request, widget_id):
+    """
+    HTMX endpoint returning the body of a single dashboard widget.
+
+    Pass ?dashboard=<pk> to load a widget that belongs to a SavedDashboard;
+    the user must be allowed to view that dashboard.
+    """
+    if widget_id not in AVAILABLE_WIDGETS:
+        raise Http404("Unknown widget")
+
+    dashboard_id = request.GET.get("dashboard")
+    if dashboard_id:
+        dashboard = get_object_or_404(SavedDashboard, pk=dashboard_id, is_active=True)
+        if not dashboard.can_view(request.user):
+            raise PermissionDenied("You don't have access to this dashboard.")
+        if widget_id not in {w["id"] for w in build_widget_layout(dashboard.widget_config)}:
+            raise Http404("Widget is not part of this dashboard")
+
+    return HttpResponse(render_widget_content(widget_id, request.user))
+
+
 @login_required
 def customize_dashboard(request):
     """
@@ -5,3 +5,7 @@ class ExecutionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.execution"
     verbose_name = "Execution"
+
+    def ready(self):
+        # Import signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,335 @@
+"""
+ARDT FMS - Step Branch Engine
+Version: 5.4
+
+Evaluates StepBranch routing rules against a finished step.
+
+A procedure's whole branch table is loaded with one query and compiled
+into typed predicate closures: condition values are parsed once (numbers,
+booleans, IN lists) and each branch becomes a function of the step's
+values. Compiled tables are kept per process, keyed by procedure and
+revision, under a per-procedure version that StepBranch and ProcedureStep
+changes bump (see apps.common.compiled and apps.execution.signals):
+
+    decision = route_step(step_execution, {"torque": "48.5"})
+    decision.action, decision.target_step_id
+    decisions = route_steps([(step_execution, outputs), ...])
+
+Values are the step's result and status, its checkpoint results (by
+checkpoint code: measured value, else actual value, else result; and
+"<code>.result") and any outputs passed in. Non-default branches are
+tried in sequence and the first match is taken, else the default (ELSE)
+branch. Every evaluated branch is recorded as a BranchEvaluation with one
+bulk insert.
+
+follow_step() also carries out the decision through the engine
+(engine.apply_branch); action_taken is only recorded for an action that
+was carried out:
+
+    decision = follow_step(step_execution, user)
+"""
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Callable
+
+from apps.common.compiled import CompiledCache, invalidate
+from apps.procedures.models import StepBranch
+
+from .engine import apply_branch
+from .models import BranchEvaluation, CheckpointResult, ProcedureExecution, StepExecution
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "execution:branches:{procedure_id}"
+MAX_COMPILED_PROCEDURES = 256
+
+TRUE_WORDS = frozenset({"true", "yes", "y", "1", "pass", "ok"})
+FALSE_WORDS = frozenset({"false", "no", "n", "0", "fail", "nok"})
+
+# Compiled tables of this process, keyed by (procedure id, revision)
+_compiled = CompiledCache(max_entries=MAX_COMPILED_PROCEDURES)
+
+
+@dataclass(frozen=True)
+class CompiledBranch:
+    pk: int
+    field: str
+    is_default: bool
+    action: str
+    target_step_id: int
+    message: str
+    predicate: Callable
+
+
+@dataclass(frozen=True)
+class Decision:
+    branch: CompiledBranch = None
+    evaluations: tuple = ()
+
+    @property
+    def action(self):
+        return self.branch.action if self.branch else None
+
+    @property
+    def target_step_id(self):
+        return self.branch.target_step_id if self.branch else None
+
+
+NO_DECISION = Decision()
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return number if number.is_finite() else None
+
+
+def _text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value).strip().casefold()
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _equals(expected):
+    """Predicate comparing numerically when the condition is a number, else as text."""
+    number = _number(expected)
+    text = _text(expected)
+    if number is not None:
+        def predicate(value):
+            actual = _number(value)
+            return actual == number if actual is not None else _text(value) == text
+        return predicate
+    if text in TRUE_WORDS or text in FALSE_WORDS:
+        words = TRUE_WORDS if text in TRUE_WORDS else FALSE_WORDS
+        return lambda value: _text(value) in words
+    return lambda value: _text(value) == text
+
+
+def _not_equals(expected):
+    test = _equals(expected)
+    return lambda value: not test(value)
+
+
+def _compare(expected, test):
+    bound = _number(expected)
+    if bound is None:
+        raise ValueError(f"{expected!r} is not a number")
+
+    def predicate(value):
+        number = _number(value)
+        return number is not None and test(number, bound)
+    return predicate
+
+
+def _member_of(expected):
+    options = [option for option in (part.strip() for part in expected.split(",")) if option]
+    texts = frozenset(_text(option) for option in options)
+    numbers = frozenset(number for number in map(_number, options) if number is not None)
+    return lambda value: _text(value) in texts or (_number(value) in numbers if numbers else False)
+
+
+def _contains(expected):
+    text = _text(expected)
+
+    def predicate(value):
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return any(_text(item) == text for item in value)
+        return text in _text(value)
+    return predicate
+
+
+def _null_check(expected):
+    wanted = _text(expected) not in FALSE_WORDS
+    return lambda value: _is_null(value) == wanted
+
+
+OPERATORS = {
+    "=": _equals,
+    "==": _equals,
+    "!=": _not_equals,
+    ">": lambda expected: _compare(expected, lambda a, b: a > b),
+    "<": lambda expected: _compare(expected, lambda a, b: a < b),
+    ">=": lambda expected: _compare(expected, lambda a, b: a >= b),
+    "<=": lambda expected: _compare(expected, lambda a, b: a <= b),
+    "IN": _member_of,
+    "CONTAINS": _contains,
+    "IS_NULL": _null_check,
+}
+
+
+def _never(value):
+    return False
+
+
+def compile_branch(values):
+    """CompiledBranch for a StepBranch row (dict of its values)."""
+    operator = values["condition_operator"].strip().upper()
+    predicate = _never
+    if not values["is_default"]:
+        try:
+            predicate = OPERATORS[operator](values["condition_value"])
+        except (KeyError, ValueError) as exc:
+            logger.warning("Step branch %s never matches: %s %r (%s)", values["id"], operator,
+                           values["condition_value"], exc)
+    return CompiledBranch(
+        pk=values["id"],
+        field=values["condition_field"].strip(),
+        is_default=values["is_default"],
+        action=values["then_action"],
+        target_step_id=values["then_target_step_id"],
+        message=values["then_message"],
+        predicate=predicate,
+    )
+
+
+def compile_procedure(procedure_id):
+    """{step id: (non-default branches in sequence..., default branches...)} for a procedure."""
+    table = {}
+    rows = StepBranch.objects.filter(step__procedure_id=procedure_id).order_by("step_id", "is_default", "sequence", "pk").values(
+        "id", "step_id", "condition_field", "condition_operator", "condition_value", "then_action",
+        "then_target_step_id", "then_message", "is_default",
+    )
+    for row in rows:
+        table.setdefault(row["step_id"], []).append(compile_branch(row))
+    return {step_id: tuple(branches) for step_id, branches in table.items()}
+
+
+def invalidate_branches(procedure_id):
+    """Make every process recompile a procedure's branch table."""
+    invalidate(VERSION_CACHE_KEY.format(procedure_id=procedure_id))
+
+
+def branch_table(procedure_id, revision=""):
+    """Compiled branch table of a procedure revision (compiled at most once per version)."""
+    return _compiled.get(
+        (procedure_id, revision),
+        [VERSION_CACHE_KEY.format(procedure_id=procedure_id)],
+        lambda: compile_procedure(procedure_id),
+    )
+
+
+def decide(branches, values):
+    """
+    Evaluate compiled branches; returns a Decision.
+
+    Evaluations are (branch, condition met, evaluated value) for each
+    branch tried, ending with the branch taken.
+    """
+    evaluations = []
+    for branch in branches:
+        if branch.is_default:
+            evaluations.append((branch, True, ""))
+            return Decision(branch, tuple(evaluations))
+        value = values.get(branch.field)
+        met = branch.predicate(value)
+        evaluations.append((branch, met, "" if value is None else str(value)))
+        if met:
+            return Decision(branch, tuple(evaluations))
+    return Decision(None, tuple(evaluations))
+
+
+def checkpoint_values(step_execution_ids):
+    """{step execution id: checkpoint values by code} with one query."""
+    values = {}
+    for step_execution_id, code, result, measured, actual in CheckpointResult.objects.filter(
+        step_execution_id__in=step_execution_ids
+    ).values_list("step_execution_id", "checkpoint__checkpoint_code", "result", "measured_value", "actual_value"):
+        if code:
+            step = values.setdefault(step_execution_id, {})
+            step[code] = measured if measured is not None else (actual or result)
+            step[f"{code}.result"] = result
+    return values
+
+
+def evaluation_rows(step_execution, decision, carried_out=False):
+    """Unsaved BranchEvaluations recording a decision."""
+    return [
+        BranchEvaluation(
+            step_execution=step_execution,
+            branch_id=branch.pk,
+            condition_met=met,
+            evaluated_value=value[:500],
+            action_taken=branch.action if branch is decision.branch and carried_out else "",
+            target_step_id=branch.target_step_id if branch is decision.branch else None,
+        )
+        for branch, met, value in decision.evaluations
+    ]
+
+
+def _procedure_revisions(step_executions):
+    """{execution id: (procedure id, revision)}, querying executions that are not loaded."""
+    revisions, missing = {}, set()
+    for step_execution in step_executions:
+        if StepExecution.execution.is_cached(step_execution):
+            execution = step_execution.execution
+            revisions[execution.pk] = (execution.procedure_id, execution.procedure_version)
+        else:
+            missing.add(step_execution.execution_id)
+    missing -= set(revisions)
+    if missing:
+        for pk, procedure_id, revision in ProcedureExecution.objects.filter(pk__in=missing).values_list(
+            "pk", "procedure_id", "procedure_version"
+        ):
+            revisions[pk] = (procedure_id, revision)
+    return revisions
+
+
+def route_steps(items, batch_size=1000, carry_out=None):
+    """
+    Evaluate and record the branches of finished steps: [(step_execution, outputs), ...].
+
+    Checkpoint values are loaded with one query and every evaluation is
+    written with one bulk insert; steps without branches cost no queries
+    once their procedure is compiled. carry_out(step_execution, decision)
+    is called for each decision with a branch and returns whether its
+    action was carried out. Returns the Decisions in order.
+    """
+    items = list(items)
+    procedures = _procedure_revisions(step_execution for step_execution, _ in items)
+    routed = []
+    for step_execution, outputs in items:
+        branches = branch_table(*procedures[step_execution.execution_id]).get(step_execution.step_id)
+        routed.append((step_execution, outputs or {}, branches))
+
+    with_branches = [step_execution.pk for step_execution, _, branches in routed if branches]
+    checkpoints = checkpoint_values(with_branches) if with_branches else {}
+    decisions, rows = [], []
+    for step_execution, outputs, branches in routed:
+        if not branches:
+            decisions.append(NO_DECISION)
+            continue
+        values = {"result": step_execution.result, "status": step_execution.status}
+        values.update(checkpoints.get(step_execution.pk, {}))
+        values.update(outputs)
+        decision = decide(branches, values)
+        decisions.append(decision)
+        carried_out = bool(decision.branch and carry_out and carry_out(step_execution, decision))
+        rows.extend(evaluation_rows(step_execution, decision, carried_out))
+    BranchEvaluation.objects.bulk_create(rows, batch_size=batch_size)
+    return decisions
+
+
+def route_step(step_execution, outputs=None):
+    """Evaluate and record the branches of one finished step; returns a Decision."""
+    return route_steps([(step_execution, outputs)])[0]
+
+
+def follow_step(step_execution, user, outputs=None):
+    """Route one finished step and carry out its decision through the engine; returns the Decision."""
+    def carry_out(step_execution, decision):
+        return apply_branch(
+            step_execution.execution, step_execution, decision.action, decision.target_step_id, user,
+            decision.branch.message,
+        ) is not None
+
+    return route_steps([(step_execution, outputs)], carry_out=carry_out)[0]
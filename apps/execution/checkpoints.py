@@ -0,0 +1,374 @@
+"""
+ARDT FMS - Checkpoint Evaluation
+Version: 5.4
+
+Records a whole step's checkpoint measurements in one call and raises
+the follow-ups that failed checkpoints ask for.
+
+The step's StepCheckpoint specs are loaded with one query, every
+measurement is evaluated against them in memory and the results are
+written in bulk. Checkpoints can only be recorded while the step and its
+execution are IN_PROGRESS; re-recording a checkpoint updates its result
+in place, so the result keeps its NCR and the notifications that point
+at it:
+
+    evaluation = evaluate_checkpoints(step_execution, {"TQ": "48.5", "VIS": "PASS"}, user)
+    evaluation.failed, evaluation.stop
+
+Measurements are keyed by checkpoint id or code; a value may also be a
+dict with "value", "result" and "notes". Checkpoints with tolerance_min /
+tolerance_max are measured numerically; otherwise the value is compared
+with expected_value, or taken as a PASS / FAIL / NA result. "NA" always
+marks a checkpoint not applicable.
+
+Every critical checkpoint must have a result before the step is
+completed (missing_critical_checkpoints, checked by engine.complete_step).
+
+Failed results whose failure_action is NCR or REWORK, or that have a
+failure_notify_role, are flagged followup_pending, unless they already
+have an NCR. After commit the
+flagged rows are handed to an in-process thread pool
+(ARDT_CHECKPOINT_FOLLOWUP_LOCAL_WORKERS), and
+`manage.py process_checkpoint_followups` drains anything left behind:
+each batch creates its NCRs and role notifications in bulk and clears the
+flag in the same transaction.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import UserRole
+from apps.common.sequences import next_document_numbers
+from apps.notifications.models import Notification
+from apps.procedures.models import StepCheckpoint
+from apps.quality.models import NCR
+
+from .models import CheckpointResult, ProcedureExecution, StepExecution
+
+logger = logging.getLogger(__name__)
+
+NCR_ACTIONS = (StepCheckpoint.FailureAction.NCR, StepCheckpoint.FailureAction.REWORK)
+RESULT_WORDS = {
+    "PASS": CheckpointResult.Result.PASS,
+    "OK": CheckpointResult.Result.PASS,
+    "TRUE": CheckpointResult.Result.PASS,
+    "YES": CheckpointResult.Result.PASS,
+    "FAIL": CheckpointResult.Result.FAIL,
+    "NOK": CheckpointResult.Result.FAIL,
+    "FALSE": CheckpointResult.Result.FAIL,
+    "NO": CheckpointResult.Result.FAIL,
+    "NA": CheckpointResult.Result.NA,
+    "N/A": CheckpointResult.Result.NA,
+}
+NOTIFICATION_ENTITY = "checkpoint_result"
+# Fields rewritten when a checkpoint is recorded again
+RECORDED_FIELDS = [
+    "result", "actual_value", "measured_value", "is_within_tolerance", "notes",
+    "evaluated_by", "evaluated_at", "followup_pending",
+]
+
+
+@dataclass
+class CheckpointEvaluation:
+    results: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+
+    @property
+    def stop(self):
+        """True when a failed checkpoint asks for the procedure to stop."""
+        return any(r.checkpoint.failure_action == StepCheckpoint.FailureAction.STOP for r in self.failed)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return number if number.is_finite() else None
+
+
+def needs_followup(checkpoint):
+    """Whether a failure of this checkpoint raises an NCR or notifies a role."""
+    return checkpoint.failure_action in NCR_ACTIONS or (
+        checkpoint.failure_notify_role_id is not None
+        and checkpoint.failure_action != StepCheckpoint.FailureAction.CONTINUE
+    )
+
+
+def evaluate(checkpoint, value, result=""):
+    """
+    (result, measured value, within tolerance) of one measurement.
+
+    Raises ValidationError when the value cannot be evaluated.
+    """
+    text = "" if value is None else str(value).strip()
+    stated = RESULT_WORDS.get((result or "").strip().upper()) or RESULT_WORDS.get(text.upper())
+    if stated == CheckpointResult.Result.NA:
+        return stated, None, None
+
+    if checkpoint.tolerance_min is not None or checkpoint.tolerance_max is not None:
+        measured = _number(text)
+        if measured is None:
+            raise ValidationError(f"{checkpoint.name}: '{text}' is not a number.")
+        within = (checkpoint.tolerance_min is None or measured >= checkpoint.tolerance_min) and (
+            checkpoint.tolerance_max is None or measured <= checkpoint.tolerance_max
+        )
+        return (CheckpointResult.Result.PASS if within else CheckpointResult.Result.FAIL), measured, within
+
+    expected = checkpoint.expected_value.strip()
+    if expected and text and RESULT_WORDS.get(expected.upper()) is None:
+        measured, target = _number(text), _number(expected)
+        if target is not None and measured is not None:
+            within = measured == target
+        else:
+            measured, within = None, text.casefold() == expected.casefold()
+        return (CheckpointResult.Result.PASS if within else CheckpointResult.Result.FAIL), measured, within
+
+    if stated is None:
+        raise ValidationError(f"{checkpoint.name}: enter PASS, FAIL or NA.")
+    return stated, _number(text), None
+
+
+def evaluate_checkpoints(step_execution, measurements, user=None):
+    """
+    Evaluate and record a step's checkpoint measurements in one transaction.
+
+    Results replace earlier ones for the same checkpoints; the step and
+    its execution must be IN_PROGRESS. Returns a CheckpointEvaluation;
+    raises ValidationError listing every problem.
+    """
+    checkpoints = list(
+        StepCheckpoint.objects.filter(step_id=step_execution.step_id).order_by("sequence", "pk")
+    )
+    by_key = {str(c.pk): c for c in checkpoints}
+    by_key.update({c.checkpoint_code: c for c in checkpoints if c.checkpoint_code})
+
+    evaluation, errors = CheckpointEvaluation(), []
+    for key, entry in measurements.items():
+        checkpoint = by_key.get(str(key))
+        if checkpoint is None:
+            errors.append(f"Unknown checkpoint: {key}.")
+            continue
+        if not isinstance(entry, dict):
+            entry = {"value": entry}
+        try:
+            result, value, within = evaluate(checkpoint, entry.get("value"), entry.get("result", ""))
+        except ValidationError as e:
+            errors.extend(e.messages)
+            continue
+        row = CheckpointResult(
+            step_execution=step_execution,
+            checkpoint=checkpoint,
+            result=result,
+            actual_value=str(entry.get("value") if entry.get("value") is not None else "")[:200],
+            measured_value=value,
+            is_within_tolerance=within,
+            notes=entry.get("notes", ""),
+            evaluated_by=user,
+            followup_pending=result == CheckpointResult.Result.FAIL and needs_followup(checkpoint),
+        )
+        evaluation.results.append(row)
+        if result == CheckpointResult.Result.FAIL:
+            evaluation.failed.append(row)
+    if errors:
+        raise ValidationError(errors)
+
+    with transaction.atomic():
+        in_progress = StepExecution.objects.filter(
+            pk=step_execution.pk,
+            status=StepExecution.Status.IN_PROGRESS,
+            execution__status=ProcedureExecution.Status.IN_PROGRESS,
+        ).exists()
+        if not in_progress:
+            raise ValidationError("Checkpoints can only be recorded on a step in progress.")
+        _record(step_execution, evaluation.results)
+        if any(r.followup_pending for r in evaluation.results):
+            transaction.on_commit(followup_runner.kick)
+    return evaluation
+
+
+def _record(step_execution, results):
+    """Insert new results and update earlier ones in place, keeping their pk and NCR."""
+    earlier = {}
+    for row in CheckpointResult.objects.select_for_update().filter(
+        step_execution=step_execution, checkpoint_id__in=[r.checkpoint_id for r in results]
+    ).order_by("pk"):
+        earlier.setdefault(row.checkpoint_id, row)
+
+    now, created, updated = timezone.now(), [], []
+    for row in results:
+        previous = earlier.get(row.checkpoint_id)
+        if previous is None:
+            created.append(row)
+            continue
+        row.pk, row.ncr_id, row.evaluated_at = previous.pk, previous.ncr_id, now
+        row._state.adding = False
+        if row.ncr_id is not None:
+            row.followup_pending = False
+        updated.append(row)
+    if created:
+        CheckpointResult.objects.bulk_create(created)
+    if updated:
+        CheckpointResult.objects.bulk_update(updated, RECORDED_FIELDS)
+
+
+def missing_critical_checkpoints(step_execution):
+    """Critical checkpoints of the step that have no recorded result."""
+    return list(
+        StepCheckpoint.objects.filter(step_id=step_execution.step_id, is_critical=True)
+        .exclude(results__step_execution=step_execution)
+        .order_by("sequence", "pk")
+    )
+
+
+def _tolerance(checkpoint):
+    low, high, unit = checkpoint.tolerance_min, checkpoint.tolerance_max, checkpoint.unit
+    if low is not None and high is not None:
+        return f"{low} to {high} {unit}".rstrip()
+    if low is not None:
+        return f"at least {low} {unit}".rstrip()
+    if high is not None:
+        return f"at most {high} {unit}".rstrip()
+    return ""
+
+
+def _ncr_for(result, number):
+    checkpoint, execution = result.checkpoint, result.step_execution.execution
+    step = checkpoint.step
+    rework = checkpoint.failure_action == StepCheckpoint.FailureAction.REWORK
+    description = f"{checkpoint.name} failed on step {step.step_number} ({step.name})."
+    if _tolerance(checkpoint):
+        description += f" Measured {result.measured_value}, tolerance {_tolerance(checkpoint)}."
+    elif checkpoint.expected_value:
+        description += f" Expected {checkpoint.expected_value}, got {result.actual_value or result.result}."
+    if result.notes:
+        description += f"\n\n{result.notes}"
+    return NCR(
+        ncr_number=number,
+        work_order_id=execution.work_order_id,
+        title=f"Checkpoint failed: {checkpoint.name}"[:200],
+        description=description,
+        severity=NCR.Severity.CRITICAL if checkpoint.is_critical else NCR.Severity.MAJOR,
+        detected_at=result.evaluated_at,
+        detected_by_id=result.evaluated_by_id,
+        detection_stage=f"{execution.procedure.code} step {step.step_number}"[:100],
+        status=NCR.Status.OPEN,
+        disposition=NCR.Disposition.REWORK if rework else None,
+        created_by_id=result.evaluated_by_id,
+    )
+
+
+def _notifications_for(results):
+    role_ids = {r.checkpoint.failure_notify_role_id for r in results if r.checkpoint.failure_notify_role_id}
+    if not role_ids:
+        return []
+    members = {}
+    for role_id, user_id in UserRole.objects.filter(role_id__in=role_ids).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+    ).values_list("role_id", "user_id"):
+        members.setdefault(role_id, []).append(user_id)
+
+    notifications = []
+    for result in results:
+        checkpoint = result.checkpoint
+        execution = result.step_execution.execution
+        message = f"{checkpoint.name} failed on step {checkpoint.step.step_number} of {execution.procedure.code}."
+        if result.ncr_id:
+            message += f" {result.ncr.ncr_number} raised."
+        for user_id in members.get(checkpoint.failure_notify_role_id, ()):
+            notifications.append(Notification(
+                recipient_id=user_id,
+                title=f"Checkpoint failed: {checkpoint.name}"[:200],
+                message=message,
+                priority=Notification.Priority.URGENT if checkpoint.is_critical else Notification.Priority.HIGH,
+                entity_type=NOTIFICATION_ENTITY,
+                entity_id=result.pk,
+                action_url=reverse("execution:detail", args=[execution.pk]),
+            ))
+    return notifications
+
+
+def process_followups(batch_size=100):
+    """
+    Raise the NCRs and notifications of one batch of pending results.
+
+    The batch is locked, its NCRs and notifications are bulk inserted and
+    the flags cleared in one transaction. Returns (results, NCRs,
+    notifications) processed.
+    """
+    with transaction.atomic():
+        results = list(
+            CheckpointResult.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(followup_pending=True)
+            .select_related("checkpoint__step", "step_execution__execution__procedure")
+            .order_by("pk")[:batch_size]
+        )
+        if not results:
+            return 0, 0, 0
+
+        raising = [r for r in results if r.checkpoint.failure_action in NCR_ACTIONS and r.ncr_id is None]
+        if raising:
+            numbers = next_document_numbers(NCR, "ncr_number", f"NCR-{timezone.now().year}-", len(raising))
+            ncrs = NCR.objects.bulk_create(_ncr_for(r, n) for r, n in zip(raising, numbers))
+            for result, ncr in zip(raising, ncrs):
+                result.ncr = ncr
+
+        notifications = Notification.objects.bulk_create(_notifications_for(results))
+        for result in results:
+            result.followup_pending = False
+        CheckpointResult.objects.bulk_update(results, ["ncr", "followup_pending"])
+    return len(results), len(raising), len(notifications)
+
+
+def process_pending_followups():
+    """Process pending follow-ups until none are left; returns the number of results processed."""
+    processed = 0
+    while True:
+        count, _, _ = process_followups()
+        if not count:
+            return processed
+        processed += count
+
+
+class LocalFollowupRunner:
+    """Small in-process thread pool that raises follow-ups after each evaluation commits."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        return getattr(settings, "ARDT_CHECKPOINT_FOLLOWUP_LOCAL_WORKERS", 0)
+
+    def kick(self):
+        if self.max_workers <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="checkpoint")
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        close_old_connections()
+        try:
+            process_pending_followups()
+        except Exception:
+            logger.exception("Checkpoint follow-up runner failed")
+        finally:
+            connection.close()
+
+
+followup_runner = LocalFollowupRunner()
@@ -0,0 +1,225 @@
+"""
+ARDT FMS - Procedure Execution Engine
+Version: 5.4
+
+Starting and advancing procedure executions without re-scanning their
+steps.
+
+start_execution() creates every StepExecution of a procedure with one
+bulk insert and numbers them in step order (StepExecution.position).
+The execution keeps a cursor on its current step (current_step,
+current_position) and counters of total, completed and skipped steps.
+Finishing a step locks the execution row, updates the counters and moves
+the cursor to the next pending step with one indexed lookup:
+
+    execution = start_execution(procedure, work_order, user)
+    execution = complete_step(execution, step_execution, user, result="PASS")
+    execution = skip_step(execution, step_execution, user, reason="Not fitted")
+
+progress_percent is completed_steps / total_steps; the execution is
+completed once every step is completed or skipped.
+
+apply_branch() carries out the routing decision of a finished step
+(apps.execution.branching): GOTO_STEP moves the cursor, SKIP_STEP skips a
+step, STOP fails the execution and COMPLETE completes it.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.procedures.models import StepBranch
+
+from .checkpoints import missing_critical_checkpoints
+from .models import ProcedureExecution, StepExecution
+
+# Step executions that can still be completed or skipped
+OPEN_STEP_STATUSES = (StepExecution.Status.PENDING, StepExecution.Status.IN_PROGRESS)
+
+# Branch actions carried out by apply_branch()
+BRANCH_ACTIONS = (
+    StepBranch.Action.GOTO_STEP, StepBranch.Action.SKIP_STEP, StepBranch.Action.STOP, StepBranch.Action.COMPLETE,
+)
+
+
+def start_execution(procedure, work_order, user, batch_size=500):
+    """Create an IN_PROGRESS execution of a procedure with its first step started."""
+    now = timezone.now()
+    step_ids = list(procedure.steps.order_by("step_number", "pk").values_list("pk", flat=True))
+    with transaction.atomic():
+        execution = ProcedureExecution.objects.create(
+            procedure=procedure,
+            work_order=work_order,
+            procedure_version=procedure.revision,
+            status=ProcedureExecution.Status.IN_PROGRESS,
+            started_at=now,
+            started_by=user,
+            current_step_id=step_ids[0] if step_ids else None,
+            current_position=0 if step_ids else None,
+            total_steps=len(step_ids),
+        )
+        StepExecution.objects.bulk_create(
+            [
+                StepExecution(
+                    execution=execution,
+                    step_id=step_id,
+                    position=position,
+                    status=StepExecution.Status.IN_PROGRESS if position == 0 else StepExecution.Status.PENDING,
+                    started_at=now if position == 0 else None,
+                )
+                for position, step_id in enumerate(step_ids)
+            ],
+            batch_size=batch_size,
+        )
+    return execution
+
+
+def progress(completed, total):
+    return int(completed * 100 / total) if total > 0 else 0
+
+
+def complete_step(execution, step_execution, user, result=StepExecution.Result.PASS, notes=""):
+    """
+    Complete a step and advance the execution; returns the updated execution.
+
+    Raises ValidationError while a critical checkpoint of the step has no result.
+    """
+    missing = missing_critical_checkpoints(step_execution)
+    if missing:
+        raise ValidationError("Critical checkpoints not measured: " + ", ".join(c.name for c in missing) + ".")
+    return _finish_step(
+        execution, step_execution, user, "completed_steps",
+        status=StepExecution.Status.COMPLETED, result=result, notes=notes,
+    )
+
+
+def skip_step(execution, step_execution, user, reason=""):
+    """Skip a skippable step and advance the execution; returns the updated execution."""
+    if not step_execution.step.can_skip:
+        raise ValidationError("This step cannot be skipped.")
+    return _finish_step(
+        execution, step_execution, user, "skipped_steps",
+        status=StepExecution.Status.SKIPPED, skip_reason=reason,
+    )
+
+
+def _finish_step(execution, step_execution, user, counter, **values):
+    now = timezone.now()
+    values.update(completed_at=now, executed_by=user)
+    with transaction.atomic():
+        execution = ProcedureExecution.objects.select_for_update().get(pk=execution.pk)
+        finished = StepExecution.objects.filter(
+            pk=step_execution.pk, execution=execution, status__in=OPEN_STEP_STATUSES
+        ).update(updated_at=now, **values)
+        if not finished:
+            raise ValidationError("This step has already been completed or skipped.")
+        for name, value in values.items():
+            setattr(step_execution, name, value)
+
+        setattr(execution, counter, getattr(execution, counter) + 1)
+        execution.progress_percent = progress(execution.completed_steps, execution.total_steps)
+        fields = [counter, "progress_percent", "current_step", "current_position", "updated_at"]
+        if execution.completed_steps + execution.skipped_steps >= execution.total_steps:
+            execution.status = ProcedureExecution.Status.COMPLETED
+            execution.completed_at = now
+            execution.completed_by = user
+            execution.current_step = None
+            execution.current_position = None
+            fields += ["status", "completed_at", "completed_by"]
+        elif step_execution.position == execution.current_position:
+            _advance(execution, step_execution.position, now)
+        execution.save(update_fields=fields)
+    return execution
+
+
+def _advance(execution, position, now):
+    """Move the cursor to the next pending step (or the first unfinished one) and start it."""
+    remaining = StepExecution.objects.filter(execution=execution).order_by("position")
+    next_step = remaining.filter(status=StepExecution.Status.PENDING, position__gt=position).first()
+    if next_step is None:
+        next_step = remaining.filter(status__in=OPEN_STEP_STATUSES).first()
+    if next_step.status == StepExecution.Status.PENDING:
+        next_step.status = StepExecution.Status.IN_PROGRESS
+        next_step.started_at = now
+        next_step.save(update_fields=["status", "started_at", "updated_at"])
+    execution.current_step_id = next_step.step_id
+    execution.current_position = next_step.position
+
+
+def apply_branch(execution, step_execution, action, target_step_id, user, message=""):
+    """
+    Carry out the branch action taken after step_execution finished.
+
+    GOTO_STEP starts the target step and skips the pending steps before
+    it; SKIP_STEP skips the target step (default: the current one); STOP
+    fails the execution; COMPLETE skips every open step and completes it.
+    Returns the updated execution, or None when the action was not carried
+    out (not an engine action, the execution is no longer in progress or
+    the target step is already finished).
+    """
+    if action not in BRANCH_ACTIONS:
+        return None
+    now = timezone.now()
+    reason = message or f"Branch of step {step_execution.step.step_number}"
+    with transaction.atomic():
+        execution = ProcedureExecution.objects.select_for_update().get(pk=execution.pk)
+        if execution.status != ProcedureExecution.Status.IN_PROGRESS:
+            return None
+        open_steps = StepExecution.objects.filter(execution=execution, status__in=OPEN_STEP_STATUSES)
+
+        if action == StepBranch.Action.STOP:
+            execution.status = ProcedureExecution.Status.FAILED
+            execution.completed_at = now
+            execution.completed_by = user
+            execution.result_summary = reason
+            execution.save(update_fields=["status", "completed_at", "completed_by", "result_summary", "updated_at"])
+            return execution
+
+        if action == StepBranch.Action.COMPLETE:
+            execution.skipped_steps += _skip(open_steps, user, reason, now)
+            execution.status = ProcedureExecution.Status.COMPLETED
+            execution.completed_at = now
+            execution.completed_by = user
+            execution.current_step = None
+            execution.current_position = None
+            execution.save(update_fields=[
+                "skipped_steps", "status", "completed_at", "completed_by", "current_step", "current_position",
+                "updated_at",
+            ])
+            return execution
+
+        if target_step_id is not None:
+            target = open_steps.filter(step_id=target_step_id).first()
+        elif action == StepBranch.Action.SKIP_STEP:
+            target = open_steps.filter(position=execution.current_position).first()
+        else:
+            target = None
+        if target is None:
+            return None
+
+        if action == StepBranch.Action.SKIP_STEP:
+            return _finish_step(
+                execution, target, user, "skipped_steps", status=StepExecution.Status.SKIPPED, skip_reason=reason,
+            )
+
+        if target.position > step_execution.position:
+            execution.skipped_steps += _skip(
+                open_steps.filter(position__gt=step_execution.position, position__lt=target.position), user, reason, now,
+            )
+        open_steps.filter(status=StepExecution.Status.IN_PROGRESS).exclude(pk=target.pk).update(
+            status=StepExecution.Status.PENDING, started_at=None, updated_at=now,
+        )
+        if target.status == StepExecution.Status.PENDING:
+            target.status = StepExecution.Status.IN_PROGRESS
+            target.started_at = now
+            target.save(update_fields=["status", "started_at", "updated_at"])
+        execution.current_step_id = target.step_id
+        execution.current_position = target.position
+        execution.save(update_fields=["skipped_steps", "current_step", "current_position", "updated_at"])
+    return execution
+
+
+def _skip(step_executions, user, reason, now):
+    return step_executions.update(
+        status=StepExecution.Status.SKIPPED, skip_reason=reason, completed_at=now, executed_by=user, updated_at=now,
+    )
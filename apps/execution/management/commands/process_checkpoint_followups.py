@@ -0,0 +1,54 @@
+"""
+ARDT FMS - Checkpoint Follow-up Worker
+Version: 5.4
+
+Raises the NCRs and notifications of failed checkpoint results.
+
+Usage:
+    python manage.py process_checkpoint_followups            # poll forever
+    python manage.py process_checkpoint_followups --once     # process what is pending, then exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.execution.checkpoints import process_followups
+
+
+class Command(BaseCommand):
+    help = "Raise NCRs and notifications for failed checkpoint results"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the results that are currently pending and exit",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between checks when idle",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            results = ncrs = notifications = 0
+            while True:
+                batch, batch_ncrs, batch_notifications = process_followups()
+                if not batch:
+                    break
+                results, ncrs, notifications = results + batch, ncrs + batch_ncrs, notifications + batch_notifications
+
+            if results:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Processed {results} failed checkpoint(s): {ncrs} NCR(s), {notifications} notification(s)"
+                ))
+
+            if options["once"]:
+                return
+            if not results:
+                time.sleep(options["poll_interval"])
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_step_cursor(apps, schema_editor):
+    """Number step executions and fill the execution cursor and counters."""
+    ProcedureExecution = apps.get_model("execution", "ProcedureExecution")
+    StepExecution = apps.get_model("execution", "StepExecution")
+    for execution in ProcedureExecution.objects.iterator(chunk_size=500):
+        steps = list(
+            StepExecution.objects.filter(execution=execution).order_by("step__step_number", "pk")
+            .only("pk", "step_id", "status")
+        )
+        execution.current_position = None
+        for position, step_execution in enumerate(steps):
+            step_execution.position = position
+            if step_execution.step_id == execution.current_step_id and execution.current_position is None:
+                execution.current_position = position
+        StepExecution.objects.bulk_update(steps, ["position"])
+        execution.total_steps = len(steps)
+        execution.completed_steps = sum(1 for step in steps if step.status == "COMPLETED")
+        execution.skipped_steps = sum(1 for step in steps if step.status == "SKIPPED")
+        execution.save(update_fields=["current_position", "total_steps", "completed_steps", "skipped_steps"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("execution", "0005_alter_branchevaluation_branch_and_more"),
+        ("procedures", "0002_alter_procedurestep_responsible_role_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="procedureexecution",
+            name="completed_steps",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="procedureexecution",
+            name="current_position",
+            field=models.IntegerField(
+                blank=True,
+                help_text="Position of the current step execution",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="procedureexecution",
+            name="skipped_steps",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="procedureexecution",
+            name="total_steps",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="stepexecution",
+            name="position",
+            field=models.IntegerField(
+                default=0, help_text="0-based order of the step within the execution"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stepexecution",
+            index=models.Index(
+                fields=["execution", "status", "position"],
+                name="step_execut_executi_276d6a_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_step_cursor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("execution", "0006_execution_step_cursor"),
+        ("procedures", "0002_alter_procedurestep_responsible_role_and_more"),
+        ("quality", "0003_alter_inspection_procedure_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="checkpointresult",
+            name="followup_pending",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="checkpointresult",
+            index=models.Index(
+                fields=["followup_pending"], name="checkpoint__followu_945252_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+from django.conf import settings
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+
+def _snapshot(input_type, value):
+    if input_type in ("number", "decimal", "integer", "range"):
+        try:
+            number = Decimal(value.strip())
+        except InvalidOperation:
+            return value
+        if not number.is_finite():
+            return value
+        if number == number.to_integral_value():
+            return int(number)
+        return float(number) if Decimal(repr(float(number))) == number else str(number)
+    if input_type in ("checkbox", "boolean"):
+        return value.strip().casefold() in ("true", "on", "yes", "y", "1", "checked")
+    return value
+
+
+def backfill_submission_data(apps, schema_editor):
+    """Build the data snapshot of existing submissions from their valid field values."""
+    FormSubmission = apps.get_model("execution", "FormSubmission")
+    FormFieldValue = apps.get_model("execution", "FormFieldValue")
+    for submission in FormSubmission.objects.only("pk").iterator(chunk_size=500):
+        data = {}
+        for name, input_type, value in FormFieldValue.objects.filter(submission=submission, is_valid=True).exclude(
+            value=""
+        ).values_list("field__name", "field__field_type__html_input_type", "value"):
+            data.setdefault(name, _snapshot(input_type.lower(), value))
+        if data:
+            FormSubmission.objects.filter(pk=submission.pk).update(data=data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("execution", "0007_checkpoint_followups"),
+        ("forms_engine", "0002_alter_formfield_field_type_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="data",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form_template", "-submitted_at"],
+                name="form_submis_form_te_151aa5_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_submission_data, migrations.RunPython.noop),
+    ]
@@ -45,6 +45,12 @@ class ProcedureExecution(models.Model):
     )
     progress_percent = models.IntegerField(default=0)
 
+    # Step cursor and counters (maintained by apps.execution.engine)
+    current_position = models.IntegerField(null=True, blank=True, help_text="Position of the current step execution")
+    total_steps = models.IntegerField(default=0)
+    completed_steps = models.IntegerField(default=0)
+    skipped_steps = models.IntegerField(default=0)
+
     # Timing
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -111,6 +117,7 @@ class StepExecution(models.Model):
 
     execution = models.ForeignKey(ProcedureExecution, on_delete=models.CASCADE, related_name="step_executions")
     step = models.ForeignKey("procedures.ProcedureStep", on_delete=models.PROTECT, related_name="step_executions")
+    position = models.IntegerField(default=0, help_text="0-based order of the step within the execution")
 
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     result = models.CharField(max_length=20, choices=Result.choices, null=True, blank=True)
@@ -150,6 +157,9 @@ class StepExecution(models.Model):
         ordering = ["execution", "step__step_number"]
         verbose_name = "Step Execution"
         verbose_name_plural = "Step Executions"
+        indexes = [
+            models.Index(fields=["execution", "status", "position"]),
+        ]
 
     def __str__(self):
         return f"{self.execution} - Step {self.step.step_number}"
@@ -181,6 +191,8 @@ class CheckpointResult(models.Model):
 
     # NCR link (if checkpoint failed and NCR created)
     ncr = models.ForeignKey("quality.NCR", on_delete=models.SET_NULL, null=True, blank=True, related_name="checkpoint_results")
+    # Failed result whose NCR / notifications are still to be raised (apps.execution.checkpoints)
+    followup_pending = models.BooleanField(default=False)
 
     evaluated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="evaluated_checkpoints")
     evaluated_at = models.DateTimeField(auto_now_add=True)
@@ -193,6 +205,7 @@ class CheckpointResult(models.Model):
         indexes = [
             models.Index(fields=["step_execution", "checkpoint"]),
             models.Index(fields=["result"]),
+            models.Index(fields=["followup_pending"]),
         ]
 
     def __str__(self):
@@ -247,11 +260,17 @@ class FormSubmission(models.Model):
     is_valid = models.BooleanField(default=True)
     validation_errors = models.JSONField(null=True, blank=True)
 
+    # Typed snapshot of the valid field values by field name (apps.execution.submissions)
+    data = models.JSONField(default=dict, blank=True)
+
     class Meta:
         db_table = "form_submissions"
         ordering = ["-submitted_at"]
         verbose_name = "Form Submission"
         verbose_name_plural = "Form Submissions"
+        indexes = [
+            models.Index(fields=["form_template", "-submitted_at"]),
+        ]
 
     def __str__(self):
         return f"{self.form_template.code} - {self.submitted_at}"
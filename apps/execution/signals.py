@@ -0,0 +1,40 @@
+"""
+ARDT FMS - Execution Signal Handlers
+Version: 5.4
+
+Keeps compiled step branch tables in sync with procedure definitions and
+form submission snapshots in sync with their field values.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.procedures.models import ProcedureStep, StepBranch
+
+from .branching import invalidate_branches
+from .models import FormFieldValue
+from .submissions import refresh_snapshots
+
+
+@receiver(post_save, sender=StepBranch)
+@receiver(post_delete, sender=StepBranch)
+def step_branch_changed(sender, instance, **kwargs):
+    """Recompile the branch table of the branch's procedure."""
+    procedure_id = ProcedureStep.objects.filter(pk=instance.step_id).values_list("procedure_id", flat=True).first()
+    if procedure_id is not None:
+        invalidate_branches(procedure_id)
+
+
+@receiver(post_save, sender=ProcedureStep)
+@receiver(post_delete, sender=ProcedureStep)
+def procedure_step_changed(sender, instance, **kwargs):
+    """Steps own their branches (deleting one cascades), so recompile on step changes too."""
+    invalidate_branches(instance.procedure_id)
+
+
+@receiver(post_save, sender=FormFieldValue)
+@receiver(post_delete, sender=FormFieldValue)
+def form_field_value_changed(sender, instance, origin=None, **kwargs):
+    """Rebuild the submission's data snapshot, unless the submission itself is being deleted."""
+    if origin is None or isinstance(origin, FormFieldValue) or getattr(origin, "model", None) is FormFieldValue:
+        refresh_snapshots([instance.submission_id])
@@ -0,0 +1,156 @@
+"""
+ARDT FMS - Form Submission Writer
+Version: 5.4
+
+Validates and stores a whole form submission at once.
+
+The payload is validated against the template's compiled schema
+(apps.forms_engine.schema), then the FormSubmission and all of its
+FormFieldValue rows are written in one transaction with one bulk insert:
+
+    submission = submit_form(step_execution, request.POST, user, files=request.FILES)
+
+Besides the text rows, each submission keeps a typed snapshot of its
+valid values by field name in FormSubmission.data (numbers as JSON
+numbers, or as strings when a float cannot hold the decimal exactly;
+dates as ISO strings, checkboxes as booleans). Reports over a
+field's history read that column through the (form_template,
+submitted_at) index instead of joining and casting text rows:
+
+    field_history(template, "wear")  # (submission id, submitted_at, value), newest first
+
+FormFieldValue rows changed one at a time (e.g. in the admin) refresh
+their submission's snapshot through apps.execution.signals.
+"""
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from apps.forms_engine.schema import get_schema
+
+from .models import FormFieldValue, FormSubmission
+
+
+def text_value(value):
+    """FormFieldValue text of a cleaned value."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return json.dumps([text_value(item) for item in value])
+    return str(value)
+
+
+def snapshot_value(value):
+    """JSON value of a cleaned value for FormSubmission.data."""
+    if isinstance(value, Decimal):
+        if value == value.to_integral_value():
+            return int(value)
+        number = float(value)
+        # Keep decimals a float would round as strings
+        return number if Decimal(repr(number)) == value else str(value)
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [snapshot_value(item) for item in value]
+    return value
+
+
+def _raw_text(compiled, data):
+    if compiled.multiple and hasattr(data, "getlist"):
+        return json.dumps(data.getlist(compiled.name))
+    value = data.get(compiled.name)
+    return "" if value is None else text_value(value)
+
+
+def submit_form(step_execution, data, user=None, template=None, files=None, allow_invalid=False, batch_size=500):
+    """
+    Validate and store a form submission for a step execution.
+
+    The template defaults to the step's form template. An invalid payload
+    raises ValidationError (a dict of field name -> messages) unless
+    allow_invalid is set; the submission is then stored with is_valid
+    False, its errors, and the rejected values flagged on their rows.
+    """
+    template = template or step_execution.step.form_template
+    if template is None:
+        raise ValidationError("This step has no form.")
+    schema = get_schema(template)
+    files = files or {}
+    if files:
+        # Uploaded files count as answers to their fields
+        data = data.copy()
+        for name, upload in files.items():
+            data[name] = upload.name
+    validation = schema.validate(data)
+    if not validation.is_valid and not allow_invalid:
+        raise ValidationError(validation.errors)
+
+    rows = []
+    for name in schema.order:
+        compiled = schema.fields[name]
+        if name in validation.errors:
+            rows.append(FormFieldValue(
+                field_id=compiled.pk,
+                value=_raw_text(compiled, data),
+                is_valid=False,
+                validation_message=" ".join(validation.errors[name])[:500],
+            ))
+        elif name in files:
+            rows.append(FormFieldValue(field_id=compiled.pk, value=files[name].name, file=files[name]))
+        elif validation.cleaned.get(name) not in (None, []):
+            rows.append(FormFieldValue(field_id=compiled.pk, value=text_value(validation.cleaned[name])))
+
+    with transaction.atomic():
+        submission = FormSubmission.objects.create(
+            step_execution=step_execution,
+            form_template_id=schema.template_id,
+            template_version=schema.version,
+            submitted_by=user,
+            is_complete=validation.is_valid,
+            is_valid=validation.is_valid,
+            validation_errors=validation.errors or None,
+            data={name: snapshot_value(value) for name, value in validation.cleaned.items() if value not in (None, [])},
+        )
+        for row in rows:
+            row.submission = submission
+        FormFieldValue.objects.bulk_create(rows, batch_size=batch_size)
+    return submission
+
+
+def refresh_snapshots(submission_ids):
+    """Rebuild FormSubmission.data from the stored field values of some submissions."""
+    submissions = list(FormSubmission.objects.filter(pk__in=submission_ids).only("pk", "form_template_id"))
+    values = {}
+    for submission_id, field_id, value in FormFieldValue.objects.filter(
+        submission__in=submissions, is_valid=True
+    ).values_list("submission_id", "field_id", "value"):
+        values.setdefault(submission_id, []).append((field_id, value))
+
+    for submission in submissions:
+        schema = get_schema(submission.form_template_id)
+        by_pk = {compiled.pk: compiled for compiled in schema.fields.values()}
+        submission.data = {}
+        for field_id, value in values.get(submission.pk, ()):
+            compiled = by_pk.get(field_id)
+            if compiled is None or value == "":
+                continue
+            try:
+                parsed = [compiled.parse(v) for v in json.loads(value)] if compiled.multiple else compiled.parse(value)
+            except (ValidationError, ValueError, TypeError):
+                continue
+            submission.data[compiled.name] = snapshot_value(parsed)
+    FormSubmission.objects.bulk_update(submissions, ["data"])
+
+
+def field_history(template, field_name, since=None):
+    """(submission id, submitted_at, value) of a field across a template's submissions, newest first."""
+    submissions = FormSubmission.objects.filter(form_template=template, data__has_key=field_name)
+    if since is not None:
+        submissions = submissions.filter(submitted_at__gte=since)
+    return submissions.order_by("-submitted_at").values_list("pk", "submitted_at", f"data__{field_name}")
@@ -0,0 +1,30 @@
+"""
+Execution App - Pytest Configuration and Shared Fixtures
+"""
+
+import pytest
+
+from apps.procedures.models import Procedure, ProcedureStep
+from apps.workorders.models import WorkOrder
+
+
+@pytest.fixture
+def engine_work_order(db, user):
+    """Work order procedures are executed against."""
+    return WorkOrder.objects.create(
+        wo_number='WO-ENGINE-001', wo_type=WorkOrder.WOType.FC_REPAIR, description='Engine test',
+        status=WorkOrder.Status.IN_PROGRESS, created_by=user,
+    )
+
+
+@pytest.fixture
+def engine_procedure(db, user):
+    """Active procedure with steps 10-40 (created out of order); step 20 can be skipped."""
+    procedure = Procedure.objects.create(
+        code='PROC-ENGINE', name='Engine Procedure', revision='B', status=Procedure.Status.ACTIVE, created_by=user,
+    )
+    for number in (30, 10, 20, 40):
+        ProcedureStep.objects.create(
+            procedure=procedure, step_number=number, name=f'Step {number}', can_skip=number == 20,
+        )
+    return procedure
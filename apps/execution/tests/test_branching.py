@@ -0,0 +1,138 @@
+"""
+Tests for the compiled step branch engine.
+"""
+
+import pytest
+from decimal import Decimal
+
+from apps.execution.branching import branch_table, compile_branch, decide, follow_step, route_step, route_steps
+from apps.execution.engine import complete_step, start_execution
+from apps.execution.models import BranchEvaluation, CheckpointResult, StepExecution
+from apps.procedures.models import StepBranch, StepCheckpoint
+
+
+def branch(pk, field, operator, value='', is_default=False):
+    return compile_branch({
+        'id': pk, 'condition_field': field, 'condition_operator': operator, 'condition_value': value,
+        'then_action': StepBranch.Action.GOTO_STEP, 'then_target_step_id': None, 'then_message': '',
+        'is_default': is_default,
+    })
+
+
+@pytest.fixture
+def started(engine_procedure, engine_work_order, user):
+    """Execution with its first step (10) completed; step 10 has a torque checkpoint and three branches."""
+    step = engine_procedure.steps.get(step_number=10)
+    rework, notify = engine_procedure.steps.get(step_number=30), engine_procedure.steps.get(step_number=40)
+    checkpoint = StepCheckpoint.objects.create(step=step, checkpoint_code='TQ', name='Torque')
+    StepBranch.objects.create(
+        step=step, sequence=1, condition_description='High torque', condition_field='TQ',
+        condition_operator='>', condition_value='50', then_action=StepBranch.Action.GOTO_STEP,
+        then_target_step=rework, then_message='Re-torque required',
+    )
+    StepBranch.objects.create(
+        step=step, sequence=2, condition_description='Failed', condition_field='result',
+        condition_operator='=', condition_value='FAIL', then_action=StepBranch.Action.NCR,
+    )
+    StepBranch.objects.create(
+        step=step, sequence=3, condition_description='Otherwise', condition_field='', condition_operator='',
+        then_action=StepBranch.Action.GOTO_STEP, then_target_step=notify, is_default=True,
+    )
+    execution = start_execution(engine_procedure, engine_work_order, user)
+    first = execution.step_executions.get(step=step)
+    complete_step(execution, first, user)
+    return first, checkpoint, rework, notify
+
+
+class TestPredicates:
+    """Tests for compiled condition predicates."""
+
+    @pytest.mark.parametrize('operator,expected,value,met', [
+        ('=', 'PASS', 'pass', True),
+        ('=', '10', Decimal('10.000'), True),
+        ('=', 'true', True, True),
+        ('!=', 'PASS', 'FAIL', True),
+        ('>', '48.5', '50', True),
+        ('>', '48.5', 'n/a', False),
+        ('<', '48.5', 48.5, False),
+        ('IN', 'A, B,7', 'b', True),
+        ('IN', 'A, B,7', '7.0', True),
+        ('CONTAINS', 'crack', 'Hairline CRACK on pin', True),
+        ('CONTAINS', 'crack', ['wear', 'crack'], True),
+        ('IS_NULL', '', '', True),
+        ('IS_NULL', 'false', 'x', True),
+        ('LIKE', 'x', 'x', False),
+        ('>', 'abc', '1', False),
+    ])
+    def test_operators(self, operator, expected, value, met):
+        assert branch(1, 'f', operator, expected).predicate(value) is met
+
+    def test_first_match_then_default(self):
+        branches = (branch(1, 'a', '>', '5'), branch(2, 'b', '=', 'x'), branch(3, '', '', is_default=True))
+
+        decision = decide(branches, {'a': 3, 'b': 'X'})
+        assert decision.branch.pk == 2
+        assert [(b.pk, met, value) for b, met, value in decision.evaluations] == [(1, False, '3'), (2, True, 'X')]
+        assert decide(branches, {}).branch.pk == 3
+        assert decide(branches[:2], {}).branch is None
+
+
+class TestRouteStep:
+    """Tests for routing recorded against step executions."""
+
+    def test_routes_on_checkpoint_values(self, started, user, django_assert_num_queries):
+        first, checkpoint, rework, _ = started
+        CheckpointResult.objects.create(
+            step_execution=first, checkpoint=checkpoint, result='PASS', measured_value=Decimal('52.5'),
+            evaluated_by=user,
+        )
+        branch_table(first.execution.procedure_id, 'B')
+
+        # checkpoint values, evaluation insert
+        with django_assert_num_queries(2):
+            decision = route_step(first)
+
+        assert (decision.action, decision.target_step_id) == (StepBranch.Action.GOTO_STEP, rework.pk)
+        assert decision.branch.message == 'Re-torque required'
+        row = BranchEvaluation.objects.get()
+        assert (row.condition_met, row.evaluated_value, row.target_step_id) == (True, '52.5000', rework.pk)
+
+    def test_bulk_routing_and_invalidation(self, started, engine_procedure, engine_work_order, user):
+        first, _, _, notify = started
+        other_step = first.execution.step_executions.get(step__step_number=20)
+        decisions = route_steps([(first, {'TQ': '12'}), (other_step, None)])
+
+        assert decisions[0].target_step_id == notify.pk
+        assert decisions[1].branch is None
+        assert BranchEvaluation.objects.filter(step_execution=first).count() == 3
+
+        default = StepBranch.objects.get(is_default=True)
+        default.is_default, default.condition_field, default.condition_operator = False, 'TQ', 'IS_NULL'
+        default.save()
+        assert route_step(first, {'TQ': '12'}).branch is None
+
+
+class TestFollowStep:
+    """Tests for carrying out routing decisions."""
+
+    def test_goto_skips_to_target(self, started, user):
+        first, _, rework, _ = started
+        decision = follow_step(first, user, {'TQ': '52'})
+
+        execution = first.execution
+        execution.refresh_from_db()
+        assert (decision.action, execution.current_step) == (StepBranch.Action.GOTO_STEP, rework)
+        assert dict(execution.step_executions.values_list('step__step_number', 'status')) == {
+            10: 'COMPLETED', 20: 'SKIPPED', 30: 'IN_PROGRESS', 40: 'PENDING',
+        }
+        assert execution.skipped_steps == 1
+        taken = BranchEvaluation.objects.get(condition_met=True)
+        assert (taken.action_taken, taken.target_step_id) == (StepBranch.Action.GOTO_STEP, rework.pk)
+
+    def test_actions_not_carried_out_are_not_recorded(self, started, user):
+        first, _, _, _ = started
+        decision = follow_step(first, user, {'result': 'FAIL'})
+
+        assert decision.action == StepBranch.Action.NCR
+        assert not BranchEvaluation.objects.exclude(action_taken='').exists()
+        assert StepExecution.objects.get(execution=first.execution, step__step_number=20).status == 'IN_PROGRESS'
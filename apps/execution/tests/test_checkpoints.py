@@ -0,0 +1,139 @@
+"""
+Tests for batched checkpoint evaluation and its follow-ups.
+"""
+
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.accounts.models import Role, UserRole
+from apps.execution.checkpoints import evaluate_checkpoints, process_followups
+from apps.execution.engine import complete_step, start_execution
+from apps.execution.models import CheckpointResult
+from apps.notifications.models import Notification
+from apps.procedures.models import StepCheckpoint
+from apps.quality.models import NCR
+
+
+@pytest.fixture
+def inspection(engine_procedure, engine_work_order, user):
+    """Started execution whose first step (10) has torque, gap and visual checkpoints."""
+    step = engine_procedure.steps.get(step_number=10)
+    role = Role.objects.create(code='QC', name='Quality Control')
+    UserRole.objects.create(user=user, role=role)
+    StepCheckpoint.objects.create(
+        step=step, sequence=1, checkpoint_code='TQ', name='Torque', tolerance_min=Decimal('40'),
+        tolerance_max=Decimal('50'), unit='Nm', is_critical=True, failure_action=StepCheckpoint.FailureAction.NCR,
+        failure_notify_role=role,
+    )
+    StepCheckpoint.objects.create(
+        step=step, sequence=2, checkpoint_code='GAP', name='Gap', tolerance_max=Decimal('0.5'),
+        failure_action=StepCheckpoint.FailureAction.STOP,
+    )
+    StepCheckpoint.objects.create(
+        step=step, sequence=3, checkpoint_code='VIS', name='Visual', expected_value='Clean',
+        failure_action=StepCheckpoint.FailureAction.CONTINUE, failure_notify_role=role,
+    )
+    execution = start_execution(engine_procedure, engine_work_order, user)
+    return execution.step_executions.get(step=step)
+
+
+class TestEvaluateCheckpoints:
+    """Tests for evaluate_checkpoints."""
+
+    def test_evaluates_in_one_write(self, inspection, user, django_assert_num_queries):
+        # checkpoints, savepoint, step status, earlier results, insert, release
+        with django_assert_num_queries(6):
+            evaluation = evaluate_checkpoints(
+                inspection, {'TQ': '45.5', 'GAP': '0.7', 'VIS': {'value': 'clean', 'notes': 'ok'}}, user,
+            )
+
+        assert [r.result for r in evaluation.results] == ['PASS', 'FAIL', 'PASS']
+        assert evaluation.stop
+        torque = CheckpointResult.objects.get(checkpoint__checkpoint_code='TQ')
+        assert (torque.measured_value, torque.is_within_tolerance, torque.followup_pending) == (
+            Decimal('45.5'), True, False,
+        )
+        gap = CheckpointResult.objects.get(checkpoint__checkpoint_code='GAP')
+        assert (gap.is_within_tolerance, gap.followup_pending) == (False, False)
+
+    def test_rejects_bad_payload(self, inspection, user):
+        with pytest.raises(ValidationError) as exc:
+            evaluate_checkpoints(inspection, {'TQ': 'tight', 'XX': '1', 'VIS': 'Clean'}, user)
+        assert exc.value.messages == ["Torque: 'tight' is not a number.", 'Unknown checkpoint: XX.']
+        assert not CheckpointResult.objects.exists()
+
+    def test_records_only_on_a_step_in_progress(self, inspection, user):
+        evaluate_checkpoints(inspection, {'TQ': '45'}, user)
+        complete_step(inspection.execution, inspection, user)
+
+        with pytest.raises(ValidationError, match='on a step in progress'):
+            evaluate_checkpoints(inspection, {'GAP': '0.7'}, user)
+        assert CheckpointResult.objects.count() == 1
+
+    def test_critical_checkpoints_are_required_to_complete(self, inspection, user):
+        evaluate_checkpoints(inspection, {'GAP': '0.1'}, user)
+
+        with pytest.raises(ValidationError, match='Critical checkpoints not measured: Torque'):
+            complete_step(inspection.execution, inspection, user)
+        inspection.refresh_from_db()
+        assert inspection.status == 'IN_PROGRESS'
+
+    def test_remeasure_replaces_and_na(self, inspection, user):
+        evaluate_checkpoints(inspection, {'TQ': '45', 'GAP': 'NA'}, user)
+        evaluate_checkpoints(inspection, {'GAP': '0.2'}, user)
+
+        assert dict(CheckpointResult.objects.values_list('checkpoint__checkpoint_code', 'result')) == {
+            'TQ': 'PASS', 'GAP': 'PASS',
+        }
+
+
+class TestFollowups:
+    """Tests for NCRs and notifications raised from failed checkpoints."""
+
+    def test_raises_ncr_and_notifications(self, inspection, user):
+        evaluate_checkpoints(inspection, {'TQ': '52', 'VIS': 'dirty'}, user)
+        torque = CheckpointResult.objects.get(checkpoint__checkpoint_code='TQ')
+        assert torque.followup_pending and torque.ncr is None
+
+        assert process_followups() == (1, 1, 1)
+        assert process_followups() == (0, 0, 0)
+
+        torque.refresh_from_db()
+        ncr = torque.ncr
+        assert not torque.followup_pending
+        assert (ncr.severity, ncr.work_order, ncr.detected_by) == (
+            NCR.Severity.CRITICAL, inspection.execution.work_order, user,
+        )
+        assert 'Measured 52.0000, tolerance 40.0000 to 50.0000 Nm.' in ncr.description
+        notification = Notification.objects.get()
+        assert (notification.recipient, notification.entity_id) == (user, torque.pk)
+        assert ncr.ncr_number in notification.message
+
+    def test_remeasured_failure_keeps_its_ncr(self, inspection, user):
+        evaluate_checkpoints(inspection, {'TQ': '52'}, user)
+        process_followups()
+        torque = CheckpointResult.objects.get()
+
+        evaluate_checkpoints(inspection, {'TQ': '53'}, user)
+
+        remeasured = CheckpointResult.objects.get()
+        assert (remeasured.pk, remeasured.ncr_id, remeasured.measured_value) == (torque.pk, torque.ncr_id, Decimal('53'))
+        assert not remeasured.followup_pending
+        assert process_followups() == (0, 0, 0)
+        assert NCR.objects.count() == 1
+
+    def test_view_and_worker(self, client, inspection, user):
+        client.force_login(user)
+        url = reverse('execution:step_checkpoints', args=[inspection.execution_id, inspection.pk])
+        checkpoints = {c.checkpoint_code: c.pk for c in StepCheckpoint.objects.all()}
+
+        client.post(url, {f"checkpoint_{checkpoints['TQ']}": '39', f"checkpoint_{checkpoints['GAP']}": ''})
+        out = StringIO()
+        call_command('process_checkpoint_followups', '--once', stdout=out)
+
+        assert CheckpointResult.objects.get().result == 'FAIL'
+        assert 'Processed 1 failed checkpoint(s): 1 NCR(s), 1 notification(s)' in out.getvalue()
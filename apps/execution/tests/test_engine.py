@@ -0,0 +1,90 @@
+"""
+Tests for the procedure execution engine.
+"""
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from apps.execution.engine import apply_branch, complete_step, skip_step, start_execution
+from apps.execution.models import ProcedureExecution, StepExecution
+from apps.procedures.models import StepBranch
+
+
+def steps_of(execution):
+    return list(execution.step_executions.order_by('position').select_related('step'))
+
+
+class TestExecutionEngine:
+    """Tests for starting and advancing executions."""
+
+    def test_start_bulk_creates_steps(self, engine_procedure, engine_work_order, user, django_assert_num_queries):
+        # steps, savepoint, execution, step executions, release
+        with django_assert_num_queries(5):
+            execution = start_execution(engine_procedure, engine_work_order, user)
+
+        steps = steps_of(execution)
+        assert [s.step.step_number for s in steps] == [10, 20, 30, 40]
+        assert [s.position for s in steps] == [0, 1, 2, 3]
+        assert [s.status for s in steps] == ['IN_PROGRESS', 'PENDING', 'PENDING', 'PENDING']
+        assert (execution.total_steps, execution.current_position) == (4, 0)
+        assert execution.current_step == steps[0].step
+        assert execution.procedure_version == 'B'
+
+    def test_advance_counts_and_completes(self, engine_procedure, engine_work_order, user, django_assert_num_queries):
+        execution = start_execution(engine_procedure, engine_work_order, user)
+        first, second, third, fourth = steps_of(execution)
+
+        # critical checkpoints, savepoint, lock, finish step, next step, start it, execution, release
+        with django_assert_num_queries(8):
+            execution = complete_step(execution, first, user, notes='ok')
+        assert (execution.completed_steps, execution.progress_percent) == (1, 25)
+        assert (execution.current_step, execution.current_position) == (second.step, 1)
+
+        execution = skip_step(execution, second, user, reason='Not fitted')
+        assert (execution.skipped_steps, execution.progress_percent, execution.current_position) == (1, 25, 2)
+        with pytest.raises(ValidationError):
+            skip_step(execution, third, user)
+        with pytest.raises(ValidationError):
+            complete_step(execution, first, user)
+
+        # Finishing a later step leaves the cursor where it is
+        execution = complete_step(execution, fourth, user)
+        assert (execution.current_position, execution.status) == (2, ProcedureExecution.Status.IN_PROGRESS)
+        execution = complete_step(execution, third, user, result='FAIL')
+
+        execution.refresh_from_db()
+        assert execution.status == ProcedureExecution.Status.COMPLETED
+        assert (execution.completed_steps, execution.progress_percent) == (3, 75)
+        assert execution.completed_by == user and execution.current_step is None
+        assert StepExecution.objects.get(pk=third.pk).result == 'FAIL'
+
+    def test_branch_actions(self, engine_procedure, engine_work_order, user):
+        execution = start_execution(engine_procedure, engine_work_order, user)
+        first, second, third, fourth = steps_of(execution)
+        execution = complete_step(execution, first, user)
+
+        execution = apply_branch(execution, first, StepBranch.Action.SKIP_STEP, None, user, 'Not needed')
+        assert (execution.skipped_steps, execution.current_position) == (1, 2)
+        assert StepExecution.objects.get(pk=second.pk).skip_reason == 'Not needed'
+
+        assert apply_branch(execution, first, StepBranch.Action.GOTO_STEP, second.step_id, user) is None
+        execution = apply_branch(execution, first, StepBranch.Action.GOTO_STEP, fourth.step_id, user)
+        assert (execution.skipped_steps, execution.current_position) == (2, 3)
+
+        execution = apply_branch(execution, first, StepBranch.Action.STOP, None, user, 'Crack found')
+        assert (execution.status, execution.result_summary) == (ProcedureExecution.Status.FAILED, 'Crack found')
+        assert apply_branch(execution, first, StepBranch.Action.COMPLETE, None, user) is None
+
+    def test_views_use_engine(self, client, engine_procedure, engine_work_order, user):
+        client.force_login(user)
+        response = client.post(reverse('execution:start', args=[engine_work_order.pk, engine_procedure.pk]))
+        execution = ProcedureExecution.objects.get()
+        assert response.url == reverse('execution:detail', args=[execution.pk])
+
+        first = steps_of(execution)[0]
+        client.post(reverse('execution:step_complete', args=[execution.pk, first.pk]), {'result': 'PASS'})
+        client.post(reverse('execution:step_skip', args=[execution.pk, first.pk]))
+
+        execution.refresh_from_db()
+        assert (execution.completed_steps, execution.skipped_steps, execution.current_position) == (1, 0, 1)
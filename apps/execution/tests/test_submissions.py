@@ -0,0 +1,122 @@
+"""
+Tests for the bulk form submission writer.
+"""
+
+import pytest
+from decimal import Decimal
+from django.contrib.messages import get_messages
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, QueryDict
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from apps.execution.engine import start_execution
+from apps.execution.models import FormFieldValue, FormSubmission
+from apps.execution.submissions import field_history, snapshot_value, submit_form
+from apps.execution.views import ExecutionDetailView
+from apps.forms_engine.models import FieldType, FormField, FormSection, FormTemplate
+from apps.forms_engine.schema import get_schema
+
+
+@pytest.fixture
+def form_step(engine_procedure, engine_work_order, user):
+    """Started execution whose first step (10) carries a wear inspection form."""
+    template = FormTemplate.objects.create(code='WEAR-01', name='Wear Check', version='2.0', created_by=user)
+    section = FormSection.objects.create(template=template, name='Wear', sequence=1)
+    number = FieldType.objects.create(code='NUMBER', name='Number', html_input_type='number')
+    checkbox = FieldType.objects.create(code='CHECKBOX', name='Checkbox', html_input_type='checkbox')
+    multi = FieldType.objects.create(code='MULTISELECT', name='Multi', html_input_type='select', has_options=True)
+    FormField.objects.create(
+        section=section, field_type=number, name='wear', label='Wear', sequence=1, is_required=True,
+        max_value=Decimal('8'),
+    )
+    FormField.objects.create(section=section, field_type=checkbox, name='cleaned', label='Cleaned', sequence=2)
+    FormField.objects.create(
+        section=section, field_type=multi, name='zones', label='Zones', sequence=3, options=['NOSE', 'GAUGE', 'CONE'],
+    )
+    step = engine_procedure.steps.get(step_number=10)
+    step.form_template = template
+    step.save()
+    execution = start_execution(engine_procedure, engine_work_order, user)
+    return execution.step_executions.select_related('step__form_template').get(step=step)
+
+
+class TestSubmitForm:
+    """Tests for submit_form and the data snapshot."""
+
+    def test_one_transaction_and_snapshot(self, form_step, user, django_assert_num_queries):
+        data = QueryDict('wear=2.50&cleaned=on&zones=NOSE&zones=CONE')
+        submit_form(form_step, data, user)  # compiles the schema
+
+        # savepoint, submission, field values, release
+        with django_assert_num_queries(4):
+            submission = submit_form(form_step, data, user)
+
+        assert (submission.is_valid, submission.is_complete, submission.template_version) == (True, True, '2.0')
+        submission.refresh_from_db()
+        assert submission.data == {'wear': 2.5, 'cleaned': True, 'zones': ['NOSE', 'CONE']}
+        assert dict(submission.field_values.values_list('field__name', 'value')) == {
+            'wear': '2.50', 'cleaned': 'true', 'zones': '["NOSE", "CONE"]',
+        }
+
+    def test_invalid_payload(self, form_step, user):
+        with pytest.raises(ValidationError) as exc:
+            submit_form(form_step, {'wear': '9', 'zones': 'TOOTH'}, user)
+        assert exc.value.message_dict == {
+            'wear': ['Enter a value of at most 8.0000.'], 'zones': ["'TOOTH' is not one of the available options."],
+        }
+        assert not FormSubmission.objects.exists()
+
+        submission = submit_form(form_step, {'wear': '9', 'cleaned': ''}, user, allow_invalid=True)
+        assert (submission.is_valid, submission.data) == (False, {'cleaned': False})
+        assert submission.field_values.get(field__name='wear').validation_message == 'Enter a value of at most 8.0000.'
+
+    def test_field_history_and_admin_edits(self, form_step, user):
+        first = submit_form(form_step, {'wear': '1'}, user)
+        second = submit_form(form_step, {'wear': '3.25'}, user)
+        submit_form(form_step, {'wear': '0', 'cleaned': 'true'}, user, template=FormTemplate.objects.get())
+
+        assert [value for _, _, value in field_history(form_step.step.form_template, 'wear')] == [0, 3.25, 1]
+
+        # Single row edits keep the snapshot in sync
+        value = FormFieldValue.objects.get(submission=first, field__name='wear')
+        value.value = '4'
+        value.save()
+        value.delete()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.data, second.data) == ({'cleaned': False}, {'wear': 3.25, 'cleaned': False})
+
+    def test_decimals_a_float_cannot_hold_stay_exact(self):
+        assert snapshot_value(Decimal('2.50')) == 2.5
+        assert snapshot_value(Decimal('0.12345678901234567891')) == '0.12345678901234567891'
+
+    def test_step_form_partial(self, form_step):
+        schema = get_schema(form_step.step.form_template)
+        submitted = QueryDict('wear=9.5&zones=CONE')
+        html = render_to_string('execution/partials/step_form.html', {
+            'execution': form_step.execution, 'step_exec': form_step, 'schema': schema,
+            'sections': ExecutionDetailView.form_sections(schema, submitted, {'wear': ['Too high.']}),
+        })
+        assert f'action="{reverse("execution:step_form", args=[form_step.execution_id, form_step.pk])}"' in html
+        assert 'name="wear"' in html and 'value="9.5"' in html
+        assert 'Too high.' in html
+        assert '<option value="CONE" selected>' in html
+
+    def test_view(self, client, form_step, user):
+        from unittest import mock
+
+        client.force_login(user)
+        url = reverse('execution:step_form', args=[form_step.execution_id, form_step.pk])
+
+        with mock.patch.object(ExecutionDetailView, 'render_to_response', return_value=HttpResponse()) as render:
+            response = client.post(url, {'wear': 'x', 'cleaned': 'true'})
+        assert [str(message) for message in get_messages(response.wsgi_request)] == ['1 field(s) failed validation.']
+        rows = render.call_args.args[0]['step_executions'][0].form_sections[0]['fields']
+        assert [(row['field'].name, row['value'], row['errors']) for row in rows] == [
+            ('wear', 'x', ['Enter a number.']), ('cleaned', 'true', []), ('zones', [], []),
+        ]
+        assert not FormSubmission.objects.exists()
+        client.post(url, {'wear': '5'})
+
+        assert FormSubmission.objects.get().data == {'wear': 5, 'cleaned': False}
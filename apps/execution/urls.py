@@ -10,6 +10,12 @@ urlpatterns = [
     path("start/<int:wo_pk>/<int:procedure_pk>/", views.ExecutionStartView.as_view(), name="start"),
     path("<int:execution_pk>/steps/<int:step_pk>/complete/", views.StepCompleteView.as_view(), name="step_complete"),
     path("<int:execution_pk>/steps/<int:step_pk>/skip/", views.StepSkipView.as_view(), name="step_skip"),
+    path(
+        "<int:execution_pk>/steps/<int:step_pk>/checkpoints/",
+        views.StepCheckpointsView.as_view(),
+        name="step_checkpoints",
+    ),
+    path("<int:execution_pk>/steps/<int:step_pk>/form/", views.StepFormSubmitView.as_view(), name="step_form"),
     path("<int:pk>/pause/", views.ExecutionPauseView.as_view(), name="pause"),
     path("<int:pk>/resume/", views.ExecutionResumeView.as_view(), name="resume"),
 ]
@@ -7,15 +7,22 @@ Views for Procedure Execution management.
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views.generic import DetailView, ListView, View
 
+from apps.forms_engine.schema import get_schema
 from apps.procedures.models import Procedure
 from apps.workorders.models import WorkOrder
 
+from .branching import follow_step
+from .checkpoints import evaluate_checkpoints
+from .engine import complete_step, skip_step, start_execution
+from .submissions import submit_form
 from .models import ProcedureExecution, StepExecution
 
 
@@ -65,19 +72,47 @@ class ExecutionDetailView(LoginRequiredMixin, DetailView):
             "procedure", "work_order", "started_by", "completed_by", "current_step"
         )
 
-    def get_context_data(self, **kwargs):
+    def get_context_data(self, submitted_step=None, submitted=None, form_errors=None, **kwargs):
         context = super().get_context_data(**kwargs)
         context["page_title"] = f"Execution - {self.object.work_order.wo_number}"
-        context["step_executions"] = self.object.step_executions.select_related(
-            "step", "step__step_type", "executed_by"
-        ).order_by("step__step_number")
+        step_executions = list(
+            self.object.step_executions.select_related("step", "step__step_type", "step__form_template", "executed_by")
+            .prefetch_related("step__checkpoints")
+            .order_by("position")
+        )
+        # The active step's form is rendered from its compiled schema, refilled after a rejected submission
+        for step_execution in step_executions:
+            step_execution.form_schema = step_execution.form_sections = None
+            if step_execution.status == StepExecution.Status.IN_PROGRESS and step_execution.step.form_template_id:
+                step_execution.form_schema = get_schema(step_execution.step.form_template)
+                rejected = step_execution.pk == submitted_step
+                step_execution.form_sections = self.form_sections(
+                    step_execution.form_schema, submitted if rejected else None, form_errors if rejected else None
+                )
+        context["step_executions"] = step_executions
+        context["progress"] = self.object.progress_percent
+        return context
 
-        # Calculate progress
-        total = context["step_executions"].count()
-        completed = context["step_executions"].filter(status="COMPLETED").count()
-        context["progress"] = int((completed / total) * 100) if total > 0 else 0
+    @staticmethod
+    def form_sections(schema, submitted=None, errors=None):
+        """Sections of a step form with each field's value (posted or default) and errors."""
+        errors = errors or {}
 
-        return context
+        def value(field):
+            if submitted is None:
+                return [] if field.multiple else field.default_value
+            return submitted.getlist(field.name) if field.multiple else submitted.get(field.name, "")
+
+        return [
+            {
+                "section": section,
+                "fields": [
+                    {"field": field, "value": value(field), "errors": errors.get(field.name, [])}
+                    for field in section.fields
+                ],
+            }
+            for section in schema.sections
+        ]
 
 
 class ExecutionStartView(LoginRequiredMixin, View):
@@ -97,34 +132,8 @@ class ExecutionStartView(LoginRequiredMixin, View):
             messages.warning(request, "This work order already has an active procedure execution.")
             return redirect("execution:detail", pk=existing.pk)
 
-        # Create execution
-        execution = ProcedureExecution.objects.create(
-            procedure=procedure,
-            work_order=work_order,
-            procedure_version=procedure.revision,
-            status=ProcedureExecution.Status.IN_PROGRESS,
-            started_at=timezone.now(),
-            started_by=request.user,
-        )
-
-        # Create step executions for all steps
-        first_step = None
-        for step in procedure.steps.order_by("step_number"):
-            step_exec = StepExecution.objects.create(
-                execution=execution,
-                step=step,
-                status=StepExecution.Status.PENDING,
-            )
-            if first_step is None:
-                first_step = step_exec
-
-        # Set first step as current
-        if first_step:
-            execution.current_step = first_step.step
-            first_step.status = StepExecution.Status.IN_PROGRESS
-            first_step.started_at = timezone.now()
-            first_step.save()
-            execution.save()
+        # Create execution with all step executions, first step started
+        execution = start_execution(procedure, work_order, request.user)
 
         messages.success(request, f"Started execution of {procedure.code}.")
         return redirect("execution:detail", pk=execution.pk)
@@ -135,79 +144,100 @@ class StepCompleteView(LoginRequiredMixin, View):
 
     def post(self, request, execution_pk, step_pk):
         execution = get_object_or_404(ProcedureExecution, pk=execution_pk)
-        step_execution = get_object_or_404(StepExecution, pk=step_pk, execution=execution)
+        step_execution = get_object_or_404(StepExecution.objects.select_related("step"), pk=step_pk, execution=execution)
 
         result = request.POST.get("result", "PASS")
         notes = request.POST.get("notes", "")
 
-        # Complete the step
-        step_execution.status = StepExecution.Status.COMPLETED
-        step_execution.result = result
-        step_execution.notes = notes
-        step_execution.completed_at = timezone.now()
-        step_execution.executed_by = request.user
-        step_execution.save()
-
-        # Find next step
-        next_step = execution.step_executions.filter(
-            step__step_number__gt=step_execution.step.step_number,
-            status=StepExecution.Status.PENDING
-        ).order_by("step__step_number").first()
-
-        if next_step:
-            # Move to next step
-            next_step.status = StepExecution.Status.IN_PROGRESS
-            next_step.started_at = timezone.now()
-            next_step.save()
-            execution.current_step = next_step.step
-        else:
-            # All steps completed
-            execution.status = ProcedureExecution.Status.COMPLETED
-            execution.completed_at = timezone.now()
-            execution.completed_by = request.user
-            execution.current_step = None
-
-        # Update progress
-        total = execution.step_executions.count()
-        completed = execution.step_executions.filter(status=StepExecution.Status.COMPLETED).count()
-        execution.progress_percent = int((completed / total) * 100) if total > 0 else 0
-        execution.save()
+        # Complete the step, then evaluate its branch rules and follow the routing
+        try:
+            with transaction.atomic():
+                complete_step(execution, step_execution, request.user, result=result, notes=notes)
+                step_execution.execution = execution
+                decision = follow_step(step_execution, request.user)
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("execution:detail", pk=execution_pk)
 
         messages.success(request, f"Step {step_execution.step.step_number} completed.")
+        if decision.branch and decision.branch.message:
+            messages.info(request, decision.branch.message)
         return redirect("execution:detail", pk=execution_pk)
 
 
-class StepSkipView(LoginRequiredMixin, View):
-    """Skip a step in an execution."""
+class StepCheckpointsView(LoginRequiredMixin, View):
+    """Record all checkpoint measurements of a step."""
 
     def post(self, request, execution_pk, step_pk):
         execution = get_object_or_404(ProcedureExecution, pk=execution_pk)
         step_execution = get_object_or_404(StepExecution, pk=step_pk, execution=execution)
 
-        if not step_execution.step.can_skip:
-            messages.error(request, "This step cannot be skipped.")
+        # checkpoint_<id> fields carry the values; blank fields are left unmeasured
+        measurements = {}
+        for key, value in request.POST.items():
+            if key.startswith("checkpoint_") and value.strip():
+                checkpoint_id = key.removeprefix("checkpoint_")
+                measurements[checkpoint_id] = {"value": value, "notes": request.POST.get(f"notes_{checkpoint_id}", "")}
+
+        try:
+            evaluation = evaluate_checkpoints(step_execution, measurements, request.user)
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
             return redirect("execution:detail", pk=execution_pk)
 
+        if evaluation.failed:
+            names = ", ".join(result.checkpoint.name for result in evaluation.failed)
+            messages.warning(request, f"{len(evaluation.failed)} checkpoint(s) failed: {names}.")
+            if evaluation.stop:
+                messages.error(request, "A failed checkpoint requires the procedure to stop.")
+        else:
+            messages.success(request, f"{len(evaluation.results)} checkpoint(s) recorded.")
+        return redirect("execution:detail", pk=execution_pk)
+
+
+class StepFormSubmitView(LoginRequiredMixin, View):
+    """Submit the form attached to a step."""
+
+    def post(self, request, execution_pk, step_pk):
+        execution = get_object_or_404(ProcedureExecution, pk=execution_pk)
+        step_execution = get_object_or_404(
+            StepExecution.objects.select_related("step__form_template"), pk=step_pk, execution=execution
+        )
+
+        try:
+            submission = submit_form(step_execution, request.POST, request.user, files=request.FILES)
+        except ValidationError as e:
+            if not hasattr(e, "error_dict"):
+                messages.error(request, " ".join(e.messages))
+                return redirect("execution:detail", pk=execution_pk)
+            # Show the detail page again with the posted values and each field's errors
+            messages.error(request, f"{len(e.message_dict)} field(s) failed validation.")
+            detail = ExecutionDetailView()
+            detail.setup(request, pk=execution_pk)
+            detail.object = detail.get_object()
+            return detail.render_to_response(detail.get_context_data(
+                object=detail.object, submitted_step=step_execution.pk, submitted=request.POST,
+                form_errors=e.message_dict,
+            ))
+
+        messages.success(request, f"{submission.form_template.name} submitted.")
+        return redirect("execution:detail", pk=execution_pk)
+
+
+class StepSkipView(LoginRequiredMixin, View):
+    """Skip a step in an execution."""
+
+    def post(self, request, execution_pk, step_pk):
+        execution = get_object_or_404(ProcedureExecution, pk=execution_pk)
+        step_execution = get_object_or_404(StepExecution.objects.select_related("step"), pk=step_pk, execution=execution)
+
         reason = request.POST.get("reason", "")
 
-        step_execution.status = StepExecution.Status.SKIPPED
-        step_execution.skip_reason = reason
-        step_execution.completed_at = timezone.now()
-        step_execution.executed_by = request.user
-        step_execution.save()
-
-        # Move to next step
-        next_step = execution.step_executions.filter(
-            step__step_number__gt=step_execution.step.step_number,
-            status=StepExecution.Status.PENDING
-        ).order_by("step__step_number").first()
-
-        if next_step:
-            next_step.status = StepExecution.Status.IN_PROGRESS
-            next_step.started_at = timezone.now()
-            next_step.save()
-            execution.current_step = next_step.step
-            execution.save()
+        try:
+            skip_step(execution, step_execution, request.user, reason=reason)
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("execution:detail", pk=execution_pk)
 
         messages.info(request, f"Step {step_execution.step.step_number} skipped.")
         return redirect("execution:detail", pk=execution_pk)
@@ -5,3 +5,7 @@ class FormsEngineConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.forms_engine"
     verbose_name = "Forms Engine"
+
+    def ready(self):
+        # Import signal handlers
+        from . import signals  # noqa: F401
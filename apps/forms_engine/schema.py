@@ -0,0 +1,432 @@
+"""
+ARDT FMS - Compiled Form Schemas
+Version: 5.4
+
+Flattens a FormTemplate (sections, fields and their field types) into an
+immutable FormSchema for rendering and validating submissions without
+per-field queries.
+
+Compiling costs two queries (sections, fields with their types). Regex
+patterns are compiled once, options are normalised to (value, label)
+pairs, each field gets a typed parser for its field type and the
+depends_on_field links become a dependency graph evaluated in order.
+Schemas are kept per process under a per-template version; template,
+section, field, field type and FormTemplateVersion changes bump it (see
+apps.common.compiled and apps.forms_engine.signals):
+
+    schema = get_schema(template)
+    for section in schema.sections: ...
+    validation = schema.validate(request.POST)
+    validation.is_valid, validation.cleaned, validation.errors
+
+Fields are addressed by name. A field whose controlling field does not
+hold its depends_on_value (or any value, when depends_on_value is blank)
+is inactive: it is neither required nor validated and is left out of the
+cleaned data.
+"""
+
+import logging
+import re
+from collections import namedtuple
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import Callable
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from apps.common.compiled import CompiledCache, invalidate
+
+from .models import FormField, FormSection, FormTemplate
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "forms_engine:schema:{template_id}"
+FIELD_TYPES_CACHE_KEY = "forms_engine:field_types"
+MAX_COMPILED_TEMPLATES = 256
+
+TRUE_WORDS = frozenset({"true", "on", "yes", "y", "1", "checked"})
+
+# Compiled schemas of this process, keyed by template id
+_compiled = CompiledCache(max_entries=MAX_COMPILED_TEMPLATES)
+
+Option = namedtuple("Option", ["value", "label"])
+
+
+@dataclass(frozen=True)
+class CompiledFieldType:
+    code: str
+    html_input_type: str
+    has_options: bool
+
+
+@dataclass(frozen=True)
+class CompiledField:
+    pk: int
+    name: str
+    label: str
+    field_type: CompiledFieldType
+    placeholder: str
+    help_text: str
+    is_required: bool
+    min_length: int
+    max_length: int
+    min_value: Decimal
+    max_value: Decimal
+    regex: re.Pattern
+    validation_message: str
+    options: tuple
+    default_value: str
+    width: str
+    is_readonly: bool
+    is_hidden: bool
+    depends_on: str
+    depends_on_value: str
+    multiple: bool
+    parse: Callable
+
+    @property
+    def option_values(self):
+        return {option.value for option in self.options}
+
+
+@dataclass(frozen=True)
+class CompiledSection:
+    pk: int
+    name: str
+    description: str
+    is_collapsible: bool
+    is_collapsed_default: bool
+    fields: tuple
+
+
+@dataclass(frozen=True)
+class FormSchema:
+    template_id: int
+    code: str
+    name: str
+    description: str
+    version: str
+    sections: tuple
+    fields: MappingProxyType
+    dependents: MappingProxyType
+    order: tuple
+
+    def active_fields(self, data):
+        """Names of the fields shown for raw submitted data."""
+        active = set()
+        for name in self.order:
+            compiled = self.fields[name]
+            if not compiled.depends_on:
+                active.add(name)
+            elif compiled.depends_on in active and _controls(self.fields[compiled.depends_on], data, compiled):
+                active.add(name)
+        return active
+
+    def validate(self, data):
+        """Validate a submission (dict or QueryDict keyed by field name); returns a FormValidation."""
+        validation = FormValidation()
+        active = self.active_fields(data)
+        for name in self.order:
+            if name not in active:
+                continue
+            compiled = self.fields[name]
+            try:
+                validation.cleaned[name] = clean_value(compiled, _raw(compiled, data))
+            except ValidationError as e:
+                validation.errors[name] = e.messages
+        return validation
+
+
+@dataclass
+class FormValidation:
+    cleaned: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def is_valid(self):
+        return not self.errors
+
+
+def _raw(compiled, data):
+    if compiled.multiple and hasattr(data, "getlist"):
+        return data.getlist(compiled.name)
+    return data.get(compiled.name)
+
+
+def _is_empty(value):
+    return value is None or value == [] or (isinstance(value, str) and not value.strip())
+
+
+def _controls(controller, data, dependent):
+    """Whether a controlling field's raw value shows a dependent field."""
+    value = _raw(controller, data)
+    if _is_empty(value):
+        return False
+    expected = dependent.depends_on_value.strip().casefold()
+    checkbox = controller.parse is parse_checkbox
+    if not expected:
+        return not checkbox or parse_checkbox(value)
+    values = value if isinstance(value, (list, tuple)) else [value]
+    if checkbox:
+        values = ["true" if str(v).strip().casefold() in TRUE_WORDS else "false" for v in values]
+        expected = "true" if expected in TRUE_WORDS else "false"
+    return any(str(v).strip().casefold() == expected for v in values)
+
+
+# Typed parsers: raw text -> Python value, raising ValidationError
+
+def parse_text(value):
+    return str(value).strip()
+
+
+def parse_number(value):
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValidationError("Enter a number.") from None
+    if not number.is_finite():
+        raise ValidationError("Enter a number.")
+    return number
+
+
+def _iso_parser(kind, message):
+    def parse(value):
+        if isinstance(value, kind):
+            return value
+        try:
+            return kind.fromisoformat(str(value).strip())
+        except ValueError:
+            raise ValidationError(message) from None
+    return parse
+
+
+parse_date = _iso_parser(date, "Enter a valid date.")
+parse_datetime = _iso_parser(datetime, "Enter a valid date and time.")
+parse_time = _iso_parser(time, "Enter a valid time.")
+
+
+def parse_checkbox(value):
+    return value is True or str(value).strip().casefold() in TRUE_WORDS
+
+
+def parse_email(value):
+    value = str(value).strip()
+    validate_email(value)
+    return value
+
+
+# html_input_type / field type code -> parser
+PARSERS = {
+    "number": parse_number,
+    "decimal": parse_number,
+    "integer": parse_number,
+    "range": parse_number,
+    "date": parse_date,
+    "datetime": parse_datetime,
+    "datetime-local": parse_datetime,
+    "time": parse_time,
+    "checkbox": parse_checkbox,
+    "boolean": parse_checkbox,
+    "email": parse_email,
+}
+
+
+def parser_for(field_type):
+    return PARSERS.get(field_type.html_input_type.lower()) or PARSERS.get(field_type.code.lower()) or parse_text
+
+
+def clean_value(compiled, value):
+    """Typed value of one field, raising ValidationError with the field's messages."""
+    if compiled.parse is parse_checkbox and not compiled.multiple:
+        checked = not _is_empty(value) and parse_checkbox(value)
+        if compiled.is_required and not checked:
+            raise ValidationError("This field is required.")
+        return checked
+    if _is_empty(value):
+        if compiled.is_required:
+            raise ValidationError("This field is required.")
+        return [] if compiled.multiple else None
+
+    if compiled.multiple:
+        values = [v for v in (value if isinstance(value, (list, tuple)) else [value]) if not _is_empty(v)]
+        return [_clean_one(compiled, v) for v in values]
+    return _clean_one(compiled, value)
+
+
+def _clean_one(compiled, value):
+    text = str(value).strip()
+    if compiled.options and text not in compiled.option_values:
+        raise ValidationError(f"'{text}' is not one of the available options.")
+    if compiled.min_length is not None and len(text) < compiled.min_length:
+        raise ValidationError(f"Enter at least {compiled.min_length} characters.")
+    if compiled.max_length is not None and len(text) > compiled.max_length:
+        raise ValidationError(f"Enter at most {compiled.max_length} characters.")
+    if compiled.regex is not None and not compiled.regex.fullmatch(text):
+        raise ValidationError(compiled.validation_message or "Enter a valid value.")
+
+    cleaned = compiled.parse(value)
+    if compiled.min_value is not None and isinstance(cleaned, Decimal) and cleaned < compiled.min_value:
+        raise ValidationError(compiled.validation_message or f"Enter a value of at least {compiled.min_value}.")
+    if compiled.max_value is not None and isinstance(cleaned, Decimal) and cleaned > compiled.max_value:
+        raise ValidationError(compiled.validation_message or f"Enter a value of at most {compiled.max_value}.")
+    return cleaned
+
+
+def _options(raw):
+    """(value, label) pairs from [{"value", "label"}, ...] or a plain list of values."""
+    options = []
+    for option in raw or ():
+        if isinstance(option, dict):
+            value = str(option.get("value", option.get("label", "")))
+            options.append(Option(value, str(option.get("label", value))))
+        else:
+            options.append(Option(str(option), str(option)))
+    return tuple(options)
+
+
+def _regex(form_field):
+    if not form_field.regex_pattern:
+        return None
+    try:
+        return re.compile(form_field.regex_pattern)
+    except re.error as exc:
+        logger.warning("Form field %s has an invalid regex %r (%s); not enforced", form_field.pk,
+                       form_field.regex_pattern, exc)
+        return None
+
+
+def compile_field(form_field, field_type, depends_on=""):
+    """CompiledField for a FormField (its field_type passed as a CompiledFieldType)."""
+    html_type = field_type.html_input_type.lower()
+    return CompiledField(
+        pk=form_field.pk,
+        name=form_field.name,
+        label=form_field.label,
+        field_type=field_type,
+        placeholder=form_field.placeholder,
+        help_text=form_field.help_text,
+        is_required=form_field.is_required,
+        min_length=form_field.min_length,
+        max_length=form_field.max_length,
+        min_value=form_field.min_value,
+        max_value=form_field.max_value,
+        regex=_regex(form_field),
+        validation_message=form_field.validation_message,
+        options=_options(form_field.options),
+        default_value=form_field.default_value,
+        width=form_field.width,
+        is_readonly=form_field.is_readonly,
+        is_hidden=form_field.is_hidden,
+        depends_on=depends_on,
+        depends_on_value=form_field.depends_on_value,
+        multiple="multi" in field_type.code.lower() or html_type in ("select-multiple", "checkbox-group"),
+        parse=parser_for(field_type),
+    )
+
+
+def _dependency_order(fields):
+    """Field names with controlling fields first; dependencies in a cycle are dropped."""
+    pending = {name: compiled.depends_on for name, compiled in fields.items()}
+    order = []
+    while pending:
+        ready = [name for name, parent in pending.items() if not parent or parent not in pending]
+        if not ready:
+            name = next(iter(pending))
+            logger.warning("Form field %s is in a dependency cycle; shown unconditionally", name)
+            fields[name] = replace(fields[name], depends_on="")
+            pending[name] = ""
+            continue
+        for name in ready:
+            order.append(name)
+            del pending[name]
+    return tuple(order)
+
+
+def compile_schema(template):
+    """Compile a FormTemplate into a FormSchema (two queries)."""
+    sections = list(FormSection.objects.filter(template=template).order_by("sequence", "pk"))
+    form_fields = list(
+        FormField.objects.filter(section__template=template)
+        .select_related("field_type")
+        .order_by("sequence", "pk")
+    )
+    names = {f.pk: f.name for f in form_fields}
+    field_types = {}
+    fields = {}
+    for form_field in form_fields:
+        field_type = field_types.get(form_field.field_type_id)
+        if field_type is None:
+            field_type = field_types[form_field.field_type_id] = CompiledFieldType(
+                code=form_field.field_type.code,
+                html_input_type=form_field.field_type.html_input_type,
+                has_options=form_field.field_type.has_options,
+            )
+        if form_field.name in fields:
+            logger.warning("Form template %s has more than one field named %s; the first is used",
+                           template.pk, form_field.name)
+            continue
+        # A link to a field outside the template never matches; it is ignored
+        depends_on = names.get(form_field.depends_on_field_id, "") if form_field.depends_on_field_id else ""
+        fields[form_field.name] = compile_field(form_field, field_type, depends_on if depends_on != form_field.name else "")
+
+    order = _dependency_order(fields)
+    dependents = {}
+    for name in order:
+        if fields[name].depends_on:
+            dependents.setdefault(fields[name].depends_on, []).append(name)
+
+    by_section = {}
+    for form_field in form_fields:
+        compiled = fields.get(form_field.name)
+        if compiled is not None and compiled.pk == form_field.pk:
+            by_section.setdefault(form_field.section_id, []).append(compiled)
+
+    return FormSchema(
+        template_id=template.pk,
+        code=template.code,
+        name=template.name,
+        description=template.description,
+        version=template.version,
+        sections=tuple(
+            CompiledSection(
+                pk=section.pk,
+                name=section.name,
+                description=section.description,
+                is_collapsible=section.is_collapsible,
+                is_collapsed_default=section.is_collapsed_default,
+                fields=tuple(by_section.get(section.pk, ())),
+            )
+            for section in sections
+        ),
+        fields=MappingProxyType(fields),
+        dependents=MappingProxyType({name: tuple(names) for name, names in dependents.items()}),
+        order=order,
+    )
+
+
+def invalidate_schema(template_id):
+    """Make every process recompile a template's schema."""
+    invalidate(VERSION_CACHE_KEY.format(template_id=template_id))
+
+
+def invalidate_field_types():
+    """Make every process recompile all schemas (field types are shared)."""
+    invalidate(FIELD_TYPES_CACHE_KEY)
+
+
+def get_schema(template):
+    """Compiled schema of a FormTemplate (or template id), compiled at most once per version."""
+    template_id = template.pk if isinstance(template, FormTemplate) else template
+
+    def build():
+        instance = template if isinstance(template, FormTemplate) else FormTemplate.objects.get(pk=template_id)
+        return compile_schema(instance)
+
+    return _compiled.get(
+        template_id,
+        [VERSION_CACHE_KEY.format(template_id=template_id), FIELD_TYPES_CACHE_KEY],
+        build,
+    )
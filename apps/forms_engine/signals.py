@@ -0,0 +1,42 @@
+"""
+ARDT FMS - Forms Engine Signal Handlers
+Version: 5.4
+
+Keeps compiled form schemas in sync with template definitions.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FieldType, FormField, FormSection, FormTemplate, FormTemplateVersion
+from .schema import invalidate_field_types, invalidate_schema
+
+
+@receiver(post_save, sender=FormTemplate)
+@receiver(post_delete, sender=FormTemplate)
+def form_template_changed(sender, instance, **kwargs):
+    invalidate_schema(instance.pk)
+
+
+@receiver(post_save, sender=FormTemplateVersion)
+@receiver(post_delete, sender=FormTemplateVersion)
+@receiver(post_save, sender=FormSection)
+@receiver(post_delete, sender=FormSection)
+def form_section_changed(sender, instance, **kwargs):
+    """Sections and template versions belong to one template."""
+    invalidate_schema(instance.template_id)
+
+
+@receiver(post_save, sender=FormField)
+@receiver(post_delete, sender=FormField)
+def form_field_changed(sender, instance, **kwargs):
+    template_id = FormSection.objects.filter(pk=instance.section_id).values_list("template_id", flat=True).first()
+    if template_id is not None:
+        invalidate_schema(template_id)
+
+
+@receiver(post_save, sender=FieldType)
+@receiver(post_delete, sender=FieldType)
+def field_type_changed(sender, instance, **kwargs):
+    """Field types are shared by every template."""
+    invalidate_field_types()
@@ -0,0 +1,106 @@
+"""
+Forms Engine App - Compiled Schema Tests
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.urls import reverse
+
+from apps.forms_engine.models import FieldType, FormField, FormSection, FormTemplate, FormTemplateVersion
+from apps.forms_engine.schema import get_schema
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='schemauser', email='schema@example.com', password='testpass123')
+
+
+@pytest.fixture
+def inspection_form(db, user):
+    """Template with a serial (regex), a result select, a conditional number and a date."""
+    template = FormTemplate.objects.create(code='INSP-01', name='Bit Inspection', created_by=user)
+    section = FormSection.objects.create(template=template, name='Inspection', sequence=1)
+    text = FieldType.objects.create(code='TEXT', name='Text', html_input_type='text')
+    select = FieldType.objects.create(code='SELECT', name='Dropdown', html_input_type='select', has_options=True)
+    number = FieldType.objects.create(code='NUMBER', name='Number', html_input_type='number')
+    day = FieldType.objects.create(code='DATE', name='Date', html_input_type='date')
+
+    FormField.objects.create(
+        section=section, field_type=text, name='serial', label='Serial', sequence=1, is_required=True,
+        regex_pattern=r'[A-Z]{2}\d{4}', validation_message='Serial is two letters and four digits.',
+    )
+    result = FormField.objects.create(
+        section=section, field_type=select, name='result', label='Result', sequence=2, is_required=True,
+        options=[{'value': 'PASS', 'label': 'Pass'}, {'value': 'FAIL', 'label': 'Fail'}],
+    )
+    FormField.objects.create(
+        section=section, field_type=number, name='wear', label='Wear', sequence=3, is_required=True,
+        min_value=Decimal('0'), max_value=Decimal('8'), depends_on_field=result, depends_on_value='FAIL',
+    )
+    FormField.objects.create(section=section, field_type=day, name='inspected_on', label='Date', sequence=4)
+    return template
+
+
+class TestCompiledSchema:
+    """Tests for compiling and validating against form schemas."""
+
+    def test_compiles_once_per_version(self, inspection_form, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            schema = get_schema(inspection_form)
+        with django_assert_num_queries(0):
+            assert get_schema(inspection_form) is schema
+
+        assert [f.name for f in schema.sections[0].fields] == ['serial', 'result', 'wear', 'inspected_on']
+        assert schema.fields['wear'].depends_on == 'result'
+        assert schema.dependents['result'] == ('wear',)
+        assert schema.fields['result'].option_values == {'PASS', 'FAIL'}
+
+        FormTemplateVersion.objects.create(template=inspection_form, version_number=2, snapshot={})
+        assert get_schema(inspection_form) is not schema
+
+    def test_field_change_recompiles(self, inspection_form):
+        schema = get_schema(inspection_form)
+        FormField.objects.filter(name='serial').get().delete()
+        assert 'serial' not in get_schema(inspection_form.pk).fields
+        assert 'serial' in schema.fields
+
+    def test_validates_typed_values(self, inspection_form):
+        schema = get_schema(inspection_form)
+
+        validation = schema.validate({'serial': 'AB1234', 'result': 'FAIL', 'wear': '2.5', 'inspected_on': '2026-10-01'})
+        assert validation.is_valid
+        assert validation.cleaned == {
+            'serial': 'AB1234', 'result': 'FAIL', 'wear': Decimal('2.5'), 'inspected_on': date(2026, 10, 1),
+        }
+
+        # wear only applies when the result is FAIL
+        assert schema.validate({'serial': 'AB1234', 'result': 'PASS', 'wear': 'x'}).cleaned == {
+            'serial': 'AB1234', 'result': 'PASS', 'inspected_on': None,
+        }
+
+        validation = schema.validate(QueryDict('serial=ab12&result=FAIL&wear=9&inspected_on=01/10/2026'))
+        assert validation.errors == {
+            'serial': ['Serial is two letters and four digits.'],
+            'wear': ['Enter a value of at most 8.0000.'],
+            'inspected_on': ['Enter a valid date.'],
+        }
+        assert schema.validate({'result': 'MAYBE'}).errors == {
+            'serial': ['This field is required.'],
+            'result': ["'MAYBE' is not one of the available options."],
+        }
+
+    def test_preview_validates_test_submission(self, client, user, inspection_form):
+        client.force_login(user)
+        url = reverse('forms_engine:template-preview', kwargs={'pk': inspection_form.pk})
+
+        response = client.post(url, {'serial': 'bad', 'result': 'FAIL'})
+
+        assert response.status_code == 200
+        assert response.context['validation'].errors['wear'] == ['This field is required.']
+        assert 'Serial is two letters and four digits.' in response.content.decode()
+        assert 'value="bad"' in response.content.decode()
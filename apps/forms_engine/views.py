@@ -18,6 +18,7 @@ from django.views.generic import (
 
 from .models import FormTemplate, FormSection, FormField, FieldType, FormTemplateVersion
 from .forms import FormTemplateForm, FormSectionForm, FormFieldForm, FieldTypeForm
+from .schema import get_schema, invalidate_schema
 
 
 # =============================================================================
@@ -406,23 +407,53 @@ class FieldTypeDeleteView(LoginRequiredMixin, DeleteView):
 
 
 class FormPreviewView(LoginRequiredMixin, DetailView):
-    """Preview how a form template will be rendered."""
+    """Preview how a form template will be rendered; test submissions are validated, not saved."""
 
     model = FormTemplate
     template_name = "forms_engine/form_preview.html"
     context_object_name = "template"
 
-    def get_queryset(self):
-        return FormTemplate.objects.prefetch_related(
-            'sections__fields__field_type'
-        )
-
-    def get_context_data(self, **kwargs):
+    def get_context_data(self, submitted=None, validation=None, **kwargs):
         context = super().get_context_data(**kwargs)
         context["page_title"] = f"Preview: {self.object.name}"
         context["preview_mode"] = True
+        schema = get_schema(self.object)
+        errors = validation.errors if validation else {}
+        context["schema"] = schema
+        context["validation"] = validation
+        context["preview_sections"] = [
+            {
+                "section": section,
+                "fields": [
+                    {
+                        "field": field,
+                        "value": self.submitted_value(field, submitted),
+                        "errors": errors.get(field.name, []),
+                    }
+                    for field in section.fields
+                ],
+            }
+            for section in schema.sections
+        ]
         return context
 
+    @staticmethod
+    def submitted_value(field, submitted):
+        if submitted is None:
+            return [] if field.multiple else field.default_value
+        return submitted.getlist(field.name) if field.multiple else submitted.get(field.name, "")
+
+    def post(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        validation = get_schema(self.object).validate(request.POST)
+        if validation.is_valid:
+            messages.success(request, "The test submission passed validation. Nothing was saved.")
+        else:
+            messages.error(request, f"{len(validation.errors)} field(s) failed validation.")
+        return self.render_to_response(
+            self.get_context_data(object=self.object, submitted=request.POST, validation=validation)
+        )
+
 
 # =============================================================================
 # HTMX / API VIEWS
@@ -438,6 +469,7 @@ def reorder_sections_htmx(request, pk):
 
         for index, section_id in enumerate(section_ids):
             FormSection.objects.filter(pk=section_id, template=template).update(sequence=index)
+        invalidate_schema(template.pk)
 
         return JsonResponse({"success": True})
 
@@ -453,6 +485,7 @@ def reorder_fields_htmx(request, pk):
 
         for index, field_id in enumerate(field_ids):
             FormField.objects.filter(pk=field_id, section=section).update(sequence=index)
+        invalidate_schema(section.template_id)
 
         return JsonResponse({"success": True})
 
@@ -33,6 +33,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from apps.common.sequences import next_document_number
+
 
 # =============================================================================
 # WEEK 1: EMPLOYEE MANAGEMENT
@@ -455,18 +457,7 @@ class Employee(models.Model):
 
     def _generate_employee_number(self):
         """Generate unique employee number: EMP-####"""
-        last_employee = Employee.objects.order_by('-id').first()
-
-        if last_employee and last_employee.employee_number.startswith('EMP-'):
-            try:
-                last_num = int(last_employee.employee_number.split('-')[1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"EMP-{new_num:04d}"
+        return next_document_number(Employee, "employee_number", "EMP-", padding=4)
 
     # ===== PROPERTIES =====
 
@@ -734,22 +725,7 @@ class EmployeeDocument(models.Model):
     def _generate_document_number(self):
         """Generate unique document number: DOC-YYYY-######"""
         year = timezone.now().year
-        prefix = f"DOC-{year}-"
-
-        last_doc = EmployeeDocument.objects.filter(
-            document_number__startswith=prefix
-        ).order_by('-document_number').first()
-
-        if last_doc:
-            try:
-                last_num = int(last_doc.document_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:06d}"
+        return next_document_number(EmployeeDocument, "document_number", f"DOC-{year}-", padding=6)
 
     @property
     def is_expired(self):
@@ -1252,22 +1228,7 @@ class PerformanceReview(models.Model):
     def _generate_review_number(self):
         """Generate unique review number: REV-YYYY-####"""
         year = timezone.now().year
-        prefix = f"REV-{year}-"
-
-        last_review = PerformanceReview.objects.filter(
-            review_number__startswith=prefix
-        ).order_by('-review_number').first()
-
-        if last_review:
-            try:
-                last_num = int(last_review.review_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:04d}"
+        return next_document_number(PerformanceReview, "review_number", f"REV-{year}-", padding=4)
 
     @property
     def is_completed(self):
@@ -1433,22 +1394,7 @@ class Goal(models.Model):
     def _generate_goal_number(self):
         """Generate unique goal number: GOAL-YYYY-####"""
         year = timezone.now().year
-        prefix = f"GOAL-{year}-"
-
-        last_goal = Goal.objects.filter(
-            goal_number__startswith=prefix
-        ).order_by('-goal_number').first()
-
-        if last_goal:
-            try:
-                last_num = int(last_goal.goal_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:04d}"
+        return next_document_number(Goal, "goal_number", f"GOAL-{year}-", padding=4)
 
     @property
     def is_overdue(self):
@@ -1806,22 +1752,7 @@ class DisciplinaryAction(models.Model):
     def _generate_action_number(self):
         """Generate unique action number: DA-YYYY-####"""
         year = timezone.now().year
-        prefix = f"DA-{year}-"
-
-        last_action = DisciplinaryAction.objects.filter(
-            action_number__startswith=prefix
-        ).order_by('-action_number').first()
-
-        if last_action:
-            try:
-                last_num = int(last_action.action_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:04d}"
+        return next_document_number(DisciplinaryAction, "action_number", f"DA-{year}-", padding=4)
 
     @property
     def is_expired(self):
@@ -2189,22 +2120,7 @@ class TimeEntry(models.Model):
     def _generate_entry_number(self):
         """Generate unique entry number: TIME-YYYY-######"""
         year = timezone.now().year
-        prefix = f"TIME-{year}-"
-
-        last_entry = TimeEntry.objects.filter(
-            entry_number__startswith=prefix
-        ).order_by('-entry_number').first()
-
-        if last_entry:
-            try:
-                last_num = int(last_entry.entry_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:06d}"
+        return next_document_number(TimeEntry, "entry_number", f"TIME-{year}-", padding=6)
 
 
 class LeaveRequest(models.Model):
@@ -2398,22 +2314,7 @@ class LeaveRequest(models.Model):
     def _generate_request_number(self):
         """Generate unique request number: LEAVE-YYYY-####"""
         year = timezone.now().year
-        prefix = f"LEAVE-{year}-"
-
-        last_request = LeaveRequest.objects.filter(
-            request_number__startswith=prefix
-        ).order_by('-request_number').first()
-
-        if last_request:
-            try:
-                last_num = int(last_request.request_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:04d}"
+        return next_document_number(LeaveRequest, "request_number", f"LEAVE-{year}-", padding=4)
 
     def submit(self):
         """Submit leave request for approval"""
@@ -2605,22 +2506,7 @@ class PayrollPeriod(models.Model):
     def _generate_period_number(self):
         """Generate unique period number: PAY-YYYY-##"""
         year = timezone.now().year
-        prefix = f"PAY-{year}-"
-
-        last_period = PayrollPeriod.objects.filter(
-            period_number__startswith=prefix
-        ).order_by('-period_number').first()
-
-        if last_period:
-            try:
-                last_num = int(last_period.period_number.split('-')[2])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"{prefix}{new_num:02d}"
+        return next_document_number(PayrollPeriod, "period_number", f"PAY-{year}-", padding=2)
 
     @property
     def is_open(self):
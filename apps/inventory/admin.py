@@ -3,6 +3,7 @@ from django.contrib import admin
 from .models import (
     InventoryCategory,
     InventoryItem,
+    InventoryLedgerCheckpoint,
     InventoryLocation,
     InventoryStock,
     InventoryTransaction,
@@ -37,6 +38,13 @@ class InventoryStockAdmin(admin.ModelAdmin):
     search_fields = ["item__code", "item__name"]
 
 
+@admin.register(InventoryLedgerCheckpoint)
+class InventoryLedgerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ["item", "location", "lot_number", "serial_number", "quantity", "last_transaction_id", "created_at"]
+    search_fields = ["item__code", "lot_number", "serial_number"]
+    readonly_fields = ["item", "location", "lot_number", "serial_number", "quantity", "last_transaction_id", "created_at"]
+
+
 @admin.register(InventoryTransaction)
 class InventoryTransactionAdmin(admin.ModelAdmin):
     list_display = ["transaction_number", "transaction_type", "item", "quantity", "transaction_date"]
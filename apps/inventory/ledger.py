@@ -0,0 +1,229 @@
+"""
+ARDT FMS - Inventory Ledger
+Version: 5.4
+
+Balances InventoryStock against the InventoryTransaction ledger.
+
+Stock is kept per key (item, location, lot_number, serial_number). A
+transaction adds its quantity to the key of its to_location and subtracts
+it from the key of its from_location.
+
+InventoryLedgerCheckpoint stores the balance of every key up to a
+transaction id. Balances are the checkpoint plus the transactions posted
+after it, so recalculation cost depends on recent activity rather than on
+the size of the whole ledger:
+
+    take_checkpoint()                    # periodically (reconcile_inventory --checkpoint)
+    ledger_balance(key)                  # one stock row, two queries
+    recalculate_stock()                  # every stock row, one grouped aggregate
+    find_drift()                         # stock rows that disagree with the ledger
+
+A checkpoint locks the transaction table against inserts (SHARE mode on
+PostgreSQL), so every transaction below its cursor has committed and no
+later commit can land underneath it. Transactions covered by a checkpoint
+are immutable: InventoryTransaction.save()/delete() reject changes to
+them, and corrections are posted as new ADJUSTMENT transactions. History
+edited behind the model's back is only seen by a full recalculation
+(reconcile_inventory --full).
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.db.models import Max, Q, Sum
+
+from .models import InventoryLedgerCheckpoint, InventoryStock, InventoryTransaction
+
+ZERO = Decimal("0")
+
+
+class StockKey(NamedTuple):
+    item_id: int
+    location_id: int
+    lot_number: str = ""
+    serial_number: str = ""
+
+
+class StockDrift(NamedTuple):
+    key: StockKey
+    stock_id: int
+    recorded: Decimal
+    ledger: Decimal
+
+    @property
+    def difference(self):
+        return self.recorded - self.ledger
+
+
+def ledger_deltas(transactions):
+    """
+    Fold transactions into {StockKey: net quantity} with one grouped
+    aggregate over (item, from_location, to_location, lot, serial).
+    """
+    rows = (
+        transactions.order_by()
+        .values_list("item_id", "from_location_id", "to_location_id", "lot_number", "serial_number")
+        .annotate(total=Sum("quantity"))
+    )
+    deltas = defaultdict(lambda: ZERO)
+    for item_id, from_id, to_id, lot, serial, total in rows:
+        if to_id is not None:
+            deltas[StockKey(item_id, to_id, lot, serial)] += total
+        if from_id is not None:
+            deltas[StockKey(item_id, from_id, lot, serial)] -= total
+    return deltas
+
+
+def latest_checkpoint_cursor():
+    """Transaction id covered by the most recent checkpoint (0 when none exists)."""
+    return InventoryLedgerCheckpoint.objects.aggregate(cursor=Max("last_transaction_id"))["cursor"] or 0
+
+
+def checkpoint_balances():
+    """Return (cursor, {StockKey: quantity}) for the most recent checkpoint."""
+    cursor = latest_checkpoint_cursor()
+    if not cursor:
+        return 0, {}
+    rows = InventoryLedgerCheckpoint.objects.filter(last_transaction_id=cursor).values_list(
+        "item_id", "location_id", "lot_number", "serial_number", "quantity"
+    )
+    return cursor, {StockKey(*row[:4]): row[4] for row in rows}
+
+
+def ledger_balances(full=False):
+    """
+    Balance of every stock key that has ever moved.
+
+    Starts from the latest checkpoint and adds the later transactions, or
+    sums the whole ledger when `full` is True.
+    """
+    cursor, balances = (0, {}) if full else checkpoint_balances()
+    balances = defaultdict(lambda: ZERO, balances)
+    for key, delta in ledger_deltas(InventoryTransaction.objects.filter(pk__gt=cursor)).items():
+        balances[key] += delta
+    return dict(balances)
+
+
+def ledger_balance(key):
+    """Balance of a single stock key: its latest checkpoint plus later movements."""
+    checkpoint = (
+        InventoryLedgerCheckpoint.objects.filter(
+            item_id=key.item_id,
+            location_id=key.location_id,
+            lot_number=key.lot_number,
+            serial_number=key.serial_number,
+        )
+        .order_by("-last_transaction_id")
+        .values_list("quantity", "last_transaction_id")
+        .first()
+    )
+    balance, cursor = checkpoint or (ZERO, 0)
+
+    movements = InventoryTransaction.objects.filter(
+        Q(to_location_id=key.location_id) | Q(from_location_id=key.location_id),
+        item_id=key.item_id,
+        lot_number=key.lot_number,
+        serial_number=key.serial_number,
+        pk__gt=cursor,
+    ).aggregate(
+        inbound=Sum("quantity", filter=Q(to_location_id=key.location_id)),
+        outbound=Sum("quantity", filter=Q(from_location_id=key.location_id)),
+    )
+    return balance + (movements["inbound"] or ZERO) - (movements["outbound"] or ZERO)
+
+
+def _lock_transactions():
+    """
+    Wait for in-flight transaction inserts and block new ones until commit.
+
+    Sequence order is not commit order: without the lock a transaction with
+    a lower id could commit after Max(pk) is read and never be counted.
+    SQLite already serialises writers.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {InventoryTransaction._meta.db_table} IN SHARE MODE")
+
+
+@transaction.atomic
+def take_checkpoint():
+    """
+    Store the current balance of every key and return the new cursor.
+
+    The previous checkpoint set is replaced; keys absent from the new set
+    simply have no movements. Inserts wait until the checkpoint commits.
+    """
+    _lock_transactions()
+    cursor = InventoryTransaction.objects.aggregate(cursor=Max("pk"))["cursor"] or 0
+    previous_cursor, balances = checkpoint_balances()
+    if cursor == previous_cursor:
+        return cursor
+
+    balances = defaultdict(lambda: ZERO, balances)
+    recent = InventoryTransaction.objects.filter(pk__gt=previous_cursor, pk__lte=cursor)
+    for key, delta in ledger_deltas(recent).items():
+        balances[key] += delta
+
+    InventoryLedgerCheckpoint.objects.all().delete()
+    InventoryLedgerCheckpoint.objects.bulk_create(
+        [
+            InventoryLedgerCheckpoint(
+                item_id=key.item_id,
+                location_id=key.location_id,
+                lot_number=key.lot_number,
+                serial_number=key.serial_number,
+                quantity=quantity,
+                last_transaction_id=cursor,
+            )
+            for key, quantity in balances.items()
+        ],
+        batch_size=1000,
+    )
+    return cursor
+
+
+def _stock_rows(queryset):
+    return queryset.only(
+        "pk", "item_id", "location_id", "lot_number", "serial_number", "quantity_on_hand", "quantity_reserved"
+    ).iterator(chunk_size=2000)
+
+
+def _stock_key(stock):
+    return StockKey(stock.item_id, stock.location_id, stock.lot_number, stock.serial_number)
+
+
+def find_drift(queryset=None, full=False):
+    """Return StockDrift entries for stock rows whose quantity_on_hand differs from the ledger."""
+    balances = ledger_balances(full=full)
+    queryset = InventoryStock.objects.all() if queryset is None else queryset
+    drift = []
+    for stock in _stock_rows(queryset):
+        key = _stock_key(stock)
+        expected = balances.get(key, ZERO)
+        if stock.quantity_on_hand != expected:
+            drift.append(StockDrift(key, stock.pk, stock.quantity_on_hand, expected))
+    return drift
+
+
+def recalculate_stock(queryset=None, full=False, batch_size=1000):
+    """
+    Set quantity_on_hand/quantity_available of stock rows from the ledger.
+
+    Uses the checkpoint plus one grouped aggregate for all rows and writes
+    only the rows that changed with bulk_update. Returns that row count.
+    """
+    balances = ledger_balances(full=full)
+    queryset = InventoryStock.objects.all() if queryset is None else queryset
+
+    changed = []
+    for stock in _stock_rows(queryset):
+        on_hand = balances.get(_stock_key(stock), ZERO)
+        if stock.quantity_on_hand != on_hand:
+            stock.quantity_on_hand = on_hand
+            stock.quantity_available = on_hand - stock.quantity_reserved
+            changed.append(stock)
+
+    InventoryStock.objects.bulk_update(changed, ["quantity_on_hand", "quantity_available"], batch_size=batch_size)
+    return len(changed)
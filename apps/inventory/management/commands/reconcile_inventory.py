@@ -0,0 +1,66 @@
+"""
+ARDT FMS - Reconcile Inventory Command
+Compares cached InventoryStock quantities with the transaction ledger.
+
+Usage:
+    python manage.py reconcile_inventory                 # report drift only
+    python manage.py reconcile_inventory --fix           # also correct drifted rows
+    python manage.py reconcile_inventory --checkpoint    # store new ledger checkpoints afterwards
+    python manage.py reconcile_inventory --full          # ignore checkpoints and sum the whole ledger
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.ledger import find_drift, recalculate_stock, take_checkpoint
+
+
+class Command(BaseCommand):
+    help = "Report (and optionally fix) inventory stock that disagrees with the transaction ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Update drifted stock rows to the ledger balance",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute from the whole ledger instead of the latest checkpoint",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            action="store_true",
+            help="Take a new ledger checkpoint when done",
+        )
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=50,
+            help="Maximum number of drifted rows to list",
+        )
+
+    def handle(self, *args, **options):
+        drift = find_drift(full=options["full"])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Inventory stock matches the ledger."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} stock row(s) differ from the ledger:"))
+            for entry in drift[: options["show"]]:
+                key = entry.key
+                self.stdout.write(
+                    f"  stock #{entry.stock_id} item={key.item_id} location={key.location_id} "
+                    f"lot={key.lot_number or '-'} serial={key.serial_number or '-'}: "
+                    f"recorded {entry.recorded}, ledger {entry.ledger} ({entry.difference:+})"
+                )
+            if len(drift) > options["show"]:
+                self.stdout.write(f"  ... and {len(drift) - options['show']} more")
+
+            if options["fix"]:
+                updated = recalculate_stock(full=options["full"])
+                self.stdout.write(self.style.SUCCESS(f"Updated {updated} stock row(s)."))
+
+        if options["checkpoint"]:
+            cursor = take_checkpoint()
+            self.stdout.write(self.style.SUCCESS(f"Ledger checkpoint stored at transaction #{cursor}."))
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0014_add_spec_tables"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryLedgerCheckpoint",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("lot_number", models.CharField(blank=True, max_length=50)),
+                ("serial_number", models.CharField(blank=True, max_length=50)),
+                ("quantity", models.DecimalField(decimal_places=3, default=0, max_digits=15)),
+                (
+                    "last_transaction_id",
+                    models.BigIntegerField(help_text="Last InventoryTransaction included in the balance"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_checkpoints",
+                        to="inventory.inventoryitem",
+                    ),
+                ),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_checkpoints",
+                        to="inventory.inventorylocation",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Inventory Ledger Checkpoint",
+                "verbose_name_plural": "Inventory Ledger Checkpoints",
+                "db_table": "inventory_ledger_checkpoints",
+                "indexes": [
+                    models.Index(
+                        fields=["item", "location", "lot_number", "serial_number", "last_transaction_id"],
+                        name="inv_checkpoint_key_idx",
+                    ),
+                    models.Index(fields=["last_transaction_id"], name="inv_checkpoint_cursor_idx"),
+                ],
+            },
+        ),
+    ]
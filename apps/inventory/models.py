@@ -9,14 +9,19 @@ Tables:
 - inventory_items (P1) - Enhanced with legacy refs, auto-code
 - inventory_stock (P1)
 - inventory_transactions (P1)
+- inventory_ledger_checkpoints - Periodic ledger balances per stock key
 - category_attributes (NEW) - Smart attributes per category
 - item_attribute_values (NEW) - Attribute values for items
 - item_variants (NEW) - Variant tracking for condition/source
 - material_lots - Lot/batch tracking
 """
 
+from decimal import Decimal
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.expressions import Combinable
 
 
 # =============================================================================
@@ -670,6 +675,19 @@ class InventoryLocation(models.Model):
         return f"{self.warehouse.code}/{self.code}"
 
 
+def available_quantity(on_hand, reserved):
+    """
+    On-hand minus reserved as an exact Decimal.
+
+    When either side is an F() expression (an atomic update such as
+    F("quantity_on_hand") + 5), the difference is returned as an expression
+    too, so the database computes it from the same pre-update values.
+    """
+    if isinstance(on_hand, Combinable) or isinstance(reserved, Combinable):
+        return on_hand - reserved
+    return Decimal(str(on_hand or 0)) - Decimal(str(reserved or 0))
+
+
 class InventoryStock(models.Model):
     """
     Stock levels by location.
@@ -707,39 +725,66 @@ class InventoryStock(models.Model):
         return f"{self.item.code} @ {self.location}: {self.quantity_on_hand}"
 
     def save(self, *args, **kwargs):
-        self.quantity_available = float(self.quantity_on_hand) - float(self.quantity_reserved)
+        self.quantity_available = available_quantity(self.quantity_on_hand, self.quantity_reserved)
         super().save(*args, **kwargs)
 
     def recalculate_from_ledger(self):
         """
         Recalculate quantity_on_hand from transaction ledger.
         This is the source of truth for inventory.
-        """
-        from django.db.models import Sum, Case, When, F, DecimalField
-
-        # Get all transactions for this item/location
-        transactions = InventoryTransaction.objects.filter(item=self.item)
-
-        # Inbound: to_location matches
-        inbound = transactions.filter(to_location=self.location).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
 
-        # Outbound: from_location matches
-        outbound = transactions.filter(from_location=self.location).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
+        Movements are matched on item, location, lot and serial. Only the
+        transactions posted after the last ledger checkpoint are summed.
+        """
+        from .ledger import StockKey, ledger_balance
 
-        self.quantity_on_hand = inbound - outbound
-        self.quantity_available = float(self.quantity_on_hand) - float(self.quantity_reserved)
+        self.quantity_on_hand = ledger_balance(
+            StockKey(self.item_id, self.location_id, self.lot_number, self.serial_number)
+        )
+        self.quantity_available = self.quantity_on_hand - self.quantity_reserved
         self.save(update_fields=['quantity_on_hand', 'quantity_available'])
         return self.quantity_on_hand
 
     @classmethod
     def recalculate_all(cls):
-        """Recalculate all stock records from ledger."""
-        for stock in cls.objects.all():
-            stock.recalculate_from_ledger()
+        """Recalculate all stock records from ledger; returns the number of rows changed."""
+        from .ledger import recalculate_stock
+
+        return recalculate_stock(cls.objects.all())
+
+
+class InventoryLedgerCheckpoint(models.Model):
+    """
+    Ledger balance of one stock key (item, location, lot, serial) including
+    every InventoryTransaction up to last_transaction_id.
+
+    Checkpoints are taken for all keys at once (see apps.inventory.ledger),
+    so a recalculation only has to sum the transactions posted after them.
+    """
+
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name="ledger_checkpoints")
+    location = models.ForeignKey(InventoryLocation, on_delete=models.CASCADE, related_name="ledger_checkpoints")
+    lot_number = models.CharField(max_length=50, blank=True)
+    serial_number = models.CharField(max_length=50, blank=True)
+
+    quantity = models.DecimalField(max_digits=15, decimal_places=3, default=0)
+    last_transaction_id = models.BigIntegerField(help_text="Last InventoryTransaction included in the balance")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "inventory_ledger_checkpoints"
+        verbose_name = "Inventory Ledger Checkpoint"
+        verbose_name_plural = "Inventory Ledger Checkpoints"
+        indexes = [
+            models.Index(
+                fields=["item", "location", "lot_number", "serial_number", "last_transaction_id"],
+                name="inv_checkpoint_key_idx",
+            ),
+            models.Index(fields=["last_transaction_id"], name="inv_checkpoint_cursor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.location_id}: {self.quantity} (txn {self.last_transaction_id})"
 
 
 class VariantStock(models.Model):
@@ -771,7 +816,7 @@ class VariantStock(models.Model):
         return f"{self.variant.code} @ {self.location}: {self.quantity_on_hand}"
 
     def save(self, *args, **kwargs):
-        self.quantity_available = float(self.quantity_on_hand) - float(self.quantity_reserved)
+        self.quantity_available = available_quantity(self.quantity_on_hand, self.quantity_reserved)
         super().save(*args, **kwargs)
 
 
@@ -845,6 +890,27 @@ class InventoryTransaction(models.Model):
     def __str__(self):
         return f"{self.transaction_number} - {self.transaction_type}"
 
+    @property
+    def is_checkpointed(self):
+        """True when a ledger checkpoint already includes this transaction."""
+        return self.pk is not None and InventoryLedgerCheckpoint.objects.filter(last_transaction_id__gte=self.pk).exists()
+
+    def save(self, *args, **kwargs):
+        if self.is_checkpointed:
+            raise ValidationError(
+                f"Transaction {self.transaction_number} is covered by a ledger checkpoint; "
+                "post an adjustment instead of editing it."
+            )
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        if self.is_checkpointed:
+            raise ValidationError(
+                f"Transaction {self.transaction_number} is covered by a ledger checkpoint; "
+                "post an adjustment instead of deleting it."
+            )
+        return super().delete(*args, **kwargs)
+
 
 # =============================================================================
 # SPRINT 4: MATERIAL LOT TRACKING
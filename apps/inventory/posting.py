@@ -0,0 +1,181 @@
+"""
+ARDT FMS - Stock Posting Service
+Version: 5.4
+
+Applies InventoryTransactions to the cached InventoryStock balances.
+
+Posting follows the same rule as the ledger (apps.inventory.ledger): the
+quantity is added to the (item, to_location, lot, serial) key and removed
+from the (item, from_location, lot, serial) key. One call posts one or
+many transactions in a single database transaction:
+
+    post_transaction(txn)                 # form/view use
+    post_transactions(txns)               # high-volume receiving/issuing
+
+Stock rows are locked with SELECT ... FOR UPDATE in key order, so two
+postings that touch the same rows always lock them in the same sequence
+and cannot deadlock. Balances are validated against negative stock before
+anything is written.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ledger import StockKey
+from .models import InventoryItem, InventoryStock, InventoryTransaction
+
+ZERO = Decimal("0")
+
+# Keys per OR-ed lookup when locking stock rows
+LOCK_BATCH_SIZE = 500
+
+
+class InsufficientStockError(ValidationError):
+    """Raised when posting would leave a stock key below zero (or a serial in stock twice)."""
+
+
+def _allow_negative(allow_negative):
+    if allow_negative is None:
+        return getattr(settings, "ARDT_INVENTORY_ALLOW_NEGATIVE_STOCK", False)
+    return allow_negative
+
+
+def transaction_deltas(transactions):
+    """Net quantity change per StockKey for in-memory transactions."""
+    deltas = defaultdict(lambda: ZERO)
+    for txn in transactions:
+        quantity = Decimal(txn.quantity)
+        if txn.to_location_id:
+            deltas[StockKey(txn.item_id, txn.to_location_id, txn.lot_number, txn.serial_number)] += quantity
+        if txn.from_location_id:
+            deltas[StockKey(txn.item_id, txn.from_location_id, txn.lot_number, txn.serial_number)] -= quantity
+    return deltas
+
+
+def validate_transactions(transactions):
+    """Check quantities, locations and lot/serial requirements of the items."""
+    items = InventoryItem.objects.in_bulk({txn.item_id for txn in transactions})
+    errors = []
+    for txn in transactions:
+        label = txn.transaction_number or txn.get_transaction_type_display()
+        item = items.get(txn.item_id)
+        if item is None:
+            errors.append(ValidationError(f"{label}: item does not exist."))
+            continue
+        if txn.quantity is None or Decimal(txn.quantity) <= 0:
+            errors.append(ValidationError(f"{label}: quantity must be greater than zero."))
+        if not txn.from_location_id and not txn.to_location_id:
+            errors.append(ValidationError(f"{label}: a from or to location is required."))
+        if item.is_lot_controlled and not txn.lot_number:
+            errors.append(ValidationError(f"{label}: {item.code} is lot controlled; a lot number is required."))
+        if item.is_serialized and not txn.serial_number:
+            errors.append(ValidationError(f"{label}: {item.code} is serialized; a serial number is required."))
+    if errors:
+        raise ValidationError(errors)
+    return items
+
+
+def _describe(key, item):
+    label = f"{item.code} at location {key.location_id}"
+    if key.lot_number:
+        label += f" lot {key.lot_number}"
+    if key.serial_number:
+        label += f" serial {key.serial_number}"
+    return label
+
+
+def _lock_stock(keys):
+    """Create missing stock rows, then lock every row for the keys in key order."""
+    InventoryStock.objects.bulk_create(
+        [
+            InventoryStock(
+                item_id=key.item_id,
+                location_id=key.location_id,
+                lot_number=key.lot_number,
+                serial_number=key.serial_number,
+            )
+            for key in keys
+        ],
+        ignore_conflicts=True,
+    )
+
+    locked = {}
+    for start in range(0, len(keys), LOCK_BATCH_SIZE):
+        condition = Q()
+        for key in keys[start:start + LOCK_BATCH_SIZE]:
+            condition |= Q(
+                item_id=key.item_id,
+                location_id=key.location_id,
+                lot_number=key.lot_number,
+                serial_number=key.serial_number,
+            )
+        rows = (
+            InventoryStock.objects.select_for_update()
+            .filter(condition)
+            .order_by("item_id", "location_id", "lot_number", "serial_number")
+        )
+        for stock in rows:
+            locked[StockKey(stock.item_id, stock.location_id, stock.lot_number, stock.serial_number)] = stock
+    return locked
+
+
+def post_transactions(transactions, allow_negative=None):
+    """
+    Save and apply a batch of transactions atomically.
+
+    Unsaved transactions are inserted with one bulk_create; already saved
+    ones are only applied to stock. Raises ValidationError (or its
+    subclass InsufficientStockError) and writes nothing when any
+    transaction is invalid or a balance would go negative.
+
+    Returns the updated InventoryStock rows.
+    """
+    transactions = list(transactions)
+    if not transactions:
+        return []
+
+    items = validate_transactions(transactions)
+    allow_negative = _allow_negative(allow_negative)
+    deltas = transaction_deltas(transactions)
+    keys = sorted(deltas)
+    now = timezone.now()
+
+    with transaction.atomic():
+        locked = _lock_stock(keys)
+
+        errors = []
+        for key in keys:
+            stock, item, delta = locked[key], items[key.item_id], deltas[key]
+            on_hand = stock.quantity_on_hand + delta
+            if delta < 0 and on_hand < 0 and not allow_negative:
+                errors.append(f"{_describe(key, item)}: {stock.quantity_on_hand} on hand, {-delta} requested.")
+            elif item.is_serialized and on_hand > 1:
+                errors.append(f"{_describe(key, item)}: serial number is already in stock.")
+            stock.quantity_on_hand = on_hand
+            stock.quantity_available = on_hand - stock.quantity_reserved
+            stock.last_movement_date = now
+        if errors:
+            raise InsufficientStockError(errors)
+
+        unsaved = [txn for txn in transactions if txn.pk is None]
+        for txn in unsaved:
+            if txn.transaction_date is None:
+                txn.transaction_date = now
+        InventoryTransaction.objects.bulk_create(unsaved)
+
+        stock_rows = [locked[key] for key in keys]
+        InventoryStock.objects.bulk_update(
+            stock_rows, ["quantity_on_hand", "quantity_available", "last_movement_date"]
+        )
+    return stock_rows
+
+
+def post_transaction(txn, allow_negative=None):
+    """Save and apply a single transaction; see post_transactions()."""
+    return post_transactions([txn], allow_negative=allow_negative)
@@ -0,0 +1,151 @@
+"""
+Tests for the inventory ledger (checkpoints, recalculation, drift).
+"""
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.inventory.ledger import (
+    StockKey, find_drift, ledger_balance, ledger_balances, recalculate_stock, take_checkpoint
+)
+from apps.inventory.models import (
+    InventoryLedgerCheckpoint, InventoryLocation, InventoryStock, InventoryTransaction
+)
+
+
+@pytest.fixture
+def second_location(db, warehouse):
+    return InventoryLocation.objects.create(warehouse=warehouse, code='B-01-01', name='Aisle B')
+
+
+@pytest.fixture
+def post(db, test_user, inventory_item):
+    """Create ledger transactions with sequential numbers."""
+    counter = iter(range(1, 10000))
+
+    def _post(quantity, to_location=None, from_location=None, lot='', serial=''):
+        return InventoryTransaction.objects.create(
+            transaction_number=f'TXN-L{next(counter):04d}',
+            transaction_type=InventoryTransaction.TransactionType.TRANSFER,
+            transaction_date=timezone.now(),
+            item=inventory_item,
+            from_location=from_location,
+            to_location=to_location,
+            quantity=Decimal(quantity),
+            lot_number=lot,
+            serial_number=serial,
+            unit='EA',
+            created_by=test_user,
+        )
+    return _post
+
+
+class TestLedgerBalances:
+    """Tests for ledger balance computation."""
+
+    def test_balances_are_per_lot_and_location(self, post, inventory_item, inventory_location, second_location):
+        post('100', to_location=inventory_location, lot='A')
+        post('40', to_location=inventory_location, lot='B')
+        post('30', from_location=inventory_location, to_location=second_location, lot='A')
+
+        balances = ledger_balances()
+        assert balances[StockKey(inventory_item.pk, inventory_location.pk, 'A', '')] == Decimal('70')
+        assert balances[StockKey(inventory_item.pk, inventory_location.pk, 'B', '')] == Decimal('40')
+        assert balances[StockKey(inventory_item.pk, second_location.pk, 'A', '')] == Decimal('30')
+
+    def test_single_key_uses_checkpoint(self, post, inventory_item, inventory_location, django_assert_num_queries):
+        key = StockKey(inventory_item.pk, inventory_location.pk, 'A', '')
+        post('100', to_location=inventory_location, lot='A')
+        post('25', from_location=inventory_location, lot='A')
+        take_checkpoint()
+        post('5', to_location=inventory_location, lot='A')
+
+        checkpoint = InventoryLedgerCheckpoint.objects.get(lot_number='A')
+        assert checkpoint.quantity == Decimal('75')
+        with django_assert_num_queries(2):
+            assert ledger_balance(key) == Decimal('80')
+
+    def test_checkpoint_rolls_forward(self, post, inventory_item, inventory_location):
+        post('10', to_location=inventory_location)
+        first = take_checkpoint()
+        post('5', to_location=inventory_location)
+        second = take_checkpoint()
+
+        assert second > first
+        checkpoint = InventoryLedgerCheckpoint.objects.get()
+        assert checkpoint.quantity == Decimal('15')
+        assert checkpoint.last_transaction_id == second
+
+    def test_checkpointed_transactions_are_immutable(self, post, inventory_location):
+        txn = post('10', to_location=inventory_location)
+        txn.notes = 'before checkpoint'
+        txn.save()
+        take_checkpoint()
+
+        txn.quantity = Decimal('8')
+        with pytest.raises(ValidationError):
+            txn.save()
+        with pytest.raises(ValidationError):
+            txn.delete()
+        assert InventoryTransaction.objects.get(pk=txn.pk).quantity == Decimal('10')
+
+
+class TestRecalculateStock:
+    """Tests for bulk stock recalculation."""
+
+    def test_recalculate_all_uses_bulk_queries(self, post, inventory_item, inventory_location, second_location,
+                                               django_assert_max_num_queries):
+        stock_a = InventoryStock.objects.create(item=inventory_item, location=inventory_location, lot_number='A')
+        stock_b = InventoryStock.objects.create(item=inventory_item, location=second_location, lot_number='A',
+                                                quantity_reserved=Decimal('2'))
+        post('50', to_location=inventory_location, lot='A')
+        post('20', from_location=inventory_location, to_location=second_location, lot='A')
+        take_checkpoint()
+        post('1', to_location=second_location, lot='A')
+
+        # checkpoint cursor + checkpoint rows + grouped aggregate + stock rows + bulk update
+        with django_assert_max_num_queries(6):
+            assert InventoryStock.recalculate_all() == 2
+
+        stock_a.refresh_from_db()
+        stock_b.refresh_from_db()
+        assert stock_a.quantity_on_hand == Decimal('30')
+        assert stock_b.quantity_on_hand == Decimal('21')
+        assert stock_b.quantity_available == Decimal('19')
+
+    def test_recalculate_from_ledger_ignores_other_lots(self, post, inventory_item, inventory_location):
+        stock = InventoryStock.objects.create(item=inventory_item, location=inventory_location, lot_number='A')
+        post('10', to_location=inventory_location, lot='A')
+        post('99', to_location=inventory_location, lot='B')
+
+        assert stock.recalculate_from_ledger() == Decimal('10')
+
+    def test_drift_report_and_fix(self, post, inventory_item, inventory_location):
+        stock = InventoryStock.objects.create(item=inventory_item, location=inventory_location,
+                                              quantity_on_hand=Decimal('12'))
+        post('10', to_location=inventory_location)
+
+        drift = find_drift()
+        assert len(drift) == 1
+        assert drift[0].difference == Decimal('2')
+
+        out = StringIO()
+        call_command('reconcile_inventory', '--fix', '--checkpoint', stdout=out)
+        assert '1 stock row(s) differ' in out.getvalue()
+        stock.refresh_from_db()
+        assert stock.quantity_on_hand == Decimal('10')
+        assert not find_drift()
+        assert InventoryLedgerCheckpoint.objects.count() == 1
+
+    def test_full_recompute_detects_edited_history(self, post, inventory_item, inventory_location):
+        InventoryStock.objects.create(item=inventory_item, location=inventory_location, quantity_on_hand=Decimal('10'))
+        txn = post('10', to_location=inventory_location)
+        take_checkpoint()
+        InventoryTransaction.objects.filter(pk=txn.pk).update(quantity=Decimal('8'))
+
+        assert not find_drift()
+        assert find_drift(full=True)[0].ledger == Decimal('8')
+        assert recalculate_stock(full=True) == 1
@@ -0,0 +1,131 @@
+"""
+Tests for the stock posting service.
+"""
+import pytest
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import F
+
+from apps.inventory.ledger import find_drift
+from apps.inventory.models import InventoryLocation, InventoryStock, InventoryTransaction
+from apps.inventory.posting import InsufficientStockError, post_transaction, post_transactions
+
+
+@pytest.fixture
+def second_location(db, warehouse):
+    return InventoryLocation.objects.create(warehouse=warehouse, code='B-01-01', name='Aisle B')
+
+
+@pytest.fixture
+def make_txn(db, test_user, inventory_item):
+    """Build unsaved transactions (the fixture item is lot controlled)."""
+    counter = iter(range(1, 10000))
+
+    def _make(txn_type, quantity, to_location=None, from_location=None, lot='LOT-A', serial='', item=None):
+        return InventoryTransaction(
+            transaction_number=f'TXN-P{next(counter):04d}',
+            transaction_type=txn_type,
+            item=item or inventory_item,
+            from_location=from_location,
+            to_location=to_location,
+            quantity=Decimal(quantity),
+            lot_number=lot,
+            serial_number=serial,
+            unit='EA',
+            created_by=test_user,
+        )
+    return _make
+
+
+class TestPostTransaction:
+    """Tests for single transaction posting."""
+
+    def test_receipt_creates_stock_row(self, make_txn, inventory_location):
+        txn = make_txn('RECEIPT', '40', to_location=inventory_location)
+        post_transaction(txn)
+
+        assert txn.pk is not None
+        stock = InventoryStock.objects.get(location=inventory_location, lot_number='LOT-A')
+        assert stock.quantity_on_hand == Decimal('40')
+        assert stock.quantity_available == Decimal('40')
+        assert stock.last_movement_date is not None
+
+    def test_issue_without_stock_is_rejected(self, make_txn, inventory_location):
+        txn = make_txn('ISSUE', '5', from_location=inventory_location)
+        with pytest.raises(InsufficientStockError):
+            post_transaction(txn)
+        assert not InventoryTransaction.objects.exists()
+        assert not InventoryStock.objects.exists()
+
+    def test_negative_stock_can_be_allowed(self, make_txn, inventory_location):
+        post_transaction(make_txn('ISSUE', '5', from_location=inventory_location), allow_negative=True)
+        assert InventoryStock.objects.get().quantity_on_hand == Decimal('-5')
+
+    def test_lot_controlled_item_requires_lot(self, make_txn, inventory_location):
+        with pytest.raises(ValidationError):
+            post_transaction(make_txn('RECEIPT', '1', to_location=inventory_location, lot=''))
+
+    def test_serial_cannot_be_received_twice(self, make_txn, inventory_item, inventory_location):
+        inventory_item.is_serialized = True
+        inventory_item.save()
+        post_transaction(make_txn('RECEIPT', '1', to_location=inventory_location, serial='SN-1'))
+        with pytest.raises(InsufficientStockError):
+            post_transaction(make_txn('RECEIPT', '1', to_location=inventory_location, serial='SN-1'))
+
+
+class TestPostTransactions:
+    """Tests for batch posting."""
+
+    def test_batch_posts_atomically(self, make_txn, inventory_location, second_location):
+        post_transactions([
+            make_txn('RECEIPT', '100', to_location=inventory_location),
+            make_txn('TRANSFER', '30', from_location=inventory_location, to_location=second_location),
+            make_txn('RECEIPT', '7', to_location=inventory_location, lot='LOT-B'),
+        ])
+
+        balances = {
+            (s.location_id, s.lot_number): s.quantity_on_hand for s in InventoryStock.objects.all()
+        }
+        assert balances == {
+            (inventory_location.pk, 'LOT-A'): Decimal('70'),
+            (second_location.pk, 'LOT-A'): Decimal('30'),
+            (inventory_location.pk, 'LOT-B'): Decimal('7'),
+        }
+        assert InventoryTransaction.objects.count() == 3
+        assert not find_drift()
+
+    def test_failed_batch_writes_nothing(self, make_txn, inventory_location, second_location):
+        post_transaction(make_txn('RECEIPT', '10', to_location=inventory_location))
+        with pytest.raises(InsufficientStockError):
+            post_transactions([
+                make_txn('RECEIPT', '5', to_location=second_location),
+                make_txn('ISSUE', '11', from_location=inventory_location),
+            ])
+        assert InventoryTransaction.objects.count() == 1
+        assert InventoryStock.objects.get(location=inventory_location).quantity_on_hand == Decimal('10')
+        assert not InventoryStock.objects.filter(location=second_location).exists()
+
+    def test_batch_query_count_is_constant(self, make_txn, inventory_location, django_assert_max_num_queries):
+        txns = [make_txn('RECEIPT', '1', to_location=inventory_location, lot=f'LOT-{i}') for i in range(25)]
+        # items + stock insert + lock + transaction insert + stock update (+ savepoint)
+        with django_assert_max_num_queries(8):
+            post_transactions(txns)
+        assert InventoryStock.objects.count() == 25
+
+
+class TestStockAvailability:
+    """Tests for InventoryStock.quantity_available arithmetic."""
+
+    def test_available_is_exact_decimal(self, db, inventory_item, inventory_location):
+        stock = InventoryStock.objects.create(
+            item=inventory_item, location=inventory_location,
+            quantity_on_hand=Decimal('0.3'), quantity_reserved=Decimal('0.1'),
+        )
+        assert stock.quantity_available == Decimal('0.2')
+
+    def test_available_follows_f_expression_update(self, inventory_stock):
+        inventory_stock.quantity_on_hand = F('quantity_on_hand') + Decimal('10')
+        inventory_stock.save()
+        inventory_stock.refresh_from_db()
+        assert inventory_stock.quantity_on_hand == Decimal('60')
+        assert inventory_stock.quantity_available == Decimal('55')
@@ -7,12 +7,15 @@ from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
 from django.db.models import F, Q, Sum
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView, View
 
+from apps.common.sequences import next_document_number
+
 from .forms import (
     CategoryAttributeForm,
     InventoryCategoryForm,
@@ -45,6 +48,7 @@ from .models import (
     UnitOfMeasure,
     VariantCase,
 )
+from .posting import post_transaction
 
 
 # =============================================================================
@@ -544,10 +548,12 @@ class TransactionCreateView(LoginRequiredMixin, CreateView):
         # Calculate total cost
         transaction.total_cost = transaction.quantity * transaction.unit_cost
 
-        transaction.save()
-
-        # Update stock levels
-        self.update_stock(transaction)
+        # Save the transaction and update stock levels atomically
+        try:
+            post_transaction(transaction)
+        except ValidationError as e:
+            form.add_error(None, e)
+            return self.form_invalid(form)
 
         messages.success(self.request, f"Transaction '{transaction.transaction_number}' created successfully.")
         return redirect(self.success_url)
@@ -556,73 +562,7 @@ class TransactionCreateView(LoginRequiredMixin, CreateView):
         """Generate unique transaction number."""
         prefix = "TXN"
         today = timezone.now().strftime("%Y%m%d")
-        last = InventoryTransaction.objects.filter(transaction_number__startswith=f"{prefix}-{today}").order_by("-id").first()
-        if last:
-            try:
-                last_num = int(last.transaction_number.split("-")[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-        return f"{prefix}-{today}-{str(next_num).zfill(4)}"
-
-    def update_stock(self, transaction):
-        """Update stock levels based on transaction."""
-        if transaction.transaction_type == "RECEIPT":
-            # Add to destination
-            stock, _ = InventoryStock.objects.get_or_create(
-                item=transaction.item, location=transaction.to_location, defaults={"quantity_on_hand": 0}
-            )
-            stock.quantity_on_hand = F("quantity_on_hand") + transaction.quantity
-            stock.last_movement_date = timezone.now()
-            stock.save()
-
-        elif transaction.transaction_type == "ISSUE":
-            # Remove from source
-            try:
-                stock = InventoryStock.objects.get(item=transaction.item, location=transaction.from_location)
-                stock.quantity_on_hand = F("quantity_on_hand") - transaction.quantity
-                stock.last_movement_date = timezone.now()
-                stock.save()
-            except InventoryStock.DoesNotExist:
-                pass
-
-        elif transaction.transaction_type == "TRANSFER":
-            # Remove from source
-            try:
-                from_stock = InventoryStock.objects.get(item=transaction.item, location=transaction.from_location)
-                from_stock.quantity_on_hand = F("quantity_on_hand") - transaction.quantity
-                from_stock.last_movement_date = timezone.now()
-                from_stock.save()
-            except InventoryStock.DoesNotExist:
-                pass
-
-            # Add to destination
-            to_stock, _ = InventoryStock.objects.get_or_create(
-                item=transaction.item, location=transaction.to_location, defaults={"quantity_on_hand": 0}
-            )
-            to_stock.quantity_on_hand = F("quantity_on_hand") + transaction.quantity
-            to_stock.last_movement_date = timezone.now()
-            to_stock.save()
-
-        elif transaction.transaction_type == "ADJUSTMENT":
-            # Adjustment can be positive or negative
-            if transaction.to_location:
-                stock, _ = InventoryStock.objects.get_or_create(
-                    item=transaction.item, location=transaction.to_location, defaults={"quantity_on_hand": 0}
-                )
-                stock.quantity_on_hand = F("quantity_on_hand") + transaction.quantity
-                stock.last_movement_date = timezone.now()
-                stock.save()
-            elif transaction.from_location:
-                try:
-                    stock = InventoryStock.objects.get(item=transaction.item, location=transaction.from_location)
-                    stock.quantity_on_hand = F("quantity_on_hand") - transaction.quantity
-                    stock.last_movement_date = timezone.now()
-                    stock.save()
-                except InventoryStock.DoesNotExist:
-                    pass
+        return next_document_number(InventoryTransaction, "transaction_number", f"{prefix}-{today}-", padding=4)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -682,9 +622,9 @@ class StockAdjustView(LoginRequiredMixin, View):
             reason = form.cleaned_data["reason"]
             notes = form.cleaned_data["notes"]
 
-            # Create transaction
+            # Create transaction and update stock
             trans_type = "ADJUSTMENT"
-            transaction = InventoryTransaction.objects.create(
+            transaction = InventoryTransaction(
                 transaction_number=f"ADJ-{timezone.now().strftime('%Y%m%d%H%M%S')}",
                 transaction_type=trans_type,
                 transaction_date=timezone.now(),
@@ -693,20 +633,18 @@ class StockAdjustView(LoginRequiredMixin, View):
                 to_location=stock.location if adjustment_type == "ADD" else None,
                 quantity=quantity,
                 unit=stock.item.unit,
+                lot_number=stock.lot_number,
+                serial_number=stock.serial_number,
                 reason=reason,
                 notes=notes,
                 created_by=request.user,
             )
-
-            # Update stock
-            if adjustment_type == "ADD":
-                stock.quantity_on_hand = F("quantity_on_hand") + quantity
+            try:
+                post_transaction(transaction)
+            except ValidationError as e:
+                messages.error(request, " ".join(e.messages))
             else:
-                stock.quantity_on_hand = F("quantity_on_hand") - quantity
-            stock.last_movement_date = timezone.now()
-            stock.save()
-
-            messages.success(request, f"Stock adjusted successfully. Transaction: {transaction.transaction_number}")
+                messages.success(request, f"Stock adjusted successfully. Transaction: {transaction.transaction_number}")
         else:
             messages.error(request, "Invalid adjustment data.")
 
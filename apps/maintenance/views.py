@@ -11,6 +11,8 @@ from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views.generic import CreateView, DetailView, ListView, UpdateView, View
 
+from apps.common.sequences import next_document_number
+
 from .forms import (
     EquipmentCategoryForm,
     EquipmentForm,
@@ -264,16 +266,7 @@ class RequestCreateView(LoginRequiredMixin, CreateView):
         """Generate unique request number."""
         prefix = "MR"
         year = timezone.now().year
-        last = MaintenanceRequest.objects.filter(request_number__startswith=f"{prefix}-{year}").order_by("-id").first()
-        if last:
-            try:
-                last_num = int(last.request_number.split("-")[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-        return f"{prefix}-{year}-{str(next_num).zfill(4)}"
+        return next_document_number(MaintenanceRequest, "request_number", f"{prefix}-{year}-", padding=4)
 
     def get_success_url(self):
         return reverse_lazy("maintenance:request_detail", kwargs={"pk": self.object.pk})
@@ -380,16 +373,7 @@ class MWOCreateView(LoginRequiredMixin, CreateView):
         """Generate unique MWO number."""
         prefix = "MWO"
         year = timezone.now().year
-        last = MaintenanceWorkOrder.objects.filter(mwo_number__startswith=f"{prefix}-{year}").order_by("-id").first()
-        if last:
-            try:
-                last_num = int(last.mwo_number.split("-")[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-        return f"{prefix}-{year}-{str(next_num).zfill(4)}"
+        return next_document_number(MaintenanceWorkOrder, "mwo_number", f"{prefix}-{year}-", padding=4)
 
     def get_success_url(self):
         return reverse_lazy("maintenance:mwo_detail", kwargs={"pk": self.object.pk})
@@ -14,6 +14,7 @@ from django.utils import timezone
 from django.views.generic import CreateView, DetailView, ListView, UpdateView, View
 
 from apps.accounts.mixins import RoleRequiredMixin
+from apps.common.sequences import next_document_number
 
 from .forms import InspectionForm, InspectionResultForm, NCRDispositionForm, NCRForm, NCRPhotoForm
 from .models import NCR, Inspection, NCRPhoto
@@ -112,20 +113,7 @@ class InspectionCreateView(LoginRequiredMixin, CreateView):
         """Generate unique inspection number."""
         prefix = "INS"
         year = timezone.now().year
-        last_inspection = Inspection.objects.filter(
-            inspection_number__startswith=f"{prefix}-{year}-"
-        ).order_by("-id").first()
-
-        if last_inspection:
-            try:
-                last_num = int(last_inspection.inspection_number.split("-")[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-
-        return f"{prefix}-{year}-{str(next_num).zfill(4)}"
+        return next_document_number(Inspection, "inspection_number", f"{prefix}-{year}-", padding=4)
 
 
 class InspectionUpdateView(LoginRequiredMixin, UpdateView):
@@ -278,20 +266,7 @@ class NCRCreateView(LoginRequiredMixin, CreateView):
         """Generate unique NCR number."""
         prefix = "NCR"
         year = timezone.now().year
-        last_ncr = NCR.objects.filter(
-            ncr_number__startswith=f"{prefix}-{year}-"
-        ).order_by("-id").first()
-
-        if last_ncr:
-            try:
-                last_num = int(last_ncr.ncr_number.split("-")[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-
-        return f"{prefix}-{year}-{str(next_num).zfill(4)}"
+        return next_document_number(NCR, "ncr_number", f"{prefix}-{year}-", padding=4)
 
 
 class NCRUpdateView(LoginRequiredMixin, UpdateView):
@@ -22,7 +22,14 @@ class SavedReportAdmin(admin.ModelAdmin):
 class ReportExportLogAdmin(admin.ModelAdmin):
     """Admin for report export logs."""
 
-    list_display = ["report_type", "export_format", "record_count", "exported_by", "exported_at"]
-    list_filter = ["report_type", "export_format", "exported_at"]
-    readonly_fields = ["report_type", "export_format", "filters_applied", "record_count", "exported_by", "exported_at"]
+    list_display = [
+        "report_type", "export_format", "status", "progress", "record_count",
+        "file_size", "duration_ms", "exported_by", "exported_at",
+    ]
+    list_filter = ["status", "report_type", "export_format", "exported_at"]
+    readonly_fields = [
+        "report_type", "export_format", "filters_applied", "record_count",
+        "file_size", "duration_ms", "exported_by", "exported_at",
+        "status", "progress", "report_key", "filter_hash", "file", "error_message", "started_at",
+    ]
     date_hierarchy = "exported_at"
@@ -0,0 +1,162 @@
+"""
+ARDT FMS - Export Audit Writer
+Version: 5.4
+
+Records ReportExportLog rows outside the request/response path.
+
+Exports call `export_audit.record(...)` when they finish. Entries are
+buffered in-process and written with one bulk_create, either when the
+buffer reaches ARDT_EXPORT_AUDIT_BATCH_SIZE or after
+ARDT_EXPORT_AUDIT_FLUSH_INTERVAL seconds, on a background thread.
+Whatever is left is flushed when the process exits.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from apps.common.exports import streaming_csv_response
+
+logger = logging.getLogger(__name__)
+
+
+class ExportAuditWriter:
+    """Batched, deferred writer for ReportExportLog entries."""
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def batch_size(self):
+        return self._batch_size or getattr(settings, "ARDT_EXPORT_AUDIT_BATCH_SIZE", 50)
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, "ARDT_EXPORT_AUDIT_FLUSH_INTERVAL", 5)
+
+    @property
+    def deferred(self):
+        """When False, record() writes synchronously (used by the test suite)."""
+        return getattr(settings, "ARDT_EXPORT_AUDIT_ASYNC", True)
+
+    def record(self, report_type, export_format, record_count=0, file_size=0, duration_ms=0,
+               exported_by=None, filters_applied=None):
+        """Queue one export log entry."""
+        from .models import ReportExportLog
+
+        entry = ReportExportLog(
+            report_type=report_type[:50],
+            export_format=export_format,
+            record_count=record_count,
+            file_size=file_size,
+            duration_ms=duration_ms,
+            exported_by=exported_by if getattr(exported_by, "is_authenticated", False) else None,
+            filters_applied=filters_applied or {},
+            exported_at=timezone.now(),
+        )
+
+        if not self.deferred:
+            entry.save()
+            return
+
+        with self._lock:
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered entries with a single bulk_create."""
+        from .models import ReportExportLog
+
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if not entries:
+            return 0
+        try:
+            ReportExportLog.objects.bulk_create(entries)
+        except Exception:
+            logger.exception("Failed to write %d export audit entries", len(entries))
+            return 0
+        return len(entries)
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="export-audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+            connection.close()
+
+
+export_audit = ExportAuditWriter()
+
+
+@atexit.register
+def _flush_on_exit():
+    export_audit.flush()
+
+
+class ExportTimer:
+    """Measure export duration in milliseconds."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+
+    @property
+    def elapsed_ms(self):
+        return int((time.monotonic() - self.started) * 1000)
+
+
+def export_filters(request, exclude=("export", "page")):
+    """Return the GET parameters that shaped an export, for the audit log."""
+    if request is None:
+        return {}
+    return {key: value for key, value in request.GET.items() if key not in exclude}
+
+
+def audited_csv_response(request, report_type, filename, header, rows):
+    """
+    Streaming CSV response that records a ReportExportLog entry (rows,
+    bytes and elapsed time) once the last row has been sent.
+    """
+    timer = ExportTimer()
+    user = getattr(request, "user", None)
+    filters = export_filters(request)
+
+    def on_complete(row_count, byte_count):
+        export_audit.record(
+            report_type,
+            "CSV",
+            record_count=row_count,
+            file_size=byte_count,
+            duration_ms=timer.elapsed_ms,
+            exported_by=user,
+            filters_applied=filters,
+        )
+
+    return streaming_csv_response(filename, header, rows, on_complete=on_complete)
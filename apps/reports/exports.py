@@ -0,0 +1,89 @@
+"""
+ARDT FMS - Streaming Excel Writer
+Version: 5.4
+
+Writes report workbooks with openpyxl's write-only mode, so rows are
+flushed to disk as they are produced instead of being kept as styled
+Cell objects in memory.
+"""
+
+from itertools import chain, islice
+
+from apps.common.exports import EXPORT_CHUNK_SIZE, compile_columns, format_export_value, iter_export_rows
+
+EXCEL_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rows inspected to size columns before the sheet is written
+WIDTH_SAMPLE_ROWS = 100
+MAX_COLUMN_WIDTH = 50
+
+
+def write_excel(fileobj, queryset, columns, sheet_name="Report", chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Write a queryset to an .xlsx file object and return the number of rows.
+
+    Args:
+        fileobj: Binary file object (or path) the workbook is saved to
+        queryset: Django queryset (or iterable of objects) to export
+        columns: List of tuples (field_name, header_name); field_name may be
+            a dotted path such as "customer.name"
+        sheet_name: Name of the Excel sheet
+        progress: Optional callable receiving the running row count after
+            every `chunk_size` rows (used by background export jobs)
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+
+    model = getattr(queryset, "model", None)
+    compiled = compile_columns(model, columns)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+
+    # Styles
+    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    thin_border = Border(
+        left=Side(style="thin"),
+        right=Side(style="thin"),
+        top=Side(style="thin"),
+        bottom=Side(style="thin"),
+    )
+
+    rows = (tuple(format_export_value(v) for v in values) for values in iter_export_rows(queryset, compiled, chunk_size))
+
+    # Size columns from a sample; write-only sheets need widths before any row
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    for col_idx, column in enumerate(compiled, 1):
+        max_length = max([len(column.header)] + [len(row[col_idx - 1]) for row in sample])
+        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, MAX_COLUMN_WIDTH)
+
+    # Write headers
+    header_cells = []
+    for column in compiled:
+        cell = WriteOnlyCell(ws, value=column.header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        cell.border = thin_border
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    # Write data
+    row_count = 0
+    for row in chain(sample, rows):
+        cells = []
+        for value in row:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.border = thin_border
+            cells.append(cell)
+        ws.append(cells)
+        row_count += 1
+        if progress is not None and row_count % chunk_size == 0:
+            progress(row_count)
+
+    wb.save(fileobj)
+    return row_count
@@ -0,0 +1,231 @@
+"""
+ARDT FMS - Background Export Jobs
+Version: 5.4
+
+Runs large report exports outside the request/response cycle.
+
+A job is a ReportExportLog row in QUEUED status. Identical requests (same
+user, report and filters) that arrive while a job is queued or running
+share that job instead of building the workbook twice; a partial unique
+constraint on filter_hash keeps concurrent requests from queueing it
+twice. Jobs are claimed with a conditional UPDATE, so any number of
+workers can drain the queue:
+
+    python manage.py run_export_jobs          # DB-backed worker
+    ARDT_EXPORT_JOB_LOCAL_WORKERS = 1         # in-process threads
+
+Finished workbooks are stored under MEDIA_ROOT/exports/ and downloaded
+through the reports:export_job_download view, by the user who queued them.
+"""
+
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .audit import ExportTimer
+from .exports import write_excel
+from .models import ReportExportLog
+
+logger = logging.getLogger(__name__)
+
+# report key -> report view; the view supplies get_queryset() and export_* attributes
+EXPORT_REPORTS = {
+    "work_orders": "apps.reports.views.WorkOrderReportView",
+    "inventory": "apps.reports.views.InventoryReportView",
+    "quality": "apps.reports.views.QualityReportView",
+    "maintenance": "apps.reports.views.MaintenanceReportView",
+    "supply_chain": "apps.reports.views.SupplyChainReportView",
+}
+
+ACTIVE_STATUSES = [ReportExportLog.Status.QUEUED, ReportExportLog.Status.RUNNING]
+
+
+def get_report_view(report_key):
+    """Return the report view class registered under a key."""
+    try:
+        return import_string(EXPORT_REPORTS[report_key])
+    except KeyError:
+        raise KeyError(f"Unknown export report: {report_key}") from None
+
+
+def export_filter_hash(report_key, filters, user_id=None):
+    """Stable hash of a user's report and filters, used to share identical jobs."""
+    payload = json.dumps({"report": report_key, "filters": filters, "user": user_id}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _active_job(filter_hash):
+    return ReportExportLog.objects.filter(filter_hash=filter_hash, status__in=ACTIVE_STATUSES).order_by("pk").first()
+
+
+def enqueue_export(report_key, filters=None, user=None):
+    """
+    Queue an Excel export of a registered report.
+
+    Returns (job, created). When the user already has an identical export
+    queued or running, that job is returned and nothing new is queued.
+    """
+    view_class = get_report_view(report_key)
+    filters = dict(filters or {})
+    user = user if getattr(user, "is_authenticated", False) else None
+    filter_hash = export_filter_hash(report_key, filters, user.pk if user else None)
+
+    job = _active_job(filter_hash)
+    if job is not None:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ReportExportLog.objects.create(
+                report_type=view_class.export_sheet_name[:50],
+                export_format=ReportExportLog.ExportFormat.EXCEL,
+                status=ReportExportLog.Status.QUEUED,
+                progress=0,
+                report_key=report_key,
+                filter_hash=filter_hash,
+                filters_applied=filters,
+                exported_by=user,
+            )
+            transaction.on_commit(local_runner.kick)
+    except IntegrityError:
+        # A concurrent identical request queued its job first
+        job = _active_job(filter_hash)
+        if job is None:
+            return enqueue_export(report_key, filters, user)
+        return job, False
+    return job, True
+
+
+def build_export_queryset(view_class, filters, user=None):
+    """Build a report view's queryset for stored filters, without a real request."""
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(mutable=True)
+    for key, value in (filters or {}).items():
+        request.GET[key] = value
+    request.user = user or AnonymousUser()
+
+    view = view_class()
+    view.setup(request)
+    return view.get_queryset()
+
+
+def claim_next_job():
+    """Move the oldest QUEUED job to RUNNING and return it (None if the queue is empty)."""
+    while True:
+        job_id = (
+            ReportExportLog.objects.filter(status=ReportExportLog.Status.QUEUED)
+            .order_by("exported_at", "pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        # Only one worker wins the conditional update; the others try the next job
+        claimed = ReportExportLog.objects.filter(pk=job_id, status=ReportExportLog.Status.QUEUED).update(
+            status=ReportExportLog.Status.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return ReportExportLog.objects.select_related("exported_by").get(pk=job_id)
+
+
+def run_export_job(job):
+    """Write the workbook for a claimed job and record the outcome on it."""
+    timer = ExportTimer()
+    try:
+        view_class = get_report_view(job.report_key)
+        queryset = build_export_queryset(view_class, job.filters_applied, job.exported_by)
+        total = queryset.count()
+
+        def progress(row_count):
+            percent = min(99, row_count * 100 // total) if total else 0
+            ReportExportLog.objects.filter(pk=job.pk).update(progress=percent)
+
+        with tempfile.TemporaryFile() as output:
+            row_count = write_excel(
+                output, queryset, view_class.export_columns, view_class.export_sheet_name, progress=progress
+            )
+            file_size = output.tell()
+            output.seek(0)
+            job.file.save(f"{view_class.export_filename}.xlsx", File(output), save=False)
+    except Exception as exc:
+        logger.exception("Export job %s failed", job.pk)
+        job.status = ReportExportLog.Status.FAILED
+        job.error_message = str(exc)
+        job.duration_ms = timer.elapsed_ms
+        job.save(update_fields=["status", "error_message", "duration_ms"])
+        return job
+
+    job.status = ReportExportLog.Status.COMPLETED
+    job.progress = 100
+    job.record_count = row_count
+    job.file_size = file_size
+    job.duration_ms = timer.elapsed_ms
+    job.exported_at = timezone.now()
+    job.save(update_fields=["status", "progress", "record_count", "file_size", "duration_ms", "exported_at", "file"])
+    return job
+
+
+def run_pending_jobs(limit=None):
+    """Claim and run queued jobs until the queue is empty; return how many ran."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_export_job(job)
+        processed += 1
+    return processed
+
+
+def requeue_stale_jobs(timeout=None):
+    """Put RUNNING jobs whose worker died back on the queue."""
+    timeout = timeout or getattr(settings, "ARDT_EXPORT_JOB_TIMEOUT", 3600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ReportExportLog.objects.filter(status=ReportExportLog.Status.RUNNING, started_at__lt=cutoff).update(
+        status=ReportExportLog.Status.QUEUED, progress=0, started_at=None
+    )
+
+
+class LocalExportRunner:
+    """Small in-process thread pool that drains the queue after each enqueue."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        return getattr(settings, "ARDT_EXPORT_JOB_LOCAL_WORKERS", 0)
+
+    def kick(self):
+        if self.max_workers <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export-job")
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        close_old_connections()
+        try:
+            run_pending_jobs()
+        except Exception:
+            logger.exception("Local export runner failed")
+        finally:
+            connection.close()
+
+
+local_runner = LocalExportRunner()
@@ -0,0 +1,50 @@
+"""
+ARDT FMS - Export Job Worker
+Version: 5.4
+
+Drains the background report export queue.
+
+Usage:
+    python manage.py run_export_jobs            # poll forever
+    python manage.py run_export_jobs --once     # run what is queued, then exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.reports.jobs import requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued report export jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are currently queued and exit",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between queue checks when idle",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale export job(s)"))
+
+            processed = run_pending_jobs()
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"Ran {processed} export job(s)"))
+
+            if options["once"]:
+                return
+            if not processed:
+                time.sleep(options["poll_interval"])
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="file_size",
+            field=models.BigIntegerField(default=0, help_text="Bytes written"),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="duration_ms",
+            field=models.PositiveIntegerField(default=0, help_text="Time taken to produce the export"),
+        ),
+        migrations.AlterField(
+            model_name="reportexportlog",
+            name="exported_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
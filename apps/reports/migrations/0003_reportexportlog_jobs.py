@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0002_reportexportlog_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="status",
+            field=models.CharField(
+                choices=[("QUEUED", "Queued"), ("RUNNING", "Running"), ("COMPLETED", "Completed"), ("FAILED", "Failed")],
+                default="COMPLETED",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="progress",
+            field=models.PositiveSmallIntegerField(default=100, help_text="Percent of rows written"),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="report_key",
+            field=models.CharField(blank=True, help_text="Registered report the job exports", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="filter_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="file",
+            field=models.FileField(blank=True, upload_to="exports/%Y/%m/"),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="error_message",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="reportexportlog",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="reportexportlog",
+            index=models.Index(fields=["status", "exported_at"], name="report_export_status_idx"),
+        ),
+    ]
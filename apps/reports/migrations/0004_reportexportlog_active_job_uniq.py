@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Keep the oldest queued/running job per filter_hash; earlier races could queue several."""
+    ReportExportLog = apps.get_model("reports", "ReportExportLog")
+    seen = set()
+    duplicates = []
+    active = ReportExportLog.objects.filter(status__in=["QUEUED", "RUNNING"]).order_by("pk")
+    for pk, filter_hash in active.values_list("pk", "filter_hash"):
+        if filter_hash in seen:
+            duplicates.append(pk)
+        seen.add(filter_hash)
+    ReportExportLog.objects.filter(pk__in=duplicates).update(
+        status="FAILED", error_message="Duplicate of an identical queued export"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0003_reportexportlog_jobs"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="reportexportlog",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["QUEUED", "RUNNING"])),
+                fields=("filter_hash",),
+                name="report_export_active_job_uniq",
+            ),
+        ),
+    ]
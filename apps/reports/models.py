@@ -5,6 +5,7 @@ Version: 5.4
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class SavedReport(models.Model):
@@ -52,17 +53,32 @@ class SavedReport(models.Model):
 
 
 class ReportExportLog(models.Model):
-    """Log of report exports for auditing."""
+    """
+    Log of report exports for auditing.
+
+    Large reports are exported in the background: the log row is created
+    QUEUED when the user asks for the file, picked up by an export worker,
+    and holds the generated workbook once COMPLETED. Synchronous exports
+    are logged directly as COMPLETED.
+    """
 
     class ExportFormat(models.TextChoices):
         EXCEL = "EXCEL", "Excel (.xlsx)"
         CSV = "CSV", "CSV (.csv)"
         PDF = "PDF", "PDF (.pdf)"
 
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        COMPLETED = "COMPLETED", "Completed"
+        FAILED = "FAILED", "Failed"
+
     report_type = models.CharField(max_length=50)
     export_format = models.CharField(max_length=10, choices=ExportFormat.choices)
     filters_applied = models.JSONField(default=dict, blank=True)
     record_count = models.IntegerField(default=0)
+    file_size = models.BigIntegerField(default=0, help_text="Bytes written")
+    duration_ms = models.PositiveIntegerField(default=0, help_text="Time taken to produce the export")
 
     # User who exported
     exported_by = models.ForeignKey(
@@ -71,13 +87,42 @@ class ReportExportLog(models.Model):
         null=True,
         related_name="report_exports",
     )
-    exported_at = models.DateTimeField(auto_now_add=True)
+    # Set when the export finishes; logs are written in deferred batches
+    exported_at = models.DateTimeField(default=timezone.now)
+
+    # Background export job
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.COMPLETED)
+    progress = models.PositiveSmallIntegerField(default=100, help_text="Percent of rows written")
+    report_key = models.CharField(max_length=50, blank=True, help_text="Registered report the job exports")
+    filter_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    file = models.FileField(upload_to="exports/%Y/%m/", blank=True)
+    error_message = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "report_export_logs"
         ordering = ["-exported_at"]
+        indexes = [
+            models.Index(fields=["status", "exported_at"], name="report_export_status_idx"),
+        ]
+        constraints = [
+            # One queued/running job per user, report and filters (see apps.reports.jobs)
+            models.UniqueConstraint(
+                fields=["filter_hash"],
+                condition=models.Q(status__in=["QUEUED", "RUNNING"]),
+                name="report_export_active_job_uniq",
+            ),
+        ]
         verbose_name = "Report Export Log"
         verbose_name_plural = "Report Export Logs"
 
     def __str__(self):
         return f"{self.report_type} - {self.export_format} - {self.exported_at}"
+
+    @property
+    def is_active(self):
+        return self.status in (self.Status.QUEUED, self.Status.RUNNING)
+
+    @property
+    def is_ready(self):
+        return self.status == self.Status.COMPLETED and bool(self.file)
@@ -0,0 +1,279 @@
+"""
+Tests for streaming report exports.
+"""
+import io
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from apps.common.exports import compile_columns, iter_export_rows
+from apps.reports.exports import write_excel
+
+User = get_user_model()
+
+
+@pytest.fixture
+def drill_bits(db, user):
+    from apps.workorders.models import DrillBit
+    return [
+        DrillBit.objects.create(
+            serial_number=f'XL-{i:03d}',
+            bit_type=DrillBit.BitType.FC,
+            size=Decimal('8.500'),
+            status=DrillBit.Status.IN_STOCK,
+            created_by=user,
+        )
+        for i in range(3)
+    ]
+
+
+class TestCompileColumns:
+    """Tests for export column compilation."""
+
+    def test_field_paths_become_lookups(self):
+        from apps.workorders.models import WorkOrder
+        columns = compile_columns(WorkOrder, [
+            ('wo_number', 'WO'),
+            ('customer.name', 'Customer'),
+            ('work_type', 'Missing'),
+            ('customer', 'Bare relation'),
+        ])
+        assert [c.lookup for c in columns] == ['wo_number', 'customer__name', None, None]
+        assert columns[2].exists is False
+        assert columns[3].exists is True
+
+    def test_values_path_builds_no_instances(self, drill_bits, django_assert_num_queries):
+        from apps.workorders.models import DrillBit
+        columns = compile_columns(DrillBit, [('serial_number', 'Serial'), ('created_by.username', 'By'), ('nope', 'X')])
+        with django_assert_num_queries(1):
+            rows = list(iter_export_rows(DrillBit.objects.order_by('serial_number'), columns))
+        assert rows[0] == ('XL-000', 'testuser', None)
+
+
+class TestWriteExcel:
+    """Tests for the write-only Excel writer."""
+
+    def test_roundtrip(self, drill_bits):
+        from openpyxl import load_workbook
+        from apps.workorders.models import DrillBit
+
+        output = io.BytesIO()
+        count = write_excel(
+            output,
+            DrillBit.objects.order_by('serial_number'),
+            [('serial_number', 'Serial Number'), ('size', 'Size'), ('created_at', 'Created')],
+            'Bits',
+        )
+        assert count == 3
+
+        output.seek(0)
+        ws = load_workbook(output)['Bits']
+        rows = list(ws.iter_rows(values_only=True))
+        assert rows[0] == ('Serial Number', 'Size', 'Created')
+        assert rows[1][:2] == ('XL-000', '8.500')
+        assert len(rows) == 4
+        assert ws.column_dimensions['A'].width == len('Serial Number') + 2
+
+
+class TestReportExcelExport:
+    """Tests for ExcelExportMixin responses."""
+
+    def test_low_stock_export_is_streamed(self, client, user):
+        client.force_login(user)
+        response = client.get(reverse('reports:low_stock_alert'), {'export': 'excel'})
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Disposition'] == 'attachment; filename="low_stock_alerts.xlsx"'
+        assert b''.join(response.streaming_content)[:2] == b'PK'
+
+
+class TestExportAudit:
+    """Tests for export audit logging."""
+
+    def test_excel_export_logs_rows_bytes_without_count_query(self, client, user, drill_bits):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.reports.models import ReportExportLog
+
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('reports:low_stock_alert'), {'export': 'excel', 'location': '1'})
+        content = b''.join(response.streaming_content)
+        assert not any('COUNT(' in q['sql'] for q in ctx.captured_queries)
+
+        log = ReportExportLog.objects.get()
+        assert log.export_format == 'EXCEL'
+        assert log.record_count == 0
+        assert log.file_size == len(content)
+        assert log.filters_applied == {'location': '1'}
+        assert log.exported_by == user
+
+    def test_csv_export_logged_after_streaming(self, client, user, drill_bits):
+        from apps.reports.models import ReportExportLog
+
+        client.force_login(user)
+        response = client.get(reverse('workorders:drillbit_export_csv'))
+        assert not ReportExportLog.objects.exists()
+        content = b''.join(response.streaming_content)
+
+        log = ReportExportLog.objects.get()
+        assert (log.report_type, log.export_format) == ('Drill Bits', 'CSV')
+        assert log.record_count == 3
+        assert log.file_size == len(content)
+
+    def test_deferred_writer_batches(self, db, user, settings):
+        from apps.reports.audit import ExportAuditWriter
+        from apps.reports.models import ReportExportLog
+
+        settings.ARDT_EXPORT_AUDIT_ASYNC = True
+        writer = ExportAuditWriter(batch_size=100, flush_interval=3600)
+        writer._ensure_thread = lambda: None  # flush manually in this thread
+        for i in range(3):
+            writer.record('Test', 'CSV', record_count=i, exported_by=user)
+        assert writer.pending() == 3
+        assert not ReportExportLog.objects.exists()
+
+        assert writer.flush() == 3
+        assert ReportExportLog.objects.count() == 3
+        assert writer.pending() == 0
+
+
+@pytest.fixture
+def export_media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+class TestExportJobs:
+    """Tests for background report export jobs."""
+
+    def test_export_button_queues_job(self, client, user):
+        from apps.reports.models import ReportExportLog
+
+        client.force_login(user)
+        response = client.get(reverse('reports:workorder_report'), {'export': 'excel', 'status': 'DRAFT', 'page': '2'})
+        job = ReportExportLog.objects.get()
+        assert response.status_code == 302
+        assert response.url == reverse('reports:export_job', args=[job.pk])
+        assert job.status == ReportExportLog.Status.QUEUED
+        assert job.progress == 0
+        assert job.report_key == 'work_orders'
+        assert job.filters_applied == {'status': 'DRAFT'}
+        assert job.exported_by == user
+
+    def test_identical_requests_share_a_job(self, db, user, admin_user):
+        from apps.reports.jobs import enqueue_export
+
+        first, created = enqueue_export('work_orders', {'status': 'DRAFT'}, user)
+        assert created
+        second, created = enqueue_export('work_orders', {'status': 'DRAFT'}, user)
+        assert not created
+        assert second.pk == first.pk
+
+        other, created = enqueue_export('work_orders', {'status': 'COMPLETED'}, user)
+        assert created
+        assert other.pk != first.pk
+
+        own, created = enqueue_export('work_orders', {'status': 'DRAFT'}, admin_user)
+        assert created
+        assert own.pk != first.pk
+
+    def test_concurrent_identical_request_returns_existing_job(self, db, user):
+        from unittest import mock
+        from apps.reports import jobs
+
+        first, _ = jobs.enqueue_export('work_orders', {}, user)
+        # The other request has not seen the first job yet when it inserts
+        with mock.patch.object(jobs, '_active_job', side_effect=[None, first]):
+            second, created = jobs.enqueue_export('work_orders', {}, user)
+        assert not created
+        assert second.pk == first.pk
+
+    def test_finished_job_is_not_reused(self, db, user, export_media):
+        from apps.reports.jobs import enqueue_export, run_pending_jobs
+
+        first, _ = enqueue_export('work_orders', {}, user)
+        run_pending_jobs()
+        second, created = enqueue_export('work_orders', {}, user)
+        assert created
+        assert second.pk != first.pk
+
+    def test_worker_writes_file_to_media(self, db, user, drill_bits, export_media):
+        from openpyxl import load_workbook
+        from apps.reports.jobs import enqueue_export, run_pending_jobs
+        from apps.reports.models import ReportExportLog
+        from apps.workorders.models import WorkOrder
+
+        for bit in drill_bits:
+            WorkOrder.objects.create(wo_number=f'WO-{bit.serial_number}', drill_bit=bit, created_by=user)
+        job, _ = enqueue_export('work_orders', {}, user)
+
+        assert run_pending_jobs() == 1
+        job.refresh_from_db()
+        assert job.status == ReportExportLog.Status.COMPLETED
+        assert job.progress == 100
+        assert job.record_count == 3
+        assert job.file.name.startswith('exports/')
+        assert job.file_size == job.file.size
+
+        with job.file.open('rb') as fh:
+            rows = list(load_workbook(fh)['Work Orders'].iter_rows(values_only=True))
+        assert rows[0][0] == 'WO Number'
+        assert len(rows) == 4
+
+    def test_claim_is_exclusive(self, db, user):
+        from apps.reports.jobs import claim_next_job, enqueue_export
+        from apps.reports.models import ReportExportLog
+
+        job, _ = enqueue_export('inventory', {}, user)
+        claimed = claim_next_job()
+        assert claimed.pk == job.pk
+        assert claimed.status == ReportExportLog.Status.RUNNING
+        assert claim_next_job() is None
+
+    def test_failed_job_records_error(self, db, user, export_media):
+        from apps.reports.jobs import claim_next_job, enqueue_export, run_export_job
+        from apps.reports.models import ReportExportLog
+
+        enqueue_export('work_orders', {}, user)
+        job = claim_next_job()
+        job.report_key = 'missing'
+        run_export_job(job)
+        job.refresh_from_db()
+        assert job.status == ReportExportLog.Status.FAILED
+        assert 'missing' in job.error_message
+
+    def test_status_polling_and_download(self, client, user, export_media):
+        from apps.reports.jobs import enqueue_export, run_pending_jobs
+
+        client.force_login(user)
+        job, _ = enqueue_export('supply_chain', {}, user)
+        url = reverse('reports:export_job', args=[job.pk])
+        download_url = reverse('reports:export_job_download', args=[job.pk])
+
+        response = client.get(url, HTTP_HX_REQUEST='true')
+        assert response.status_code == 200
+        assert 'hx-trigger="every 2s"' in response.content.decode()
+        assert client.get(download_url).status_code == 404
+
+        run_pending_jobs()
+        response = client.get(url, HTTP_HX_REQUEST='true')
+        assert 'hx-trigger' not in response.content.decode()
+        assert download_url in response.content.decode()
+
+        response = client.get(download_url)
+        assert response.status_code == 200
+        assert response['Content-Disposition'] == 'attachment; filename="supply_chain_report.xlsx"'
+        assert b''.join(response.streaming_content)[:2] == b'PK'
+
+    def test_jobs_are_private_to_their_user(self, client, user, admin_user, export_media):
+        from apps.reports.jobs import enqueue_export, run_pending_jobs
+
+        job, _ = enqueue_export('supply_chain', {}, user)
+        run_pending_jobs()
+
+        client.force_login(admin_user)
+        assert client.get(reverse('reports:export_job', args=[job.pk])).status_code == 404
+        assert client.get(reverse('reports:export_job_download', args=[job.pk])).status_code == 404
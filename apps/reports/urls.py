@@ -24,4 +24,7 @@ urlpatterns = [
     path("equipment-health/", views.EquipmentHealthReportView.as_view(), name="equipment_health"),
     # Supply Chain
     path("supply-chain/", views.SupplyChainReportView.as_view(), name="supplychain_report"),
+    # Background exports
+    path("exports/<int:pk>/", views.ExportJobDetailView.as_view(), name="export_job"),
+    path("exports/<int:pk>/download/", views.ExportJobDownloadView.as_view(), name="export_job_download"),
 ]
@@ -4,17 +4,18 @@ Version: 5.4
 Comprehensive reporting suite with Excel export.
 """
 
-import io
+import tempfile
 from datetime import timedelta
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Avg, Count, F, Q, Sum
 from django.db.models.functions import TruncDate, TruncMonth
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.views.generic import ListView, TemplateView, View
+from django.views.generic import DetailView, ListView, TemplateView, View
 
 from apps.inventory.models import InventoryItem, InventoryStock, InventoryTransaction
 from apps.maintenance.models import Equipment, MaintenanceRequest, MaintenanceWorkOrder
@@ -22,6 +23,9 @@ from apps.quality.models import Inspection, NCR
 from apps.supplychain.models import CAPA, PurchaseOrder, PurchaseRequisition, Receipt, Supplier, Vendor
 from apps.workorders.models import DrillBit, WorkOrder
 
+from .audit import ExportTimer, export_audit, export_filters
+from .exports import EXCEL_CONTENT_TYPE, write_excel
+from .jobs import enqueue_export, get_report_view
 from .models import ReportExportLog
 
 
@@ -31,12 +35,27 @@ from .models import ReportExportLog
 
 
 class ExcelExportMixin:
-    """Mixin to add Excel export capability to views."""
+    """
+    Mixin to add Excel export capability to views.
+
+    Small reports are written inline with export_to_excel(). Reports that
+    can grow large declare export_report_key/export_columns and hand the
+    export to a background job with queue_export().
+    """
+
+    export_report_key = None
+    export_filename = "report"
+    export_sheet_name = "Report"
+    export_columns = []
 
     def export_to_excel(self, queryset, columns, filename, sheet_name="Report"):
         """
         Export queryset to Excel file.
 
+        The workbook is written in openpyxl write-only mode to a temporary
+        file, which is then streamed to the client, so memory use does not
+        grow with the number of rows.
+
         Args:
             queryset: Django queryset to export
             columns: List of tuples (field_name, header_name)
@@ -44,92 +63,85 @@ class ExcelExportMixin:
             sheet_name: Name of the Excel sheet
         """
         try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
-            from openpyxl.utils import get_column_letter
+            import openpyxl  # noqa: F401
         except ImportError:
             return HttpResponse("openpyxl is not installed. Please install it with: pip install openpyxl", status=500)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-
-        # Styles
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
-        # Write headers
-        for col_idx, (field, header) in enumerate(columns, 1):
-            cell = ws.cell(row=1, column=col_idx, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # Write data
-        for row_idx, obj in enumerate(queryset, 2):
-            for col_idx, (field, header) in enumerate(columns, 1):
-                # Handle nested fields (e.g., "customer.name")
-                value = obj
-                for part in field.split("."):
-                    if value is None:
-                        break
-                    if hasattr(value, part):
-                        value = getattr(value, part)
-                    elif hasattr(value, "get"):
-                        value = value.get(part)
-                    else:
-                        value = None
-
-                # Handle callable (properties)
-                if callable(value):
-                    value = value()
-
-                # Format specific types
-                if hasattr(value, "strftime"):
-                    value = value.strftime("%Y-%m-%d %H:%M") if hasattr(value, "hour") else value.strftime("%Y-%m-%d")
-
-                cell = ws.cell(row=row_idx, column=col_idx, value=str(value) if value is not None else "")
-                cell.border = thin_border
-
-        # Auto-adjust column widths
-        for col_idx, (field, header) in enumerate(columns, 1):
-            col_letter = get_column_letter(col_idx)
-            max_length = len(header)
-            for row in range(2, min(ws.max_row + 1, 100)):  # Check first 100 rows
-                cell_value = ws.cell(row=row, column=col_idx).value
-                if cell_value:
-                    max_length = max(max_length, len(str(cell_value)))
-            ws.column_dimensions[col_letter].width = min(max_length + 2, 50)
-
-        # Create response
-        output = io.BytesIO()
-        wb.save(output)
+        timer = ExportTimer()
+        output = tempfile.TemporaryFile()
+        try:
+            row_count = write_excel(output, queryset, columns, sheet_name)
+        except Exception:
+            output.close()
+            raise
+        file_size = output.tell()
         output.seek(0)
 
-        response = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+        response = FileResponse(output, content_type=EXCEL_CONTENT_TYPE)
         response["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
 
-        # Log export
-        ReportExportLog.objects.create(
-            report_type=sheet_name,
-            export_format="EXCEL",
-            record_count=queryset.count() if hasattr(queryset, "count") else len(queryset),
-            exported_by=self.request.user if hasattr(self, "request") else None,
+        # Log export (rows counted while writing; the log row is written in a deferred batch)
+        request = getattr(self, "request", None)
+        export_audit.record(
+            sheet_name,
+            "EXCEL",
+            record_count=row_count,
+            file_size=file_size,
+            duration_ms=timer.elapsed_ms,
+            exported_by=getattr(request, "user", None),
+            filters_applied=export_filters(request),
         )
 
         return response
 
+    def queue_export(self, request):
+        """Queue a background Excel export and send the user to its status page."""
+        job, created = enqueue_export(self.export_report_key, export_filters(request), request.user)
+        if created:
+            messages.info(request, f"{self.export_sheet_name} export queued. The file will be ready to download here.")
+        else:
+            messages.info(request, f"An identical {self.export_sheet_name} export is already in progress.")
+        return redirect("reports:export_job", pk=job.pk)
+
+
+# =============================================================================
+# Background Export Jobs
+# =============================================================================
+
+
+class ExportJobDetailView(LoginRequiredMixin, DetailView):
+    """Status page for a background export; HTMX polls it until the file is ready."""
+
+    model = ReportExportLog
+    template_name = "reports/export_job.html"
+    context_object_name = "job"
+
+    def get_queryset(self):
+        return ReportExportLog.objects.exclude(report_key="").filter(exported_by=self.request.user).select_related(
+            "exported_by"
+        )
+
+    def get_template_names(self):
+        if getattr(self.request, "htmx", False):
+            return ["reports/partials/export_job_status.html"]
+        return [self.template_name]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["page_title"] = f"{self.object.report_type} Export"
+        return context
+
+
+class ExportJobDownloadView(LoginRequiredMixin, View):
+    """Download the workbook produced by a completed export job."""
+
+    def get(self, request, pk):
+        job = get_object_or_404(ReportExportLog.objects.exclude(report_key="").filter(exported_by=request.user), pk=pk)
+        if not job.is_ready:
+            raise Http404("Export is not ready")
+        filename = f"{get_report_view(job.report_key).export_filename}.xlsx"
+        return FileResponse(job.file.open("rb"), as_attachment=True, filename=filename, content_type=EXCEL_CONTENT_TYPE)
+
 
 # =============================================================================
 # Reports Dashboard
@@ -174,6 +186,22 @@ class WorkOrderReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
     context_object_name = "work_orders"
     paginate_by = 50
 
+    export_report_key = "work_orders"
+    export_filename = "work_order_report"
+    export_sheet_name = "Work Orders"
+    export_columns = [
+        ("wo_number", "WO Number"),
+        ("customer.name", "Customer"),
+        ("drill_bit.serial_number", "Bit Serial"),
+        ("work_type", "Type"),
+        ("status", "Status"),
+        ("priority", "Priority"),
+        ("assigned_to.username", "Assigned To"),
+        ("created_at", "Created"),
+        ("due_date", "Due Date"),
+        ("completed_at", "Completed"),
+    ]
+
     def get_queryset(self):
         qs = WorkOrder.objects.select_related("customer", "drill_bit", "assigned_to", "design").order_by("-created_at")
 
@@ -215,19 +243,7 @@ class WorkOrderReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
 
     def get(self, request, *args, **kwargs):
         if request.GET.get("export") == "excel":
-            columns = [
-                ("wo_number", "WO Number"),
-                ("customer.name", "Customer"),
-                ("drill_bit.serial_number", "Bit Serial"),
-                ("work_type", "Type"),
-                ("status", "Status"),
-                ("priority", "Priority"),
-                ("assigned_to.username", "Assigned To"),
-                ("created_at", "Created"),
-                ("due_date", "Due Date"),
-                ("completed_at", "Completed"),
-            ]
-            return self.export_to_excel(self.get_queryset(), columns, "work_order_report", "Work Orders")
+            return self.queue_export(request)
         return super().get(request, *args, **kwargs)
 
 
@@ -244,6 +260,21 @@ class InventoryReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
     context_object_name = "stock_items"
     paginate_by = 50
 
+    export_report_key = "inventory"
+    export_filename = "inventory_report"
+    export_sheet_name = "Inventory"
+    export_columns = [
+        ("item.code", "Item Code"),
+        ("item.name", "Item Name"),
+        ("item.category.name", "Category"),
+        ("location.name", "Location"),
+        ("quantity_on_hand", "Qty On Hand"),
+        ("quantity_reserved", "Qty Reserved"),
+        ("quantity_available", "Qty Available"),
+        ("item.reorder_point", "Reorder Point"),
+        ("item.standard_cost", "Unit Cost"),
+    ]
+
     def get_queryset(self):
         qs = InventoryStock.objects.select_related("item", "item__category", "location").order_by("item__name")
 
@@ -283,18 +314,7 @@ class InventoryReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
 
     def get(self, request, *args, **kwargs):
         if request.GET.get("export") == "excel":
-            columns = [
-                ("item.code", "Item Code"),
-                ("item.name", "Item Name"),
-                ("item.category.name", "Category"),
-                ("location.name", "Location"),
-                ("quantity_on_hand", "Qty On Hand"),
-                ("quantity_reserved", "Qty Reserved"),
-                ("quantity_available", "Qty Available"),
-                ("item.reorder_point", "Reorder Point"),
-                ("item.standard_cost", "Unit Cost"),
-            ]
-            return self.export_to_excel(self.get_queryset(), columns, "inventory_report", "Inventory")
+            return self.queue_export(request)
         return super().get(request, *args, **kwargs)
 
 
@@ -345,6 +365,21 @@ class QualityReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
     context_object_name = "ncrs"
     paginate_by = 50
 
+    export_report_key = "quality"
+    export_filename = "quality_report"
+    export_sheet_name = "NCRs"
+    export_columns = [
+        ("ncr_number", "NCR Number"),
+        ("work_order.wo_number", "Work Order"),
+        ("ncr_type", "Type"),
+        ("severity", "Severity"),
+        ("status", "Status"),
+        ("description", "Description"),
+        ("reported_by.username", "Reported By"),
+        ("created_at", "Created"),
+        ("closed_date", "Closed Date"),
+    ]
+
     def get_queryset(self):
         qs = NCR.objects.select_related("work_order", "inspection", "reported_by").order_by("-created_at")
 
@@ -397,18 +432,7 @@ class QualityReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
 
     def get(self, request, *args, **kwargs):
         if request.GET.get("export") == "excel":
-            columns = [
-                ("ncr_number", "NCR Number"),
-                ("work_order.wo_number", "Work Order"),
-                ("ncr_type", "Type"),
-                ("severity", "Severity"),
-                ("status", "Status"),
-                ("description", "Description"),
-                ("reported_by.username", "Reported By"),
-                ("created_at", "Created"),
-                ("closed_date", "Closed Date"),
-            ]
-            return self.export_to_excel(self.get_queryset(), columns, "quality_report", "NCRs")
+            return self.queue_export(request)
         return super().get(request, *args, **kwargs)
 
 
@@ -425,6 +449,20 @@ class MaintenanceReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
     context_object_name = "mwos"
     paginate_by = 50
 
+    export_report_key = "maintenance"
+    export_filename = "maintenance_report"
+    export_sheet_name = "Maintenance"
+    export_columns = [
+        ("mwo_number", "MWO Number"),
+        ("equipment.code", "Equipment"),
+        ("work_type", "Work Type"),
+        ("status", "Status"),
+        ("priority", "Priority"),
+        ("assigned_to.username", "Assigned To"),
+        ("scheduled_date", "Scheduled"),
+        ("completed_date", "Completed"),
+    ]
+
     def get_queryset(self):
         qs = MaintenanceWorkOrder.objects.select_related("equipment", "request", "assigned_to").order_by("-created_at")
 
@@ -474,17 +512,7 @@ class MaintenanceReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
 
     def get(self, request, *args, **kwargs):
         if request.GET.get("export") == "excel":
-            columns = [
-                ("mwo_number", "MWO Number"),
-                ("equipment.code", "Equipment"),
-                ("work_type", "Work Type"),
-                ("status", "Status"),
-                ("priority", "Priority"),
-                ("assigned_to.username", "Assigned To"),
-                ("scheduled_date", "Scheduled"),
-                ("completed_date", "Completed"),
-            ]
-            return self.export_to_excel(self.get_queryset(), columns, "maintenance_report", "Maintenance")
+            return self.queue_export(request)
         return super().get(request, *args, **kwargs)
 
 
@@ -539,6 +567,19 @@ class SupplyChainReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
     context_object_name = "purchase_orders"
     paginate_by = 50
 
+    export_report_key = "supply_chain"
+    export_filename = "supply_chain_report"
+    export_sheet_name = "Purchase Orders"
+    export_columns = [
+        ("po_number", "PO Number"),
+        ("supplier.name", "Supplier"),
+        ("status", "Status"),
+        ("order_date", "Order Date"),
+        ("expected_date", "Expected Date"),
+        ("total_amount", "Total Amount"),
+        ("created_by.username", "Created By"),
+    ]
+
     def get_queryset(self):
         qs = PurchaseOrder.objects.select_related("supplier", "created_by").order_by("-created_at")
 
@@ -581,14 +622,5 @@ class SupplyChainReportView(LoginRequiredMixin, ExcelExportMixin, ListView):
 
     def get(self, request, *args, **kwargs):
         if request.GET.get("export") == "excel":
-            columns = [
-                ("po_number", "PO Number"),
-                ("supplier.name", "Supplier"),
-                ("status", "Status"),
-                ("order_date", "Order Date"),
-                ("expected_date", "Expected Date"),
-                ("total_amount", "Total Amount"),
-                ("created_by.username", "Created By"),
-            ]
-            return self.export_to_excel(self.get_queryset(), columns, "supply_chain_report", "Purchase Orders")
+            return self.queue_export(request)
         return super().get(request, *args, **kwargs)
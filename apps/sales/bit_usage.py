@@ -0,0 +1,163 @@
+"""
+ARDT FMS - Drill Bit Usage Accumulation
+Version: 5.4
+
+Race free maintenance of a drill bit's usage counters.
+
+DrillBit.total_hours, total_footage and run_count, and the per hour type
+totals in DrillBitHourTotal, are only ever changed by adding deltas with
+F() expressions, so concurrent run completions and hour entries cannot
+overwrite each other and no history is re-read on save:
+
+    - a completed FieldDrillStringRun adds its spud to out-of-hole hours,
+      its footage and one run;
+    - a RunHours entry adds its hours to its (bit, hour type) total, and
+      TOTAL entries not linked to a run also add to DrillBit.total_hours
+      (hours logged against a run are counted once, when it completes).
+
+RunHours.cumulative_hours is the (bit, hour type) total right after the
+entry was added, so it follows insertion order, not record_date: a
+backdated entry continues the total of the entries entered before it.
+recompute_bit_usage() rebuilds everything from history
+to repair drift (command: recompute_bit_usage).
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.workorders.models import DrillBit
+
+from .models import DrillBitHourTotal, FieldDrillStringRun, RunHours
+
+USAGE_FIELDS = ("total_hours", "total_footage", "run_count")
+
+
+def add_bit_usage(bit, hours=0, footage=0, runs=0):
+    """
+    Add usage deltas to a DrillBit with one atomic UPDATE.
+
+    `bit` is a DrillBit instance; its counters are refreshed afterwards.
+    """
+    if not (hours or footage or runs):
+        return bit
+    bit.total_hours = F("total_hours") + Decimal(str(hours))
+    bit.total_footage = F("total_footage") + int(footage)
+    bit.run_count = F("run_count") + runs
+    bit.save(update_fields=[*USAGE_FIELDS, "updated_at"])
+    bit.refresh_from_db(fields=USAGE_FIELDS)
+    return bit
+
+
+def add_hours(bit_id, hour_type, hours):
+    """
+    Add hours to a bit's total for an hour type and return the new total.
+
+    The counter row stays locked until the surrounding transaction ends,
+    so the returned total is consistent with concurrent entries.
+    """
+    counters = DrillBitHourTotal.objects.filter(drill_bit_id=bit_id, hour_type=hour_type)
+    if not counters.update(hours=F("hours") + hours):
+        try:
+            with transaction.atomic():
+                DrillBitHourTotal.objects.create(drill_bit_id=bit_id, hour_type=hour_type, hours=hours)
+            return Decimal(hours)
+        except IntegrityError:
+            counters.update(hours=F("hours") + hours)
+    return counters.values_list("hours", flat=True).get()
+
+
+def run_usage(spud_time, out_of_hole_time, footage_drilled):
+    """(hours, footage) a completed run adds to its bit."""
+    hours = Decimal("0")
+    if spud_time and out_of_hole_time:
+        hours = Decimal(str(round((out_of_hole_time - spud_time).total_seconds() / 3600, 2)))
+    return hours, int(footage_drilled or 0)
+
+
+def counts_toward_bit_hours(hour_type, field_run_id):
+    return hour_type == RunHours.HourType.TOTAL and field_run_id is None
+
+
+@dataclass
+class RecomputeResult:
+    bits: int = 0
+    drifted: list = field(default_factory=list)
+    hour_entries: int = 0
+
+
+def _history_bits(bit_ids):
+    runs = FieldDrillStringRun.objects.filter(status=FieldDrillStringRun.Status.COMPLETED)
+    hours = RunHours.objects.all()
+    if bit_ids is not None:
+        runs, hours = runs.filter(drill_bit_id__in=bit_ids), hours.filter(drill_bit_id__in=bit_ids)
+    found = set(runs.values_list("drill_bit_id", flat=True)) | set(hours.values_list("drill_bit_id", flat=True))
+    return found, runs, hours
+
+
+def recompute_bit_usage(bit_ids=None, dry_run=False, batch_size=1000):
+    """
+    Rebuild usage counters from run and hour history.
+
+    Only bits with completed runs or hour entries are touched (counters of
+    bits without history may hold usage imported from elsewhere); they are
+    locked while rebuilding. Cumulative hours are renumbered in insertion
+    (created_at, pk) order, as RunHours.save assigns them. Returns a RecomputeResult listing
+    the drifted bits as (serial, stored, expected).
+    """
+    with transaction.atomic():
+        return _recompute(bit_ids, dry_run, batch_size)
+
+
+def _recompute(bit_ids, dry_run, batch_size):
+    found, runs, hours = _history_bits(bit_ids)
+    expected = {bit_id: [Decimal("0"), 0, 0] for bit_id in found}
+    for bit_id, spud, out, footage in runs.values_list("drill_bit_id", "spud_time", "out_of_hole_time", "footage_drilled"):
+        run_hours, run_footage = run_usage(spud, out, footage)
+        expected[bit_id][0] += run_hours
+        expected[bit_id][1] += run_footage
+        expected[bit_id][2] += 1
+    loose = hours.filter(hour_type=RunHours.HourType.TOTAL, field_run__isnull=True)
+    for row in loose.values("drill_bit_id").annotate(total=Sum("hours")).order_by():
+        expected[row["drill_bit_id"]][0] += row["total"]
+
+    result = RecomputeResult(bits=len(found))
+    bits = []
+    locked = DrillBit.objects.filter(pk__in=found).order_by("pk").only("pk", "serial_number", *USAGE_FIELDS)
+    for bit in locked if dry_run else locked.select_for_update():
+        values = tuple(expected[bit.pk])
+        if (bit.total_hours, bit.total_footage, bit.run_count) != values:
+            result.drifted.append((bit.serial_number, (bit.total_hours, bit.total_footage, bit.run_count), values))
+            bit.total_hours, bit.total_footage, bit.run_count = values
+            bits.append(bit)
+
+    running = defaultdict(Decimal)
+    entries = []
+    for entry in hours.order_by("drill_bit_id", "hour_type", "created_at", "pk").only(
+        "pk", "drill_bit_id", "hour_type", "hours", "cumulative_hours"
+    ).iterator(chunk_size=batch_size):
+        key = (entry.drill_bit_id, entry.hour_type)
+        running[key] += entry.hours
+        if entry.cumulative_hours != running[key]:
+            entry.cumulative_hours = running[key]
+            entries.append(entry)
+    result.hour_entries = len(entries)
+    if dry_run:
+        return result
+
+    now = timezone.now()
+    for bit in bits:
+        bit.updated_at = now
+    DrillBit.objects.bulk_update(bits, [*USAGE_FIELDS, "updated_at"], batch_size=batch_size)
+    RunHours.objects.bulk_update(entries, ["cumulative_hours"], batch_size=batch_size)
+    DrillBitHourTotal.objects.filter(drill_bit_id__in=found).delete()
+    DrillBitHourTotal.objects.bulk_create(
+        [DrillBitHourTotal(drill_bit_id=bit_id, hour_type=hour_type, hours=total)
+         for (bit_id, hour_type), total in running.items()],
+        batch_size=batch_size,
+    )
+    return result
@@ -0,0 +1,397 @@
+"""
+ARDT FMS - Drilling Analytics
+Version: 5.4
+
+Derived drilling values for a whole run, computed over column arrays.
+
+A run's FieldRunData samples are loaded once into time ordered NumPy
+float columns (NaN for missing values). Every derived series is then a
+vectorized expression over those columns; trailing time windows are
+resolved with searchsorted and differences of cumulative sums:
+
+    - on-bottom detection (WOB above a threshold, bit at hole depth)
+    - ROP from new hole made per on-bottom hour over a trailing time window
+    - Teale mechanical specific energy (MSE)
+    - bit hydraulic horsepower
+    - rolling mean / standard deviation of any column
+
+    analysis = analyze_run(run)
+    analysis.summary()                    # run level averages, maxima, on-bottom hours
+    analysis.interval(start, end)         # FieldPerformanceLog values for an interval
+    write_back(analysis)                  # bulk_update mse / rop / bit_hydraulic_power
+
+Units follow FieldRunData: WOB klbs, torque ft-lbs, ROP ft/hr, depth ft,
+flow GPM, pressure psi, mud weight ppg, bit size and TFA in inches/in².
+"""
+
+import math
+from array import array
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from django.db import transaction
+
+from .models import FieldDrillStringRun, FieldRunData
+
+NAN = float("nan")
+
+# Columns loaded from FieldRunData (timestamp as epoch seconds)
+COLUMNS = (
+    "timestamp", "bit_depth", "hole_depth", "wob", "rpm", "torque", "rop",
+    "flow_rate", "differential_pressure", "mud_weight_in",
+)
+
+# On-bottom detection
+ON_BOTTOM_MIN_WOB = 1.0  # klbs
+ON_BOTTOM_DEPTH_TOLERANCE = 1.0  # ft above hole depth
+# Longest gap between samples still counted as continuous on-bottom time
+ON_BOTTOM_MAX_GAP = 60  # seconds
+
+# Trailing window for depth based ROP
+ROP_WINDOW = 60  # seconds
+
+HYDRAULIC_HP_CONSTANT = 1714
+NOZZLE_PRESSURE_CONSTANT = 12031
+
+WRITE_BATCH_SIZE = 1000
+
+
+def _float(value):
+    return NAN if value is None else float(value)
+
+
+def _present(value):
+    return not math.isnan(value)
+
+
+def _column(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def bit_area(bit_size):
+    """Bit face area in in² for a bit diameter in inches."""
+    return math.pi * float(bit_size) ** 2 / 4
+
+
+def teale_mse(wob, rpm, torque, rop, area):
+    """
+    Teale (1965) mechanical specific energy in psi:
+
+        MSE = WOB / A + 120 π N T / (A ROP)
+
+    with WOB in lbf, A in in², N in RPM, T in ft-lbf and ROP in ft/hr.
+    Samples without all inputs or with ROP <= 0 get NaN.
+    """
+    wob, rpm, torque, rop = map(_column, (wob, rpm, torque, rop))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mse = wob * 1000 / area + (120 * math.pi / area) * rpm * torque / rop
+    return np.where(rop > 0, mse, np.nan)
+
+
+def detect_on_bottom(bit_depth, hole_depth, wob, min_wob=ON_BOTTOM_MIN_WOB, tolerance=ON_BOTTOM_DEPTH_TOLERANCE):
+    """
+    True where the bit is drilling: WOB above `min_wob` and the bit within
+    `tolerance` of hole depth. Missing hole depth falls back to the deepest
+    bit depth reached so far.
+    """
+    bit_depth, hole_depth, wob = map(_column, (bit_depth, hole_depth, wob))
+    if not len(bit_depth):
+        return np.zeros(0, dtype=bool)
+    # Deepest point reached so far, counting hole depth only on samples with a bit depth
+    reached = np.where(np.isnan(bit_depth), np.nan, np.fmax(bit_depth, hole_depth))
+    deepest = np.fmax.accumulate(reached)
+    return (wob > min_wob) & (deepest - bit_depth <= tolerance)
+
+
+def _window_starts(times, window, side):
+    """Index of the first sample inside each sample's trailing window."""
+    return np.searchsorted(times, times - window, side=side)
+
+
+def _drilling_intervals(on_bottom):
+    """True for samples that end an interval spent on bottom."""
+    on_bottom = np.asarray(on_bottom, dtype=bool)
+    intervals = np.zeros(len(on_bottom), dtype=bool)
+    intervals[1:] = on_bottom[1:] & on_bottom[:-1]
+    return intervals
+
+
+def _on_bottom_seconds(times, on_bottom, max_gap=ON_BOTTOM_MAX_GAP):
+    """Running total of on-bottom seconds, gaps capped at `max_gap`."""
+    seconds = np.zeros(len(times))
+    if len(times):
+        gaps = np.minimum(np.diff(times), max_gap)
+        seconds[1:] = np.where(_drilling_intervals(on_bottom)[1:], gaps, 0.0)
+    return np.cumsum(seconds)
+
+
+def rop_from_depth(times, bit_depth, on_bottom, window=ROP_WINDOW, max_gap=ON_BOTTOM_MAX_GAP):
+    """
+    ROP in ft/hr: new hole made (deepest bit depth gained) per on-bottom
+    hour over a trailing `window` of seconds, so reaming back to bottom
+    and off-bottom time do not count. NaN while off bottom.
+    """
+    times, bit_depth = _column(times), _column(bit_depth)
+    on_bottom = np.asarray(on_bottom, dtype=bool)
+    if not len(times):
+        return np.zeros(0)
+
+    # Running totals of new hole and on-bottom seconds, differenced over the window
+    previous = np.full(len(bit_depth), np.nan)
+    previous[1:] = np.fmax.accumulate(bit_depth)[:-1]
+    gained = _drilling_intervals(on_bottom) & (bit_depth > previous)
+    drilled = np.cumsum(np.where(gained, bit_depth - previous, 0.0))
+    drilling = _on_bottom_seconds(times, on_bottom, max_gap)
+
+    start = _window_starts(times, window, "left")
+    elapsed = drilling - drilling[start]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rop = (drilled - drilled[start]) / elapsed * 3600
+    return np.where(on_bottom & (elapsed > 0), rop, np.nan)
+
+
+def bit_pressure_drop(flow_rate, mud_weight, tfa):
+    """Nozzle pressure drop in psi: MW Q² / (12031 TFA²)."""
+    flow_rate = _column(flow_rate)
+    return _column(mud_weight) * flow_rate * flow_rate / (NOZZLE_PRESSURE_CONSTANT * tfa ** 2)
+
+
+def hydraulic_horsepower(flow_rate, pressure_drop):
+    """Hydraulic horsepower: ΔP Q / 1714 (NaN propagates)."""
+    return _column(pressure_drop) * _column(flow_rate) / HYDRAULIC_HP_CONSTANT
+
+
+def rolling_stats(times, values, window):
+    """
+    Trailing time window mean and standard deviation, ignoring NaN.
+
+    Window sums are differences of cumulative sums of the values, their
+    squares and their counts. Returns (means, stds) arrays.
+    """
+    times, values = _column(times), _column(values)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    totals, squares, counts = (
+        np.concatenate(([0.0], np.cumsum(column))) for column in (filled, filled * filled, present)
+    )
+    start, stop = _window_starts(times, window, "right"), np.arange(1, len(times) + 1)
+    count = counts[stop] - counts[start]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (totals[stop] - totals[start]) / count
+        variances = (squares[stop] - squares[start]) / count - means * means
+    return np.where(count > 0, means, np.nan), np.where(count > 0, np.sqrt(np.maximum(variances, 0.0)), np.nan)
+
+
+class RunSamples:
+    """A run's FieldRunData as time ordered float columns."""
+
+    def __init__(self, field_run, pks, columns):
+        self.field_run = field_run
+        self.pks = pks
+        self.columns = columns
+
+    @classmethod
+    def load(cls, field_run, chunk_size=5000):
+        pks = array("q")
+        columns = {name: array("d") for name in COLUMNS}
+        targets = [columns[name] for name in COLUMNS]
+        rows = (
+            FieldRunData.objects.filter(field_run=field_run)
+            .order_by("timestamp", "pk")
+            .values_list("pk", *COLUMNS)
+            .iterator(chunk_size=chunk_size)
+        )
+        for row in rows:
+            pks.append(row[0])
+            targets[0].append(row[1].timestamp())
+            for target, value in zip(targets[1:], row[2:]):
+                target.append(_float(value))
+        return cls(field_run, np.asarray(pks, dtype=np.int64), {name: _column(columns[name]) for name in COLUMNS})
+
+    def __len__(self):
+        return len(self.pks)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+def _present_values(values):
+    values = _column(values)
+    return values[~np.isnan(values)]
+
+
+def _mean(values):
+    present = _present_values(values)
+    return float(present.mean()) if present.size else None
+
+
+def _max(values):
+    present = _present_values(values)
+    return float(present.max()) if present.size else None
+
+
+def _min(values):
+    present = _present_values(values)
+    return float(present.min()) if present.size else None
+
+
+def _decimal(value, places=2):
+    if value is None or not _present(value):
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(repr(float(value)))
+    return value.quantize(Decimal(1).scaleb(-places))
+
+
+class RunAnalysis:
+    """Derived series of one run (arrays aligned with samples.pks)."""
+
+    def __init__(self, samples, on_bottom, rop, mse, hydraulic_power):
+        self.samples = samples
+        self.on_bottom = on_bottom
+        self.rop = rop
+        self.mse = mse
+        self.hydraulic_power = hydraulic_power
+
+    def effective_rop(self):
+        """Recorded ROP where present, else the depth based ROP."""
+        recorded = self.samples["rop"]
+        return np.where(np.isnan(recorded), self.rop, recorded)
+
+    def on_bottom_hours(self, start=0, stop=None):
+        times = self.samples["timestamp"]
+        stop = len(times) if stop is None else stop
+        if stop - start < 2:
+            return 0.0
+        seconds = _on_bottom_seconds(times[start:stop], self.on_bottom[start:stop])
+        return float(seconds[-1]) / 3600
+
+    def _stats(self, start, stop):
+        samples = self.samples
+        drilling = self.on_bottom[start:stop]
+        depths = _present_values(samples["bit_depth"][start:stop])
+        on_bottom_rop = self.effective_rop()[start:stop][drilling]
+        return {
+            "start_depth": _decimal(depths[0]) if depths.size else None,
+            "end_depth": _decimal(depths.max()) if depths.size else None,
+            "footage_drilled": _decimal(depths.max() - depths[0]) if depths.size else None,
+            "on_bottom_hours": _decimal(self.on_bottom_hours(start, stop)),
+            "avg_wob": _decimal(_mean(samples["wob"][start:stop][drilling])),
+            "avg_rpm": _decimal(_mean(samples["rpm"][start:stop][drilling])),
+            "avg_torque": _decimal(_mean(samples["torque"][start:stop][drilling])),
+            "avg_flow_rate": _decimal(_mean(samples["flow_rate"][start:stop])),
+            "avg_mse": _decimal(_mean(self.mse[start:stop][drilling])),
+            "avg_rop": _decimal(_mean(on_bottom_rop)),
+            "max_rop": _decimal(_max(on_bottom_rop)),
+            "min_rop": _decimal(_min(on_bottom_rop)),
+        }
+
+    def summary(self):
+        """Whole run statistics (averages over on-bottom samples)."""
+        return self._stats(0, len(self.samples))
+
+    def interval(self, start_time, end_time):
+        """Statistics for samples with start_time <= timestamp < end_time (FieldPerformanceLog fields)."""
+        times = self.samples["timestamp"]
+        start, stop = np.searchsorted(times, [start_time.timestamp(), end_time.timestamp()])
+        return self._stats(start, stop)
+
+    def rolling(self, column, window=300):
+        """Rolling (mean, std) of a sample column or of "mse" / "rop"."""
+        values = getattr(self, column) if column in ("mse", "rop") else self.samples[column]
+        return rolling_stats(self.samples["timestamp"], values, window)
+
+
+def analyze_run(field_run, bit_size=None, tfa=None, min_wob=ON_BOTTOM_MIN_WOB, rop_window=ROP_WINDOW):
+    """
+    Load a run's samples and compute its derived series.
+
+    `bit_size` defaults to the run's drill bit size. With a nozzle `tfa`
+    (in²), bit hydraulic power uses the nozzle pressure drop; otherwise the
+    recorded differential pressure is taken as the drop across the bit.
+    """
+    if bit_size is None:
+        bit_size = FieldDrillStringRun.objects.filter(pk=getattr(field_run, "pk", field_run)).values_list(
+            "drill_bit__size", flat=True
+        ).first()
+    samples = RunSamples.load(field_run)
+
+    on_bottom = detect_on_bottom(samples["bit_depth"], samples["hole_depth"], samples["wob"], min_wob=min_wob)
+    rop = rop_from_depth(samples["timestamp"], samples["bit_depth"], on_bottom, window=rop_window)
+    analysis = RunAnalysis(samples, on_bottom, rop, np.full(len(samples), np.nan), None)
+
+    if bit_size:
+        analysis.mse = teale_mse(
+            samples["wob"], samples["rpm"], samples["torque"], analysis.effective_rop(), bit_area(bit_size)
+        )
+    if tfa:
+        pressure_drop = bit_pressure_drop(samples["flow_rate"], samples["mud_weight_in"], float(tfa))
+    else:
+        pressure_drop = samples["differential_pressure"]
+    analysis.hydraulic_power = hydraulic_horsepower(samples["flow_rate"], pressure_drop)
+    return analysis
+
+
+def _field_limit(name):
+    model_field = FieldRunData._meta.get_field(name)
+    return Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+
+
+def write_back(analysis, fill_rop=True, update_run=False, batch_size=WRITE_BATCH_SIZE):
+    """
+    Store derived values on the run's FieldRunData rows with bulk_update.
+
+    Writes mse and bit_hydraulic_power, and rop where none was recorded
+    (`fill_rop`). The run's rollups are rebuilt afterwards. With
+    `update_run` the run's averages, maxima and on-bottom hours are updated
+    from summary(). Returns the number of rows written.
+    """
+    from .run_rollups import rebuild_rollups
+
+    fields = ["mse", "bit_hydraulic_power"] + (["rop"] if fill_rop else [])
+    limits = {name: _field_limit(name) for name in fields}
+
+    def bounded(name, value):
+        try:
+            value = _decimal(value)
+        except InvalidOperation:
+            return None
+        if value is None or abs(value) >= limits[name]:
+            return None
+        return value
+
+    samples = analysis.samples
+    points = []
+    for i, pk in enumerate(samples.pks.tolist()):
+        point = FieldRunData(
+            pk=pk,
+            mse=bounded("mse", analysis.mse[i]),
+            bit_hydraulic_power=bounded("bit_hydraulic_power", analysis.hydraulic_power[i]),
+        )
+        if fill_rop:
+            recorded = samples["rop"][i]
+            point.rop = _decimal(recorded) if _present(recorded) else bounded("rop", analysis.rop[i])
+        points.append(point)
+
+    with transaction.atomic():
+        FieldRunData.objects.bulk_update(points, fields, batch_size=batch_size)
+        rebuild_rollups(samples.field_run)
+        if update_run and len(samples):
+            summary = analysis.summary()
+            wob, rpm, torque = (_max(samples[name]) for name in ("wob", "rpm", "torque"))
+            FieldDrillStringRun.objects.filter(pk=getattr(samples.field_run, "pk", samples.field_run)).update(
+                avg_wob=summary["avg_wob"], max_wob=_decimal(wob),
+                avg_rpm=_decimal(summary["avg_rpm"], 1), max_rpm=_decimal(rpm, 1),
+                avg_torque=summary["avg_torque"], max_torque=_decimal(torque),
+                avg_rop=summary["avg_rop"], max_rop=summary["max_rop"],
+                total_on_bottom_hours=summary["on_bottom_hours"],
+            )
+    return len(points)
+
+
+def teale_mse_value(wob, rpm, torque, rop, bit_size):
+    """Teale MSE of a single sample as a Decimal (None when not computable)."""
+    if None in (wob, rpm, torque, rop) or not bit_size:
+        return None
+    value = teale_mse([float(wob)], [float(rpm)], [float(torque)], [float(rop)], bit_area(bit_size))[0]
+    return _decimal(value)
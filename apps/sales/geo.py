@@ -0,0 +1,285 @@
+"""
+ARDT FMS - GPS Geospatial Support
+Version: 5.4
+
+Spatial lookups for GPSLocation tracking without a GIS database.
+
+Every GPSLocation stores the geohash of its coordinates in an indexed
+column. Geohashes of nearby points share prefixes, so a radius search is
+a handful of indexed prefix ranges (geohash_cover) followed by exact
+Haversine distances for the few rows they return:
+
+    technicians_near(site, radius_km=25)     # latest pings within 25 km of a site
+    result = record_pings(pings)             # bulk insert + geofence check-ins
+
+record_pings() evaluates a whole batch of pings against the open site
+visits of their technicians in one pass and checks visits in when a
+ping falls inside the site geofence.
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import NamedTuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import GPSLocation, SiteVisit
+
+EARTH_RADIUS_M = 6371000
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~4.8 m x 4.8 m cells
+
+# Most prefix ranges a radius query is split into
+MAX_COVER_CELLS = 9
+
+# Visits a ping inside the geofence checks in
+CHECK_IN_STATUSES = (SiteVisit.Status.SCHEDULED, SiteVisit.Status.EN_ROUTE)
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a coordinate (interleaved longitude/latitude bisection, base32)."""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        target, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """(height, width) in degrees of a geohash cell."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_m):
+    """(south, north, west, east) degrees enclosing a circle; west/east may pass ±180."""
+    latitude, longitude = float(latitude), float(longitude)
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if cos_lat <= 0 or radius_m / EARTH_RADIUS_M >= cos_lat * math.pi:
+        return south, north, -180.0, 180.0
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+    return south, north, longitude - dlon, longitude + dlon
+
+
+def geohash_cover(latitude, longitude, radius_m, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose cells together cover a circle.
+
+    Uses the longest prefix length for which the circle's bounding box
+    spans at most `max_cells` cells.
+    """
+    south, north, west, east = bounding_box(latitude, longitude, radius_m)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        rows = range(math.floor((south + 90) / height), math.floor((min(north, 89.999999) + 90) / height) + 1)
+        columns = range(math.floor((west + 180) / width), math.floor((east + 180) / width) + 1)
+        if len(rows) * len(columns) <= max_cells or precision == 1:
+            break
+    columns_per_turn = round(360 / width)
+    cells = set()
+    for row in rows:
+        for column in columns:
+            column %= columns_per_turn
+            cells.add(encode_geohash(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision))
+    return sorted(cells)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in meters between two points."""
+    lat1, lon1, lat2, lon2 = (math.radians(float(value)) for value in (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_many(latitude, longitude, latitudes, longitudes):
+    """
+    Distances in meters from one point to a batch of points.
+
+    One vectorized NumPy expression over the batch; returns a float array.
+    """
+    lat1, lon1 = math.radians(float(latitude)), math.radians(float(longitude))
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def within_cells(cells, field_name="geohash"):
+    """Q matching geohashes in any of the cells (indexed prefix lookups); no cells match nothing."""
+    if not cells:
+        return Q(pk__in=[])
+    query = Q()
+    for cell in cells:
+        query |= Q(**{f"{field_name}__startswith": cell})
+    return query
+
+
+class NearbyTechnician(NamedTuple):
+    technician: object
+    distance_m: float
+    location: GPSLocation
+
+
+def technicians_near(site, radius_km, max_age=None):
+    """
+    Technicians whose latest GPS ping is within `radius_km` of a ServiceSite.
+
+    Pings older than `max_age` (default ARDT_GPS_LIVE_MINUTES) are ignored.
+    Returns NearbyTechnician tuples, nearest first.
+    """
+    if not site.has_gps_coordinates:
+        return []
+    radius_m = float(radius_km) * 1000
+    if max_age is None:
+        max_age = timedelta(minutes=settings.ARDT_GPS_LIVE_MINUTES)
+
+    latest = GPSLocation.objects.filter(field_technician=OuterRef("field_technician")).order_by("-recorded_at", "-pk")
+    locations = list(
+        GPSLocation.objects.filter(
+            within_cells(geohash_cover(site.latitude, site.longitude, radius_m)),
+            recorded_at__gte=timezone.now() - max_age,
+            field_technician__isnull=False,
+            pk=Subquery(latest.values("pk")[:1]),
+        ).select_related("field_technician")
+    )
+    distances = haversine_many(
+        site.latitude, site.longitude,
+        [location.latitude for location in locations], [location.longitude for location in locations],
+    )
+    nearby = [
+        NearbyTechnician(location.field_technician, distance, location)
+        for location, distance in zip(locations, distances.tolist())
+        if distance <= radius_m
+    ]
+    return sorted(nearby, key=lambda item: item.distance_m)
+
+
+@dataclass
+class PingResult:
+    created: int = 0
+    inside: int = 0
+    checked_in: list = field(default_factory=list)
+
+
+def _open_visits(pings):
+    """Open visits of the pings' technicians on the pings' dates, by (technician, date)."""
+    technicians = {ping.field_technician_id for ping in pings if ping.field_technician_id}
+    if not technicians:
+        return {}
+    dates = {timezone.localdate(ping.recorded_at) for ping in pings}
+    visits = {}
+    for visit in SiteVisit.objects.filter(
+        technician_id__in=technicians, visit_date__in=dates, status__in=CHECK_IN_STATUSES,
+        service_site__latitude__isnull=False, service_site__longitude__isnull=False,
+    ).select_related("service_site"):
+        visits.setdefault((visit.technician_id, visit.visit_date), []).append(visit)
+    return visits
+
+
+def evaluate_geofences(pings, radius_m=None):
+    """
+    Match pings to their technician's open site visits.
+
+    Each ping with candidate visits gets the nearest visit's site,
+    distance_from_site and geofence flags. Returns {visit: first ping
+    inside its geofence}.
+    """
+    if radius_m is None:
+        radius_m = settings.ARDT_GEOFENCE_RADIUS_M
+    groups = {}
+    for ping in pings:
+        groups.setdefault((ping.field_technician_id, timezone.localdate(ping.recorded_at)), []).append(ping)
+
+    arrivals = {}
+    visits_by_key = _open_visits(pings)
+    for key, group in groups.items():
+        visits = visits_by_key.get(key)
+        if not visits:
+            continue
+        latitudes = [ping.latitude for ping in group]
+        longitudes = [ping.longitude for ping in group]
+        nearest = [(math.inf, None)] * len(group)
+        for visit in visits:
+            site = visit.service_site
+            distances = haversine_many(site.latitude, site.longitude, latitudes, longitudes).tolist()
+            for i, distance in enumerate(distances):
+                if group[i].site_visit_id in (None, visit.pk) and distance < nearest[i][0]:
+                    nearest[i] = (distance, visit)
+        for ping, (distance, visit) in zip(group, nearest):
+            if visit is None:
+                continue
+            ping.site_visit = visit
+            ping.service_site = visit.service_site
+            ping.distance_from_site = round(distance, 2)
+            ping.is_inside_geofence = distance <= radius_m
+            ping.geofence_name = visit.service_site.name[:100]
+            if ping.is_inside_geofence and (visit not in arrivals or ping.recorded_at < arrivals[visit].recorded_at):
+                arrivals[visit] = ping
+    return arrivals
+
+
+def record_pings(pings, radius_m=None, batch_size=1000):
+    """
+    Bulk insert unsaved GPSLocation pings and check in arrived visits.
+
+    Fills each ping's geohash and geofence fields (evaluate_geofences),
+    then checks in every open visit with a ping inside its geofence at the
+    time and position of its first such ping. Returns a PingResult.
+    """
+    pings = list(pings)
+    for ping in pings:
+        ping.geohash = encode_geohash(ping.latitude, ping.longitude)
+    arrivals = evaluate_geofences(pings, radius_m)
+
+    result = PingResult(inside=sum(1 for ping in pings if ping.is_inside_geofence))
+    now = timezone.now()
+    with transaction.atomic():
+        open_pks = set(
+            SiteVisit.objects.select_for_update()
+            .filter(pk__in=[visit.pk for visit in arrivals], status__in=CHECK_IN_STATUSES)
+            .values_list("pk", flat=True)
+        )
+        for visit, ping in arrivals.items():
+            if visit.pk not in open_pks:
+                continue
+            visit.check_in_time = ping.recorded_at
+            visit.check_in_latitude = ping.latitude
+            visit.check_in_longitude = ping.longitude
+            visit.status = SiteVisit.Status.ARRIVED
+            visit.updated_at = now
+            if ping.location_type == GPSLocation.LocationType.AUTOMATIC:
+                ping.location_type = GPSLocation.LocationType.CHECK_IN
+            result.checked_in.append(visit)
+
+        GPSLocation.objects.bulk_create(pings, batch_size=batch_size)
+        SiteVisit.objects.bulk_update(
+            result.checked_in,
+            ["check_in_time", "check_in_latitude", "check_in_longitude", "status", "updated_at"],
+            batch_size=batch_size,
+        )
+    result.created = len(pings)
+    return result
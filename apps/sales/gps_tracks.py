@@ -0,0 +1,264 @@
+"""
+ARDT FMS - GPS Track Compression
+Version: 5.4
+
+Retention tiers for GPSLocation history:
+
+    - recent pings (younger than ARDT_GPS_RAW_RETENTION_DAYS) stay as
+      full resolution GPSLocation rows;
+    - older automatic pings are archived, losslessly at the stored
+      precision, into one compressed GPSTrack blob per site visit (or per
+      technician and day without a visit), and only a Douglas-Peucker
+      simplified subset is kept as GPSLocation rows (is_track_point).
+
+Check-ins, check-outs, manual entries, waypoints and alerts are never
+archived. compress_history() is run by the prune_gps_history command:
+
+    result = compress_history()                          # settings defaults
+    result = compress_history(older_than=timedelta(days=7), tolerance_m=25)
+    points = track.decode()                              # [TrackPoint, ...]
+
+Blob layout (zlib compressed, little endian): a header with the format
+version, point count and first timestamp in milliseconds, then three
+int64 columns of deltas: milliseconds, latitude and longitude in 1e-7
+degrees.
+"""
+
+import math
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .geo import EARTH_RADIUS_M, haversine
+from .models import GPSLocation, GPSTrack
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<BIq")
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+COORDINATE_SCALE = 7  # GPSLocation stores 7 decimal places
+
+DELETE_BATCH_SIZE = 1000
+
+
+class TrackPoint(NamedTuple):
+    recorded_at: datetime
+    latitude: Decimal
+    longitude: Decimal
+
+
+def _milliseconds(moment):
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def _little_endian(column):
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def encode_track(points):
+    """Compress time ordered TrackPoints into a GPSTrack blob."""
+    columns = (array("q"), array("q"), array("q"))
+    previous = None
+    for point in points:
+        values = (
+            _milliseconds(point.recorded_at),
+            int(Decimal(point.latitude).scaleb(COORDINATE_SCALE)),
+            int(Decimal(point.longitude).scaleb(COORDINATE_SCALE)),
+        )
+        for column, value, last in zip(columns, values, previous or (values[0], 0, 0)):
+            column.append(value - last)
+        previous = values
+    start = _milliseconds(points[0].recorded_at) if points else 0
+    payload = b"".join(_little_endian(column).tobytes() for column in columns)
+    return zlib.compress(HEADER.pack(FORMAT_VERSION, len(points), start) + payload)
+
+
+def decode_track(blob):
+    """Decompress a GPSTrack blob into TrackPoints."""
+    data = zlib.decompress(bytes(blob))
+    version, count, start = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported GPS track format {version}")
+    columns = []
+    offset = HEADER.size
+    for _ in range(3):
+        column = array("q")
+        column.frombytes(data[offset:offset + count * column.itemsize])
+        columns.append(_little_endian(column))
+        offset += count * column.itemsize
+
+    points = []
+    milliseconds, latitude, longitude = start, 0, 0
+    for position, (dt, dlat, dlon) in enumerate(zip(*columns)):
+        milliseconds += dt if position else 0
+        latitude += dlat
+        longitude += dlon
+        points.append(TrackPoint(
+            EPOCH + timedelta(milliseconds=milliseconds),
+            Decimal(latitude).scaleb(-COORDINATE_SCALE),
+            Decimal(longitude).scaleb(-COORDINATE_SCALE),
+        ))
+    return points
+
+
+def track_length(points):
+    """Length in meters of a track along its points."""
+    return sum(
+        haversine(first.latitude, first.longitude, second.latitude, second.longitude)
+        for first, second in zip(points, points[1:])
+    )
+
+
+def _project(points):
+    """Equirectangular x/y in meters around the first point (fine at track scale)."""
+    lat0 = math.radians(float(points[0].latitude))
+    lon0 = math.radians(float(points[0].longitude))
+    cos_lat0 = math.cos(lat0)
+    xs, ys = array("d"), array("d")
+    for point in points:
+        xs.append((math.radians(float(point.longitude)) - lon0) * cos_lat0 * EARTH_RADIUS_M)
+        ys.append((math.radians(float(point.latitude)) - lat0) * EARTH_RADIUS_M)
+    return xs, ys
+
+
+def _segment_distance(x, y, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    if length == 0:
+        return math.hypot(x - x1, y - y1)
+    t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length))
+    return math.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
+
+def simplify(points, tolerance_m):
+    """
+    Douglas-Peucker simplification: positions of the points to keep.
+
+    Every dropped point lies within `tolerance_m` of the kept polyline.
+    Iterative, so long tracks do not hit the recursion limit.
+    """
+    count = len(points)
+    if count < 3:
+        return list(range(count))
+    xs, ys = _project(points)
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        farthest, distance = None, tolerance_m
+        for i in range(first + 1, last):
+            d = _segment_distance(xs[i], ys[i], xs[first], ys[first], xs[last], ys[last])
+            if d > distance:
+                farthest, distance = i, d
+        if farthest is not None:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [i for i in range(count) if keep[i]]
+
+
+@dataclass
+class CompressResult:
+    tracks: int = 0
+    archived: int = 0
+    kept: int = 0
+    deleted: int = 0
+
+
+def _archivable(cutoff):
+    return GPSLocation.objects.filter(
+        recorded_at__lt=cutoff,
+        location_type=GPSLocation.LocationType.AUTOMATIC,
+        is_track_point=False,
+    )
+
+
+def _track_groups(cutoff):
+    """(technician id, visit id, local day start or None) of every track to write."""
+    pairs = _archivable(cutoff).order_by().values_list("field_technician_id", "site_visit_id").distinct()
+    for technician_id, visit_id in pairs:
+        if visit_id is not None:
+            yield technician_id, visit_id, None
+            continue
+        days = _archivable(cutoff).filter(field_technician_id=technician_id, site_visit__isnull=True).datetimes(
+            "recorded_at", "day"
+        )
+        for day in days:
+            yield technician_id, None, day
+
+
+def _archive_group(technician_id, visit_id, day, cutoff, tolerance_m, dry_run, result):
+    rows = _archivable(cutoff).filter(field_technician_id=technician_id, site_visit_id=visit_id)
+    if day is not None:
+        rows = rows.filter(recorded_at__gte=day, recorded_at__lt=day + timedelta(days=1))
+    rows = list(rows.order_by("recorded_at", "pk").values_list("pk", "recorded_at", "latitude", "longitude"))
+    if not rows:
+        return
+    points = [TrackPoint(*row[1:]) for row in rows]
+    kept = [rows[i][0] for i in simplify(points, tolerance_m)]
+    result.tracks += 1
+    result.archived += len(rows)
+    result.kept += len(kept)
+    result.deleted += len(rows) - len(kept)
+    if dry_run:
+        return
+
+    with transaction.atomic():
+        tracks = GPSTrack.objects.select_for_update().filter(field_technician_id=technician_id, site_visit_id=visit_id)
+        if day is not None:
+            tracks = tracks.filter(track_date=timezone.localdate(day))
+        track = tracks.first()
+        if track is None:
+            track = GPSTrack(
+                field_technician_id=technician_id, site_visit_id=visit_id,
+                track_date=timezone.localdate(points[0].recorded_at),
+            )
+        else:
+            seen = {point.recorded_at for point in points}
+            points = sorted(
+                [point for point in track.decode() if point.recorded_at not in seen] + points,
+                key=lambda point: point.recorded_at,
+            )
+        track.points = encode_track(points)
+        track.point_count = len(points)
+        track.simplified_count += len(kept)
+        track.start_time, track.end_time = points[0].recorded_at, points[-1].recorded_at
+        track.distance_meters = Decimal(track_length(points)).quantize(Decimal("0.01"))
+        track.save()
+
+        GPSLocation.objects.filter(pk__in=kept).update(is_track_point=True)
+        dropped = sorted(set(row[0] for row in rows) - set(kept))
+        for start in range(0, len(dropped), DELETE_BATCH_SIZE):
+            GPSLocation.objects.filter(pk__in=dropped[start:start + DELETE_BATCH_SIZE]).delete()
+
+
+def compress_history(older_than=None, tolerance_m=None, dry_run=False):
+    """
+    Archive automatic pings older than `older_than` into GPSTrack blobs.
+
+    Defaults come from ARDT_GPS_RAW_RETENTION_DAYS and
+    ARDT_GPS_TRACK_TOLERANCE_M. Each track is written in its own
+    transaction, so an interrupted run can simply be repeated.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.ARDT_GPS_RAW_RETENTION_DAYS)
+    if tolerance_m is None:
+        tolerance_m = settings.ARDT_GPS_TRACK_TOLERANCE_M
+    cutoff = timezone.now() - older_than
+
+    result = CompressResult()
+    for technician_id, visit_id, day in list(_track_groups(cutoff)):
+        _archive_group(technician_id, visit_id, day, cutoff, tolerance_m, dry_run, result)
+    return result
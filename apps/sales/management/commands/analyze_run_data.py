@@ -0,0 +1,53 @@
+"""
+ARDT FMS - Analyze Run Data Command
+Computes derived drilling values (Teale MSE, depth based ROP, bit hydraulic
+power) for drill string runs and stores them on their FieldRunData points.
+
+Usage:
+    python manage.py analyze_run_data RUN-2026-0001
+    python manage.py analyze_run_data RUN-2026-0001 --tfa 0.994 --update-run
+    python manage.py analyze_run_data RUN-2026-0001 --dry-run     # print the summary only
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sales.drilling_analytics import analyze_run, write_back
+from apps.sales.models import FieldDrillStringRun
+
+
+class Command(BaseCommand):
+    help = "Compute MSE, ROP and hydraulic power for drill string runs from their raw data points"
+
+    def add_arguments(self, parser):
+        parser.add_argument("runs", nargs="+", help="Run numbers to analyze")
+        parser.add_argument("--tfa", type=Decimal, help="Nozzle total flow area in in² (default: use differential pressure)")
+        parser.add_argument("--keep-rop", action="store_true", help="Do not fill missing ROP from bit depth")
+        parser.add_argument("--update-run", action="store_true", help="Update run averages, maxima and on-bottom hours")
+        parser.add_argument("--dry-run", action="store_true", help="Print the summary without writing")
+
+    def handle(self, *args, **options):
+        runs = list(FieldDrillStringRun.objects.filter(run_number__in=options["runs"]).select_related("drill_bit"))
+        missing = set(options["runs"]) - {run.run_number for run in runs}
+        if missing:
+            raise CommandError(f"Unknown run(s): {', '.join(sorted(missing))}")
+
+        for run in runs:
+            analysis = analyze_run(run, bit_size=run.drill_bit.size, tfa=options["tfa"])
+            if not len(analysis.samples):
+                self.stdout.write(self.style.WARNING(f"  {run.run_number}: no data points"))
+                continue
+            summary = analysis.summary()
+            self.stdout.write(
+                f"  {run.run_number}: {len(analysis.samples)} point(s), "
+                f"{summary['on_bottom_hours']} h on bottom, avg ROP {summary['avg_rop']} ft/hr, "
+                f"avg MSE {summary['avg_mse']} psi"
+            )
+            if not options["dry_run"]:
+                write_back(analysis, fill_rop=not options["keep_rop"], update_run=options["update_run"])
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run - nothing written."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Analyzed {len(runs)} run(s)."))
@@ -0,0 +1,87 @@
+"""
+ARDT FMS - Ingest Run Data Command
+Bulk loads FieldRunData points for a drill string run from an EDR CSV export or a WITS stream.
+
+Usage:
+    python manage.py ingest_run_data RUN-2026-0001 edr_export.csv
+    python manage.py ingest_run_data RUN-2026-0001 feed.wits --format wits
+    tail -f feed.wits | python manage.py ingest_run_data RUN-2026-0001 - --format wits --chunk-size 60
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sales.models import FieldDrillStringRun, FieldRunData
+from apps.sales.run_ingest import INGEST_CHUNK_SIZE, ingest_rows, read_csv, read_wits
+
+WITS_EXTENSIONS = (".wits", ".wit")
+
+
+class Command(BaseCommand):
+    help = "Bulk load drilling time series (CSV or WITS) into FieldRunData for a run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("run", help="Run number (or id) of the FieldDrillStringRun")
+        parser.add_argument("path", help="File to load, or - for standard input")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "wits"],
+            help="Input format (default: from the file extension, else csv)",
+        )
+        parser.add_argument(
+            "--source",
+            choices=FieldRunData.DataSource.values,
+            help="Data source recorded on the points (default: EDR for csv, WITS for wits)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=INGEST_CHUNK_SIZE,
+            help="Rows validated and inserted per batch",
+        )
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=20,
+            help="Maximum number of rejected rows to list",
+        )
+
+    def get_run(self, value):
+        runs = FieldDrillStringRun.objects.all()
+        run = runs.filter(run_number=value).first()
+        if run is None and value.isdigit():
+            run = runs.filter(pk=int(value)).first()
+        if run is None:
+            raise CommandError(f"Run '{value}' does not exist.")
+        return run
+
+    def handle(self, *args, **options):
+        run = self.get_run(options["run"])
+        path = options["path"]
+        input_format = options["format"] or ("wits" if path.lower().endswith(WITS_EXTENSIONS) else "csv")
+        source = options["source"] or (
+            FieldRunData.DataSource.WITS if input_format == "wits" else FieldRunData.DataSource.EDR
+        )
+        reader = read_wits if input_format == "wits" else read_csv
+
+        try:
+            stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path}: {exc}")
+        try:
+            result = ingest_rows(run, reader(stream), data_source=source, chunk_size=options["chunk_size"])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{run.run_number}: {result.created} point(s) loaded from {result.received} row(s), "
+            f"{result.duplicates} duplicate(s) skipped."
+        ))
+        if result.rejected:
+            self.stdout.write(self.style.WARNING(f"{result.rejected} row(s) rejected:"))
+            for line, message in result.errors[: options["show"]]:
+                self.stdout.write(f"  row {line}: {message}")
+            if result.rejected > options["show"]:
+                self.stdout.write(f"  ... and {result.rejected - options['show']} more")
@@ -0,0 +1,39 @@
+"""
+ARDT FMS - Prune GPS History Command
+Archives automatic GPSLocation pings older than the raw retention period
+into compressed per-visit GPSTrack blobs and keeps only a simplified set
+of track points in the GPSLocation table.
+
+Usage:
+    python manage.py prune_gps_history                       # ARDT_GPS_RAW_RETENTION_DAYS
+    python manage.py prune_gps_history --days 7 --tolerance 25
+    python manage.py prune_gps_history --dry-run
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.sales.gps_tracks import compress_history
+
+
+class Command(BaseCommand):
+    help = "Archive old GPS pings into compressed tracks and keep simplified track points"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Archive pings older than this many days")
+        parser.add_argument("--tolerance", type=float, help="Simplification tolerance in meters")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be archived")
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options["days"]) if options["days"] is not None else None
+        result = compress_history(older_than=older_than, tolerance_m=options["tolerance"], dry_run=options["dry_run"])
+
+        self.stdout.write(
+            f"  {result.tracks} track(s): {result.archived} ping(s) archived, "
+            f"{result.kept} kept as track points, {result.deleted} removed"
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run - nothing written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("GPS history pruned."))
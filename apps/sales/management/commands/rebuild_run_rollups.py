@@ -0,0 +1,39 @@
+"""
+ARDT FMS - Rebuild Run Rollups Command
+Recomputes the FieldRunDataRollup buckets of drill string runs from their raw data points.
+
+Needed after raw data is changed outside FieldRunData.save()/delete(), e.g. by
+queryset updates or deletes, or to backfill runs loaded before rollups existed.
+
+Usage:
+    python manage.py rebuild_run_rollups                         # every run with data
+    python manage.py rebuild_run_rollups RUN-2026-0001 RUN-2026-0002
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sales.models import FieldDrillStringRun
+from apps.sales.run_rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute downsampled run data rollups from the raw FieldRunData points"
+
+    def add_arguments(self, parser):
+        parser.add_argument("runs", nargs="*", help="Run numbers to rebuild (default: every run with data)")
+
+    def handle(self, *args, **options):
+        if options["runs"]:
+            runs = list(FieldDrillStringRun.objects.filter(run_number__in=options["runs"]))
+            missing = set(options["runs"]) - {run.run_number for run in runs}
+            if missing:
+                raise CommandError(f"Unknown run(s): {', '.join(sorted(missing))}")
+        else:
+            runs = FieldDrillStringRun.objects.filter(run_data_points__isnull=False).distinct()
+
+        total = 0
+        for run in runs:
+            buckets = rebuild_rollups(run)
+            total += buckets
+            self.stdout.write(f"  {run.run_number}: {buckets} bucket(s)")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} rollup bucket(s)."))
@@ -0,0 +1,49 @@
+"""
+ARDT FMS - Recompute Bit Usage Command
+Rebuilds drill bit usage counters (total hours, footage, run count), the
+per hour type totals and RunHours cumulative hours from run and hour
+history, to repair drift from edits made outside the models.
+
+Usage:
+    python manage.py recompute_bit_usage                   # every bit with history
+    python manage.py recompute_bit_usage SN-1001 SN-1002
+    python manage.py recompute_bit_usage --dry-run         # report drift only
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sales.bit_usage import recompute_bit_usage
+from apps.workorders.models import DrillBit
+
+
+class Command(BaseCommand):
+    help = "Recompute drill bit usage counters from completed runs and hour entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("bits", nargs="*", help="Bit serial numbers (default: every bit with history)")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without writing")
+
+    def handle(self, *args, **options):
+        bit_ids = None
+        if options["bits"]:
+            found = dict(DrillBit.objects.filter(serial_number__in=options["bits"]).values_list("serial_number", "pk"))
+            missing = set(options["bits"]) - set(found)
+            if missing:
+                raise CommandError(f"Unknown bit(s): {', '.join(sorted(missing))}")
+            bit_ids = list(found.values())
+
+        result = recompute_bit_usage(bit_ids, dry_run=options["dry_run"])
+
+        for serial, stored, expected in result.drifted:
+            self.stdout.write(
+                f"  {serial}: hours {stored[0]} -> {expected[0]}, footage {stored[1]} -> {expected[1]}, "
+                f"runs {stored[2]} -> {expected[2]}"
+            )
+        summary = (
+            f"{result.bits} bit(s) checked, {len(result.drifted)} drifted, "
+            f"{result.hour_entries} cumulative hour entr{'y' if result.hour_entries == 1 else 'ies'} renumbered."
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry run - {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,279 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0006_week3_field_data_capture"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FieldRunDataRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[
+                            ("1MIN", "1 Minute"),
+                            ("10MIN", "10 Minutes"),
+                            ("DEPTH", "Depth Interval"),
+                        ],
+                        help_text="Bucket resolution",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "bucket",
+                    models.BigIntegerField(
+                        help_text="Bucket number (epoch seconds // width, or bit depth // interval)"
+                    ),
+                ),
+                (
+                    "start_time",
+                    models.DateTimeField(help_text="First sample in the bucket"),
+                ),
+                (
+                    "end_time",
+                    models.DateTimeField(help_text="Last sample in the bucket"),
+                ),
+                (
+                    "depth_min",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Shallowest bit depth (feet)",
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    "depth_max",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Deepest bit depth (feet)",
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    "sample_count",
+                    models.IntegerField(
+                        default=0, help_text="Data points in the bucket"
+                    ),
+                ),
+                (
+                    "wob_min",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Minimum WOB (klbs)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "wob_max",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Maximum WOB (klbs)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "wob_sum",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of WOB (klbs) samples",
+                        max_digits=20,
+                    ),
+                ),
+                (
+                    "wob_count",
+                    models.IntegerField(
+                        default=0, help_text="Samples with a WOB (klbs) value"
+                    ),
+                ),
+                (
+                    "rpm_min",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Minimum RPM",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "rpm_max",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Maximum RPM",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "rpm_sum",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of RPM samples",
+                        max_digits=20,
+                    ),
+                ),
+                (
+                    "rpm_count",
+                    models.IntegerField(
+                        default=0, help_text="Samples with an RPM value"
+                    ),
+                ),
+                (
+                    "torque_min",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Minimum torque (ft-lbs)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "torque_max",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Maximum torque (ft-lbs)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "torque_sum",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of torque (ft-lbs) samples",
+                        max_digits=20,
+                    ),
+                ),
+                (
+                    "torque_count",
+                    models.IntegerField(
+                        default=0, help_text="Samples with a torque (ft-lbs) value"
+                    ),
+                ),
+                (
+                    "rop_min",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Minimum ROP (ft/hr)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "rop_max",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Maximum ROP (ft/hr)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "rop_sum",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of ROP (ft/hr) samples",
+                        max_digits=20,
+                    ),
+                ),
+                (
+                    "rop_count",
+                    models.IntegerField(
+                        default=0, help_text="Samples with a ROP (ft/hr) value"
+                    ),
+                ),
+                (
+                    "mse_min",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Minimum MSE (PSI)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "mse_max",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Maximum MSE (PSI)",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "mse_sum",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of MSE (PSI) samples",
+                        max_digits=20,
+                    ),
+                ),
+                (
+                    "mse_count",
+                    models.IntegerField(
+                        default=0, help_text="Samples with an MSE (PSI) value"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "field_run",
+                    models.ForeignKey(
+                        help_text="Parent drilling run",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="data_rollups",
+                        to="sales.fielddrillstringrun",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Field Run Data Rollup",
+                "verbose_name_plural": "Field Run Data Rollups",
+                "db_table": "field_run_data_rollups",
+                "ordering": ["field_run", "resolution", "bucket"],
+                "indexes": [
+                    models.Index(
+                        fields=["field_run", "resolution", "start_time"],
+                        name="run_rollup_time_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("field_run", "resolution", "bucket"),
+                        name="run_rollup_bucket_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _geohash(latitude, longitude, precision=9):
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        target, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    """Set the geohash of existing GPS locations."""
+    GPSLocation = apps.get_model("sales", "GPSLocation")
+    batch = []
+    for location in GPSLocation.objects.only("pk", "latitude", "longitude").iterator(chunk_size=2000):
+        location.geohash = _geohash(location.latitude, location.longitude)
+        batch.append(location)
+        if len(batch) >= 2000:
+            GPSLocation.objects.bulk_update(batch, ["geohash"])
+            batch = []
+    if batch:
+        GPSLocation.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0007_field_run_data_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gpslocation",
+            name="geohash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Geohash of the coordinates (spatial prefix index, set on save)",
+                max_length=12,
+            ),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
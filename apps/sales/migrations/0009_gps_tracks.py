@@ -0,0 +1,134 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0008_gps_location_geohash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GPSTrack",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "track_date",
+                    models.DateField(help_text="Local date of the first point"),
+                ),
+                ("start_time", models.DateTimeField(help_text="First point")),
+                ("end_time", models.DateTimeField(help_text="Last point")),
+                (
+                    "point_count",
+                    models.IntegerField(default=0, help_text="Raw points in the blob"),
+                ),
+                (
+                    "simplified_count",
+                    models.IntegerField(
+                        default=0, help_text="Points kept in GPSLocation"
+                    ),
+                ),
+                (
+                    "distance_meters",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Length of the raw track in meters",
+                        max_digits=12,
+                    ),
+                ),
+                (
+                    "points",
+                    models.BinaryField(
+                        help_text="Compressed raw points (see apps.sales.gps_tracks.encode_track)"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "GPS Track",
+                "verbose_name_plural": "GPS Tracks",
+                "db_table": "gps_tracks",
+                "ordering": ["-start_time"],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="gpslocation",
+            name="gps_locatio_recorde_933f68_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="gpslocation",
+            name="gps_locatio_latitud_b2b332_idx",
+        ),
+        migrations.AddField(
+            model_name="gpslocation",
+            name="is_track_point",
+            field=models.BooleanField(
+                default=False,
+                help_text="Kept as a simplified track point after the raw history was archived to a GPSTrack",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="gpslocation",
+            name="latitude",
+            field=models.DecimalField(
+                decimal_places=7, help_text="GPS latitude", max_digits=10
+            ),
+        ),
+        migrations.AlterField(
+            model_name="gpslocation",
+            name="longitude",
+            field=models.DecimalField(
+                decimal_places=7, help_text="GPS longitude", max_digits=10
+            ),
+        ),
+        migrations.AddField(
+            model_name="gpstrack",
+            name="field_technician",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Technician tracked",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="gps_tracks",
+                to="sales.fieldtechnician",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gpstrack",
+            name="site_visit",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Site visit of the track (empty for a technician day track)",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="gps_tracks",
+                to="sales.sitevisit",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gpstrack",
+            index=models.Index(
+                fields=["site_visit"], name="gps_tracks_site_vi_3b74c3_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gpstrack",
+            index=models.Index(
+                fields=["field_technician", "track_date"],
+                name="gps_tracks_field_t_e54c4a_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.15 on 2026-10-16 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0009_gps_tracks"),
+        ("workorders", "0006_bittype_phase2_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DrillBitHourTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "hour_type",
+                    models.CharField(
+                        choices=[
+                            ("ROTATING", "Rotating Hours"),
+                            ("CIRCULATING", "Circulating Hours"),
+                            ("ON_BOTTOM", "On Bottom Hours"),
+                            ("TOTAL", "Total Hours"),
+                            ("REAMING", "Reaming Hours"),
+                            ("TRIPPING", "Tripping Hours"),
+                        ],
+                        help_text="Type of hours",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "hours",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of the bit's RunHours of this type",
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    "drill_bit",
+                    models.ForeignKey(
+                        help_text="Drill bit",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hour_totals",
+                        to="workorders.drillbit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Drill Bit Hour Total",
+                "verbose_name_plural": "Drill Bit Hour Totals",
+                "db_table": "drill_bit_hour_totals",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("drill_bit", "hour_type"), name="bit_hour_total_unique"
+                    )
+                ],
+            },
+        ),
+    ]
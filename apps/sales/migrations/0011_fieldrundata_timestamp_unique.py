@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-17 09:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_points(apps, schema_editor):
+    """
+    Keep the first point per run and timestamp; concurrent ingests could insert both.
+
+    The dropped points stay counted in their rollups until `rebuild_run_rollups` is run.
+    """
+    FieldRunData = apps.get_model("sales", "FieldRunData")
+    duplicated = (
+        FieldRunData.objects.values("field_run_id", "timestamp")
+        .annotate(points=Count("pk"), keep=Min("pk"))
+        .filter(points__gt=1)
+        .order_by()
+    )
+    for group in duplicated:
+        FieldRunData.objects.filter(field_run_id=group["field_run_id"], timestamp=group["timestamp"]).exclude(
+            pk=group["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0010_drill_bit_hour_totals"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_points, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="fieldrundata",
+            constraint=models.UniqueConstraint(
+                fields=("field_run", "timestamp"),
+                name="field_run_data_timestamp_unique",
+            ),
+        ),
+    ]
@@ -21,10 +21,12 @@ Sprint 5 Additions:
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from decimal import Decimal
 
+from apps.common.sequences import next_document_number
+
 
 class Customer(models.Model):
     """
@@ -693,6 +695,12 @@ class ServiceSite(models.Model):
         self.total_service_visits += 1
         self.save(update_fields=['first_service_date', 'last_service_date', 'total_service_visits'])
 
+    def nearby_technicians(self, radius_km, max_age=None):
+        """Technicians whose latest GPS ping is within radius_km of this site, nearest first"""
+        from .geo import technicians_near
+
+        return technicians_near(self, radius_km, max_age=max_age)
+
 
 class FieldTechnician(models.Model):
     """
@@ -1353,21 +1361,7 @@ class FieldServiceRequest(models.Model):
     def _generate_request_number(self):
         """Generate unique request number: FSR-YYYY-####"""
         year = timezone.now().year
-
-        last_request = FieldServiceRequest.objects.filter(
-            request_number__startswith=f"FSR-{year}-"
-        ).order_by('-request_number').first()
-
-        if last_request:
-            try:
-                last_num = int(last_request.request_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"FSR-{year}-{new_num:04d}"
+        return next_document_number(FieldServiceRequest, "request_number", f"FSR-{year}-", padding=4)
 
     # ===== PROPERTIES =====
 
@@ -1751,52 +1745,25 @@ class ServiceSchedule(models.Model):
     def _generate_schedule_number(self):
         """Generate unique schedule number: SCH-YYYY-####"""
         year = timezone.now().year
-
-        last_schedule = ServiceSchedule.objects.filter(
-            schedule_number__startswith=f"SCH-{year}-"
-        ).order_by('-schedule_number').first()
-
-        if last_schedule:
-            try:
-                last_num = int(last_schedule.schedule_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"SCH-{year}-{new_num:04d}"
-
-    def _times_overlap(self, other):
-        """Check if time slots overlap"""
-        return not (
-            self.scheduled_end_time <= other.scheduled_start_time or
-            self.scheduled_start_time >= other.scheduled_end_time
-        )
+        return next_document_number(ServiceSchedule, "schedule_number", f"SCH-{year}-", padding=4)
 
     def check_conflicts(self):
         """
         Check for scheduling conflicts.
 
         Returns:
-            list: List of conflicting schedules
+            list: Confirmed or in-progress schedules of the same technician
+            whose time range overlaps this one
         """
-        conflicts = ServiceSchedule.objects.filter(
-            technician=self.technician,
-            scheduled_date=self.scheduled_date,
-            status__in=['CONFIRMED', 'IN_PROGRESS']
-        ).exclude(pk=self.pk)
-
-        conflicting = []
-        for schedule in conflicts:
-            if self._times_overlap(schedule):
-                conflicting.append(schedule)
+        from .scheduling import schedule_conflicts
 
-        return conflicting
+        return list(schedule_conflicts(self))
 
     def has_conflicts(self):
         """Check if schedule has any conflicts"""
-        return len(self.check_conflicts()) > 0
+        from .scheduling import schedule_conflicts
+
+        return schedule_conflicts(self).exists()
 
     @property
     def is_past(self):
@@ -2173,21 +2140,7 @@ class SiteVisit(models.Model):
     def _generate_visit_number(self):
         """Generate unique visit number: VIS-YYYY-####"""
         year = timezone.now().year
-
-        last_visit = SiteVisit.objects.filter(
-            visit_number__startswith=f"VIS-{year}-"
-        ).order_by('-visit_number').first()
-
-        if last_visit:
-            try:
-                last_num = int(last_visit.visit_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"VIS-{year}-{new_num:04d}"
+        return next_document_number(SiteVisit, "visit_number", f"VIS-{year}-", padding=4)
 
     @property
     def is_checked_in(self):
@@ -2532,21 +2485,7 @@ class ServiceReport(models.Model):
     def _generate_report_number(self):
         """Generate unique report number: RPT-YYYY-####"""
         year = timezone.now().year
-
-        last_report = ServiceReport.objects.filter(
-            report_number__startswith=f"RPT-{year}-"
-        ).order_by('-report_number').first()
-
-        if last_report:
-            try:
-                last_num = int(last_report.report_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"RPT-{year}-{new_num:04d}"
+        return next_document_number(ServiceReport, "report_number", f"RPT-{year}-", padding=4)
 
     def calculate_total_cost(self):
         """Calculate total cost from parts and labor"""
@@ -3095,21 +3034,7 @@ class FieldDrillStringRun(models.Model):
     def _generate_run_number(self):
         """Generate unique run number: RUN-YYYY-####"""
         year = timezone.now().year
-
-        last_run = FieldDrillStringRun.objects.filter(
-            run_number__startswith=f"RUN-{year}-"
-        ).order_by('-run_number').first()
-
-        if last_run:
-            try:
-                last_num = int(last_run.run_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"RUN-{year}-{new_num:04d}"
+        return next_document_number(FieldDrillStringRun, "run_number", f"RUN-{year}-", padding=4)
 
     # ===== PROPERTIES =====
 
@@ -3153,9 +3078,8 @@ class FieldDrillStringRun(models.Model):
     @property
     def calculated_rop(self):
         """Calculate ROP from footage and on-bottom hours"""
-        if self.footage_drilled and self.total_on_bottom_hours:
-            if float(self.total_on_bottom_hours) > 0:
-                return round(float(self.footage_drilled) / float(self.total_on_bottom_hours), 2)
+        if self.footage_drilled and self.total_on_bottom_hours and self.total_on_bottom_hours > 0:
+            return (Decimal(self.footage_drilled) / Decimal(self.total_on_bottom_hours)).quantize(Decimal('0.01'))
         return None
 
     # ===== STATUS CHECK METHODS =====
@@ -3190,20 +3114,28 @@ class FieldDrillStringRun(models.Model):
         if not self.can_complete():
             raise ValidationError("Run cannot be completed in current status")
 
-        self.status = self.Status.COMPLETED
-        self.out_of_hole_time = timezone.now()
+        with transaction.atomic():
+            # Lock the run so a concurrent completion cannot count it twice
+            status = FieldDrillStringRun.objects.select_for_update().filter(pk=self.pk).values_list(
+                'status', flat=True
+            ).first()
+            if status == self.Status.COMPLETED:
+                raise ValidationError("Run is already completed")
 
-        if depth_out is not None:
-            self.depth_out = depth_out
-        if termination_reason:
-            self.termination_reason = termination_reason
-        if dull_grade_out:
-            self.dull_grade_out = dull_grade_out
+            self.status = self.Status.COMPLETED
+            self.out_of_hole_time = timezone.now()
 
-        self.save()
+            if depth_out is not None:
+                self.depth_out = depth_out
+            if termination_reason:
+                self.termination_reason = termination_reason
+            if dull_grade_out:
+                self.dull_grade_out = dull_grade_out
 
-        # Update drill bit usage
-        self._update_bit_usage()
+            self.save()
+
+            # Update drill bit usage
+            self._update_bit_usage()
 
     def cancel_run(self, reason=None):
         """Cancel the run"""
@@ -3216,14 +3148,12 @@ class FieldDrillStringRun(models.Model):
         self.save()
 
     def _update_bit_usage(self):
-        """Update drill bit total hours and footage after run completion"""
+        """Add this run's hours, footage and one run to the drill bit (atomic F() deltas)"""
+        from .bit_usage import add_bit_usage, run_usage
+
         if self.drill_bit and self.is_completed:
-            if self.total_hours:
-                self.drill_bit.total_hours += Decimal(str(self.total_hours))
-            if self.footage_drilled:
-                self.drill_bit.total_footage += int(self.footage_drilled)
-            self.drill_bit.run_count += 1
-            self.drill_bit.save()
+            hours, footage = run_usage(self.spud_time, self.out_of_hole_time, self.footage_drilled)
+            add_bit_usage(self.drill_bit, hours=hours, footage=footage, runs=1)
 
 
 class FieldRunData(models.Model):
@@ -3499,6 +3429,12 @@ class FieldRunData(models.Model):
         ordering = ['field_run', 'timestamp']
         verbose_name = "Field Run Data Point"
         verbose_name_plural = "Field Run Data Points"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['field_run', 'timestamp'],
+                name='field_run_data_timestamp_unique'
+            ),
+        ]
         indexes = [
             models.Index(fields=['field_run', 'timestamp']),
             models.Index(fields=['field_run', 'bit_depth']),
@@ -3512,6 +3448,27 @@ class FieldRunData(models.Model):
     def __str__(self):
         return f"{self.field_run.run_number} @ {self.bit_depth}ft - {self.timestamp}"
 
+    def save(self, *args, **kwargs):
+        """Save and keep the run's rollup buckets (FieldRunDataRollup) current"""
+        from .run_rollups import add_points, refresh_points
+
+        previous = None
+        if not self._state.adding and self.pk:
+            previous = FieldRunData.objects.filter(pk=self.pk).first()
+        super().save(*args, **kwargs)
+        if previous is None:
+            add_points([self])
+        else:
+            refresh_points([previous, self])
+
+    def delete(self, *args, **kwargs):
+        """Delete and rebuild the rollup buckets the point belonged to"""
+        from .run_rollups import refresh_points
+
+        result = super().delete(*args, **kwargs)
+        refresh_points([self])
+        return result
+
     def clean(self):
         """Validate data point"""
         super().clean()
@@ -3530,10 +3487,102 @@ class FieldRunData(models.Model):
 
     @property
     def calculated_mse(self):
-        """Calculate MSE from parameters if not directly provided"""
+        """Stored MSE, else Teale MSE from this point's WOB, RPM, torque, ROP and the bit size"""
         if self.mse:
             return self.mse
-        return None
+        from .drilling_analytics import teale_mse_value
+
+        return teale_mse_value(self.wob, self.rpm, self.torque, self.rop, self.field_run.drill_bit.size)
+
+
+class FieldRunDataRollup(models.Model):
+    """
+    Downsampled FieldRunData buckets for charts and reports.
+
+    One row per run, resolution and bucket. Time buckets cover 1 or 10
+    minutes; depth buckets cover a fixed bit depth interval. Each bucket
+    keeps min/max/sum/count of the main drilling parameters, so averages
+    can be merged as new data arrives (avg = sum / count).
+
+    Maintained by apps.sales.run_rollups.
+    """
+
+    class Resolution(models.TextChoices):
+        MINUTE = "1MIN", "1 Minute"
+        TEN_MINUTES = "10MIN", "10 Minutes"
+        DEPTH = "DEPTH", "Depth Interval"
+
+    field_run = models.ForeignKey(
+        'FieldDrillStringRun',
+        on_delete=models.CASCADE,
+        related_name='data_rollups',
+        help_text="Parent drilling run"
+    )
+
+    resolution = models.CharField(
+        max_length=10,
+        choices=Resolution.choices,
+        help_text="Bucket resolution"
+    )
+
+    bucket = models.BigIntegerField(
+        help_text="Bucket number (epoch seconds // width, or bit depth // interval)"
+    )
+
+    # ===== EXTENT =====
+
+    start_time = models.DateTimeField(help_text="First sample in the bucket")
+    end_time = models.DateTimeField(help_text="Last sample in the bucket")
+    depth_min = models.DecimalField(max_digits=10, decimal_places=2, help_text="Shallowest bit depth (feet)")
+    depth_max = models.DecimalField(max_digits=10, decimal_places=2, help_text="Deepest bit depth (feet)")
+    sample_count = models.IntegerField(default=0, help_text="Data points in the bucket")
+
+    # ===== PARAMETER STATISTICS =====
+
+    wob_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Minimum WOB (klbs)")
+    wob_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Maximum WOB (klbs)")
+    wob_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Sum of WOB (klbs) samples")
+    wob_count = models.IntegerField(default=0, help_text="Samples with a WOB (klbs) value")
+
+    rpm_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Minimum RPM")
+    rpm_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Maximum RPM")
+    rpm_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Sum of RPM samples")
+    rpm_count = models.IntegerField(default=0, help_text="Samples with an RPM value")
+
+    torque_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Minimum torque (ft-lbs)")
+    torque_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Maximum torque (ft-lbs)")
+    torque_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Sum of torque (ft-lbs) samples")
+    torque_count = models.IntegerField(default=0, help_text="Samples with a torque (ft-lbs) value")
+
+    rop_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Minimum ROP (ft/hr)")
+    rop_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Maximum ROP (ft/hr)")
+    rop_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Sum of ROP (ft/hr) samples")
+    rop_count = models.IntegerField(default=0, help_text="Samples with a ROP (ft/hr) value")
+
+    mse_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Minimum MSE (PSI)")
+    mse_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Maximum MSE (PSI)")
+    mse_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Sum of MSE (PSI) samples")
+    mse_count = models.IntegerField(default=0, help_text="Samples with an MSE (PSI) value")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "field_run_data_rollups"
+        ordering = ['field_run', 'resolution', 'bucket']
+        verbose_name = "Field Run Data Rollup"
+        verbose_name_plural = "Field Run Data Rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['field_run', 'resolution', 'bucket'],
+                name='run_rollup_bucket_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['field_run', 'resolution', 'start_time'], name='run_rollup_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.field_run_id} {self.resolution} #{self.bucket}"
 
 
 class FieldPerformanceLog(models.Model):
@@ -3871,40 +3920,26 @@ class FieldPerformanceLog(models.Model):
     def _generate_log_number(self):
         """Generate unique log number: PERF-YYYY-####"""
         year = timezone.now().year
+        return next_document_number(FieldPerformanceLog, "log_number", f"PERF-{year}-", padding=4)
 
-        last_log = FieldPerformanceLog.objects.filter(
-            log_number__startswith=f"PERF-{year}-"
-        ).order_by('-log_number').first()
-
-        if last_log:
-            try:
-                last_num = int(last_log.log_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"PERF-{year}-{new_num:04d}"
+    @staticmethod
+    def _percent(part, whole):
+        return (Decimal(part) / Decimal(whole) * 100).quantize(Decimal('0.01'))
 
     def _calculate_variances(self):
         """Calculate variance percentages"""
         if self.target_rop and self.avg_rop:
-            self.rop_variance_percent = round(
-                ((float(self.avg_rop) - float(self.target_rop)) / float(self.target_rop)) * 100, 2
-            )
+            self.rop_variance_percent = self._percent(Decimal(self.avg_rop) - Decimal(self.target_rop), self.target_rop)
 
         if self.target_footage and self.footage_drilled:
-            self.footage_variance_percent = round(
-                ((float(self.footage_drilled) - float(self.target_footage)) / float(self.target_footage)) * 100, 2
+            self.footage_variance_percent = self._percent(
+                Decimal(self.footage_drilled) - Decimal(self.target_footage), self.target_footage
             )
 
     def _calculate_efficiency(self):
         """Calculate drilling efficiency"""
-        if self.rotating_hours and float(self.rotating_hours) > 0 and self.on_bottom_hours:
-            self.drilling_efficiency = round(
-                (float(self.on_bottom_hours) / float(self.rotating_hours)) * 100, 2
-            )
+        if self.rotating_hours and self.rotating_hours > 0 and self.on_bottom_hours:
+            self.drilling_efficiency = self._percent(self.on_bottom_hours, self.rotating_hours)
 
     @property
     def interval_duration_hours(self):
@@ -4316,21 +4351,7 @@ class FieldInspection(models.Model):
     def _generate_inspection_number(self):
         """Generate unique inspection number: INSP-YYYY-####"""
         year = timezone.now().year
-
-        last_insp = FieldInspection.objects.filter(
-            inspection_number__startswith=f"INSP-{year}-"
-        ).order_by('-inspection_number').first()
-
-        if last_insp:
-            try:
-                last_num = int(last_insp.inspection_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"INSP-{year}-{new_num:04d}"
+        return next_document_number(FieldInspection, "inspection_number", f"INSP-{year}-", padding=4)
 
     # ===== PROPERTIES =====
 
@@ -4566,37 +4587,48 @@ class RunHours(models.Model):
         return f"{self.drill_bit} - {self.hours}hrs ({self.hour_type}) - {self.record_date}"
 
     def save(self, *args, **kwargs):
-        """Override save to calculate cumulative hours"""
-        if self.cumulative_hours is None:
-            self._calculate_cumulative()
-        super().save(*args, **kwargs)
-
-        # Update drill bit total hours
-        self._update_bit_hours()
-
-    def _calculate_cumulative(self):
-        """Calculate cumulative hours for this bit and hour type"""
-        previous = RunHours.objects.filter(
-            drill_bit=self.drill_bit,
-            hour_type=self.hour_type,
-            record_date__lte=self.record_date
-        ).exclude(pk=self.pk).order_by('-record_date', '-created_at').first()
-
-        if previous and previous.cumulative_hours:
-            self.cumulative_hours = previous.cumulative_hours + self.hours
-        else:
-            self.cumulative_hours = self.hours
-
-    def _update_bit_hours(self):
-        """Update drill bit total hours"""
-        if self.drill_bit and self.hour_type == self.HourType.TOTAL:
-            total = RunHours.objects.filter(
-                drill_bit=self.drill_bit,
-                hour_type=self.HourType.TOTAL
-            ).aggregate(total=models.Sum('hours'))['total'] or Decimal('0')
-
-            self.drill_bit.total_hours = total
-            self.drill_bit.save(update_fields=['total_hours'])
+        """Save and add the hour change to the bit's running totals"""
+        previous = None
+        if not self._state.adding and self.pk:
+            previous = RunHours.objects.filter(pk=self.pk).values(
+                'drill_bit_id', 'hour_type', 'hours', 'field_run_id'
+            ).first()
+
+        with transaction.atomic():
+            if previous is not None:
+                self._update_bit_hours(previous, sign=-1)
+            total = self._update_bit_hours(self._hour_entry(), sign=1)
+            if self.cumulative_hours is None:
+                self.cumulative_hours = total
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Delete and take the entry's hours off the bit's running totals"""
+        with transaction.atomic():
+            self._update_bit_hours(self._hour_entry(), sign=-1)
+            return super().delete(*args, **kwargs)
+
+    def _hour_entry(self):
+        return {
+            'drill_bit_id': self.drill_bit_id,
+            'hour_type': self.hour_type,
+            'hours': self.hours,
+            'field_run_id': self.field_run_id,
+        }
+
+    def _update_bit_hours(self, entry, sign):
+        """Apply an entry's hours to the (bit, hour type) total and, for TOTAL
+        hours outside a run, to the drill bit (see apps.sales.bit_usage)"""
+        from apps.workorders.models import DrillBit
+        from .bit_usage import add_bit_usage, add_hours, counts_toward_bit_hours
+
+        hours = sign * Decimal(str(entry['hours']))
+        total = add_hours(entry['drill_bit_id'], entry['hour_type'], hours)
+        if counts_toward_bit_hours(entry['hour_type'], entry['field_run_id']):
+            bit_id = entry['drill_bit_id']
+            bit = self.drill_bit if bit_id == self.drill_bit_id else DrillBit(pk=bit_id)
+            add_bit_usage(bit, hours=hours)
+        return total
 
     def clean(self):
         """Validate hour entry"""
@@ -4619,6 +4651,47 @@ class RunHours(models.Model):
         return None
 
 
+class DrillBitHourTotal(models.Model):
+    """
+    Running total of a drill bit's RunHours per hour type.
+
+    Incremented with F() deltas as entries are saved, so
+    RunHours.cumulative_hours needs no history lookup. Maintained by
+    apps.sales.bit_usage.
+    """
+
+    drill_bit = models.ForeignKey(
+        'workorders.DrillBit',
+        on_delete=models.CASCADE,
+        related_name='hour_totals',
+        help_text="Drill bit"
+    )
+
+    hour_type = models.CharField(
+        max_length=20,
+        choices=RunHours.HourType.choices,
+        help_text="Type of hours"
+    )
+
+    hours = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the bit's RunHours of this type"
+    )
+
+    class Meta:
+        db_table = "drill_bit_hour_totals"
+        verbose_name = "Drill Bit Hour Total"
+        verbose_name_plural = "Drill Bit Hour Totals"
+        constraints = [
+            models.UniqueConstraint(fields=['drill_bit', 'hour_type'], name='bit_hour_total_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.drill_bit_id} {self.hour_type}: {self.hours}"
+
+
 class FieldIncident(models.Model):
     """
     Record incidents that occur during field operations.
@@ -5067,21 +5140,7 @@ class FieldIncident(models.Model):
     def _generate_incident_number(self):
         """Generate unique incident number: INC-YYYY-####"""
         year = timezone.now().year
-
-        last_inc = FieldIncident.objects.filter(
-            incident_number__startswith=f"INC-{year}-"
-        ).order_by('-incident_number').first()
-
-        if last_inc:
-            try:
-                last_num = int(last_inc.incident_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"INC-{year}-{new_num:04d}"
+        return next_document_number(FieldIncident, "incident_number", f"INC-{year}-", padding=4)
 
     # ===== PROPERTIES =====
 
@@ -5521,21 +5580,7 @@ class FieldDataEntry(models.Model):
     def _generate_entry_number(self):
         """Generate unique entry number: DATA-YYYY-####"""
         year = timezone.now().year
-
-        last_entry = FieldDataEntry.objects.filter(
-            entry_number__startswith=f"DATA-{year}-"
-        ).order_by('-entry_number').first()
-
-        if last_entry:
-            try:
-                last_num = int(last_entry.entry_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"DATA-{year}-{new_num:04d}"
+        return next_document_number(FieldDataEntry, "entry_number", f"DATA-{year}-", padding=4)
 
     def _check_range(self):
         """Check if numeric value is within acceptable range"""
@@ -5914,21 +5959,7 @@ class FieldPhoto(models.Model):
     def _generate_photo_number(self):
         """Generate unique photo number: PHOTO-YYYY-####"""
         year = timezone.now().year
-
-        last_photo = FieldPhoto.objects.filter(
-            photo_number__startswith=f"PHOTO-{year}-"
-        ).order_by('-photo_number').first()
-
-        if last_photo:
-            try:
-                last_num = int(last_photo.photo_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"PHOTO-{year}-{new_num:04d}"
+        return next_document_number(FieldPhoto, "photo_number", f"PHOTO-{year}-", padding=4)
 
     @property
     def has_location(self):
@@ -6281,21 +6312,7 @@ class FieldDocument(models.Model):
     def _generate_document_number(self):
         """Generate unique document number: DOC-YYYY-####"""
         year = timezone.now().year
-
-        last_doc = FieldDocument.objects.filter(
-            document_number__startswith=f"DOC-{year}-"
-        ).order_by('-document_number').first()
-
-        if last_doc:
-            try:
-                last_num = int(last_doc.document_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"DOC-{year}-{new_num:04d}"
+        return next_document_number(FieldDocument, "document_number", f"DOC-{year}-", padding=4)
 
     @property
     def is_expired(self):
@@ -6424,17 +6441,22 @@ class GPSLocation(models.Model):
     latitude = models.DecimalField(
         max_digits=10,
         decimal_places=7,
-        db_index=True,
         help_text="GPS latitude"
     )
 
     longitude = models.DecimalField(
         max_digits=10,
         decimal_places=7,
-        db_index=True,
         help_text="GPS longitude"
     )
 
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        db_index=True,
+        help_text="Geohash of the coordinates (spatial prefix index, set on save)"
+    )
+
     altitude = models.DecimalField(
         max_digits=8,
         decimal_places=2,
@@ -6569,6 +6591,11 @@ class GPSLocation(models.Model):
         help_text="Notes about this location"
     )
 
+    is_track_point = models.BooleanField(
+        default=False,
+        help_text="Kept as a simplified track point after the raw history was archived to a GPSTrack"
+    )
+
     # ===== AUDIT =====
 
     created_at = models.DateTimeField(
@@ -6584,8 +6611,6 @@ class GPSLocation(models.Model):
         indexes = [
             models.Index(fields=['field_technician', 'recorded_at']),
             models.Index(fields=['site_visit']),
-            models.Index(fields=['recorded_at']),
-            models.Index(fields=['latitude', 'longitude']),
         ]
         permissions = [
             ("can_view_gps_tracking", "Can view GPS tracking data"),
@@ -6605,22 +6630,91 @@ class GPSLocation(models.Model):
         """Check if record has movement data"""
         return self.speed is not None or self.heading is not None
 
+    def save(self, *args, **kwargs):
+        """Override save to keep the geohash in step with the coordinates"""
+        from .geo import encode_geohash
+
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+            if kwargs.get('update_fields') is not None and 'geohash' not in kwargs['update_fields']:
+                kwargs['update_fields'] = [*kwargs['update_fields'], 'geohash']
+        super().save(*args, **kwargs)
+
     def distance_to(self, other_lat, other_lon):
-        """Calculate distance to another point using Haversine formula"""
-        from math import radians, sin, cos, sqrt, atan2
+        """Calculate distance in meters to another point using Haversine formula"""
+        from .geo import haversine
 
-        R = 6371000  # Earth's radius in meters
+        return haversine(self.latitude, self.longitude, other_lat, other_lon)
 
-        lat1, lon1 = radians(float(self.latitude)), radians(float(self.longitude))
-        lat2, lon2 = radians(float(other_lat)), radians(float(other_lon))
 
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+class GPSTrack(models.Model):
+    """
+    Archived raw GPS history of one site visit, or of a technician's day
+    when the pings had no visit.
 
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    The full resolution points are stored as one compressed blob
+    (timestamp, latitude, longitude per point); only a simplified subset
+    stays in GPSLocation. Written by apps.sales.gps_tracks.
+    """
 
-        return R * c
+    field_technician = models.ForeignKey(
+        'FieldTechnician',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='gps_tracks',
+        help_text="Technician tracked"
+    )
+
+    site_visit = models.ForeignKey(
+        'SiteVisit',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='gps_tracks',
+        help_text="Site visit of the track (empty for a technician day track)"
+    )
+
+    track_date = models.DateField(
+        help_text="Local date of the first point"
+    )
+
+    start_time = models.DateTimeField(help_text="First point")
+    end_time = models.DateTimeField(help_text="Last point")
+
+    point_count = models.IntegerField(default=0, help_text="Raw points in the blob")
+    simplified_count = models.IntegerField(default=0, help_text="Points kept in GPSLocation")
+
+    distance_meters = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Length of the raw track in meters"
+    )
+
+    points = models.BinaryField(help_text="Compressed raw points (see apps.sales.gps_tracks.encode_track)")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "gps_tracks"
+        ordering = ['-start_time']
+        verbose_name = "GPS Track"
+        verbose_name_plural = "GPS Tracks"
+        indexes = [
+            models.Index(fields=['site_visit']),
+            models.Index(fields=['field_technician', 'track_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.field_technician} track {self.track_date} ({self.point_count} points)"
+
+    def decode(self):
+        """Raw points as TrackPoint(recorded_at, latitude, longitude) tuples"""
+        from .gps_tracks import decode_track
+
+        return decode_track(self.points)
 
 
 class FieldWorkOrder(models.Model):
@@ -6984,21 +7078,7 @@ class FieldWorkOrder(models.Model):
     def _generate_work_order_number(self):
         """Generate unique work order number: FWO-YYYY-####"""
         year = timezone.now().year
-
-        last_wo = FieldWorkOrder.objects.filter(
-            work_order_number__startswith=f"FWO-{year}-"
-        ).order_by('-work_order_number').first()
-
-        if last_wo:
-            try:
-                last_num = int(last_wo.work_order_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"FWO-{year}-{new_num:04d}"
+        return next_document_number(FieldWorkOrder, "work_order_number", f"FWO-{year}-", padding=4)
 
     # ===== PROPERTIES =====
 
@@ -7396,21 +7476,7 @@ class FieldAssetAssignment(models.Model):
     def _generate_assignment_number(self):
         """Generate unique assignment number: ASSIGN-YYYY-####"""
         year = timezone.now().year
-
-        last_assign = FieldAssetAssignment.objects.filter(
-            assignment_number__startswith=f"ASSIGN-{year}-"
-        ).order_by('-assignment_number').first()
-
-        if last_assign:
-            try:
-                last_num = int(last_assign.assignment_number.split('-')[-1])
-                new_num = last_num + 1
-            except ValueError:
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"ASSIGN-{year}-{new_num:04d}"
+        return next_document_number(FieldAssetAssignment, "assignment_number", f"ASSIGN-{year}-", padding=4)
 
     def _calculate_cost(self):
         """Calculate total cost based on duration and rate"""
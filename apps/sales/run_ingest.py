@@ -0,0 +1,312 @@
+"""
+ARDT FMS - Field Run Data Ingestion
+Version: 5.4
+
+Bulk loading of FieldRunData time series from EDR (CSV) and WITS feeds.
+
+Rows are processed in chunks. Each chunk is converted column by column:
+one timestamp column and one Decimal column per drilling parameter,
+quantized to the model field's decimal places. Points whose timestamp
+already exists for the run (in the database or earlier in the stream) are
+skipped, and the rest are written with a single bulk_create per chunk.
+The run row is locked while a chunk is checked and written, so concurrent
+loads of the same run cannot both insert a timestamp
+(field_run_data_timestamp_unique).
+The run's rollup buckets (apps.sales.run_rollups) are updated in the same
+transaction:
+
+    result = ingest_rows(run, rows)                       # dicts of field -> raw value
+    result = ingest_rows(run, read_csv(stream))           # EDR/CSV export
+    result = ingest_rows(run, read_wits(stream), data_source=FieldRunData.DataSource.WITS)
+
+The management command `ingest_run_data` wraps these for files.
+"""
+
+import csv
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import FieldRunData
+from .run_rollups import add_points, lock_runs
+
+INGEST_CHUNK_SIZE = 5000
+
+# Errors kept on the result; later ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+NUMERIC_FIELDS = (
+    "bit_depth", "hole_depth", "wob", "rpm", "torque", "rop",
+    "flow_rate", "standpipe_pressure", "differential_pressure", "ecd",
+    "mud_weight_in", "mud_weight_out", "mud_temperature", "funnel_viscosity",
+    "hook_load", "block_position", "mse", "bit_hydraulic_power", "gamma_ray",
+)
+
+# Normalized CSV header -> FieldRunData field
+COLUMN_ALIASES = {
+    "timestamp": "timestamp", "datetime": "timestamp", "date_time": "timestamp", "time_stamp": "timestamp",
+    "bit_depth": "bit_depth", "depth": "bit_depth", "bit_depth_md": "bit_depth",
+    "hole_depth": "hole_depth", "hole_depth_md": "hole_depth",
+    "wob": "wob", "weight_on_bit": "wob",
+    "rpm": "rpm", "rotary_speed": "rpm", "surface_rpm": "rpm",
+    "torque": "torque", "tq": "torque", "rotary_torque": "torque",
+    "rop": "rop", "rate_of_penetration": "rop",
+    "flow_rate": "flow_rate", "flow": "flow_rate", "flow_in": "flow_rate",
+    "standpipe_pressure": "standpipe_pressure", "spp": "standpipe_pressure",
+    "differential_pressure": "differential_pressure", "diff_pressure": "differential_pressure",
+    "ecd": "ecd",
+    "mud_weight_in": "mud_weight_in", "mw_in": "mud_weight_in",
+    "mud_weight_out": "mud_weight_out", "mw_out": "mud_weight_out",
+    "mud_temperature": "mud_temperature", "mud_temp": "mud_temperature",
+    "funnel_viscosity": "funnel_viscosity",
+    "hook_load": "hook_load", "hookload": "hook_load",
+    "block_position": "block_position", "block_height": "block_position",
+    "mse": "mse",
+    "bit_hydraulic_power": "bit_hydraulic_power", "hhp": "bit_hydraulic_power",
+    "gamma_ray": "gamma_ray", "gr": "gamma_ray",
+    "formation": "formation",
+}
+
+# WITS record 1 (general time based) items -> FieldRunData field
+WITS_ITEMS = {
+    "0105": "date",
+    "0106": "time",
+    "0108": "bit_depth",
+    "0110": "hole_depth",
+    "0112": "block_position",
+    "0113": "rop",
+    "0114": "hook_load",
+    "0116": "wob",
+    "0118": "torque",
+    "0120": "rpm",
+    "0121": "standpipe_pressure",
+    "0130": "flow_rate",
+}
+
+# Sentinels used by EDR/WITS/LAS feeds for "no value"
+NULL_VALUES = frozenset({"", "-999.25", "-9999", "-9999.0", "-8888", "-8888.0", "nan", "null", "none", "n/a"})
+
+
+@dataclass
+class IngestResult:
+    received: int = 0
+    created: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def normalize_header(header):
+    return header.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def read_csv(stream):
+    """
+    Yield FieldRunData dicts from a CSV stream with a header row.
+
+    Headers are matched through COLUMN_ALIASES; unknown columns are ignored.
+    Separate "date" and "time" columns are combined into the timestamp.
+    """
+    reader = csv.reader(stream)
+    headers = [normalize_header(header) for header in next(reader, [])]
+    columns = [(position, COLUMN_ALIASES.get(header, header)) for position, header in enumerate(headers)]
+    columns = [
+        (position, name) for position, name in columns
+        if name in COLUMN_ALIASES.values() or name in ("date", "time")
+    ]
+    for values in reader:
+        if not values:
+            continue
+        row = {name: values[position] for position, name in columns if position < len(values)}
+        if "timestamp" not in row and "time" in row:
+            row["timestamp"] = f"{row.pop('date')} {row.pop('time')}" if "date" in row else row.pop("time")
+        yield row
+
+
+def _wits_timestamp(date_value, time_value):
+    date_value, time_value = date_value.strip().zfill(6), time_value.strip().zfill(6)
+    return (
+        f"20{date_value[0:2]}-{date_value[2:4]}-{date_value[4:6]} "
+        f"{time_value[0:2]}:{time_value[2:4]}:{time_value[4:6]}"
+    )
+
+
+def read_wits(stream, items=None):
+    """
+    Yield FieldRunData dicts from a WITS level 0 stream.
+
+    Each record starts with "&&" and ends with "!!"; every line in between
+    is a four digit record/item code followed by the value. Only the items
+    in `items` (default WITS_ITEMS) are read.
+    """
+    items = WITS_ITEMS if items is None else items
+    record = None
+    for line in stream:
+        line = line.strip()
+        if line == "&&":
+            record = {}
+        elif line == "!!":
+            if record:
+                if "date" in record and "time" in record:
+                    record["timestamp"] = _wits_timestamp(record.pop("date"), record.pop("time"))
+                yield record
+            record = None
+        elif record is not None and len(line) > 4:
+            name = items.get(line[:4])
+            if name:
+                record[name] = line[4:].strip()
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, str) and value.strip().lower() in NULL_VALUES)
+
+
+def convert_timestamps(values):
+    """Return (datetimes, bad positions) for a column of raw timestamps."""
+    default_timezone = timezone.get_current_timezone()
+    converted, bad = [], []
+    for position, value in enumerate(values):
+        if isinstance(value, str):
+            value = value.strip()
+            try:
+                parsed = parse_datetime(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                try:
+                    parsed = datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+                except (ValueError, OverflowError):
+                    parsed = None
+            value = parsed
+        elif isinstance(value, (int, float)):
+            value = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        if not isinstance(value, datetime):
+            converted.append(None)
+            bad.append(position)
+            continue
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, default_timezone)
+        converted.append(value)
+    return converted, bad
+
+
+def decimal_converter(model_field):
+    """Build a column converter quantizing to a DecimalField's precision."""
+    quantum = Decimal(1).scaleb(-model_field.decimal_places)
+    limit = Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+
+    def convert(values):
+        converted, bad = [], []
+        for position, value in enumerate(values):
+            if _is_null(value):
+                converted.append(None)
+                continue
+            try:
+                number = Decimal(value.strip() if isinstance(value, str) else str(value)).quantize(quantum)
+            except (InvalidOperation, ValueError):
+                number = None
+            if number is None or not number.is_finite() or abs(number) >= limit:
+                converted.append(None)
+                bad.append(position)
+            else:
+                converted.append(number)
+        return converted, bad
+
+    return convert
+
+
+_CONVERTERS = {name: decimal_converter(FieldRunData._meta.get_field(name)) for name in NUMERIC_FIELDS}
+
+
+def _existing_timestamps(field_run, timestamps):
+    return set(
+        FieldRunData.objects.filter(
+            field_run=field_run, timestamp__gte=min(timestamps), timestamp__lte=max(timestamps)
+        ).values_list("timestamp", flat=True)
+    )
+
+
+def _ingest_chunk(field_run, rows, first_line, seen, result, defaults):
+    columns = {name: [row.get(name) for row in rows] for name in {key for row in rows for key in row}}
+    invalid = {}
+
+    timestamps, bad = convert_timestamps(columns.pop("timestamp", [None] * len(rows)))
+    for position in bad:
+        invalid.setdefault(position, "invalid or missing timestamp")
+
+    converted = {}
+    for name, converter in _CONVERTERS.items():
+        if name in columns:
+            converted[name], bad = converter(columns[name])
+            for position in bad:
+                invalid.setdefault(position, f"invalid {name}: {columns[name][position]!r}")
+    if "bit_depth" not in converted:
+        converted["bit_depth"] = [None] * len(rows)
+    for position, depth in enumerate(converted["bit_depth"]):
+        if depth is None:
+            invalid.setdefault(position, "bit depth is required")
+
+    formations = columns.get("formation")
+    valid = [position for position in range(len(rows)) if position not in invalid]
+    for position in sorted(invalid):
+        result.add_error(first_line + position, invalid[position])
+    if not valid:
+        return
+
+    lock_runs([field_run.pk])
+    existing = _existing_timestamps(field_run, [timestamps[position] for position in valid])
+    points = []
+    for position in valid:
+        timestamp = timestamps[position]
+        if timestamp in existing or timestamp in seen:
+            result.duplicates += 1
+            continue
+        seen.add(timestamp)
+        values = {name: column[position] for name, column in converted.items()}
+        if formations is not None:
+            values["formation"] = (formations[position] or "").strip()[:100]
+        points.append(FieldRunData(field_run=field_run, timestamp=timestamp, **defaults, **values))
+
+    FieldRunData.objects.bulk_create(points)
+    add_points(points)
+    result.created += len(points)
+
+
+def ingest_rows(field_run, rows, data_source=FieldRunData.DataSource.EDR, recorded_by=None,
+                data_quality=FieldRunData.DataQuality.GOOD, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Validate and bulk insert FieldRunData points for a run.
+
+    `rows` is an iterable of dicts mapping FieldRunData field names to raw
+    values (strings, numbers or datetimes). Invalid rows are rejected and
+    reported; points with a timestamp the run already has are skipped.
+    Each chunk is committed on its own, so an interrupted load can simply
+    be run again.
+    """
+    result = IngestResult()
+    defaults = {"data_source": data_source, "data_quality": data_quality, "recorded_by": recorded_by}
+    seen = set()
+    chunk = []
+    first_line = 1
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            with transaction.atomic():
+                _ingest_chunk(field_run, chunk, first_line, seen, result, defaults)
+            result.received += len(chunk)
+            first_line += len(chunk)
+            chunk = []
+    if chunk:
+        with transaction.atomic():
+            _ingest_chunk(field_run, chunk, first_line, seen, result, defaults)
+        result.received += len(chunk)
+    return result
@@ -0,0 +1,325 @@
+"""
+ARDT FMS - Field Run Data Rollups
+Version: 5.4
+
+Downsampled FieldRunData for charts and reports.
+
+Every data point belongs to three FieldRunDataRollup buckets of its run:
+its 1-minute bucket, its 10-minute bucket and its bit depth interval
+(ARDT_RUN_ROLLUP_DEPTH_INTERVAL feet). A bucket keeps min/max/sum/count
+of WOB, RPM, torque, ROP and MSE, so new points are merged into it
+without rereading the raw data:
+
+    add_points(points)              # new points (ingest, FieldRunData.save)
+    refresh_points(points)          # changed/deleted points: rebuild their buckets
+    rebuild_rollups(field_run)      # whole run (rebuild_run_rollups command)
+
+Reading:
+
+    resolution, rows = run_series(run, start, end)    # picks raw, 1-min or 10-min
+    rows = depth_profile(run)                         # per depth interval
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import FieldDrillStringRun, FieldRunData, FieldRunDataRollup
+
+Resolution = FieldRunDataRollup.Resolution
+
+# Raw FieldRunData rows, returned for short windows
+RAW = "RAW"
+
+METRICS = ("wob", "rpm", "torque", "rop", "mse")
+POINT_FIELDS = ("field_run_id", "timestamp", "bit_depth") + METRICS
+
+# Bucket width in seconds, finest first
+TIME_WIDTHS = {Resolution.MINUTE: 60, Resolution.TEN_MINUTES: 600}
+
+EXTENT_FIELDS = ["start_time", "end_time", "depth_min", "depth_max", "sample_count"]
+STAT_FIELDS = [f"{metric}_{stat}" for metric in METRICS for stat in ("min", "max", "sum", "count")]
+
+CENT = Decimal("0.01")
+
+
+def depth_interval():
+    return Decimal(str(getattr(settings, "ARDT_RUN_ROLLUP_DEPTH_INTERVAL", 10)))
+
+
+def series_max_points():
+    return getattr(settings, "ARDT_RUN_SERIES_MAX_POINTS", 2000)
+
+
+def _epoch(bucket, width):
+    return datetime.fromtimestamp(bucket * width, tz=dt_timezone.utc)
+
+
+def _bucket_keys(row, interval):
+    """(resolution, bucket) of every rollup a point row belongs to."""
+    epoch = int(row[1].timestamp())
+    keys = [(resolution, epoch // width) for resolution, width in TIME_WIDTHS.items()]
+    keys.append((Resolution.DEPTH, int(row[2] // interval)))
+    return keys
+
+
+def _point_row(point):
+    return tuple(getattr(point, name) for name in POINT_FIELDS)
+
+
+def _add(rollup, row):
+    """Merge one point row into a rollup."""
+    timestamp, depth = row[1], row[2]
+    if rollup.sample_count == 0:
+        rollup.start_time = rollup.end_time = timestamp
+        rollup.depth_min = rollup.depth_max = depth
+    else:
+        rollup.start_time = min(rollup.start_time, timestamp)
+        rollup.end_time = max(rollup.end_time, timestamp)
+        rollup.depth_min = min(rollup.depth_min, depth)
+        rollup.depth_max = max(rollup.depth_max, depth)
+    rollup.sample_count += 1
+
+    for metric, value in zip(METRICS, row[3:]):
+        if value is None:
+            continue
+        count = getattr(rollup, f"{metric}_count")
+        if count == 0:
+            setattr(rollup, f"{metric}_min", value)
+            setattr(rollup, f"{metric}_max", value)
+        else:
+            setattr(rollup, f"{metric}_min", min(getattr(rollup, f"{metric}_min"), value))
+            setattr(rollup, f"{metric}_max", max(getattr(rollup, f"{metric}_max"), value))
+        setattr(rollup, f"{metric}_sum", getattr(rollup, f"{metric}_sum") + value)
+        setattr(rollup, f"{metric}_count", count + 1)
+
+
+def _accumulate(rows, rollups, interval, only=None):
+    """
+    Merge point rows into `rollups` ({(run_id, resolution, bucket): rollup}),
+    creating missing buckets. `only` restricts the buckets that are touched.
+    Returns the keys that changed.
+    """
+    touched = set()
+    for row in rows:
+        for resolution, bucket in _bucket_keys(row, interval):
+            key = (row[0], resolution, bucket)
+            if only is not None and key not in only:
+                continue
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = FieldRunDataRollup(
+                    field_run_id=row[0], resolution=resolution, bucket=bucket, sample_count=0
+                )
+            _add(rollup, row)
+            touched.add(key)
+    return touched
+
+
+def _keys_condition(keys):
+    buckets = defaultdict(set)
+    for run_id, resolution, bucket in keys:
+        buckets[(run_id, resolution)].add(bucket)
+    condition = Q()
+    for (run_id, resolution), values in buckets.items():
+        condition |= Q(field_run_id=run_id, resolution=resolution, bucket__in=values)
+    return condition
+
+
+def lock_runs(run_ids):
+    """
+    Lock FieldDrillStringRun rows in pk order.
+
+    Serialises bucket writers per run: locking only existing buckets would
+    let two writers both insert the same new bucket.
+    """
+    runs = FieldDrillStringRun.objects.select_for_update().filter(pk__in=set(run_ids)).order_by("pk")
+    list(runs.values_list("pk", flat=True))
+
+
+def add_points(points):
+    """
+    Merge newly saved FieldRunData points into their rollups.
+
+    Locks the points' runs, then writes one bulk_create for new buckets
+    and one bulk_update for the changed ones.
+    """
+    rows = [row for row in map(_point_row, points) if row[1] is not None and row[2] is not None]
+    if not rows:
+        return 0
+    interval = depth_interval()
+    keys = {(row[0], resolution, bucket) for row in rows for resolution, bucket in _bucket_keys(row, interval)}
+
+    with transaction.atomic():
+        lock_runs(run_id for run_id, _, _ in keys)
+        existing = {
+            (rollup.field_run_id, rollup.resolution, rollup.bucket): rollup
+            for rollup in FieldRunDataRollup.objects.filter(_keys_condition(keys))
+        }
+        rollups = dict(existing)
+        touched = _accumulate(rows, rollups, interval)
+
+        changed = [existing[key] for key in touched if key in existing]
+        now = timezone.now()
+        for rollup in changed:
+            rollup.updated_at = now
+        FieldRunDataRollup.objects.bulk_create([rollups[key] for key in touched if key not in existing])
+        FieldRunDataRollup.objects.bulk_update(changed, EXTENT_FIELDS + STAT_FIELDS + ["updated_at"], batch_size=500)
+    return len(touched)
+
+
+def _bucket_condition(keys, interval):
+    """Raw data condition selecting every point of the given buckets."""
+    condition = Q()
+    for run_id, resolution, bucket in keys:
+        if resolution in TIME_WIDTHS:
+            width = TIME_WIDTHS[resolution]
+            condition |= Q(
+                field_run_id=run_id, timestamp__gte=_epoch(bucket, width), timestamp__lt=_epoch(bucket + 1, width)
+            )
+        else:
+            condition |= Q(
+                field_run_id=run_id, bit_depth__gte=bucket * interval, bit_depth__lt=(bucket + 1) * interval
+            )
+    return condition
+
+
+def refresh_points(points):
+    """
+    Rebuild the buckets of changed or deleted points from the raw data.
+
+    Pass both the old and the new version of a moved point so that both
+    of its buckets are refreshed.
+    """
+    rows = [row for row in map(_point_row, points) if row[1] is not None and row[2] is not None]
+    if not rows:
+        return 0
+    interval = depth_interval()
+    keys = {(row[0], resolution, bucket) for row in rows for resolution, bucket in _bucket_keys(row, interval)}
+
+    with transaction.atomic():
+        lock_runs(run_id for run_id, _, _ in keys)
+        FieldRunDataRollup.objects.filter(_keys_condition(keys)).delete()
+        raw = FieldRunData.objects.filter(_bucket_condition(keys, interval)).values_list(*POINT_FIELDS)
+        rollups = {}
+        _accumulate(raw, rollups, interval, only=keys)
+        FieldRunDataRollup.objects.bulk_create(rollups.values())
+    return len(keys)
+
+
+def rebuild_rollups(field_run, chunk_size=5000):
+    """Recompute every rollup of a run from its raw data; returns the bucket count."""
+    interval = depth_interval()
+    with transaction.atomic():
+        lock_runs([field_run.pk])
+        FieldRunDataRollup.objects.filter(field_run=field_run).delete()
+        raw = (
+            FieldRunData.objects.filter(field_run=field_run)
+            .exclude(bit_depth=None)
+            .order_by()
+            .values_list(*POINT_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+        rollups = {}
+        _accumulate(raw, rollups, interval)
+        FieldRunDataRollup.objects.bulk_create(rollups.values(), batch_size=1000)
+    return len(rollups)
+
+
+def choose_resolution(start, end, max_points=None):
+    """
+    Finest resolution whose point count for the window stays within
+    max_points: raw (one-second feeds), then 1-minute, then 10-minute.
+    """
+    max_points = max_points or series_max_points()
+    seconds = (end - start).total_seconds()
+    if seconds <= max_points:
+        return RAW
+    for resolution, width in TIME_WIDTHS.items():
+        if seconds / width <= max_points:
+            return resolution
+    return Resolution.TEN_MINUTES
+
+
+def _average(total, count):
+    return (total / count).quantize(CENT) if count else None
+
+
+def _rollup_row(values):
+    row = {
+        "start": values["start_time"],
+        "end": values["end_time"],
+        "depth_min": values["depth_min"],
+        "depth_max": values["depth_max"],
+        "samples": values["sample_count"],
+    }
+    for metric in METRICS:
+        row[f"{metric}_min"] = values[f"{metric}_min"]
+        row[f"{metric}_max"] = values[f"{metric}_max"]
+        row[f"{metric}_avg"] = _average(values[f"{metric}_sum"], values[f"{metric}_count"])
+    return row
+
+
+def _raw_row(values):
+    row = {
+        "start": values[1],
+        "end": values[1],
+        "depth_min": values[2],
+        "depth_max": values[2],
+        "samples": 1,
+    }
+    for metric, value in zip(METRICS, values[3:]):
+        row[f"{metric}_min"] = row[f"{metric}_max"] = row[f"{metric}_avg"] = value
+    return row
+
+
+def run_series(field_run, start=None, end=None, max_points=None, resolution=None):
+    """
+    Time series of a run for charting.
+
+    Returns (resolution, rows). Each row has start/end, depth_min/max,
+    samples and <metric>_min/_max/_avg for WOB, RPM, torque, ROP and MSE.
+    Without start/end the whole run is returned; the resolution is chosen
+    with choose_resolution() unless given.
+    """
+    if start is None or end is None:
+        extent = FieldRunDataRollup.objects.filter(
+            field_run=field_run, resolution=Resolution.TEN_MINUTES
+        ).aggregate(start=Min("start_time"), end=Max("end_time"))
+        start = start or extent["start"]
+        end = end or extent["end"]
+        if start is None or end is None:
+            return resolution or RAW, []
+    resolution = resolution or choose_resolution(start, end, max_points)
+
+    if resolution == RAW:
+        rows = (
+            FieldRunData.objects.filter(field_run=field_run, timestamp__gte=start, timestamp__lte=end)
+            .order_by("timestamp")
+            .values_list(*POINT_FIELDS)
+        )
+        return resolution, [_raw_row(values) for values in rows]
+
+    rows = (
+        FieldRunDataRollup.objects.filter(
+            field_run=field_run, resolution=resolution, start_time__lte=end, end_time__gte=start
+        )
+        .order_by("bucket")
+        .values(*EXTENT_FIELDS, *STAT_FIELDS)
+    )
+    return resolution, [_rollup_row(values) for values in rows]
+
+
+def depth_profile(field_run, depth_from=None, depth_to=None):
+    """Per depth interval rows (same keys as run_series), shallowest first."""
+    rows = FieldRunDataRollup.objects.filter(field_run=field_run, resolution=Resolution.DEPTH)
+    if depth_from is not None:
+        rows = rows.filter(depth_max__gte=depth_from)
+    if depth_to is not None:
+        rows = rows.filter(depth_min__lte=depth_to)
+    return [_rollup_row(values) for values in rows.order_by("bucket").values(*EXTENT_FIELDS, *STAT_FIELDS)]
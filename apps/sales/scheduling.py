@@ -0,0 +1,261 @@
+"""
+ARDT FMS - Field Service Scheduling
+Version: 5.4
+
+Conflict detection and slot finding for ServiceSchedule.
+
+A schedule conflicts with another schedule of the same technician on the
+same date when their time ranges overlap (start < other end and end >
+other start). Only CONFIRMED and IN_PROGRESS schedules block a technician.
+
+    schedule_conflicts(schedule)     # one schedule, range predicates in SQL
+    board_conflicts(week_start)      # every schedule of a board, one query
+    find_earliest_slot(duration)     # first free slot across technicians
+
+For planning many visits at once, load a ScheduleIndex once and call
+assign() for each visit. The index keeps the busy time of every technician
+and date as sorted, merged intervals, so checking or finding a slot is a
+binary search instead of a query:
+
+    index = ScheduleIndex.load(start_date, end_date)
+    for request in requests:
+        slot = index.assign(timedelta(hours=3))
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import groupby
+from typing import NamedTuple
+
+from django.utils import timezone
+
+from .models import FieldTechnician, ServiceSchedule
+
+BLOCKING_STATUSES = (ServiceSchedule.Status.CONFIRMED, ServiceSchedule.Status.IN_PROGRESS)
+BOARD_STATUSES = (ServiceSchedule.Status.DRAFT,) + BLOCKING_STATUSES
+
+# Default working window used when searching for free slots
+DAY_START = time(7, 0)
+DAY_END = time(19, 0)
+
+
+class Slot(NamedTuple):
+    technician_id: int
+    date: object
+    start_time: time
+    end_time: time
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _time(seconds):
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def _duration_seconds(duration):
+    """Accept a timedelta or a number of hours (like estimated_duration_hours)."""
+    if isinstance(duration, timedelta):
+        seconds = duration.total_seconds()
+    else:
+        seconds = Decimal(str(duration)) * 3600
+    seconds = int(seconds)
+    if seconds <= 0:
+        raise ValueError("duration must be positive")
+    return seconds
+
+
+def overlapping_schedules(technician, scheduled_date, start_time, end_time, exclude=None,
+                          statuses=BLOCKING_STATUSES):
+    """Schedules of a technician on a date whose time range overlaps start_time-end_time."""
+    queryset = ServiceSchedule.objects.filter(
+        technician=technician,
+        scheduled_date=scheduled_date,
+        status__in=statuses,
+        scheduled_start_time__lt=end_time,
+        scheduled_end_time__gt=start_time,
+    )
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset
+
+
+def schedule_conflicts(schedule):
+    """Blocking schedules that overlap a (saved or unsaved) schedule."""
+    return overlapping_schedules(
+        schedule.technician_id,
+        schedule.scheduled_date,
+        schedule.scheduled_start_time,
+        schedule.scheduled_end_time,
+        exclude=schedule.pk,
+    )
+
+
+def board_conflicts(start_date, days=7, technicians=None):
+    """
+    Conflicts of every open schedule on a dispatch board.
+
+    Loads the DRAFT, CONFIRMED and IN_PROGRESS schedules of the date range
+    with one query and sweeps each technician's day in start-time order.
+    Returns {schedule_id: [ids of the blocking schedules it overlaps]} for
+    the schedules that have conflicts.
+    """
+    queryset = ServiceSchedule.objects.filter(
+        scheduled_date__gte=start_date,
+        scheduled_date__lt=start_date + timedelta(days=days),
+        status__in=BOARD_STATUSES,
+    )
+    if technicians is not None:
+        queryset = queryset.filter(technician__in=technicians)
+    rows = queryset.order_by("technician_id", "scheduled_date", "scheduled_start_time", "pk").values_list(
+        "pk", "technician_id", "scheduled_date", "scheduled_start_time", "scheduled_end_time", "status"
+    )
+
+    conflicts = defaultdict(list)
+    for _, day in groupby(rows, key=lambda row: (row[1], row[2])):
+        active = []
+        for pk, _, _, start, end, status in day:
+            blocking = status in BLOCKING_STATUSES
+            active = [entry for entry in active if entry[0] > start]
+            for _, other_pk, other_blocking in active:
+                if other_blocking:
+                    conflicts[pk].append(other_pk)
+                if blocking:
+                    conflicts[other_pk].append(pk)
+            active.append((end, pk, blocking))
+    return {pk: sorted(ids) for pk, ids in conflicts.items()}
+
+
+def _end_key(interval):
+    return interval[1]
+
+
+class ScheduleIndex:
+    """
+    Busy intervals of technicians per date, loaded with one query.
+
+    Each (technician, date) holds disjoint [start, end) intervals in
+    seconds since midnight, sorted by start. Because they are merged on
+    insert, their ends are sorted too and lookups use bisect.
+    """
+
+    def __init__(self, technician_ids, start_date, end_date):
+        self.technician_ids = list(technician_ids)
+        self.start_date = start_date
+        self.end_date = end_date
+        self._busy = defaultdict(list)
+
+    @classmethod
+    def load(cls, start_date, end_date, technicians=None, statuses=BLOCKING_STATUSES):
+        """
+        Index the schedules from start_date up to (excluding) end_date.
+
+        `technicians` defaults to every active FieldTechnician.
+        """
+        if technicians is None:
+            technicians = FieldTechnician.objects.filter(
+                employment_status=FieldTechnician.EmploymentStatus.ACTIVE
+            ).order_by("pk")
+        technician_ids = [getattr(technician, "pk", technician) for technician in technicians]
+        index = cls(technician_ids, start_date, end_date)
+
+        rows = ServiceSchedule.objects.filter(
+            technician_id__in=technician_ids,
+            scheduled_date__gte=start_date,
+            scheduled_date__lt=end_date,
+            status__in=statuses,
+        ).values_list("technician_id", "scheduled_date", "scheduled_start_time", "scheduled_end_time")
+        for technician_id, scheduled_date, start, end in rows:
+            index.book(technician_id, scheduled_date, start, end)
+        return index
+
+    def busy(self, technician_id, scheduled_date):
+        """Merged busy intervals as (start_time, end_time) pairs."""
+        return [(_time(start), _time(end)) for start, end in self._busy.get((technician_id, scheduled_date), [])]
+
+    def book(self, technician_id, scheduled_date, start_time, end_time):
+        """Mark a time range as busy, merging it with touching or overlapping intervals."""
+        start, end = _seconds(start_time), _seconds(end_time)
+        if end <= start:
+            return
+        intervals = self._busy[(technician_id, scheduled_date)]
+        first = bisect_right(intervals, start, key=_end_key)
+        if first > 0 and intervals[first - 1][1] == start:
+            first -= 1
+        last = first
+        while last < len(intervals) and intervals[last][0] <= end:
+            start = min(start, intervals[last][0])
+            end = max(end, intervals[last][1])
+            last += 1
+        intervals[first:last] = [(start, end)]
+
+    def is_free(self, technician_id, scheduled_date, start_time, end_time):
+        start, end = _seconds(start_time), _seconds(end_time)
+        intervals = self._busy.get((technician_id, scheduled_date), [])
+        position = bisect_right(intervals, start, key=_end_key)
+        return position == len(intervals) or intervals[position][0] >= end
+
+    def first_free(self, technician_id, scheduled_date, duration, day_start=DAY_START, day_end=DAY_END):
+        """Start time of the first gap of `duration` within the working window, or None."""
+        length = _duration_seconds(duration)
+        cursor, limit = _seconds(day_start), _seconds(day_end)
+        intervals = self._busy.get((technician_id, scheduled_date), [])
+        for start, end in intervals[bisect_right(intervals, cursor, key=_end_key):]:
+            if start - cursor >= length:
+                break
+            cursor = max(cursor, end)
+        if limit - cursor >= length:
+            return _time(cursor)
+        return None
+
+    def earliest_slot(self, duration, not_before=None, day_start=DAY_START, day_end=DAY_END):
+        """
+        Earliest free Slot of `duration` across the indexed technicians.
+
+        Ties on the same date and start time go to the technician listed
+        first. `not_before` (a datetime) skips earlier dates and times.
+        """
+        length = _duration_seconds(duration)
+        scheduled_date = self.start_date
+        earliest_start = None
+        if not_before is not None:
+            if timezone.is_aware(not_before):
+                not_before = timezone.localtime(not_before)
+            scheduled_date = max(scheduled_date, not_before.date())
+            earliest_start = not_before.time().replace(microsecond=0)
+
+        while scheduled_date < self.end_date:
+            window_start = day_start
+            if earliest_start is not None and scheduled_date == not_before.date():
+                window_start = max(day_start, earliest_start)
+            best = None
+            for technician_id in self.technician_ids:
+                start = self.first_free(technician_id, scheduled_date, duration, window_start, day_end)
+                if start is not None and (best is None or start < best[1]):
+                    best = (technician_id, start)
+            if best is not None:
+                technician_id, start = best
+                return Slot(technician_id, scheduled_date, start, _time(_seconds(start) + length))
+            scheduled_date += timedelta(days=1)
+        return None
+
+    def assign(self, duration, not_before=None, day_start=DAY_START, day_end=DAY_END):
+        """Find the earliest slot and book it in the index (the caller saves the schedule)."""
+        slot = self.earliest_slot(duration, not_before=not_before, day_start=day_start, day_end=day_end)
+        if slot is not None:
+            self.book(slot.technician_id, slot.date, slot.start_time, slot.end_time)
+        return slot
+
+
+def find_earliest_slot(duration, start_date=None, horizon_days=14, technicians=None,
+                       day_start=DAY_START, day_end=DAY_END):
+    """Earliest free Slot of `duration` for any technician within the horizon, or None."""
+    if start_date is None:
+        start_date = timezone.localdate()
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    index = ScheduleIndex.load(start_date, start_date + timedelta(days=horizon_days), technicians)
+    return index.earliest_slot(duration, day_start=day_start, day_end=day_end)
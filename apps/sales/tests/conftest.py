@@ -271,6 +271,17 @@ def field_service_request(db, customer, service_site, base_user):
     )
 
 
+@pytest.fixture
+def field_run(db):
+    """Drill string run for run data tests."""
+    from apps.sales.models import Customer, FieldDrillStringRun, Well
+    from apps.workorders.models import DrillBit
+    customer = Customer.objects.create(code='CUST-RUN', name='Run Data Customer', customer_type='OPERATOR')
+    well = Well.objects.create(customer=customer, code='WELL-RUN-1', name='Run Data Well')
+    bit = DrillBit.objects.create(serial_number='SN-RUN-001', bit_type='PDC', size=Decimal('8.500'), status='AVAILABLE')
+    return FieldDrillStringRun.objects.create(drill_bit=bit, well=well, customer=customer)
+
+
 # Django test client fixtures
 @pytest.fixture
 def authenticated_client(db, client, base_user):
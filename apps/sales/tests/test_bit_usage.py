@@ -0,0 +1,124 @@
+"""
+Tests for atomic drill bit usage accumulation.
+"""
+
+import io
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.sales.bit_usage import recompute_bit_usage
+from apps.sales.models import DrillBitHourTotal, FieldDrillStringRun, RunHours
+from apps.workorders.models import DrillBit
+
+TOTAL = RunHours.HourType.TOTAL
+
+
+def start(run, hours_ago, depth_in='5000'):
+    run.status = FieldDrillStringRun.Status.DRILLING
+    run.spud_time = timezone.now() - timedelta(hours=hours_ago)
+    run.depth_in = Decimal(depth_in)
+    run.save()
+    return run
+
+
+def log(bit, hours, hour_type=TOTAL, day=date(2026, 10, 1), **extra):
+    return RunHours.objects.create(drill_bit=bit, hours=Decimal(hours), hour_type=hour_type, record_date=day, **extra)
+
+
+class TestRunCompletion:
+    """Tests for run completion updates."""
+
+    def test_concurrent_completions_do_not_lose_updates(self, field_run):
+        second = FieldDrillStringRun.objects.create(
+            drill_bit=field_run.drill_bit, well=field_run.well, customer=field_run.customer,
+        )
+        start(field_run, 10)
+        start(second, 5)
+        # both runs hold their own (stale) copy of the bit
+        second.drill_bit = DrillBit.objects.get(pk=field_run.drill_bit_id)
+
+        field_run.complete_run(depth_out=Decimal('5600'))
+        second.complete_run(depth_out=Decimal('5250'))
+
+        bit = DrillBit.objects.get(pk=field_run.drill_bit_id)
+        assert bit.run_count == 2
+        assert bit.total_footage == 850
+        assert bit.total_hours == pytest.approx(Decimal('15'), abs=Decimal('0.02'))
+        assert second.drill_bit.run_count == 2
+
+    def test_run_is_counted_once(self, field_run):
+        start(field_run, 2)
+        stale = FieldDrillStringRun.objects.get(pk=field_run.pk)
+        field_run.complete_run()
+
+        with pytest.raises(ValidationError):
+            stale.complete_run()
+        assert DrillBit.objects.get(pk=field_run.drill_bit_id).run_count == 1
+
+
+class TestRunHours:
+    """Tests for hour entry accumulation."""
+
+    def test_cumulative_without_history_lookup(self, field_run, django_assert_num_queries):
+        bit = field_run.drill_bit
+        for day in range(1, 21):
+            log(bit, '2.5', hour_type=RunHours.HourType.ROTATING, day=date(2026, 9, day))
+
+        # counter update + read, insert (inside a savepoint)
+        with django_assert_num_queries(5):
+            entry = log(bit, '1.5', hour_type=RunHours.HourType.ROTATING)
+
+        assert entry.cumulative_hours == Decimal('51.50')
+        assert DrillBit.objects.get(pk=bit.pk).total_hours == 0
+
+    def test_total_hours_follow_edits_and_deletes(self, field_run):
+        bit = field_run.drill_bit
+        first = log(bit, '8')
+        log(bit, '4', field_run=field_run)
+        assert DrillBit.objects.get(pk=bit.pk).total_hours == Decimal('8')
+
+        first.hours = Decimal('10')
+        first.save()
+        assert DrillBit.objects.get(pk=bit.pk).total_hours == Decimal('10')
+        assert DrillBitHourTotal.objects.get(drill_bit=bit, hour_type=TOTAL).hours == Decimal('14')
+
+        first.delete()
+        assert DrillBit.objects.get(pk=bit.pk).total_hours == 0
+        assert DrillBitHourTotal.objects.get(drill_bit=bit, hour_type=TOTAL).hours == Decimal('4')
+
+
+class TestRecompute:
+    """Tests for drift repair."""
+
+    def test_recompute_repairs_drift(self, field_run):
+        bit = field_run.drill_bit
+        start(field_run, 3)
+        field_run.complete_run(depth_out=Decimal('5100'))
+        log(bit, '2', day=date(2026, 10, 2))
+        backdated = log(bit, '3', day=date(2026, 10, 1))
+        RunHours.objects.filter(pk=backdated.pk).update(cumulative_hours=Decimal('3'))
+        DrillBit.objects.filter(pk=bit.pk).update(total_hours=0, total_footage=7, run_count=5)
+        DrillBitHourTotal.objects.all().delete()
+
+        out = io.StringIO()
+        call_command('recompute_bit_usage', '--dry-run', stdout=out)
+        assert 'SN-RUN-001: hours 0.00 -> ' in out.getvalue()
+        assert DrillBit.objects.get(pk=bit.pk).run_count == 5
+
+        result = recompute_bit_usage()
+        assert len(result.drifted) == 1
+        assert result.hour_entries == 1
+
+        bit.refresh_from_db()
+        assert (bit.total_footage, bit.run_count) == (100, 1)
+        assert bit.total_hours == pytest.approx(Decimal('8'), abs=Decimal('0.02'))
+        # Insertion order: the backdated entry continues the earlier total
+        assert list(RunHours.objects.order_by('pk').values_list('cumulative_hours', flat=True)) == [
+            Decimal('2'), Decimal('5'),
+        ]
+        assert DrillBitHourTotal.objects.get(drill_bit=bit, hour_type=TOTAL).hours == Decimal('5')
+        assert recompute_bit_usage().drifted == []
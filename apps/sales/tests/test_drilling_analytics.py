@@ -0,0 +1,127 @@
+"""
+Tests for run level drilling analytics.
+"""
+
+import io
+import math
+import pytest
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.sales.drilling_analytics import (
+    analyze_run, bit_area, detect_on_bottom, rolling_stats, rop_from_depth, teale_mse, teale_mse_value, write_back,
+)
+from apps.sales.models import FieldDrillStringRun, FieldRunData, FieldRunDataRollup
+from apps.sales.run_ingest import ingest_rows
+
+START = timezone.make_aware(datetime(2026, 10, 1, 6, 0, 0))
+NAN = float('nan')
+
+
+def drilling(count, start=START):
+    """Ten seconds on bottom drilling 72 ft/hr, then ten seconds pulled back 5 ft."""
+    depth = Decimal('5000')
+    for second in range(count):
+        on_bottom = (second // 10) % 2 == 0
+        if on_bottom and second:
+            depth += Decimal('0.02')
+        yield {
+            'timestamp': start + timedelta(seconds=second),
+            'bit_depth': depth if on_bottom else depth - 5,
+            'hole_depth': depth,
+            'wob': Decimal('20') if on_bottom else Decimal('0'),
+            'rpm': Decimal('120'),
+            'torque': Decimal('8000'),
+            'flow_rate': Decimal('500'),
+            'differential_pressure': Decimal('600'),
+        }
+
+
+class TestSeries:
+    """Tests for the column functions."""
+
+    def test_teale_mse(self):
+        area = bit_area(Decimal('8.500'))
+        mse = teale_mse(array('d', [20, 20, NAN]), array('d', [120, 120, 120]),
+                        array('d', [8000, 8000, 8000]), array('d', [60, 0, 60]), area)
+
+        expected = 20000 / area + 120 * math.pi * 120 * 8000 / (area * 60)
+        assert mse[0] == pytest.approx(expected)
+        assert math.isnan(mse[1]) and math.isnan(mse[2])
+        assert teale_mse_value(Decimal('20'), Decimal('120'), Decimal('8000'), Decimal('60'), Decimal('8.5')) == (
+            Decimal(repr(expected)).quantize(Decimal('0.01'))
+        )
+        assert teale_mse_value(None, 120, 8000, 60, Decimal('8.5')) is None
+
+    def test_on_bottom_and_rop(self):
+        times = array('d', range(6))
+        bit_depth = array('d', [100, 100.5, 101, 101, 96, 96])
+        hole_depth = array('d', [100, 100.5, 101, NAN, NAN, 101])
+        wob = array('d', [20, 20, 20, 0.5, 20, 20])
+
+        on_bottom = detect_on_bottom(bit_depth, hole_depth, wob)
+        assert list(on_bottom) == [1, 1, 1, 0, 0, 0]
+
+        rop = rop_from_depth(times, bit_depth, on_bottom, window=60)
+        assert math.isnan(rop[0])
+        assert list(rop[1:3]) == [1800.0, 1800.0]
+        assert all(math.isnan(value) for value in rop[3:])
+
+    def test_rolling_stats_skip_missing(self):
+        means, stds = rolling_stats(array('d', range(5)), array('d', [1, 3, NAN, 5, 7]), window=2)
+        assert list(means) == [1, 2, 3, 5, 6]
+        assert list(stds) == [0, 1, 0, 0, 1]
+
+
+class TestRunAnalysis:
+    """Tests for analyzing and writing back a stored run."""
+
+    def test_summary_and_interval(self, field_run, django_assert_num_queries):
+        ingest_rows(field_run, drilling(120))
+        with django_assert_num_queries(2):
+            analysis = analyze_run(field_run)
+
+        summary = analysis.summary()
+        assert summary['avg_wob'] == Decimal('20.00')
+        assert analysis.on_bottom_hours() == pytest.approx(54 / 3600)
+        assert summary['avg_rop'] == Decimal('72.00')
+
+        interval = analysis.interval(START, START + timedelta(seconds=10))
+        assert interval['start_depth'] == Decimal('5000.00')
+        assert interval['footage_drilled'] == Decimal('0.18')
+        assert interval['avg_flow_rate'] == Decimal('500.00')
+
+    def test_write_back_updates_points_rollups_and_run(self, field_run):
+        ingest_rows(field_run, drilling(120))
+        written = write_back(analyze_run(field_run), update_run=True)
+
+        assert written == 120
+        point = FieldRunData.objects.get(field_run=field_run, timestamp=START + timedelta(seconds=5))
+        assert point.rop == Decimal('72.00')
+        assert point.mse == teale_mse_value(point.wob, point.rpm, point.torque, point.rop, Decimal('8.5'))
+        assert point.calculated_mse == point.mse
+        assert point.bit_hydraulic_power == Decimal('175.03')
+        off_bottom = FieldRunData.objects.get(field_run=field_run, timestamp=START + timedelta(seconds=15))
+        assert (off_bottom.rop, off_bottom.mse) == (None, None)
+
+        rollup = FieldRunDataRollup.objects.get(
+            field_run=field_run, resolution=FieldRunDataRollup.Resolution.MINUTE, start_time=START
+        )
+        assert rollup.rop_count == rollup.mse_count == 29
+
+        field_run.refresh_from_db()
+        assert field_run.avg_wob == Decimal('20.00')
+        assert field_run.max_rpm == Decimal('120.0')
+        assert field_run.avg_rop is not None
+
+    def test_command(self, field_run):
+        ingest_rows(field_run, drilling(30))
+        out = io.StringIO()
+        call_command('analyze_run_data', field_run.run_number, '--tfa', '0.994', '--update-run', stdout=out)
+
+        assert 'Analyzed 1 run(s)' in out.getvalue()
+        assert FieldRunData.objects.filter(field_run=field_run, mse__isnull=False).count() > 0
+        assert FieldDrillStringRun.objects.get(pk=field_run.pk).total_on_bottom_hours is not None
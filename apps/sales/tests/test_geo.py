@@ -0,0 +1,161 @@
+"""
+Tests for GPS geospatial lookups and geofence check-ins.
+"""
+
+import math
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.sales.geo import (
+    encode_geohash, geohash_cover, haversine, haversine_many, record_pings, technicians_near, within_cells,
+)
+from apps.sales.models import (
+    Customer, FieldServiceRequest, FieldTechnician, GPSLocation, ServiceSite, SiteVisit,
+)
+
+SITE = (Decimal('25.9000000'), Decimal('49.6000000'))
+
+
+def offset(meters_north, meters_east, origin=SITE):
+    """Coordinate `meters_north`/`meters_east` away from origin."""
+    lat = float(origin[0]) + math.degrees(meters_north / 6371000)
+    lon = float(origin[1]) + math.degrees(meters_east / (6371000 * math.cos(math.radians(float(origin[0])))))
+    return Decimal(f'{lat:.7f}'), Decimal(f'{lon:.7f}')
+
+
+@pytest.fixture
+def site(db):
+    customer = Customer.objects.create(code='CUST-GEO', name='Geo Customer', customer_type='OPERATOR')
+    return ServiceSite.objects.create(
+        site_code='SITE-GEO', name='Geo Rig', customer=customer, address_line1='Ghawar Field', city='Dhahran',
+        latitude=SITE[0], longitude=SITE[1],
+    )
+
+
+@pytest.fixture
+def technicians(db):
+    return [
+        FieldTechnician.objects.create(
+            employee_id=f'TECH-G{i}', name=f'Geo Technician {i}', email=f'geo{i}@example.com', phone='+966500000000',
+        )
+        for i in range(1, 4)
+    ]
+
+
+@pytest.fixture
+def make_visit(db, site, user):
+    request = FieldServiceRequest.objects.create(
+        customer=site.customer, service_site=site, request_type='DRILL_BIT_INSPECTION', priority='MEDIUM',
+        title='Geofence', description='Geofence', requested_date=timezone.localdate(),
+        contact_person='Dispatcher', contact_phone='+966500000000', created_by=user,
+    )
+
+    def _make(technician, status=SiteVisit.Status.EN_ROUTE):
+        return SiteVisit.objects.create(
+            service_request=request, technician=technician, service_site=site,
+            visit_date=timezone.localdate(), status=status,
+        )
+    return _make
+
+
+def ping(technician, coordinates, when):
+    return GPSLocation(field_technician=technician, latitude=coordinates[0], longitude=coordinates[1], recorded_at=when)
+
+
+class TestGeometry:
+    """Tests for geohash and distance helpers."""
+
+    def test_geohash_and_distance(self):
+        assert encode_geohash(57.64911, 10.40744) == 'u4pruydqq'
+        assert haversine(*SITE, *offset(1000, 0)) == pytest.approx(1000, rel=1e-3)
+
+        points = [offset(0, 500), offset(-3000, 4000)]
+        distances = haversine_many(*SITE, [p[0] for p in points], [p[1] for p in points])
+        assert list(distances) == pytest.approx([500, 5000], rel=1e-3)
+        assert ping(None, points[1], None).distance_to(*SITE) == pytest.approx(distances[1])
+
+    @pytest.mark.parametrize('radius', [150, 5000, 80000])
+    def test_cover_contains_every_point_in_radius(self, radius):
+        cells = geohash_cover(*SITE, radius)
+        assert len(cells) <= 9
+        for bearing in range(0, 360, 15):
+            north = radius * 0.999 * math.cos(math.radians(bearing))
+            east = radius * 0.999 * math.sin(math.radians(bearing))
+            assert encode_geohash(*offset(north, east)).startswith(tuple(cells))
+
+    def test_no_cells_match_nothing(self):
+        assert within_cells([]) == Q(pk__in=[])
+
+
+class TestTechniciansNear:
+    """Tests for the nearby technician query."""
+
+    def test_latest_live_ping_counts(self, site, technicians, django_assert_num_queries):
+        now = timezone.now()
+        near, moved_away, stale = technicians
+        ping(near, offset(2000, 0), now - timedelta(minutes=5)).save()
+        ping(moved_away, offset(1000, 0), now - timedelta(minutes=10)).save()
+        ping(moved_away, offset(90000, 0), now - timedelta(minutes=2)).save()
+        ping(stale, offset(500, 0), now - timedelta(hours=2)).save()
+
+        with django_assert_num_queries(1):
+            nearby = technicians_near(site, radius_km=10)
+
+        assert [item.technician for item in nearby] == [near]
+        assert nearby[0].distance_m == pytest.approx(2000, rel=1e-3)
+        assert site.nearby_technicians(100, max_age=timedelta(hours=3))[0].technician == stale
+
+    def test_view_returns_json(self, client, user, site, technicians):
+        ping(technicians[0], offset(0, 3000), timezone.now()).save()
+        client.force_login(user)
+
+        response = client.get(reverse('sales:servicesite_nearby_technicians', args=[site.pk]), {'km': '5'})
+        assert response.status_code == 200
+        assert [row['name'] for row in response.json()['technicians']] == ['Geo Technician 1']
+        assert response.json()['technicians'][0]['distance_km'] == pytest.approx(3, rel=1e-3)
+
+    @pytest.mark.parametrize('km', ['abc', 'nan', 'inf', '0', '-5', '100000'])
+    def test_view_rejects_bad_radius(self, client, user, site, km):
+        client.force_login(user)
+        response = client.get(reverse('sales:servicesite_nearby_technicians', args=[site.pk]), {'km': km})
+        assert response.status_code == 400
+
+
+class TestRecordPings:
+    """Tests for bulk ping recording with geofence check-in."""
+
+    def test_first_ping_inside_checks_visit_in(self, technicians, make_visit, django_assert_max_num_queries):
+        visit = make_visit(technicians[0])
+        arrived = make_visit(technicians[1], status=SiteVisit.Status.ARRIVED)
+        start = timezone.localtime().replace(hour=8, minute=0, second=0, microsecond=0)
+        pings = [
+            ping(technicians[0], offset(-2000 + 300 * i, 0), start + timedelta(minutes=i))
+            for i in range(10)
+        ] + [ping(technicians[1], offset(0, 0), start), ping(technicians[2], offset(0, 0), start)]
+
+        # open visit lookup, lock, insert, visit update
+        with django_assert_max_num_queries(6):
+            result = record_pings(pings)
+
+        assert result.created == 12
+        assert result.checked_in == [visit]
+        visit.refresh_from_db()
+        assert visit.status == SiteVisit.Status.ARRIVED
+        assert visit.check_in_time == start + timedelta(minutes=6)
+        assert (visit.check_in_latitude, visit.check_in_longitude) == offset(-200, 0)
+
+        stored = GPSLocation.objects.get(field_technician=technicians[0], recorded_at=start + timedelta(minutes=6))
+        assert stored.location_type == GPSLocation.LocationType.CHECK_IN
+        assert stored.is_inside_geofence and stored.site_visit == visit
+        assert stored.distance_from_site == pytest.approx(Decimal('200'), abs=1)
+        assert stored.geohash == encode_geohash(stored.latitude, stored.longitude)
+        assert GPSLocation.objects.get(field_technician=technicians[0], recorded_at=start).is_inside_geofence is False
+
+        assert GPSLocation.objects.get(field_technician=technicians[1]).site_visit is None
+        arrived.refresh_from_db()
+        assert arrived.check_in_time is None
+        assert GPSLocation.objects.get(field_technician=technicians[2]).is_inside_geofence is None
@@ -0,0 +1,105 @@
+"""
+Tests for GPS track compression and history pruning.
+"""
+
+import io
+import math
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.sales.gps_tracks import TrackPoint, compress_history, decode_track, encode_track, simplify
+from apps.sales.models import FieldTechnician, GPSLocation, GPSTrack
+
+
+@pytest.fixture
+def technician(db):
+    return FieldTechnician.objects.create(
+        employee_id='TECH-TRK', name='Track Technician', email='track@example.com', phone='+966500000000',
+    )
+
+
+def route(count, start, step_m=20):
+    """Drive north for half the points, then east, one ping per 10 seconds."""
+    points = []
+    lat, lon = Decimal('25.9000000'), Decimal('49.6000000')
+    for i in range(count):
+        points.append(TrackPoint(start + timedelta(seconds=10 * i), lat, lon))
+        if i < count // 2:
+            lat += Decimal(f'{math.degrees(step_m / 6371000):.7f}')
+        else:
+            lon += Decimal(f'{math.degrees(step_m / (6371000 * math.cos(math.radians(25.9)))):.7f}')
+    return points
+
+
+def store(technician, points, **extra):
+    GPSLocation.objects.bulk_create(
+        GPSLocation(field_technician=technician, recorded_at=point.recorded_at, latitude=point.latitude,
+                    longitude=point.longitude, **extra)
+        for point in points
+    )
+
+
+class TestTrackEncoding:
+    """Tests for blob encoding and simplification."""
+
+    def test_round_trip_is_lossless(self):
+        start = timezone.now().replace(microsecond=123000)
+        points = route(500, start) + [TrackPoint(start + timedelta(hours=2), Decimal('-33.8688197'), Decimal('151.2092955'))]
+
+        blob = encode_track(points)
+        assert decode_track(blob) == points
+        assert len(blob) < len(points) * 6
+        assert decode_track(encode_track([])) == []
+
+    def test_simplify_keeps_corners_only(self):
+        points = route(41, timezone.now())
+        assert simplify(points, tolerance_m=5) == [0, 20, 40]
+        assert len(simplify(points, tolerance_m=0)) > 3
+
+
+class TestCompressHistory:
+    """Tests for the retention tier pruning."""
+
+    def test_old_pings_are_archived_and_simplified(self, technician):
+        old = timezone.localtime(timezone.now() - timedelta(days=40)).replace(hour=8, microsecond=0)
+        recent = timezone.now() - timedelta(days=1)
+        store(technician, route(41, old))
+        store(technician, route(10, recent))
+        store(technician, route(1, old + timedelta(minutes=1)), location_type=GPSLocation.LocationType.CHECK_IN)
+
+        result = compress_history()
+
+        assert (result.tracks, result.archived, result.kept, result.deleted) == (1, 41, 3, 38)
+        track = GPSTrack.objects.get()
+        assert track.decode() == route(41, old)
+        assert track.track_date == timezone.localdate(old)
+        assert track.distance_meters == pytest.approx(Decimal('800'), abs=1)
+
+        remaining = GPSLocation.objects.filter(field_technician=technician)
+        assert remaining.count() == 3 + 10 + 1
+        assert remaining.filter(is_track_point=True).count() == 3
+        assert compress_history().tracks == 0
+
+    def test_later_pings_merge_into_the_track(self, technician):
+        start = timezone.localtime(timezone.now() - timedelta(days=40)).replace(hour=8, minute=0, second=0, microsecond=0)
+        store(technician, route(20, start))
+        compress_history()
+        store(technician, route(20, start + timedelta(hours=1)))
+
+        call_command('prune_gps_history', '--days', '30', stdout=io.StringIO())
+
+        track = GPSTrack.objects.get()
+        assert track.point_count == 40
+        assert track.end_time == start + timedelta(hours=1, seconds=190)
+
+    def test_dry_run_changes_nothing(self, technician):
+        store(technician, route(41, timezone.now() - timedelta(days=40)))
+        out = io.StringIO()
+        call_command('prune_gps_history', '--dry-run', stdout=out)
+
+        assert '41 ping(s) archived' in out.getvalue()
+        assert GPSLocation.objects.count() == 41
+        assert not GPSTrack.objects.exists()
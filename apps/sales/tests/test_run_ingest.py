@@ -0,0 +1,106 @@
+"""
+Tests for bulk FieldRunData ingestion.
+"""
+
+import io
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.sales.models import FieldRunData
+from apps.sales.run_ingest import ingest_rows, read_csv, read_wits
+
+START = timezone.make_aware(datetime(2026, 10, 1, 6, 0, 0))
+
+
+def samples(count, start=START):
+    for second in range(count):
+        yield {
+            'timestamp': start + timedelta(seconds=second),
+            'bit_depth': f'{5000 + second * 0.05:.3f}',
+            'wob': '25.456',
+            'rpm': 120,
+            'torque': 8500.5,
+            'rop': '-999.25',
+        }
+
+
+class TestIngestRows:
+    """Tests for the ingest API."""
+
+    def test_bulk_insert_with_converted_values(self, field_run, django_assert_max_num_queries):
+        # per chunk: savepoint, run lock, duplicate lookup, insert (SQLite may split it), rollup lock/insert/update
+        with django_assert_max_num_queries(60):
+            result = ingest_rows(field_run, samples(1000), chunk_size=500)
+
+        assert (result.received, result.created, result.duplicates, result.rejected) == (1000, 1000, 0, 0)
+        point = FieldRunData.objects.get(timestamp=START + timedelta(seconds=10))
+        assert point.bit_depth == Decimal('5000.50')
+        assert point.wob == Decimal('25.46')
+        assert point.rpm == Decimal('120.0')
+        assert point.rop is None
+        assert point.data_source == FieldRunData.DataSource.EDR
+
+    def test_duplicates_are_skipped(self, field_run):
+        ingest_rows(field_run, samples(100))
+        rows = list(samples(150)) + [{'timestamp': START, 'bit_depth': '1'}]
+
+        result = ingest_rows(field_run, rows, chunk_size=40)
+
+        assert result.created == 50
+        assert result.duplicates == 101
+        assert FieldRunData.objects.filter(field_run=field_run).count() == 150
+
+    def test_timestamps_are_unique_per_run(self, field_run):
+        ingest_rows(field_run, samples(1))
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            FieldRunData.objects.bulk_create([FieldRunData(field_run=field_run, timestamp=START, bit_depth=1)])
+
+    def test_invalid_rows_are_rejected(self, field_run):
+        rows = [
+            {'timestamp': '2026-10-01T06:00:00', 'bit_depth': '5000'},
+            {'timestamp': 'yesterday', 'bit_depth': '5000'},
+            {'timestamp': '2026-10-01T06:00:02', 'bit_depth': ''},
+            {'timestamp': '2026-10-01T06:00:03', 'bit_depth': '5001', 'rpm': '1000000'},
+            {'timestamp': '2026-10-01T06:00:04', 'bit_depth': '5001', 'wob': 'abc'},
+        ]
+        result = ingest_rows(field_run, rows)
+
+        assert result.created == 1
+        assert result.rejected == 4
+        assert [line for line, _ in result.errors] == [2, 3, 4, 5]
+        assert 'invalid rpm' in result.errors[2][1]
+
+
+class TestReaders:
+    """Tests for the CSV and WITS readers."""
+
+    def test_csv_headers_are_mapped(self):
+        stream = io.StringIO(
+            'Date,Time,Bit Depth,WOB,Surface RPM,TQ,Unknown\n'
+            '2026-10-01,06:00:00,5000.1,25,120,8000,x\n'
+        )
+        assert list(read_csv(stream)) == [{
+            'timestamp': '2026-10-01 06:00:00', 'bit_depth': '5000.1', 'wob': '25', 'rpm': '120', 'torque': '8000',
+        }]
+
+    def test_wits_records(self):
+        stream = io.StringIO('&&\n0105261001\n0106060005\n01085000.5\n011625.0\n0120-9999\n9999ignored\n!!\n')
+        assert list(read_wits(stream)) == [{
+            'timestamp': '2026-10-01 06:00:05', 'bit_depth': '5000.5', 'wob': '25.0', 'rpm': '-9999',
+        }]
+
+    def test_command_loads_wits_file(self, field_run, tmp_path):
+        path = tmp_path / 'feed.wits'
+        path.write_text(''.join(
+            f'&&\n0105261001\n010606{second:04d}\n0108{5000 + second}\n!!\n' for second in range(0, 50)
+        ))
+        out = io.StringIO()
+        call_command('ingest_run_data', field_run.run_number, str(path), stdout=out)
+
+        assert '50 point(s) loaded' in out.getvalue()
+        assert FieldRunData.objects.filter(data_source=FieldRunData.DataSource.WITS).count() == 50
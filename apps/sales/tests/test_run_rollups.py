@@ -0,0 +1,143 @@
+"""
+Tests for downsampled run data rollups and the series query API.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.sales.models import FieldRunData, FieldRunDataRollup
+from apps.sales.run_ingest import ingest_rows
+from apps.sales.run_rollups import RAW, depth_profile, rebuild_rollups, run_series
+from apps.sales.views import FieldRunDataListView
+
+START = timezone.make_aware(datetime(2026, 10, 1, 6, 0, 0))
+Resolution = FieldRunDataRollup.Resolution
+
+
+def samples(count, start=START):
+    """One-second samples drilling 3 ft per minute."""
+    for second in range(count):
+        yield {
+            'timestamp': start + timedelta(seconds=second),
+            'bit_depth': Decimal('5000') + Decimal(second) / 20,
+            'wob': Decimal(20 + second % 10),
+            'rpm': Decimal('120'),
+            'torque': Decimal('8000') + second,
+        }
+
+
+def rollup_values(field_run):
+    return list(
+        FieldRunDataRollup.objects.filter(field_run=field_run)
+        .order_by('resolution', 'bucket')
+        .values_list('resolution', 'bucket', 'sample_count', 'start_time', 'end_time', 'depth_min', 'depth_max',
+                     'wob_min', 'wob_max', 'wob_sum', 'wob_count', 'torque_sum', 'rop_count')
+    )
+
+
+class TestRollupMaintenance:
+    """Tests for incremental rollup updates."""
+
+    def test_ingest_builds_all_resolutions(self, field_run):
+        ingest_rows(field_run, samples(1200))
+
+        rollups = FieldRunDataRollup.objects.filter(field_run=field_run)
+        assert rollups.filter(resolution=Resolution.MINUTE).count() == 20
+        assert rollups.filter(resolution=Resolution.TEN_MINUTES).count() == 2
+        assert rollups.filter(resolution=Resolution.DEPTH).count() == 6
+
+        minute = rollups.get(resolution=Resolution.MINUTE, start_time=START)
+        assert minute.sample_count == 60
+        assert (minute.wob_min, minute.wob_max, minute.wob_sum) == (Decimal('20'), Decimal('29'), Decimal('1470'))
+        assert minute.rop_count == 0
+        assert minute.end_time == START + timedelta(seconds=59)
+
+    def test_incremental_matches_rebuild(self, field_run):
+        ingest_rows(field_run, samples(700), chunk_size=250)
+        ingest_rows(field_run, samples(900), chunk_size=333)
+        incremental = rollup_values(field_run)
+
+        rebuild_rollups(field_run)
+        assert rollup_values(field_run) == incremental
+
+    def test_save_and_delete_keep_buckets_current(self, field_run):
+        ingest_rows(field_run, samples(60))
+        point = FieldRunData.objects.get(timestamp=START)
+        bucket = FieldRunDataRollup.objects.filter(field_run=field_run, resolution=Resolution.MINUTE)
+
+        point.wob = Decimal('99')
+        point.save()
+        assert bucket.get().wob_max == Decimal('99')
+
+        point.delete()
+        assert bucket.get().sample_count == 59
+        assert bucket.get().wob_max == Decimal('29')
+
+        FieldRunData.objects.create(field_run=field_run, timestamp=START, bit_depth=Decimal('5000'), wob=Decimal('5'))
+        assert (bucket.get().sample_count, bucket.get().wob_min) == (60, Decimal('5'))
+
+
+class TestRunSeries:
+    """Tests for the resolution picking query API."""
+
+    def test_resolution_follows_window(self, field_run, django_assert_num_queries):
+        ingest_rows(field_run, samples(1200))
+        end = START + timedelta(minutes=20)
+
+        assert run_series(field_run, START, end)[0] == RAW
+        resolution, rows = run_series(field_run, START, end, max_points=100)
+        assert resolution == Resolution.MINUTE
+        assert len(rows) == 20
+        assert rows[0]['wob_avg'] == Decimal('24.50')
+        assert rows[0]['rop_avg'] is None
+
+        with django_assert_num_queries(2):
+            resolution, rows = run_series(field_run, max_points=10)
+        assert resolution == Resolution.TEN_MINUTES
+        assert [row['samples'] for row in rows] == [600, 600]
+
+    def test_depth_profile(self, field_run):
+        ingest_rows(field_run, samples(1200))
+        rows = depth_profile(field_run, depth_from=Decimal('5025'), depth_to=Decimal('5035'))
+        assert [(row['depth_min'], row['samples']) for row in rows] == [
+            (Decimal('5020.00'), 200), (Decimal('5030.00'), 200),
+        ]
+
+
+class TestRunDataViews:
+    """Tests for the run data views."""
+
+    def test_series_view_returns_json(self, client, user, field_run):
+        ingest_rows(field_run, samples(120))
+        client.force_login(user)
+
+        response = client.get(reverse('sales:fielddrillstringrun_series', args=[field_run.pk]))
+        assert response.status_code == 200
+        assert response.json()['resolution'] == RAW
+        assert len(response.json()['points']) == 120
+
+        response = client.get(reverse('sales:fielddrillstringrun_series', args=[field_run.pk]), {'by': 'depth'})
+        assert response.json()['resolution'] == 'DEPTH'
+
+    def test_series_view_window(self, client, user, field_run):
+        ingest_rows(field_run, samples(120))
+        client.force_login(user)
+        url = reverse('sales:fielddrillstringrun_series', args=[field_run.pk])
+
+        response = client.get(url, {'start': timezone.localtime(START).replace(tzinfo=None).isoformat()})
+        assert response.status_code == 200
+        assert len(response.json()['points']) == 120
+
+        response = client.get(url, {'start': '2026-13-45T00:00'})
+        assert response.status_code == 400
+
+    def test_list_orders_by_timestamp(self, rf, field_run):
+        ingest_rows(field_run, samples(3))
+        view = FieldRunDataListView()
+        view.setup(rf.get('/sales/run-data/', {'q': field_run.run_number}))
+
+        assert [point.timestamp for point in view.get_queryset()] == [
+            START + timedelta(seconds=2), START + timedelta(seconds=1), START,
+        ]
@@ -0,0 +1,127 @@
+"""
+Tests for the field service scheduling engine.
+"""
+
+import pytest
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from apps.sales.models import Customer, FieldServiceRequest, FieldTechnician, ServiceSchedule, ServiceSite
+from apps.sales.scheduling import ScheduleIndex, Slot, board_conflicts, find_earliest_slot
+
+DAY = date(2026, 11, 2)
+
+
+@pytest.fixture
+def service_site(db):
+    customer = Customer.objects.create(code='CUST-SCH', name='Scheduling Customer', customer_type='OPERATOR')
+    return ServiceSite.objects.create(
+        site_code='SITE-SCH', name='Scheduling Site', customer=customer, site_type='RIG_SITE',
+        address_line1='Ghawar Field', city='Dhahran',
+    )
+
+
+@pytest.fixture
+def technicians(db):
+    return [
+        FieldTechnician.objects.create(
+            employee_id=f'TECH-S{i}', name=f'Technician {i}', email=f'tech{i}@example.com', phone='+966500000000',
+        )
+        for i in range(1, 4)
+    ]
+
+
+@pytest.fixture
+def make_schedule(db, service_site, user):
+    request = FieldServiceRequest.objects.create(
+        customer=service_site.customer, service_site=service_site, request_type='DRILL_BIT_INSPECTION',
+        priority='MEDIUM', title='Scheduling', description='Scheduling', requested_date=DAY,
+        contact_person='Dispatcher', contact_phone='+966500000000', created_by=user,
+    )
+
+    def _make(technician, start, end, status='CONFIRMED', day=DAY):
+        return ServiceSchedule.objects.create(
+            service_request=request, technician=technician, service_site=service_site, scheduled_date=day,
+            scheduled_start_time=start, scheduled_end_time=end, estimated_duration_hours=Decimal('1.00'),
+            status=status, created_by=user,
+        )
+    return _make
+
+
+class TestScheduleConflicts:
+    """Tests for single schedule conflict checks."""
+
+    def test_touching_schedules_do_not_conflict(self, make_schedule, technicians):
+        make_schedule(technicians[0], time(8, 0), time(10, 0))
+        draft = make_schedule(technicians[0], time(10, 0), time(11, 0), status='DRAFT')
+        assert not draft.has_conflicts()
+
+    def test_overlap_is_found_with_one_query(self, make_schedule, technicians, django_assert_num_queries):
+        first = make_schedule(technicians[0], time(8, 0), time(10, 0))
+        make_schedule(technicians[0], time(12, 0), time(13, 0))
+        make_schedule(technicians[0], time(9, 0), time(11, 0), status='CANCELLED')
+        draft = make_schedule(technicians[0], time(9, 30), time(11, 0), status='DRAFT')
+
+        with django_assert_num_queries(1):
+            assert draft.check_conflicts() == [first]
+
+
+class TestBoardConflicts:
+    """Tests for week board conflict detection."""
+
+    def test_board_pairs_in_one_query(self, make_schedule, technicians, django_assert_num_queries):
+        a = make_schedule(technicians[0], time(8, 0), time(12, 0))
+        b = make_schedule(technicians[0], time(9, 0), time(10, 0))
+        c = make_schedule(technicians[0], time(11, 0), time(13, 0), status='DRAFT')
+        make_schedule(technicians[0], time(13, 0), time(14, 0))
+        make_schedule(technicians[1], time(8, 0), time(12, 0))
+        make_schedule(technicians[0], time(8, 0), time(12, 0), day=DAY + timedelta(days=1))
+        d = make_schedule(technicians[2], time(8, 0), time(9, 0), status='DRAFT')
+        make_schedule(technicians[2], time(8, 30), time(9, 30), status='DRAFT')
+
+        with django_assert_num_queries(1):
+            conflicts = board_conflicts(DAY)
+
+        # Drafts never block each other, but a draft is reported against confirmed schedules
+        assert conflicts == {a.pk: [b.pk], b.pk: [a.pk], c.pk: [a.pk]}
+        assert d.pk not in conflicts
+
+
+class TestScheduleIndex:
+    """Tests for the interval index and slot finder."""
+
+    def test_book_merges_intervals(self):
+        index = ScheduleIndex([1], DAY, DAY + timedelta(days=1))
+        index.book(1, DAY, time(10, 0), time(11, 0))
+        index.book(1, DAY, time(8, 0), time(9, 0))
+        index.book(1, DAY, time(9, 0), time(10, 30))
+        index.book(1, DAY, time(14, 0), time(15, 0))
+
+        assert index.busy(1, DAY) == [(time(8, 0), time(11, 0)), (time(14, 0), time(15, 0))]
+        assert index.is_free(1, DAY, time(11, 0), time(14, 0))
+        assert not index.is_free(1, DAY, time(13, 30), time(14, 30))
+
+    def test_earliest_slot_across_technicians(self, make_schedule, technicians, django_assert_num_queries):
+        for technician in technicians:
+            make_schedule(technician, time(7, 0), time(9, 0))
+        make_schedule(technicians[0], time(9, 0), time(12, 0))
+        make_schedule(technicians[1], time(10, 0), time(12, 0))
+
+        with django_assert_num_queries(2):
+            slot = find_earliest_slot(timedelta(hours=2), start_date=DAY)
+        assert slot == Slot(technicians[2].pk, DAY, time(9, 0), time(11, 0))
+
+    def test_assign_plans_many_visits_without_queries(self, make_schedule, technicians, django_assert_num_queries):
+        index = ScheduleIndex.load(DAY, DAY + timedelta(days=7), technicians)
+
+        with django_assert_num_queries(0):
+            slots = [index.assign(Decimal('4')) for _ in range(10)]
+
+        # Three technicians fit three four-hour visits in a 07:00-19:00 day
+        assert [slot.date for slot in slots].count(DAY) == 9
+        assert slots[9] == Slot(technicians[0].pk, DAY + timedelta(days=1), time(7, 0), time(11, 0))
+
+    def test_not_before_skips_earlier_times(self, technicians):
+        index = ScheduleIndex([technicians[0].pk], DAY, DAY + timedelta(days=2))
+        slot = index.earliest_slot(timedelta(hours=3), not_before=datetime.combine(DAY, time(17, 0)))
+        assert slot == Slot(technicians[0].pk, DAY + timedelta(days=1), time(7, 0), time(10, 0))
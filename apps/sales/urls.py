@@ -61,6 +61,7 @@ urlpatterns = [
     path("sites/create/", views.ServiceSiteCreateView.as_view(), name="servicesite_create"),
     path("sites/<int:pk>/", views.ServiceSiteDetailView.as_view(), name="servicesite_detail"),
     path("sites/<int:pk>/edit/", views.ServiceSiteUpdateView.as_view(), name="servicesite_update"),
+    path("sites/<int:pk>/nearby-technicians/", views.ServiceSiteNearbyTechniciansView.as_view(), name="servicesite_nearby_technicians"),
     path("sites/<int:pk>/delete/", views.ServiceSiteDeleteView.as_view(), name="servicesite_delete"),
     # ==========================================================================
     # FIELD TECHNICIAN URLS
@@ -108,6 +109,7 @@ urlpatterns = [
     path("drill-runs/", views.FieldDrillStringRunListView.as_view(), name="fielddrillstringrun_list"),
     path("drill-runs/create/", views.FieldDrillStringRunCreateView.as_view(), name="fielddrillstringrun_create"),
     path("drill-runs/<int:pk>/", views.FieldDrillStringRunDetailView.as_view(), name="fielddrillstringrun_detail"),
+    path("drill-runs/<int:pk>/series/", views.FieldDrillStringRunSeriesView.as_view(), name="fielddrillstringrun_series"),
     path("drill-runs/<int:pk>/edit/", views.FieldDrillStringRunUpdateView.as_view(), name="fielddrillstringrun_update"),
     path("drill-runs/<int:pk>/delete/", views.FieldDrillStringRunDeleteView.as_view(), name="fielddrillstringrun_delete"),
     # ==========================================================================
@@ -8,13 +8,17 @@ Views for customer, rig, well, and warehouse management.
 import csv
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
 from apps.core.mixins import ManagerRequiredMixin
@@ -39,6 +43,7 @@ from .models import (
     FieldIncident, FieldDataEntry, FieldPhoto, FieldDocument,
     GPSLocation, FieldWorkOrder, FieldAssetAssignment
 )
+from .run_rollups import depth_profile, run_series
 
 # =============================================================================
 # CUSTOMER VIEWS
@@ -917,6 +922,37 @@ class ServiceSiteDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
+class ServiceSiteNearbyTechniciansView(LoginRequiredMixin, View):
+    """
+    Technicians near a site as JSON, from their latest live GPS ping.
+
+    ?km= sets the radius (default 50, at most ARDT_GPS_NEARBY_MAX_KM).
+    """
+
+    def get(self, request, pk):
+        site = get_object_or_404(ServiceSite, pk=pk)
+        max_km = settings.ARDT_GPS_NEARBY_MAX_KM
+        try:
+            radius_km = float(request.GET.get("km", 50))
+        except ValueError:
+            return JsonResponse({"error": "km must be a number"}, status=400)
+        if not 0 < radius_km <= max_km:
+            return JsonResponse({"error": f"km must be greater than 0 and at most {max_km}"}, status=400)
+
+        technicians = [
+            {
+                "technician_id": item.technician.pk,
+                "name": item.technician.name,
+                "distance_km": round(item.distance_m / 1000, 3),
+                "latitude": item.location.latitude,
+                "longitude": item.location.longitude,
+                "recorded_at": item.location.recorded_at,
+            }
+            for item in site.nearby_technicians(radius_km)
+        ]
+        return JsonResponse({"site": site.site_code, "radius_km": radius_km, "technicians": technicians})
+
+
 class ServiceSiteCreateView(LoginRequiredMixin, CreateView):
     """Create a new service site."""
 
@@ -1614,6 +1650,33 @@ class FieldDrillStringRunDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
+class FieldDrillStringRunSeriesView(LoginRequiredMixin, View):
+    """
+    Chart data for a run as JSON.
+
+    ?start=&end= (ISO datetimes) limit the window and the resolution is
+    picked from its length; ?by=depth returns the depth interval profile.
+    """
+
+    def get(self, request, pk):
+        run = get_object_or_404(FieldDrillStringRun, pk=pk)
+        if request.GET.get("by") == "depth":
+            return JsonResponse({"resolution": "DEPTH", "points": depth_profile(run)})
+
+        try:
+            start = parse_datetime(request.GET.get("start", ""))
+            end = parse_datetime(request.GET.get("end", ""))
+        except ValueError:
+            return JsonResponse({"error": "start and end must be valid ISO datetimes"}, status=400)
+        # Naive datetimes are in the current time zone
+        if start is not None and timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        if end is not None and timezone.is_naive(end):
+            end = timezone.make_aware(end)
+        resolution, points = run_series(run, start=start, end=end)
+        return JsonResponse({"resolution": resolution, "points": points})
+
+
 class FieldDrillStringRunCreateView(LoginRequiredMixin, CreateView):
     """Create a new field drill string run."""
 
@@ -1688,15 +1751,15 @@ class FieldRunDataListView(LoginRequiredMixin, ListView):
     paginate_by = 25
 
     def get_queryset(self):
-        queryset = FieldRunData.objects.select_related("drill_string_run", "drill_string_run__drill_bit")
+        queryset = FieldRunData.objects.select_related("field_run", "field_run__drill_bit")
 
         search = self.request.GET.get("q")
         if search:
             queryset = queryset.filter(
-                Q(drill_string_run__run_number__icontains=search)
+                Q(field_run__run_number__icontains=search)
             )
 
-        return queryset.order_by("-recorded_at")
+        return queryset.order_by("-timestamp")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1713,7 +1776,7 @@ class FieldRunDataDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "data"
 
     def get_queryset(self):
-        return FieldRunData.objects.select_related("drill_string_run", "drill_string_run__drill_bit")
+        return FieldRunData.objects.select_related("field_run", "field_run__drill_bit")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -0,0 +1,49 @@
+"""
+ARDT FMS - Match Invoices Command
+Three-way matches vendor invoices against their purchase order lines and
+accepted receipts, and records the results as InvoiceMatch rows. Meant to
+be scheduled (e.g. every few minutes) as well as run by hand.
+
+Usage:
+    python manage.py match_invoices                        # every open invoice
+    python manage.py match_invoices INV-2026-000042        # re-match specific invoices
+    python manage.py match_invoices --dry-run              # report without writing
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.supplychain.matching import match_invoices
+from apps.supplychain.models import VendorInvoice
+
+
+class Command(BaseCommand):
+    help = "Three-way match vendor invoices against purchase orders and receipts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("invoices", nargs="*", help="Invoice numbers (default: every open invoice)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Invoices matched per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Report matches without writing")
+
+    def handle(self, *args, **options):
+        invoice_ids = None
+        if options["invoices"]:
+            found = dict(
+                VendorInvoice.objects.filter(invoice_number__in=options["invoices"]).values_list("invoice_number", "pk")
+            )
+            missing = set(options["invoices"]) - set(found)
+            if missing:
+                raise CommandError(f"Unknown invoice(s): {', '.join(sorted(missing))}")
+            invoice_ids = list(found.values())
+
+        result = match_invoices(invoice_ids, dry_run=options["dry_run"], batch_size=options["batch_size"])
+
+        for number, reasons in result.exceptions:
+            self.stdout.write(f"  {number}: {'; '.join(reasons)}")
+        summary = (
+            f"{result.invoices} invoice(s) checked, {result.matched} matched, {len(result.exceptions)} exception(s); "
+            f"{result.created} match record(s) created, {result.updated} updated."
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry run - {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,265 @@
+"""
+ARDT FMS - Three-Way Match Engine
+Version: 5.4
+
+Batch matching of vendor invoices against their purchase order lines
+(price) and the receipt lines of those PO lines (quantity).
+
+Invoices are processed in chunks, each in a handful of set based
+queries: the invoices, their lines, the referenced PO lines, accepted
+receipt quantities and invoiced quantities per PO line, and the existing
+InvoiceMatch rows. Results are written with bulk_create/bulk_update:
+
+    result = match_invoices()                       # every open invoice
+    result = match_invoices([invoice.pk], user=request.user)
+
+For each invoice:
+
+    - price variance is (invoice unit price - PO net unit price) x invoiced
+      quantity, summed over lines; it must stay within
+      ARDT_MATCH_PRICE_TOLERANCE_AMOUNT or ARDT_MATCH_PRICE_TOLERANCE_PERCENT
+      of the PO value, whichever is larger;
+    - quantity variance is the quantity invoiced beyond the accepted
+      quantity of the PO line (counting every non-rejected invoice), beyond
+      ARDT_MATCH_QUANTITY_TOLERANCE_PERCENT of the accepted quantity.
+
+The invoice becomes MATCHED or MATCH_EXCEPTION, its InvoiceMatch row is
+created or updated and each line's variance_amount is set. Matches that
+were resolved by hand are never touched. Command: match_invoices.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import InvoiceLine, InvoiceMatch, PurchaseOrderLine, Receipt, ReceiptLine, VendorInvoice
+
+# Invoices matched by a default run
+OPEN_STATUSES = (VendorInvoice.Status.PENDING, VendorInvoice.Status.MATCH_EXCEPTION)
+
+# Invoices whose status the engine may change
+MATCHABLE_STATUSES = (*OPEN_STATUSES, VendorInvoice.Status.MATCHED)
+
+# Receipts whose accepted quantities count as received
+RECEIVED_STATUSES = (Receipt.Status.ACCEPTED, Receipt.Status.PARTIALLY_ACCEPTED, Receipt.Status.COMPLETED)
+
+CENTS = Decimal("0.01")
+THOUSANDTHS = Decimal("0.001")
+MAX_PERCENT = Decimal("999.99")  # InvoiceMatch.price_variance_percent has 5 digits
+
+MATCH_FIELDS = [
+    "purchase_order", "receipt", "match_status", "price_variance", "quantity_variance",
+    "price_variance_percent", "match_performed_by", "match_date", "exception_notes", "updated_at",
+]
+
+
+@dataclass(frozen=True)
+class Tolerances:
+    price_percent: Decimal
+    price_amount: Decimal
+    quantity_percent: Decimal
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            price_percent=Decimal(str(settings.ARDT_MATCH_PRICE_TOLERANCE_PERCENT)),
+            price_amount=Decimal(str(settings.ARDT_MATCH_PRICE_TOLERANCE_AMOUNT)),
+            quantity_percent=Decimal(str(settings.ARDT_MATCH_QUANTITY_TOLERANCE_PERCENT)),
+        )
+
+
+@dataclass
+class MatchResult:
+    invoices: int = 0
+    matched: int = 0
+    exceptions: list = field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+
+
+@dataclass
+class _Evaluation:
+    price_variance: Decimal = Decimal("0")
+    po_value: Decimal = Decimal("0")
+    quantity_variance: Decimal = Decimal("0")
+    receipt_id: int = None
+    reasons: list = field(default_factory=list)
+    line_variances: dict = field(default_factory=dict)
+
+
+def _matchable(statuses):
+    return VendorInvoice.objects.exclude(matches__match_status=InvoiceMatch.MatchStatus.RESOLVED).filter(
+        status__in=statuses
+    )
+
+
+def _invoice_ids(invoice_ids, statuses):
+    invoices = _matchable(statuses)
+    if invoice_ids is not None:
+        invoices = invoices.filter(pk__in=invoice_ids)
+    return list(invoices.order_by("pk").values_list("pk", flat=True).distinct())
+
+
+def match_invoices(invoice_ids=None, tolerances=None, user=None, dry_run=False, batch_size=500):
+    """
+    Three-way match invoices and record the results.
+
+    Without `invoice_ids` every PENDING or MATCH_EXCEPTION invoice is
+    matched; listed invoices may also be MATCHED already. Each chunk of
+    `batch_size` invoices is written in its own transaction, which locks
+    the chunk's invoices and re-checks their status: invoices approved,
+    paid or rejected since the run started (or locked by another run) are
+    left alone. Returns a MatchResult listing the exceptions as (invoice
+    number, reasons).
+    """
+    if tolerances is None:
+        tolerances = Tolerances.from_settings()
+    statuses = OPEN_STATUSES if invoice_ids is None else MATCHABLE_STATUSES
+    ids = _invoice_ids(invoice_ids, statuses)
+    result = MatchResult()
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            _match_chunk(ids[start:start + batch_size], statuses, tolerances, user, dry_run, result)
+    return result
+
+
+def _evaluate(invoice, lines, po_lines, received, invoiced, tolerances):
+    evaluation = _Evaluation()
+    if not lines:
+        evaluation.reasons.append("Invoice has no lines")
+    quantities = defaultdict(Decimal)
+    for pk, number, po_line_id, quantity, unit_price in lines:
+        po_line = po_lines.get(po_line_id)
+        if po_line is None:
+            evaluation.reasons.append(f"Line {number}: not linked to a PO line")
+            continue
+        po_id, po_price, discount, cancelled = po_line
+        if po_id != invoice.purchase_order_id:
+            evaluation.reasons.append(f"Line {number}: PO line belongs to another purchase order")
+            continue
+        if cancelled:
+            evaluation.reasons.append(f"Line {number}: PO line is cancelled")
+        net_price = po_price * (1 - discount / 100)
+        variance = (unit_price - net_price) * quantity
+        evaluation.price_variance += variance
+        evaluation.po_value += net_price * quantity
+        evaluation.line_variances[pk] = variance.quantize(CENTS)
+        quantities[po_line_id] += quantity
+
+    for po_line_id, quantity in quantities.items():
+        accepted, receipt_id = received.get(po_line_id, (Decimal("0"), None))
+        if receipt_id is not None and (evaluation.receipt_id is None or receipt_id > evaluation.receipt_id):
+            evaluation.receipt_id = receipt_id
+        excess = invoiced.get(po_line_id, quantity) - accepted
+        if excess > accepted * tolerances.quantity_percent / 100:
+            over = min(excess, quantity)
+            evaluation.quantity_variance += over
+            evaluation.reasons.append(
+                f"PO line {po_line_id}: {over.normalize():f} invoiced beyond accepted receipts"
+            )
+
+    allowed = max(tolerances.price_amount, evaluation.po_value * tolerances.price_percent / 100)
+    if abs(evaluation.price_variance) > allowed:
+        evaluation.reasons.append(
+            f"Price variance {evaluation.price_variance.quantize(CENTS)} "
+            f"({_percent(evaluation)}%) exceeds tolerance {allowed.quantize(CENTS)}"
+        )
+    return evaluation
+
+
+def _percent(evaluation):
+    if not evaluation.po_value:
+        return Decimal("0.00")
+    percent = (evaluation.price_variance / evaluation.po_value * 100).quantize(CENTS)
+    return max(-MAX_PERCENT, min(MAX_PERCENT, percent))
+
+
+def _match_chunk(ids, statuses, tolerances, user, dry_run, result):
+    invoices = list(
+        _matchable(statuses).select_for_update(skip_locked=True, of=("self",)).filter(pk__in=ids).order_by("pk")
+        .only("pk", "invoice_number", "purchase_order_id", "status", "is_matched", "match_exception_reason")
+    )
+    ids = [invoice.pk for invoice in invoices]
+    result.invoices += len(ids)
+    if not ids:
+        return
+    lines = defaultdict(list)
+    current_variances = {}
+    for pk, invoice_id, number, po_line_id, quantity, unit_price, variance in InvoiceLine.objects.filter(
+        vendor_invoice_id__in=ids
+    ).order_by("vendor_invoice_id", "line_number").values_list(
+        "pk", "vendor_invoice_id", "line_number", "po_line_id", "quantity", "unit_price", "variance_amount"
+    ):
+        lines[invoice_id].append((pk, number, po_line_id, quantity, unit_price))
+        current_variances[pk] = variance
+
+    po_line_ids = {line[2] for group in lines.values() for line in group if line[2] is not None}
+    po_lines = {
+        pk: rest for pk, *rest in PurchaseOrderLine.objects.filter(pk__in=po_line_ids).values_list(
+            "pk", "purchase_order_id", "unit_price", "discount_percent", "is_cancelled"
+        )
+    }
+    received = {
+        row["po_line_id"]: (row["accepted"], row["receipt_id"])
+        for row in ReceiptLine.objects.filter(po_line_id__in=po_line_ids, receipt__status__in=RECEIVED_STATUSES)
+        .values("po_line_id").annotate(accepted=Sum("quantity_accepted"), receipt_id=Max("receipt_id")).order_by()
+    }
+    invoiced = dict(
+        InvoiceLine.objects.filter(po_line_id__in=po_line_ids)
+        .exclude(vendor_invoice__status=VendorInvoice.Status.REJECTED)
+        .values("po_line_id").annotate(total=Sum("quantity")).order_by().values_list("po_line_id", "total")
+    )
+    existing = {
+        match.vendor_invoice_id: match
+        for match in InvoiceMatch.objects.filter(vendor_invoice_id__in=ids).order_by("vendor_invoice_id", "pk")
+    }
+
+    now = timezone.now()
+    new_matches, changed_matches, changed_lines = [], [], []
+    for invoice in invoices:
+        evaluation = _evaluate(invoice, lines[invoice.pk], po_lines, received, invoiced, tolerances)
+        notes = "; ".join(evaluation.reasons)
+        if evaluation.reasons:
+            result.exceptions.append((invoice.invoice_number, evaluation.reasons))
+        else:
+            result.matched += 1
+
+        match = existing.get(invoice.pk)
+        if match is None:
+            match = InvoiceMatch(vendor_invoice=invoice)
+            new_matches.append(match)
+        else:
+            changed_matches.append(match)
+        match.purchase_order_id = invoice.purchase_order_id
+        match.receipt_id = evaluation.receipt_id
+        match.match_status = InvoiceMatch.MatchStatus.EXCEPTION if notes else InvoiceMatch.MatchStatus.MATCHED
+        match.price_variance = evaluation.price_variance.quantize(CENTS)
+        match.quantity_variance = evaluation.quantity_variance.quantize(THOUSANDTHS)
+        match.price_variance_percent = _percent(evaluation)
+        match.match_performed_by = user
+        match.match_date = now
+        match.exception_notes = notes
+        match.updated_at = now
+
+        invoice.status = VendorInvoice.Status.MATCH_EXCEPTION if notes else VendorInvoice.Status.MATCHED
+        invoice.is_matched = not notes
+        invoice.match_exception_reason = notes
+        invoice.updated_at = now
+
+        for pk, variance in evaluation.line_variances.items():
+            if current_variances[pk] != variance:
+                changed_lines.append(InvoiceLine(pk=pk, variance_amount=variance))
+
+    result.created += len(new_matches)
+    result.updated += len(changed_matches)
+    if dry_run:
+        return
+    InvoiceMatch.objects.bulk_create(new_matches)
+    InvoiceMatch.objects.bulk_update(changed_matches, MATCH_FIELDS)
+    VendorInvoice.objects.bulk_update(invoices, ["status", "is_matched", "match_exception_reason", "updated_at"])
+    InvoiceLine.objects.bulk_update(changed_lines, ["variance_amount"])
@@ -33,11 +33,13 @@ Date: December 2024
 """
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
 
+from apps.common.sequences import next_document_number
+
 
 # =============================================================================
 # WEEK 1: VENDOR MANAGEMENT & PURCHASING
@@ -974,20 +976,7 @@ class PurchaseRequisition(models.Model):
     def _generate_requisition_number(self):
         """Generate unique requisition number: REQ-YYYY-####"""
         year = timezone.now().year
-        last_req = PurchaseRequisition.objects.filter(
-            requisition_number__startswith=f"REQ-{year}-"
-        ).order_by('-requisition_number').first()
-
-        if last_req:
-            try:
-                last_num = int(last_req.requisition_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"REQ-{year}-{new_num:04d}"
+        return next_document_number(PurchaseRequisition, "requisition_number", f"REQ-{year}-", padding=4)
 
     def submit(self):
         """Submit for approval"""
@@ -1397,32 +1386,21 @@ class PurchaseOrder(models.Model):
     def _generate_po_number(self):
         """Generate unique PO number: PO-YYYY-######"""
         year = timezone.now().year
-        last_po = PurchaseOrder.objects.filter(
-            po_number__startswith=f"PO-{year}-"
-        ).order_by('-po_number').first()
-
-        if last_po:
-            try:
-                last_num = int(last_po.po_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"PO-{year}-{new_num:06d}"
+        return next_document_number(PurchaseOrder, "po_number", f"PO-{year}-", padding=6)
 
     def calculate_totals(self):
-        """Recalculate PO totals from lines"""
-        lines = self.lines.filter(is_cancelled=False)
-        self.subtotal_amount = sum(line.line_total or Decimal('0.00') for line in lines)
-        self.total_amount = self.subtotal_amount + self.tax_amount + self.shipping_amount - self.discount_amount
-        self.save()
+        """Recalculate PO totals from lines (one UPDATE, see rollups.refresh_po_totals)"""
+        from .rollups import refresh_po_totals
+
+        refresh_po_totals([self.pk])
+        self.refresh_from_db(fields=['subtotal_amount', 'total_amount', 'updated_at'])
 
     @property
     def is_fully_received(self):
         """Check if all lines are fully received"""
-        return all(line.is_fully_received for line in self.lines.filter(is_cancelled=False))
+        return not self.lines.filter(
+            is_cancelled=False, quantity_received__lt=models.F('quantity_ordered')
+        ).exists()
 
 
 class PurchaseOrderLine(models.Model):
@@ -1772,20 +1750,7 @@ class Receipt(models.Model):
     def _generate_receipt_number(self):
         """Generate unique receipt number: RCP-YYYY-######"""
         year = timezone.now().year
-        last_rcp = Receipt.objects.filter(
-            receipt_number__startswith=f"RCP-{year}-"
-        ).order_by('-receipt_number').first()
-
-        if last_rcp:
-            try:
-                last_num = int(last_rcp.receipt_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"RCP-{year}-{new_num:06d}"
+        return next_document_number(Receipt, "receipt_number", f"RCP-{year}-", padding=6)
 
 
 class ReceiptLine(models.Model):
@@ -1885,12 +1850,34 @@ class ReceiptLine(models.Model):
         return f"{self.receipt.receipt_number} - Line {self.line_number}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update PO line received quantity
-        self.po_line.quantity_received = sum(
-            rl.quantity_accepted for rl in self.po_line.receipt_lines.all()
-        )
-        self.po_line.save()
+        from .rollups import post_receipt_quantities
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = ReceiptLine.objects.filter(pk=self.pk).values_list(
+                    'po_line_id', 'quantity_accepted'
+                ).first()
+            super().save(*args, **kwargs)
+            # Add the accepted quantity change to the PO line received quantity
+            deltas = {self.po_line_id: Decimal(self.quantity_accepted)}
+            if previous:
+                deltas[previous[0]] = deltas.get(previous[0], Decimal('0')) - previous[1]
+            post_receipt_quantities(deltas)
+        self._refresh_po_line()
+
+    def delete(self, *args, **kwargs):
+        from .rollups import post_receipt_quantities
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            post_receipt_quantities({self.po_line_id: -Decimal(self.quantity_accepted)})
+        self._refresh_po_line()
+        return result
+
+    def _refresh_po_line(self):
+        if ReceiptLine.po_line.is_cached(self):
+            self.po_line.refresh_from_db(fields=['quantity_received', 'updated_at'])
 
 
 class VendorInvoice(models.Model):
@@ -2098,20 +2085,7 @@ class VendorInvoice(models.Model):
     def _generate_invoice_number(self):
         """Generate unique invoice number: INV-YYYY-######"""
         year = timezone.now().year
-        last_inv = VendorInvoice.objects.filter(
-            invoice_number__startswith=f"INV-{year}-"
-        ).order_by('-invoice_number').first()
-
-        if last_inv:
-            try:
-                last_num = int(last_inv.invoice_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"INV-{year}-{new_num:06d}"
+        return next_document_number(VendorInvoice, "invoice_number", f"INV-{year}-", padding=6)
 
     @property
     def amount_outstanding(self):
@@ -2555,20 +2529,7 @@ class CostAllocation(models.Model):
     def _generate_allocation_number(self):
         """Generate unique allocation number: COST-YYYY-####"""
         year = timezone.now().year
-        last_alloc = CostAllocation.objects.filter(
-            allocation_number__startswith=f"COST-{year}-"
-        ).order_by('-allocation_number').first()
-
-        if last_alloc:
-            try:
-                last_num = int(last_alloc.allocation_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"COST-{year}-{new_num:04d}"
+        return next_document_number(CostAllocation, "allocation_number", f"COST-{year}-", padding=4)
 
 
 class PaymentTerm(models.Model):
@@ -2776,20 +2737,7 @@ class VendorPayment(models.Model):
     def _generate_payment_number(self):
         """Generate unique payment number: PAY-YYYY-######"""
         year = timezone.now().year
-        last_pay = VendorPayment.objects.filter(
-            payment_number__startswith=f"PAY-{year}-"
-        ).order_by('-payment_number').first()
-
-        if last_pay:
-            try:
-                last_num = int(last_pay.payment_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-
-        return f"PAY-{year}-{new_num:06d}"
+        return next_document_number(VendorPayment, "payment_number", f"PAY-{year}-", padding=6)
 
 
 class PaymentAllocation(models.Model):
@@ -2827,17 +2775,34 @@ class PaymentAllocation(models.Model):
         return f"{self.payment.payment_number} → {self.vendor_invoice.invoice_number}: {self.allocated_amount}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update invoice paid amount
-        total_paid = self.vendor_invoice.payment_allocations.aggregate(
-            total=models.Sum('allocated_amount')
-        )['total'] or Decimal('0.00')
-        self.vendor_invoice.amount_paid = total_paid
-        if total_paid >= self.vendor_invoice.total_amount:
-            self.vendor_invoice.status = VendorInvoice.Status.PAID
-        elif total_paid > 0:
-            self.vendor_invoice.status = VendorInvoice.Status.PARTIALLY_PAID
-        self.vendor_invoice.save()
+        from .rollups import add_paid
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = PaymentAllocation.objects.filter(pk=self.pk).values_list(
+                    'vendor_invoice_id', 'allocated_amount'
+                ).first()
+            super().save(*args, **kwargs)
+            # Add the allocation change to the invoice paid amount
+            deltas = {self.vendor_invoice_id: Decimal(self.allocated_amount)}
+            if previous:
+                deltas[previous[0]] = deltas.get(previous[0], Decimal('0')) - previous[1]
+            add_paid(deltas)
+        self._refresh_invoice()
+
+    def delete(self, *args, **kwargs):
+        from .rollups import add_paid
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            add_paid({self.vendor_invoice_id: -Decimal(self.allocated_amount)})
+        self._refresh_invoice()
+        return result
+
+    def _refresh_invoice(self):
+        if PaymentAllocation.vendor_invoice.is_cached(self):
+            self.vendor_invoice.refresh_from_db(fields=['amount_paid', 'status', 'updated_at'])
 
 
 # =============================================================================
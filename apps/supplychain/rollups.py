@@ -0,0 +1,194 @@
+"""
+ARDT FMS - Purchasing Rollups
+Version: 5.4
+
+Set based maintenance of the totals that purchase orders and vendor
+invoices carry for their children.
+
+Nothing here re-reads a document's children in Python:
+
+    - PO subtotals and totals are one UPDATE with a SUM subquery;
+    - PO line received quantities and invoice paid amounts only change
+      by adding deltas with F() expressions, so concurrent receipts and
+      payments cannot overwrite each other;
+    - PO receiving status and invoice payment status are one conditional
+      UPDATE each for all affected documents.
+
+ReceiptLine and PaymentAllocation save()/delete() post their own deltas.
+Large receipts and payments go through the bulk APIs, which insert all
+lines at once and roll up each affected PO or invoice exactly once:
+
+    receive_lines(receipt, [ReceiptLine(po_line=..., quantity_received=..., quantity_accepted=...), ...])
+    allocate_payment(payment, {invoice: Decimal("1200.00"), ...})
+
+Queryset bulk_create()/update()/delete() on those models bypass the
+rollups; use these helpers instead.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import (
+    Case, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import PaymentAllocation, PurchaseOrder, PurchaseOrderLine, ReceiptLine, VendorInvoice
+
+ZERO = Decimal("0.00")
+
+# PO statuses that follow the receiving progress of their lines
+RECEIVING_STATUSES = (
+    PurchaseOrder.Status.APPROVED,
+    PurchaseOrder.Status.SENT,
+    PurchaseOrder.Status.ACKNOWLEDGED,
+    PurchaseOrder.Status.IN_PROGRESS,
+    PurchaseOrder.Status.PARTIALLY_RECEIVED,
+    PurchaseOrder.Status.COMPLETED,
+)
+
+# Invoice statuses that follow the paid amount
+PAYMENT_STATUSES = (VendorInvoice.Status.PAID, VendorInvoice.Status.PARTIALLY_PAID)
+
+
+def refresh_po_totals(po_ids):
+    """Recalculate subtotal and total of purchase orders from their non-cancelled lines."""
+    line_totals = (
+        PurchaseOrderLine.objects.filter(purchase_order=OuterRef("pk"), is_cancelled=False)
+        .order_by()
+        .values("purchase_order")
+        .annotate(total=Sum("line_total"))
+        .values("total")
+    )
+    subtotal = Coalesce(Subquery(line_totals), Value(ZERO), output_field=DecimalField())
+    return PurchaseOrder.objects.filter(pk__in=po_ids).update(
+        subtotal_amount=subtotal,
+        total_amount=subtotal + F("tax_amount") + F("shipping_amount") - F("discount_amount"),
+        updated_at=timezone.now(),
+    )
+
+
+def _add(model, field_name, deltas):
+    """Add {pk: delta} to a numeric field with one UPDATE."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    return model.objects.filter(pk__in=deltas).update(**{
+        field_name: Case(
+            *[When(pk=pk, then=F(field_name) + Value(delta)) for pk, delta in deltas.items()],
+            default=F(field_name),
+            output_field=model._meta.get_field(field_name),
+        ),
+        "updated_at": timezone.now(),
+    })
+
+
+def add_received(deltas):
+    """Add accepted quantities to PO lines ({po_line_id: delta})."""
+    return _add(PurchaseOrderLine, "quantity_received", deltas)
+
+
+def refresh_receipt_status(po_ids):
+    """
+    Move purchase orders to PARTIALLY_RECEIVED or COMPLETED.
+
+    A PO is COMPLETED when every non-cancelled line is fully received and
+    PARTIALLY_RECEIVED when some quantity has been received. Only POs in
+    RECEIVING_STATUSES are changed; nothing received leaves the status alone.
+    """
+    lines = PurchaseOrderLine.objects.filter(purchase_order=OuterRef("pk"), is_cancelled=False)
+    outstanding = Exists(lines.filter(quantity_received__lt=F("quantity_ordered")))
+    received = Exists(lines.filter(quantity_received__gt=0))
+    return PurchaseOrder.objects.filter(pk__in=po_ids, status__in=RECEIVING_STATUSES).filter(
+        Q(Exists(lines), ~outstanding) | Q(received, outstanding)
+    ).update(
+        status=Case(
+            When(outstanding, then=Value(PurchaseOrder.Status.PARTIALLY_RECEIVED)),
+            default=Value(PurchaseOrder.Status.COMPLETED),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def post_receipt_quantities(deltas):
+    """Add {po_line_id: accepted delta} and roll up each affected PO once."""
+    with transaction.atomic(savepoint=False):
+        add_received(deltas)
+        po_ids = set(
+            PurchaseOrderLine.objects.filter(pk__in=deltas).values_list("purchase_order_id", flat=True)
+        )
+        refresh_receipt_status(po_ids)
+
+
+def receive_lines(receipt, lines, batch_size=1000):
+    """
+    Bulk post unsaved ReceiptLines on a receipt.
+
+    Lines must belong to the receipt's purchase order; missing line
+    numbers continue after the receipt's last line. Received quantities
+    are added per PO line and the PO is rolled up once. Returns the
+    created lines.
+    """
+    lines = list(lines)
+    if not lines:
+        return lines
+    with transaction.atomic():
+        po_lines = set(receipt.purchase_order.lines.values_list("pk", flat=True))
+        foreign = sorted({line.po_line_id for line in lines} - po_lines)
+        if foreign:
+            raise ValidationError(f"PO lines {foreign} are not on {receipt.purchase_order.po_number}.")
+
+        last = receipt.lines.order_by("-line_number").values_list("line_number", flat=True).first() or 0
+        deltas = defaultdict(Decimal)
+        for line in lines:
+            line.receipt = receipt
+            if line.line_number is None:
+                last += 1
+                line.line_number = last
+            deltas[line.po_line_id] += line.quantity_accepted
+        ReceiptLine.objects.bulk_create(lines, batch_size=batch_size)
+        add_received(deltas)
+        refresh_receipt_status([receipt.purchase_order_id])
+    return lines
+
+
+def add_paid(deltas):
+    """
+    Add {invoice_id: amount} to invoices' amount_paid and update their status.
+
+    Invoices become PAID when fully paid and PARTIALLY_PAID when partly
+    paid; payment statuses go back to APPROVED when nothing is paid.
+    """
+    with transaction.atomic(savepoint=False):
+        if not _add(VendorInvoice, "amount_paid", deltas):
+            return 0
+        return VendorInvoice.objects.filter(pk__in=deltas).update(status=Case(
+            When(amount_paid__gt=0, amount_paid__gte=F("total_amount"), then=Value(VendorInvoice.Status.PAID)),
+            When(amount_paid__gt=0, then=Value(VendorInvoice.Status.PARTIALLY_PAID)),
+            When(status__in=PAYMENT_STATUSES, then=Value(VendorInvoice.Status.APPROVED)),
+            default=F("status"),
+        ))
+
+
+def allocate_payment(payment, allocations, batch_size=1000):
+    """
+    Bulk allocate a VendorPayment to invoices ({invoice or id: amount}).
+
+    Creates the PaymentAllocations and rolls up each invoice once.
+    Returns the created allocations.
+    """
+    created = [
+        PaymentAllocation(
+            payment=payment,
+            vendor_invoice_id=getattr(invoice, "pk", invoice),
+            allocated_amount=amount,
+        )
+        for invoice, amount in allocations.items()
+    ]
+    with transaction.atomic():
+        PaymentAllocation.objects.bulk_create(created, batch_size=batch_size)
+        add_paid({allocation.vendor_invoice_id: allocation.allocated_amount for allocation in created})
+    return created
@@ -0,0 +1,167 @@
+"""
+Tests for the batch three-way match engine.
+"""
+
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+
+from apps.supplychain.matching import Tolerances, match_invoices
+from apps.supplychain.models import (
+    InvoiceLine, InvoiceMatch, PurchaseOrder, PurchaseOrderLine, Receipt, ReceiptLine, Vendor, VendorInvoice,
+)
+from apps.supplychain.rollups import receive_lines
+
+TOLERANCES = Tolerances(price_percent=Decimal('2'), price_amount=Decimal('10'), quantity_percent=Decimal('0'))
+
+
+@pytest.fixture
+def vendor(db):
+    return Vendor.objects.create(
+        name='Match Vendor', vendor_type=Vendor.VendorType.MATERIALS_SUPPLIER, status=Vendor.Status.ACTIVE,
+        address_line_1='1 Vendor Street', city='Dammam', country='Saudi Arabia', phone='+966-12-345-6789',
+        email='match@vendor.com',
+    )
+
+
+@pytest.fixture
+def make_order(vendor, user):
+    """PO with one line of 10 x 100.00 (10% discount), `received` accepted on a receipt."""
+    def _make(received=Decimal('10')):
+        po = PurchaseOrder.objects.create(
+            vendor=vendor, status=PurchaseOrder.Status.SENT, order_date=date.today(), created_by=user,
+        )
+        line = PurchaseOrderLine.objects.create(
+            purchase_order=po, line_number=1, item_description='Cutter', quantity_ordered=Decimal('10'),
+            unit_of_measure='EA', unit_price=Decimal('100.00'), discount_percent=Decimal('10'),
+            required_date=date.today(),
+        )
+        receipt = Receipt.objects.create(
+            purchase_order=po, vendor=vendor, receipt_date=date.today(), received_by=user,
+            status=Receipt.Status.ACCEPTED,
+        )
+        receive_lines(receipt, [ReceiptLine(po_line=line, quantity_received=received, quantity_accepted=received)])
+        return line, receipt
+    return _make
+
+
+def invoice_for(po_line, quantity, unit_price, number='V-1'):
+    invoice = VendorInvoice.objects.create(
+        vendor=po_line.purchase_order.vendor, vendor_invoice_number=number, purchase_order=po_line.purchase_order,
+        invoice_date=date.today(), received_date=date.today(), due_date=date.today() + timedelta(days=30),
+        subtotal_amount=quantity * unit_price, total_amount=quantity * unit_price,
+    )
+    InvoiceLine.objects.create(
+        vendor_invoice=invoice, line_number=1, po_line=po_line, description='Cutter',
+        quantity=quantity, unit_price=unit_price, line_total=quantity * unit_price,
+    )
+    return invoice
+
+
+class TestMatchInvoices:
+    """Tests for match_invoices."""
+
+    def test_price_tolerance(self, make_order):
+        line, receipt = make_order()
+        within = invoice_for(line, Decimal('4'), Decimal('92.00'), 'V-1')
+        beyond = invoice_for(line, Decimal('6'), Decimal('95.00'), 'V-2')
+
+        result = match_invoices(tolerances=TOLERANCES)
+
+        assert (result.invoices, result.matched, result.created) == (2, 1, 2)
+        within.refresh_from_db()
+        assert within.status == VendorInvoice.Status.MATCHED and within.is_matched
+        match = within.matches.get()
+        assert (match.match_status, match.receipt, match.price_variance) == (
+            InvoiceMatch.MatchStatus.MATCHED, receipt, Decimal('8.00'),
+        )
+        assert match.price_variance_percent == Decimal('2.22')
+
+        beyond.refresh_from_db()
+        assert beyond.status == VendorInvoice.Status.MATCH_EXCEPTION
+        assert 'Price variance 30.00 (5.56%)' in beyond.match_exception_reason
+        assert beyond.lines.get().variance_amount == Decimal('30.00')
+
+    def test_quantity_beyond_receipts_then_rematch(self, make_order):
+        line, _ = make_order(received=Decimal('6'))
+        invoice = invoice_for(line, Decimal('8'), Decimal('90.00'))
+
+        match_invoices(tolerances=TOLERANCES)
+        match = invoice.matches.get()
+        assert match.match_status == InvoiceMatch.MatchStatus.EXCEPTION
+        assert match.quantity_variance == Decimal('2.000')
+        assert '2 invoiced beyond accepted receipts' in match.exception_notes
+
+        second = Receipt.objects.create(
+            purchase_order=line.purchase_order, vendor=line.purchase_order.vendor, receipt_date=date.today(),
+            received_by=match.purchase_order.created_by, status=Receipt.Status.COMPLETED,
+        )
+        receive_lines(second, [ReceiptLine(po_line=line, quantity_received=2, quantity_accepted=2)])
+        result = match_invoices(tolerances=TOLERANCES)
+
+        assert (result.matched, result.created, result.updated) == (1, 0, 1)
+        match.refresh_from_db()
+        assert (match.match_status, match.receipt, match.quantity_variance) == (
+            InvoiceMatch.MatchStatus.MATCHED, second, Decimal('0.000'),
+        )
+
+    def test_unlinked_lines_and_resolved_matches(self, make_order):
+        line, _ = make_order()
+        unlinked = invoice_for(line, Decimal('1'), Decimal('90.00'), 'V-1')
+        unlinked.lines.update(po_line=None)
+        resolved = invoice_for(line, Decimal('1'), Decimal('500.00'), 'V-2')
+        InvoiceMatch.objects.create(
+            vendor_invoice=resolved, purchase_order=line.purchase_order,
+            match_status=InvoiceMatch.MatchStatus.RESOLVED,
+        )
+
+        result = match_invoices(tolerances=TOLERANCES)
+
+        assert result.exceptions == [(unlinked.invoice_number, ['Line 1: not linked to a PO line'])]
+        assert resolved.matches.get().match_status == InvoiceMatch.MatchStatus.RESOLVED
+
+    def test_invoices_approved_during_the_run_are_left_alone(self, make_order):
+        from unittest import mock
+        from apps.supplychain import matching
+
+        line, _ = make_order()
+        approved = invoice_for(line, Decimal('1'), Decimal('90.00'), 'V-1')
+        pending = invoice_for(line, Decimal('1'), Decimal('90.00'), 'V-2')
+        snapshot = matching._invoice_ids
+
+        def approve_after_snapshot(*args):
+            ids = snapshot(*args)
+            VendorInvoice.objects.filter(pk=approved.pk).update(status=VendorInvoice.Status.APPROVED)
+            return ids
+
+        with mock.patch.object(matching, '_invoice_ids', approve_after_snapshot):
+            result = match_invoices(tolerances=TOLERANCES)
+
+        assert (result.invoices, result.matched) == (1, 1)
+        approved.refresh_from_db()
+        pending.refresh_from_db()
+        assert (approved.status, approved.matches.exists()) == (VendorInvoice.Status.APPROVED, False)
+        assert pending.status == VendorInvoice.Status.MATCHED
+
+    def test_queries_do_not_grow_with_invoices(self, make_order, django_assert_max_num_queries):
+        line, _ = make_order()
+        for number in range(10):
+            invoice_for(line, Decimal('1'), Decimal('90.00'), f'V-{number}')
+
+        # ids, invoices, lines, PO lines, receipts, invoiced, matches, 4 writes, savepoint
+        with django_assert_max_num_queries(13):
+            result = match_invoices(tolerances=TOLERANCES)
+        assert (result.invoices, result.matched) == (10, 10)
+
+    def test_command_dry_run(self, make_order):
+        line, _ = make_order()
+        invoice = invoice_for(line, Decimal('12'), Decimal('90.00'))
+        out = StringIO()
+
+        call_command('match_invoices', invoice.invoice_number, '--dry-run', stdout=out)
+
+        assert f'{invoice.invoice_number}: PO line {line.pk}: 2 invoiced beyond accepted receipts' in out.getvalue()
+        assert 'Dry run - 1 invoice(s) checked, 0 matched, 1 exception(s)' in out.getvalue()
+        assert not InvoiceMatch.objects.exists()
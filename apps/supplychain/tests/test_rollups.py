@@ -0,0 +1,172 @@
+"""
+Tests for set based purchase order and invoice rollups.
+"""
+
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+
+from apps.supplychain.models import (
+    PaymentAllocation, PurchaseOrder, PurchaseOrderLine, Receipt, ReceiptLine, Vendor, VendorInvoice,
+    VendorPayment,
+)
+from apps.supplychain.rollups import allocate_payment, receive_lines, refresh_receipt_status
+
+
+@pytest.fixture
+def vendor(db):
+    return Vendor.objects.create(
+        name='Rollup Vendor', vendor_type=Vendor.VendorType.MATERIALS_SUPPLIER, status=Vendor.Status.ACTIVE,
+        address_line_1='1 Vendor Street', city='Dammam', country='Saudi Arabia', phone='+966-12-345-6789',
+        email='rollup@vendor.com',
+    )
+
+
+@pytest.fixture
+def purchase_order(db, vendor, user):
+    po = PurchaseOrder.objects.create(
+        vendor=vendor, status=PurchaseOrder.Status.SENT, order_date=date.today(), created_by=user,
+        tax_amount=Decimal('15.00'), shipping_amount=Decimal('10.00'), discount_amount=Decimal('5.00'),
+    )
+    for number in range(1, 4):
+        PurchaseOrderLine.objects.create(
+            purchase_order=po, line_number=number, item_description=f'Item {number}',
+            quantity_ordered=Decimal('10'), unit_of_measure='EA', unit_price=Decimal('20.00'),
+            required_date=date.today() + timedelta(days=7), is_cancelled=number == 3,
+        )
+    return po
+
+
+@pytest.fixture
+def receipt(db, purchase_order, user):
+    return Receipt.objects.create(
+        purchase_order=purchase_order, vendor=purchase_order.vendor, receipt_date=date.today(), received_by=user,
+    )
+
+
+@pytest.fixture
+def invoices(db, vendor, purchase_order):
+    return [
+        VendorInvoice.objects.create(
+            vendor=vendor, vendor_invoice_number=f'V-{i}', purchase_order=purchase_order,
+            invoice_date=date.today(), received_date=date.today(), due_date=date.today() + timedelta(days=30),
+            subtotal_amount=Decimal('300.00'), total_amount=Decimal('300.00'),
+            status=VendorInvoice.Status.APPROVED,
+        )
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def payment(db, vendor):
+    return VendorPayment.objects.create(
+        vendor=vendor, payment_method=VendorPayment.PaymentMethod.WIRE_TRANSFER, payment_date=date.today(),
+        payment_amount=Decimal('1000.00'),
+    )
+
+
+def quantities(po):
+    return list(po.lines.order_by('line_number').values_list('quantity_received', flat=True))
+
+
+class TestPurchaseOrderTotals:
+    """Tests for PO totals and receiving status."""
+
+    def test_totals_skip_cancelled_lines(self, purchase_order, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            purchase_order.calculate_totals()
+        assert purchase_order.subtotal_amount == Decimal('400.00')
+        assert purchase_order.total_amount == Decimal('420.00')
+
+    def test_receipt_line_edits_post_deltas(self, purchase_order, receipt):
+        line = purchase_order.lines.get(line_number=1)
+        receipt_line = ReceiptLine.objects.create(
+            receipt=receipt, line_number=1, po_line=line,
+            quantity_received=Decimal('6'), quantity_accepted=Decimal('4'),
+        )
+        assert line.quantity_received == Decimal('4')
+        purchase_order.refresh_from_db()
+        assert purchase_order.status == PurchaseOrder.Status.PARTIALLY_RECEIVED
+        assert not purchase_order.is_fully_received
+
+        receipt_line.quantity_accepted = Decimal('6')
+        receipt_line.save()
+        assert quantities(purchase_order) == [Decimal('6'), Decimal('0'), Decimal('0')]
+
+        receipt_line.po_line = purchase_order.lines.get(line_number=2)
+        receipt_line.save()
+        assert quantities(purchase_order) == [Decimal('0'), Decimal('6'), Decimal('0')]
+
+        receipt_line.delete()
+        assert quantities(purchase_order) == [Decimal('0'), Decimal('0'), Decimal('0')]
+
+    def test_status_only_follows_receiving_statuses(self, purchase_order):
+        purchase_order.lines.update(quantity_received=Decimal('10'))
+        refresh_receipt_status([purchase_order.pk])
+        purchase_order.refresh_from_db()
+        assert purchase_order.status == PurchaseOrder.Status.COMPLETED
+        assert purchase_order.is_fully_received
+
+        PurchaseOrder.objects.filter(pk=purchase_order.pk).update(status=PurchaseOrder.Status.CLOSED)
+        purchase_order.lines.update(quantity_received=Decimal('0'))
+        assert refresh_receipt_status([purchase_order.pk]) == 0
+
+
+class TestReceiveLines:
+    """Tests for bulk receiving."""
+
+    def test_bulk_receipt_rolls_up_once(self, purchase_order, receipt, django_assert_num_queries):
+        first, second = purchase_order.lines.filter(is_cancelled=False).order_by('line_number')
+        lines = [
+            ReceiptLine(po_line=line, quantity_received=Decimal('0.6'), quantity_accepted=Decimal('0.5'))
+            for line in [first, second] * 20
+        ]
+
+        # savepoint, PO lines, last line number, insert, increment, status, release
+        with django_assert_num_queries(7):
+            receive_lines(receipt, lines)
+
+        assert [line.line_number for line in lines] == list(range(1, 41))
+        assert quantities(purchase_order) == [Decimal('10'), Decimal('10'), Decimal('0')]
+        purchase_order.refresh_from_db()
+        assert purchase_order.status == PurchaseOrder.Status.COMPLETED
+
+    def test_rejects_lines_of_other_orders(self, purchase_order, receipt, vendor, user):
+        other = PurchaseOrder.objects.create(vendor=vendor, order_date=date.today(), created_by=user)
+        line = PurchaseOrderLine.objects.create(
+            purchase_order=other, line_number=1, item_description='Other', quantity_ordered=Decimal('1'),
+            unit_of_measure='EA', unit_price=Decimal('1'), required_date=date.today(),
+        )
+        with pytest.raises(ValidationError):
+            receive_lines(receipt, [ReceiptLine(po_line=line, quantity_received=1, quantity_accepted=1)])
+        assert not ReceiptLine.objects.exists()
+
+
+class TestPaymentRollups:
+    """Tests for invoice paid amount rollups."""
+
+    def test_allocation_edits_update_invoice(self, invoices, payment):
+        invoice = invoices[0]
+        allocation = PaymentAllocation.objects.create(
+            payment=payment, vendor_invoice=invoice, allocated_amount=Decimal('100.00'),
+        )
+        assert (invoice.amount_paid, invoice.status) == (Decimal('100.00'), VendorInvoice.Status.PARTIALLY_PAID)
+
+        allocation.allocated_amount = Decimal('300.00')
+        allocation.save()
+        assert (invoice.amount_paid, invoice.status) == (Decimal('300.00'), VendorInvoice.Status.PAID)
+
+        allocation.delete()
+        assert (invoice.amount_paid, invoice.status) == (Decimal('0.00'), VendorInvoice.Status.APPROVED)
+
+    def test_bulk_allocation(self, invoices, payment, django_assert_num_queries):
+        # savepoint, insert, increment, status, release
+        with django_assert_num_queries(5):
+            allocate_payment(payment, {invoices[0]: Decimal('300.00'), invoices[1].pk: Decimal('50.00')})
+
+        paid = VendorInvoice.objects.order_by('vendor_invoice_number').values_list('amount_paid', 'status')
+        assert list(paid) == [
+            (Decimal('300.00'), VendorInvoice.Status.PAID),
+            (Decimal('50.00'), VendorInvoice.Status.PARTIALLY_PAID),
+        ]
@@ -580,11 +580,9 @@ class ReceiptAddLineView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         receipt = get_object_or_404(Receipt, pk=self.kwargs["pk"])
         form.instance.receipt = receipt
-
-        # Update PO line received quantity
-        po_line = form.instance.po_line
-        po_line.quantity_received += form.instance.quantity_received
-        po_line.save()
+        last_line = receipt.lines.order_by("-line_number").first()
+        form.instance.line_number = (last_line.line_number + 1) if last_line else 1
+        # ReceiptLine.save() adds the accepted quantity to the PO line
 
         messages.success(self.request, "Receipt line added successfully.")
         return super().form_valid(form)
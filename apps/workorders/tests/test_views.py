@@ -49,6 +49,24 @@ class TestWorkOrderListView:
         response = authenticated_client.get(url, {'status': WorkOrder.Status.DRAFT})
         assert response.status_code == 200
 
+    def test_export_work_orders_csv_is_streamed(self, authenticated_client, work_order):
+        """Test work orders export streams display values row by row."""
+        url = reverse('workorders:export_csv')
+        response = authenticated_client.get(url)
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0].startswith('WO Number,Type,Customer')
+        assert lines[1].startswith(f'{work_order.wo_number},{work_order.get_wo_type_display()},')
+        assert len(lines) == 2
+
+    def test_export_drill_bits_csv_is_streamed(self, authenticated_client, drill_bit):
+        """Test drill bits export streams display values row by row."""
+        url = reverse('workorders:drillbit_export_csv')
+        response = authenticated_client.get(url)
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[1].startswith(f'{drill_bit.serial_number},{drill_bit.get_bit_type_display()},8.500,')
+
     def test_list_view_filter_by_priority(self, authenticated_client, work_order):
         """Test list view filters by priority."""
         from apps.workorders.models import WorkOrder
@@ -5,7 +5,6 @@ Version: 5.4 - Sprint 1.5
 Work order management views with optimized queries and exports.
 """
 
-import csv
 from datetime import datetime
 
 from django.conf import settings
@@ -13,12 +12,15 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Q
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
+from apps.common.exports import EXPORT_CHUNK_SIZE, choice_labels
+from apps.common.sequences import next_document_number
+from apps.reports.audit import audited_csv_response
+
 from .forms import DrillBitForm, WorkOrderForm
 from .models import DrillBit, WorkOrder
 from .utils import generate_drill_bit_qr, generate_work_order_qr
@@ -126,10 +128,7 @@ class WorkOrderCreateView(LoginRequiredMixin, CreateView):
         prefix = getattr(settings, "ARDT_WO_NUMBER_PREFIX", "WO")
         padding = getattr(settings, "ARDT_WO_NUMBER_PADDING", 6)
 
-        last_wo = WorkOrder.objects.order_by("-id").first()
-        next_number = (last_wo.id + 1) if last_wo else 1
-
-        return f"{prefix}-{str(next_number).zfill(padding)}"
+        return next_document_number(WorkOrder, "wo_number", f"{prefix}-", padding=padding)
 
     def get_success_url(self):
         return reverse_lazy("workorders:detail", kwargs={"pk": self.object.pk})
@@ -425,29 +424,26 @@ def export_work_orders_csv(request):
     """
     Export work orders to CSV file.
     Preserves any active filters from the list view.
+
+    Rows are streamed from a .values_list() iterator, so memory use stays
+    constant and the first bytes reach the client immediately.
     """
-    response = HttpResponse(content_type="text/csv")
     filename = f'workorders_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "WO Number",
-            "Type",
-            "Customer",
-            "Drill Bit",
-            "Status",
-            "Priority",
-            "Due Date",
-            "Assigned To",
-            "Progress %",
-            "Created At",
-        ]
-    )
+    header = [
+        "WO Number",
+        "Type",
+        "Customer",
+        "Drill Bit",
+        "Status",
+        "Priority",
+        "Due Date",
+        "Assigned To",
+        "Progress %",
+        "Created At",
+    ]
 
     # Build queryset with same filters as list view
-    queryset = WorkOrder.objects.select_related("customer", "drill_bit", "assigned_to").order_by("-created_at")
+    queryset = WorkOrder.objects.order_by("-created_at")
 
     # Apply filters from request
     status = request.GET.get("status")
@@ -462,23 +458,41 @@ def export_work_orders_csv(request):
     if search:
         queryset = queryset.filter(Q(wo_number__icontains=search) | Q(customer__name__icontains=search))
 
-    for wo in queryset:
-        writer.writerow(
-            [
-                wo.wo_number,
-                wo.get_wo_type_display(),
-                wo.customer.name if wo.customer else "",
-                wo.drill_bit.serial_number if wo.drill_bit else "",
-                wo.get_status_display(),
-                wo.get_priority_display(),
-                wo.due_date.strftime("%Y-%m-%d") if wo.due_date else "",
-                wo.assigned_to.get_full_name() if wo.assigned_to else "",
-                wo.progress_percent,
-                wo.created_at.strftime("%Y-%m-%d %H:%M"),
+    rows = queryset.values_list(
+        "wo_number",
+        "wo_type",
+        "customer__name",
+        "drill_bit__serial_number",
+        "status",
+        "priority",
+        "due_date",
+        "assigned_to__first_name",
+        "assigned_to__last_name",
+        "progress_percent",
+        "created_at",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    wo_types = choice_labels(WorkOrder, "wo_type")
+    statuses = choice_labels(WorkOrder, "status")
+    priorities = choice_labels(WorkOrder, "priority")
+
+    def format_rows():
+        for (wo_number, wo_type, customer, bit_serial, wo_status, wo_priority,
+             due_date, first_name, last_name, progress, created_at) in rows:
+            yield [
+                wo_number,
+                wo_types.get(wo_type, wo_type),
+                customer or "",
+                bit_serial or "",
+                statuses.get(wo_status, wo_status),
+                priorities.get(wo_priority, wo_priority),
+                due_date.strftime("%Y-%m-%d") if due_date else "",
+                f"{first_name or ''} {last_name or ''}".strip(),
+                progress,
+                created_at.strftime("%Y-%m-%d %H:%M"),
             ]
-        )
 
-    return response
+    return audited_csv_response(request, "Work Orders", filename, header, format_rows())
 
 
 @login_required
@@ -486,29 +500,26 @@ def export_drill_bits_csv(request):
     """
     Export drill bits to CSV file.
     Preserves any active filters from the list view.
+
+    Rows are streamed from a .values_list() iterator, so memory use stays
+    constant and the first bytes reach the client immediately.
     """
-    response = HttpResponse(content_type="text/csv")
     filename = f'drillbits_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "Serial Number",
-            "Type",
-            "Size",
-            "IADC Code",
-            "Status",
-            "Customer",
-            "Location",
-            "Total Hours",
-            "Total Footage",
-            "Run Count",
-        ]
-    )
+    header = [
+        "Serial Number",
+        "Type",
+        "Size",
+        "IADC Code",
+        "Status",
+        "Customer",
+        "Location",
+        "Total Hours",
+        "Total Footage",
+        "Run Count",
+    ]
 
     # Build queryset with same filters as list view
-    queryset = DrillBit.objects.select_related("customer", "current_location").order_by("-created_at")
+    queryset = DrillBit.objects.order_by("-created_at")
 
     # Apply filters from request
     status = request.GET.get("status")
@@ -523,23 +534,39 @@ def export_drill_bits_csv(request):
     if search:
         queryset = queryset.filter(Q(serial_number__icontains=search) | Q(iadc_code__icontains=search))
 
-    for bit in queryset:
-        writer.writerow(
-            [
-                bit.serial_number,
-                bit.get_bit_type_display(),
-                str(bit.size),
-                bit.iadc_code,
-                bit.get_status_display(),
-                bit.customer.name if bit.customer else "",
-                bit.current_location.name if bit.current_location else "",
-                str(bit.total_hours),
-                bit.total_footage,
-                bit.run_count,
+    rows = queryset.values_list(
+        "serial_number",
+        "bit_type",
+        "size",
+        "iadc_code",
+        "status",
+        "customer__name",
+        "current_location__name",
+        "total_hours",
+        "total_footage",
+        "run_count",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    bit_types = choice_labels(DrillBit, "bit_type")
+    statuses = choice_labels(DrillBit, "status")
+
+    def format_rows():
+        for (serial, bit_type_value, size, iadc, bit_status, customer, location,
+             hours, footage, runs) in rows:
+            yield [
+                serial,
+                bit_types.get(bit_type_value, bit_type_value),
+                str(size),
+                iadc,
+                statuses.get(bit_status, bit_status),
+                customer or "",
+                location or "",
+                str(hours),
+                footage,
+                runs,
             ]
-        )
 
-    return response
+    return audited_csv_response(request, "Drill Bits", filename, header, format_rows())
 
 
 # =============================================================================
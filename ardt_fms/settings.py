@@ -156,6 +156,17 @@ DATABASES = {
     'default': env.db('DATABASE_URL')
 }
 
+# =============================================================================
+# CACHE
+# =============================================================================
+
+# Role/permission snapshots and other cached data are invalidated through
+# version keys in this cache, so every worker process must share it.
+# Without REDIS_URL a per-process cache is used (single-process development only).
+CACHES = {
+    'default': env.cache('REDIS_URL', default='locmemcache://')
+}
+
 # =============================================================================
 # AUTHENTICATION
 # =============================================================================
@@ -297,10 +308,54 @@ ARDT_WO_NUMBER_PADDING = 6  # WO-000001
 ARDT_DRSS_NUMBER_PREFIX = 'DRSS'
 ARDT_DRSS_NUMBER_PADDING = 6
 
+# Document Number Sequences (apps.common.sequences)
+ARDT_SEQUENCE_BLOCK_SIZE = 1  # >1 pre-allocates blocks per worker outside transactions (faster, not gap-free)
+
+# Field Run Data Rollups (apps.sales.run_rollups)
+ARDT_RUN_ROLLUP_DEPTH_INTERVAL = 10  # Feet of bit depth per depth-interval bucket
+ARDT_RUN_SERIES_MAX_POINTS = 2000  # Run charts switch to coarser buckets above this many points
+
+# GPS Tracking (apps.sales.geo)
+ARDT_GPS_LIVE_MINUTES = 30  # Pings older than this do not count as a technician's live position
+ARDT_GEOFENCE_RADIUS_M = 200  # A ping this close to a visit's site checks the visit in
+ARDT_GPS_RAW_RETENTION_DAYS = 30  # Older automatic pings are archived to GPSTrack blobs by prune_gps_history
+ARDT_GPS_TRACK_TOLERANCE_M = 10  # Simplified track points stay within this distance of the raw track
+ARDT_GPS_NEARBY_MAX_KM = 500  # Largest radius accepted by the nearby technicians lookup
+
+# Three-Way Match (apps.supplychain.matching)
+ARDT_MATCH_PRICE_TOLERANCE_PERCENT = 2  # Invoice price variance allowed, as a percent of the PO value...
+ARDT_MATCH_PRICE_TOLERANCE_AMOUNT = 50  # ...or as an amount per invoice, whichever is larger
+ARDT_MATCH_QUANTITY_TOLERANCE_PERCENT = 0  # Quantity that may be invoiced beyond accepted receipts
+
+# Compiled Branch Tables / Form Schemas (apps.common.compiled)
+ARDT_COMPILED_CACHE_TIMEOUT = 300  # Seconds a process keeps a compiled object before recompiling it anyway
+
+# Checkpoint Follow-ups (apps.execution.checkpoints; run `manage.py process_checkpoint_followups` as a worker)
+ARDT_CHECKPOINT_FOLLOWUP_LOCAL_WORKERS = 1  # In-process threads raising NCRs/notifications after commit; 0 = worker only
+
 # Planning Settings
 ARDT_DEFAULT_SPRINT_DURATION_WEEKS = 2
 ARDT_DEFAULT_WIP_LIMIT = 3
 
+# Inventory Settings
+ARDT_INVENTORY_ALLOW_NEGATIVE_STOCK = False  # Reject issues/transfers that would take a stock row below zero
+
+# Authorization Settings
+ARDT_AUTHZ_CACHE_TIMEOUT = 300  # Seconds a user's role/permission snapshot is shared across requests
+
+# Dashboard Settings
+ARDT_DASHBOARD_KPI_CACHE_TIMEOUT = 60  # Seconds KPI counters are shared across users
+ARDT_DASHBOARD_WIDGET_CACHE_TIMEOUT = 60  # Default TTL for rendered widget bodies
+
+# Export Audit Settings (ReportExportLog rows are written in deferred batches)
+ARDT_EXPORT_AUDIT_ASYNC = True
+ARDT_EXPORT_AUDIT_BATCH_SIZE = 50
+ARDT_EXPORT_AUDIT_FLUSH_INTERVAL = 5  # Seconds
+
+# Background Export Jobs (files under MEDIA_ROOT/exports/; run `manage.py run_export_jobs` as a worker)
+ARDT_EXPORT_JOB_LOCAL_WORKERS = 1  # In-process threads that also drain the queue; 0 = dedicated workers only
+ARDT_EXPORT_JOB_TIMEOUT = 3600  # Seconds before a RUNNING job is considered abandoned and re-queued
+
 # =============================================================================
 # SECURITY SETTINGS
 # =============================================================================
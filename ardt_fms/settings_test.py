@@ -14,6 +14,13 @@ DATABASES = {
     }
 }
 
+# Per-process cache for tests (ignore REDIS_URL from .env)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Faster password hashing for tests
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
@@ -24,3 +31,12 @@ DEBUG = False
 
 # Faster tests
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Write export audit logs synchronously (the test database is not shared with threads)
+ARDT_EXPORT_AUDIT_ASYNC = False
+
+# Tests run export jobs explicitly instead of on background threads
+ARDT_EXPORT_JOB_LOCAL_WORKERS = 0
+
+# Tests raise checkpoint follow-ups explicitly instead of on background threads
+ARDT_CHECKPOINT_FOLLOWUP_LOCAL_WORKERS = 0